@@ -1,38 +1,66 @@
+import asyncio
 from fastapi import FastAPI
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-from endpoints.users import router as users_router
-from endpoints.auth import router as auth_router
-from endpoints.sessions import router as sessions_router
-from endpoints.courses import router as courses_router
-from endpoints.lessons import router as lessons_router
-from endpoints.assignments import router as assignments_router
-from endpoints.grades import router as grades_router
-from endpoints.progress import router as progress_router
-from endpoints.notifications import router as notifications_router
-from endpoints.files import router as files_router
-from endpoints.analytics import router as analytics_router
-from endpoints.reports import router as reports_router
-from endpoints.settings import router as settings_router
-from endpoints.calendar import router as calendar_router
-from endpoints.messages import router as messages_router
-from endpoints.payments import router as payments_router
-from endpoints.subscriptions import router as subscriptions_router
-from endpoints.feedback import router as feedback_router
-from endpoints.support import router as support_router
-from endpoints.admin import router as admin_router
-from endpoints.learning_sessions import router as learning_sessions_router
-from endpoints.ai_tutor import router as ai_tutor_router
-from endpoints.families import router as families_router
-from endpoints.device_monitoring import router as device_monitoring_router
-from endpoints.parental_controls import router as parental_controls_router
-from endpoints.anti_cheat import router as anti_cheat_router
-from endpoints.gamification import router as gamification_router
-from endpoints.content import router as content_router
-from endpoints.assessments import router as assessments_router
+from utils.process_pool import EventLoopLagMonitor, get_detector_pool
+from monitoring.iprangeindex import get_ip_range_index
+from monitoring.activity_logger import get_activity_sink
+from utils.router_registry import LazyRouterMiddleware, RouterRegistry
+from utils.rate_limiter import get_rate_limiter
+from utils.compression import CompressionMiddleware
+from utils.dataloader import DataLoaderMiddleware
+from utils.idempotency import IdempotencyMiddleware
+from utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, get_metrics_registry
+from config import settings
+from database import dispose_engine
+from utils.resource_stats import start_stats_reconciler, stop_stats_reconciler
+
+# Endpoint modules by URL prefix; they are imported on first use or during warmup
+ROUTERS = [
+    ("/api/assessments", "endpoints.assessments"),
+    ("/api/content", "endpoints.content"),
+    ("/api/gamification", "endpoints.gamification"),
+    ("/api/anti-cheat", "endpoints.anti_cheat"),
+    ("/api/parental-controls", "endpoints.parental_controls"),
+    ("/api/device-monitoring", "endpoints.device_monitoring"),
+    ("/api/families", "endpoints.families"),
+    ("/api/ai-tutor", "endpoints.ai_tutor"),
+    ("/api/learning-sessions", "endpoints.learning_sessions"),
+    ("/api/admin", "endpoints.admin"),
+    ("/api/support", "endpoints.support"),
+    ("/api/feedback", "endpoints.feedback"),
+    ("/api/subscriptions", "endpoints.subscriptions"),
+    ("/api/payments", "endpoints.payments"),
+    ("/api/messages", "endpoints.messages"),
+    ("/api/calendar", "endpoints.calendar"),
+    ("/api/settings", "endpoints.settings"),
+    ("/api/reports", "endpoints.reports"),
+    ("/api/analytics", "endpoints.analytics"),
+    ("/api/files", "endpoints.files"),
+    ("/api/notifications", "endpoints.notifications"),
+    ("/api/progress", "endpoints.progress"),
+    ("/api/grades", "endpoints.grades"),
+    ("/api/assignments", "endpoints.assignments"),
+    ("/api/lessons", "endpoints.lessons"),
+    ("/api/courses", "endpoints.courses"),
+    ("/api/sessions", "endpoints.sessions"),
+    ("/api/auth", "endpoints.auth"),
+    ("/api/users", "endpoints.users"),
+    ("/api/batch", "endpoints.batch"),
+]
 
 app = FastAPI()
 
+router_registry = RouterRegistry(app)
+for prefix, module in ROUTERS:
+    router_registry.register(prefix, module)
+
+if settings.LAZY_ROUTERS:
+    app.add_middleware(LazyRouterMiddleware, registry=router_registry)
+else:
+    router_registry.load_all_sync()
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],
@@ -40,39 +68,80 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(assessments_router)
-app.include_router(content_router)
-app.include_router(gamification_router)
-app.include_router(anti_cheat_router)
-app.include_router(parental_controls_router)
-app.include_router(device_monitoring_router)
-app.include_router(families_router)
-app.include_router(ai_tutor_router)
-app.include_router(learning_sessions_router)
-app.include_router(admin_router)
-app.include_router(support_router)
-app.include_router(feedback_router)
-app.include_router(subscriptions_router)
-app.include_router(payments_router)
-app.include_router(messages_router)
-app.include_router(calendar_router)
-app.include_router(settings_router)
-app.include_router(reports_router)
-app.include_router(analytics_router)
-app.include_router(files_router)
-app.include_router(notifications_router)
-app.include_router(progress_router)
-app.include_router(grades_router)
-app.include_router(assignments_router)
-app.include_router(lessons_router)
-app.include_router(courses_router)
-app.include_router(sessions_router)
-app.include_router(auth_router)
-app.include_router(users_router)
+# Per-request loaders for batched service-layer lookups
+app.add_middleware(DataLoaderMiddleware)
+
+# Replays stored responses for retried POST/PATCH requests carrying an Idempotency-Key
+app.add_middleware(IdempotencyMiddleware)
+
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+# Outermost, so latencies and sizes cover every other middleware
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+loop_lag_monitor = EventLoopLagMonitor()
+
+@app.on_event("startup")
+async def start_background_services():
+    loop_lag_monitor.start()
+    # Workers warm up in the background; startup does not wait for them
+    get_detector_pool().start_warmup()
+    await get_ip_range_index().start_auto_reload()
+    await get_rate_limiter().start()
+    await get_activity_sink().start()
+    await get_metrics_registry().start()
+    start_stats_reconciler()
+    if settings.LAZY_ROUTERS and settings.ROUTER_WARMUP:
+        router_registry.start_warmup(delay=settings.ROUTER_WARMUP_DELAY)
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    await router_registry.stop_warmup()
+    await get_rate_limiter().stop()
+    await get_metrics_registry().stop()
+    await stop_stats_reconciler()
+    # Buffered activity records need the engine, so they are written before it goes
+    await get_activity_sink().stop()
+    await dispose_engine()
+    # Imported here so startup does not pay for numpy; indexes exist only once a router used them
+    from utils.search_index import close_search_indexes
+    await asyncio.to_thread(close_search_indexes)
+    await get_ip_range_index().stop_auto_reload()
+    await get_detector_pool().shutdown()
+    await loop_lag_monitor.stop()
+
 @app.get("/api/status")
 async def get_status():
     return {"status": "operational", "version": "1.0.0"}
 
+@app.get("/api/status/event-loop")
+async def get_event_loop_status():
+    return {
+        "lag": loop_lag_monitor.snapshot(),
+        "detector_pool": {
+            "in_flight": get_detector_pool().in_flight,
+            **get_detector_pool().stats
+        }
+    }
+
+@app.get("/api/status/routers")
+async def get_router_status():
+    return {"routers": router_registry.status()}
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    registry = get_metrics_registry()
+    if registry.directory:
+        # Other workers' files are read from disk; this worker's numbers are taken here on the loop
+        body = await asyncio.to_thread(registry.render, registry.snapshot())
+    else:
+        body = registry.render()
+    return Response(body, headers={"content-type": METRICS_CONTENT_TYPE})
+
 @app.get("/api/data")
 async def get_data():
     # TODO: Implement data endpoint
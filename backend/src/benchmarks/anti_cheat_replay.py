@@ -0,0 +1,333 @@
+# Anti-cheat replay - throughput, per-detector latency and verdict diffs
+#
+# Replays a corpus of interactions, browser and clipboard events through
+# AntiCheatService.analyze_interaction as fast as possible. Browser and
+# clipboard events are served from memory, and the detectors see the
+# corpus timestamps as "now", so verdicts are reproducible between runs.
+#
+# Usage (from backend/src):
+#   python -m benchmarks.anti_cheat_replay --synthesize 5000 --corpus corpus.ndjson
+#   python -m benchmarks.anti_cheat_replay --corpus corpus.ndjson --save-baseline baseline.json
+#   python -m benchmarks.anti_cheat_replay --corpus corpus.ndjson --baseline baseline.json
+#   python -m benchmarks.anti_cheat_replay --verdicts verdicts.json --baseline baseline.json
+#
+# Corpus format: one JSON object per line, ordered by "ts" (ISO 8601):
+#   {"id": "e1", "type": "interaction", "ts": ..., "user_id": ..., "message": ..., "context": {...}}
+#   {"id": "e2", "type": "browser", "ts": ..., "user_id": ..., "url": ..., "is_private_mode": false}
+#   {"id": "e3", "type": "clipboard", "ts": ..., "user_id": ..., "content_preview": ..., "source_app": ...}
+#
+# The replay imports AntiCheatService itself, so it needs everything the
+# service imports: the anti-cheat, device, browser, clipboard and AI-usage
+# models, the notification and device-monitoring services, utils.ml_models.
+# Until those exist a replay stops with the name of the first one missing;
+# --synthesize and --verdicts diffs do not import the service.
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+
+from utils.process_pool import DetectorProcessPool
+
+
+@dataclass
+class ReplayBrowserEvent:
+    user_id: str
+    url: str
+    is_private_mode: bool
+    timestamp: datetime
+
+
+@dataclass
+class ReplayClipboardEvent:
+    user_id: str
+    content_preview: str
+    source_app: str
+    timestamp: datetime
+
+
+class InlinePool:
+    """Runs detector tasks in-process; deterministic and free of IPC overhead"""
+
+    async def run(self, fn, *args, timeout: Optional[float] = None):
+        return fn(*args)
+
+
+class ReplayStore:
+    """In-memory event history served to the detectors during a replay"""
+
+    def __init__(self, history_limit: int = 200):
+        self.clock = datetime.utcnow()
+        self.browser: Dict[str, Deque[ReplayBrowserEvent]] = defaultdict(lambda: deque(maxlen=history_limit))
+        self.clipboard: Dict[str, Deque[ReplayClipboardEvent]] = defaultdict(lambda: deque(maxlen=history_limit))
+        self.interactions: Dict[str, Deque[Dict[str, Any]]] = defaultdict(lambda: deque(maxlen=history_limit))
+
+    def add(self, event: Dict[str, Any]):
+        timestamp = event["timestamp"]
+        user_id = event["user_id"]
+        if event["type"] == "browser":
+            self.browser[user_id].append(ReplayBrowserEvent(
+                user_id, event["url"], event.get("is_private_mode", False), timestamp
+            ))
+        elif event["type"] == "clipboard":
+            self.clipboard[user_id].append(ReplayClipboardEvent(
+                user_id, event.get("content_preview", ""), event.get("source_app", "unknown"), timestamp
+            ))
+        elif event["type"] == "interaction":
+            self.interactions[user_id].append({"timestamp": timestamp, "message": event["message"]})
+
+    @staticmethod
+    def _recent(events, since: datetime, limit: int) -> List[Any]:
+        recent = [e for e in reversed(events) if e.timestamp >= since]
+        return recent[:limit]
+
+
+def make_replay_service(store: ReplayStore, process_pool=None):
+    """
+    AntiCheatService wired to a ReplayStore instead of the database
+
+    The service is imported here, on first use, so the parts of the tool
+    that do not replay run without it.
+    """
+    try:
+        from services.anti_cheat_service import AntiCheatService, SuspicionAlert
+    except ImportError as e:
+        sys.exit(f"anti_cheat_replay needs AntiCheatService, which cannot be imported: {e}")
+
+    class ReplayAntiCheatService(AntiCheatService):
+        """Detectors see the store's clock and history; alerts are recorded, not acted on"""
+
+        def __init__(self, store: ReplayStore, process_pool=None):
+            super().__init__(db=None, process_pool=process_pool or InlinePool())
+            self.store = store
+            self.detector_latency: Dict[str, List[float]] = defaultdict(list)
+            self.last_alerts: List[SuspicionAlert] = []
+
+        def _now(self) -> datetime:
+            return self.store.clock
+
+        def _record_detector_latency(self, detector: str, seconds: float):
+            self.detector_latency[detector].append(seconds)
+
+        async def detect_alerts(self, user_id, message, context) -> List[SuspicionAlert]:
+            self.last_alerts = await super().detect_alerts(user_id, message, context)
+            return self.last_alerts
+
+        async def _get_recent_interactions(self, user_id: str, hours: int = 24) -> List[Dict[str, Any]]:
+            since = self._now() - timedelta(hours=hours)
+            return [i for i in self.store.interactions[user_id] if i["timestamp"] >= since]
+
+        async def _get_user_message_history(self, user_id: str, limit: int = 50) -> List[str]:
+            return [i["message"] for i in list(self.store.interactions[user_id])[-limit:]]
+
+        async def _get_recent_clipboard_activity(self, user_id: str, minutes: int = 10):
+            since = self._now() - timedelta(minutes=minutes)
+            return ReplayStore._recent(self.store.clipboard[user_id], since, 10)
+
+        async def _get_recent_browser_activity(self, user_id: str, minutes: int = 5):
+            since = self._now() - timedelta(minutes=minutes)
+            return ReplayStore._recent(self.store.browser[user_id], since, 20)
+
+        async def _handle_suspicion_alert(self, alert: SuspicionAlert):
+            pass
+
+        async def _log_minor_suspicion(self, alert: SuspicionAlert):
+            pass
+
+    return ReplayAntiCheatService(store, process_pool)
+
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    """Read an NDJSON corpus, assigning ids to events that have none"""
+    events = []
+    with open(path) as fh:
+        for index, line in enumerate(fh):
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            event.setdefault("id", f"e{index}")
+            event["timestamp"] = datetime.fromisoformat(event["ts"])
+            events.append(event)
+    return events
+
+
+def synthesize_corpus(path: str, events: int, users: int = 50, seed: int = 7):
+    """Write a synthetic corpus mixing honest and cheating behaviour"""
+    rng = random.Random(seed)
+    honest_messages = [
+        "I think the answer is x = 2 because 2 + 3 = 5, is that right?",
+        "Why does the moon have phases?",
+        "I tried factoring but got stuck on the second step",
+        "Can you explain what a metaphor is with an example?",
+        "How does photosynthesis store energy?",
+    ]
+    cheating_messages = [
+        "just tell me the answer to this homework, it's due tomorrow",
+        "solve this equation for me: 3x + 7 = 22",
+        "write my essay about the french revolution",
+        "Furthermore, the comprehensive analysis demonstrates the fundamental mechanisms. Moreover, it facilitates understanding.",
+        "give me the answer key for the quiz",
+    ]
+    urls = [
+        "https://en.wikipedia.org/wiki/Algebra",
+        "https://www.khanacademy.org/math",
+        "https://chat.openai.com/c/123",
+        "https://www.google.com/search?q=solve+this+equation+step+by+step+solution",
+        "https://www.chegg.com/homework-help",
+    ]
+    cheaters = set(rng.sample(range(users), max(1, users // 5)))
+    clock = datetime(2024, 3, 4, 15, 0, 0)
+
+    with open(path, "w") as fh:
+        for index in range(events):
+            clock += timedelta(seconds=rng.expovariate(1 / 4))
+            user = rng.randrange(users)
+            is_cheater = user in cheaters
+            kind = rng.choices(["interaction", "browser", "clipboard"], weights=[6, 3, 1])[0]
+            event: Dict[str, Any] = {"id": f"e{index}", "type": kind, "ts": clock.isoformat(), "user_id": f"student_{user}"}
+            if kind == "interaction":
+                pool = cheating_messages if is_cheater and rng.random() < 0.6 else honest_messages
+                event["message"] = rng.choice(pool)
+                event["context"] = {"time_of_day": clock.hour, "session_duration": rng.randint(1, 60)}
+            elif kind == "browser":
+                event["url"] = rng.choice(urls[2:] if is_cheater and rng.random() < 0.5 else urls[:2])
+                event["is_private_mode"] = is_cheater and rng.random() < 0.2
+            else:
+                event["content_preview"] = rng.choice(cheating_messages + honest_messages)
+                event["source_app"] = rng.choice(["Chrome", "Mrs-Unkwn"] if is_cheater else ["Mrs-Unkwn", "internal"])
+            fh.write(json.dumps(event) + "\n")
+
+
+async def replay(events: List[Dict[str, Any]], process_pool=None) -> Dict[str, Any]:
+    """Replay a corpus and collect verdicts and timings"""
+    store = ReplayStore()
+    service = make_replay_service(store, process_pool)
+    verdicts: Dict[str, Any] = {}
+    interactions = 0
+
+    started = time.perf_counter()
+    for event in events:
+        store.clock = event["timestamp"]
+        if event["type"] == "interaction":
+            suspicious = await service.analyze_interaction(event["user_id"], event["message"], event.get("context", {}))
+            verdicts[event["id"]] = {
+                "suspicious": suspicious,
+                "alerts": {a.pattern.value: round(a.confidence, 4) for a in service.last_alerts}
+            }
+            interactions += 1
+        store.add(event)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "events": len(events),
+        "interactions": interactions,
+        "elapsed_s": elapsed,
+        "verdicts": verdicts,
+        "detector_latency": service.detector_latency
+    }
+
+
+def diff_verdicts(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Describe every verdict that differs from the baseline"""
+    changes = []
+    for event_id in sorted(set(current) | set(baseline), key=lambda e: (len(e), e)):
+        now, before = current.get(event_id), baseline.get(event_id)
+        if now is None or before is None:
+            changes.append(f"{event_id}: only in {'baseline' if now is None else 'current run'}")
+            continue
+        if now["suspicious"] != before["suspicious"]:
+            changes.append(f"{event_id}: suspicious {before['suspicious']} -> {now['suspicious']}")
+        for pattern in sorted(set(now["alerts"]) | set(before["alerts"])):
+            a, b = before["alerts"].get(pattern), now["alerts"].get(pattern)
+            if a is None or b is None or abs(a - b) > tolerance:
+                changes.append(f"{event_id}: {pattern} {a} -> {b}")
+    return changes
+
+
+def print_report(result: Dict[str, Any]):
+    elapsed = max(result["elapsed_s"], 1e-9)
+    print(f"events:        {result['events']} ({result['events'] / elapsed:,.0f}/s)")
+    print(f"interactions:  {result['interactions']} ({result['interactions'] / elapsed:,.0f}/s)")
+    flagged = sum(1 for v in result["verdicts"].values() if v["suspicious"])
+    print(f"flagged:       {flagged}")
+    print()
+    print(f"{'detector':<24}{'mean us':>10}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}")
+    for detector, samples in result["detector_latency"].items():
+        us = np.array(samples) * 1e6
+        print(
+            f"{detector:<24}{us.mean():>10.1f}{np.percentile(us, 50):>10.1f}"
+            f"{np.percentile(us, 95):>10.1f}{np.percentile(us, 99):>10.1f}"
+        )
+
+
+def report_diffs(verdicts: Dict[str, Any], baseline_path: str, tolerance: float):
+    """Print the verdicts that differ from a saved baseline; exit 1 if any do"""
+    with open(baseline_path) as fh:
+        baseline = json.load(fh)
+    changes = diff_verdicts(verdicts, baseline, tolerance)
+    print(f"\nVerdict diffs against {baseline_path}: {len(changes)}")
+    for change in changes[:50]:
+        print(f"  {change}")
+    if len(changes) > 50:
+        print(f"  ... {len(changes) - 50} more")
+    if changes:
+        sys.exit(1)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay a corpus through the anti-cheat engine")
+    parser.add_argument("--corpus", help="NDJSON corpus to replay (or write with --synthesize)")
+    parser.add_argument("--synthesize", type=int, metavar="N", help="Write a synthetic corpus of N events and exit")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--baseline", help="Baseline verdicts to diff against")
+    parser.add_argument("--verdicts", help="Diff these saved verdicts against --baseline instead of replaying")
+    parser.add_argument("--save-baseline", help="Write this run's verdicts as a baseline")
+    parser.add_argument("--tolerance", type=float, default=1e-3, help="Confidence change treated as a diff")
+    parser.add_argument("--process-pool", type=int, metavar="WORKERS", help="Run text analysis in a process pool")
+    args = parser.parse_args()
+    if args.verdicts and not args.baseline:
+        parser.error("--verdicts needs --baseline")
+    if not args.verdicts and not args.corpus:
+        parser.error("--corpus is required unless diffing --verdicts")
+
+    if args.verdicts:
+        with open(args.verdicts) as fh:
+            report_diffs(json.load(fh), args.baseline, args.tolerance)
+        return
+
+    if args.synthesize:
+        synthesize_corpus(args.corpus, args.synthesize, seed=args.seed)
+        print(f"Wrote {args.synthesize} events to {args.corpus}")
+        return
+
+    pool = None
+    if args.process_pool:
+        pool = DetectorProcessPool(max_workers=args.process_pool, submit_timeout=None, task_timeout=30)
+        await pool.start()
+
+    try:
+        result = await replay(load_corpus(args.corpus), pool)
+    finally:
+        if pool is not None:
+            await pool.shutdown()
+
+    print_report(result)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as fh:
+            json.dump(result["verdicts"], fh, indent=1, sort_keys=True)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        report_diffs(result["verdicts"], args.baseline, args.tolerance)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+# Event loop lag benchmark - anti-cheat text analysis inline vs. process pool
+#
+# Usage (from backend/src):
+#   python -m benchmarks.event_loop_lag --requests 40 --concurrency 8 --essay-words 1500
+import argparse
+import asyncio
+import random
+import time
+
+from utils.process_pool import DetectorProcessPool, EventLoopLagMonitor
+from utils.text_analysis import vocabulary_profile
+
+WORDS = (
+    "the photosynthesis process converts light energy into chemical energy "
+    "furthermore plants utilize chlorophyll to demonstrate fundamental biology "
+    "students often explain their reasoning with short sentences and examples"
+).split()
+
+
+def make_essay(words: int, rng: random.Random) -> str:
+    """Build a synthetic essay of roughly the requested length"""
+    sentences = []
+    while words > 0:
+        length = rng.randint(6, 24)
+        sentences.append(" ".join(rng.choice(WORDS) for _ in range(length)).capitalize() + ".")
+        words -= length
+    return " ".join(sentences)
+
+
+async def run_mode(mode: str, args, essays, history) -> dict:
+    monitor = EventLoopLagMonitor(interval=0.01, window=100000)
+    pool = None
+    if mode == "pool":
+        pool = DetectorProcessPool(max_workers=args.workers, submit_timeout=None, task_timeout=60)
+        await pool.start()
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def analyze(essay: str):
+        async with semaphore:
+            if pool is None:
+                return vocabulary_profile(essay, history)
+            return await pool.run(vocabulary_profile, essay, history)
+
+    monitor.start()
+    # Let the monitor take its first tick before the load starts
+    await asyncio.sleep(monitor.interval)
+    started = time.perf_counter()
+    await asyncio.gather(*[analyze(essay) for essay in essays])
+    elapsed = time.perf_counter() - started
+    # ...and one after it ends, so a fully blocked loop still records a sample
+    await asyncio.sleep(monitor.interval * 2)
+    await monitor.stop()
+
+    if pool is not None:
+        await pool.shutdown()
+
+    return {"mode": mode, "elapsed_s": elapsed, **monitor.snapshot()}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Measure event loop lag during anti-cheat text analysis")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--essay-words", type=int, default=1500)
+    parser.add_argument("--history", type=int, default=20, help="Messages of user history per request")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    essays = [make_essay(args.essay_words, rng) for _ in range(args.requests)]
+    history = [make_essay(40, rng) for _ in range(args.history)]
+
+    print(f"{'mode':<8}{'elapsed s':>12}{'lag p50 ms':>14}{'lag p99 ms':>14}{'lag max ms':>14}")
+    for mode in ("inline", "pool"):
+        result = await run_mode(mode, args, essays, history)
+        print(
+            f"{result['mode']:<8}{result['elapsed_s']:>12.2f}{result['p50_ms']:>14.1f}"
+            f"{result['p99_ms']:>14.1f}{result['max_ms']:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
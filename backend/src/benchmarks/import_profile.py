@@ -0,0 +1,88 @@
+# Import-time profile - where app startup spends its time
+#
+# Runs `python -X importtime` in a fresh interpreter and reports the slowest
+# imports and top-level packages. Compare the lazy app against eager
+# registration of every endpoint module.
+#
+# Usage (from backend/src):
+#   python -m benchmarks.import_profile --top 25
+#   python -m benchmarks.import_profile --target eager
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    # What a server process imports before it can accept a request
+    "app": "import app",
+    # Every endpoint module loaded up front, as app.py used to do
+    "eager": "import app; app.router_registry.load_all_sync()",
+}
+
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile(code: str) -> Tuple[List[Tuple[str, int, int, int]], float]:
+    """Run code under -X importtime; returns (module, self_us, cumulative_us, depth) rows and wall seconds"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=SRC_DIR, env=env, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr[-2000:])
+        raise SystemExit(f"Profiled interpreter exited with {result.returncode}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows, elapsed
+
+
+def by_package(rows) -> Dict[str, int]:
+    """Self time summed per top-level package"""
+    totals: Dict[str, int] = defaultdict(int)
+    for module, self_us, _, _ in rows:
+        totals[module.split(".")[0]] += self_us
+    return totals
+
+
+def print_report(name: str, rows, elapsed: float, top: int):
+    total_us = sum(row[1] for row in rows)
+    print(f"== {name}: {len(rows)} modules, {total_us / 1000:.0f} ms importing, {elapsed * 1000:.0f} ms wall")
+
+    print(f"\n{'top-level package':<32}{'self ms':>10}{'share':>8}")
+    for package, self_us in sorted(by_package(rows).items(), key=lambda kv: -kv[1])[:top]:
+        print(f"{package:<32}{self_us / 1000:>10.1f}{self_us / total_us:>8.1%}")
+
+    print(f"\n{'slowest imports (cumulative)':<48}{'cum ms':>10}{'self ms':>10}")
+    for module, self_us, cumulative_us, _ in sorted(rows, key=lambda r: -r[2])[:top]:
+        print(f"{module:<48}{cumulative_us / 1000:>10.1f}{self_us / 1000:>10.1f}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile import time of the backend app")
+    parser.add_argument("--target", choices=sorted(TARGETS) + ["both"], default="both")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    targets = sorted(TARGETS) if args.target == "both" else [args.target]
+    for name in targets:
+        rows, elapsed = profile(TARGETS[name])
+        print_report(name, rows, elapsed, args.top)
+
+
+if __name__ == "__main__":
+    main()
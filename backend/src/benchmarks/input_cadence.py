@@ -0,0 +1,46 @@
+# Input cadence throughput - events/sec through InputCadenceAnalyzer.ingest_batch
+#
+# Usage (from backend/src):
+#   python -m benchmarks.input_cadence --batch-size 500 --batches 2000
+import argparse
+import time
+
+import numpy as np
+
+from monitoring.inputcadenceanalyzer import InputCadenceAnalyzer, InputEventKind
+
+
+def make_batch(size: int, rng: np.random.Generator):
+    """Human-like typing with pauses and the occasional paste"""
+    intervals = rng.lognormal(mean=np.log(160), sigma=0.5, size=size)
+    intervals[rng.random(size) < 0.03] += rng.uniform(1500, 6000)
+    timestamps = np.cumsum(intervals) + 1.7e12
+    kinds = np.where(rng.random(size) < 0.01, InputEventKind.PASTE, InputEventKind.KEY)
+    chars = np.where(kinds == InputEventKind.PASTE, rng.integers(20, 400, size), 1)
+    return timestamps.tolist(), kinds.tolist(), chars.tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure input cadence ingestion throughput")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--batches", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    batches = [make_batch(args.batch_size, rng) for _ in range(50)]
+    analyzer = InputCadenceAnalyzer()
+
+    started = time.perf_counter()
+    for i in range(args.batches):
+        timestamps, kinds, chars = batches[i % len(batches)]
+        analyzer.ingest_batch(f"student_{i % args.users}", timestamps, kinds, chars)
+    elapsed = time.perf_counter() - started
+
+    events = args.batches * args.batch_size
+    print(f"{events} events in {elapsed:.3f}s: {events / elapsed:,.0f} events/s, "
+          f"{elapsed / args.batches * 1e6:.1f} us per batch")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# JSON response benchmark - CPU per request for large list responses
+#
+# Serves the same in-memory rows two ways: the pydantic path (build the
+# response models, let FastAPI validate against response_model and run
+# jsonable_encoder) and the FastJSONResponse path used by the template list
+# endpoints. No database is involved, so the numbers are serialization only.
+#
+# Usage (from backend/src):
+#   python -m benchmarks.json_responses --items 100 500 1000
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from endpoints.files import FilesList, FilesResponse
+from utils import fast_json
+from utils.fast_json import FastJSONResponse, as_model_dicts
+
+
+def make_rows(count: int) -> list:
+    rng = random.Random(3)
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "id": i + 1,
+            "name": f"Row {i}",
+            "description": "Benchmark row with a realistic description length " * 2,
+            "status": rng.choice(["active", "inactive", "pending"]),
+            "type": rng.choice(["standard", "premium"]),
+            "tags": ["bench", f"tag{i % 10}"],
+            "metadata": {"index": i, "score": rng.random()},
+            "created_at": start + timedelta(seconds=i),
+            "updated_at": None,
+            "created_by": "user123",
+            "updated_by": None,
+            "version": 1
+        }
+        for i in range(count)
+    ]
+
+
+def build_app(rows: list) -> FastAPI:
+    app = FastAPI()
+    meta = {"total": len(rows), "page": 1, "per_page": len(rows), "pages": 1, "has_next": False, "has_prev": False}
+
+    @app.get("/pydantic", response_model=FilesList)
+    async def pydantic_path():
+        return FilesList(items=[FilesResponse(**row) for row in rows], **meta)
+
+    @app.get("/fast", response_model=FilesList, response_class=FastJSONResponse)
+    async def fast_path():
+        return FastJSONResponse({"items": as_model_dicts(FilesResponse, rows), "total_is_estimate": False,
+                                 "next_cursor": None, **meta})
+
+    return app
+
+
+def measure(client: TestClient, path: str, requests: int) -> float:
+    client.get(path)
+    started = time.process_time()
+    for _ in range(requests):
+        client.get(path)
+    return (time.process_time() - started) / requests * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare CPU per request of list response paths")
+    parser.add_argument("--items", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"encoder: {'orjson' if fast_json.orjson is not None else 'json (orjson not installed)'}")
+    print(f"{'items':>8}{'pydantic ms':>14}{'fast ms':>10}{'speedup':>10}")
+    for count in args.items:
+        client = TestClient(build_app(make_rows(count)))
+        assert client.get("/pydantic").json() == client.get("/fast").json()
+        slow = measure(client, "/pydantic", args.requests)
+        fast = measure(client, "/fast", args.requests)
+        print(f"{count:>8}{slow:>14.2f}{fast:>10.2f}{slow / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
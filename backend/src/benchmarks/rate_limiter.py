@@ -0,0 +1,67 @@
+# Rate limiter overhead benchmark - cost of the rate_limit decorator per request
+#
+# Measures the local fast path (no Redis round trip on the request path) and,
+# with --redis, one background sync of all buckets against a live server.
+#
+# Usage (from backend/src):
+#   python -m benchmarks.rate_limiter --calls 200000 --users 1000
+#   python -m benchmarks.rate_limiter --redis redis://localhost:6379/15
+import argparse
+import asyncio
+import time
+
+from utils.rate_limiter import RateLimiter, rate_limit
+
+
+async def bench_decorator(calls: int, users: int) -> float:
+    """Microseconds per call through the decorator, with every call allowed"""
+
+    @rate_limit(max_calls=10 ** 9, time_window=60)
+    async def handler(current_user: str = None):
+        return None
+
+    @rate_limit(max_calls=10 ** 9, time_window=60)
+    async def baseline(current_user: str = None):
+        return None
+    # Undecorated reference for the same coroutine call
+    baseline = baseline.__wrapped__
+
+    user_ids = [f"user{i}" for i in range(users)]
+    timings = []
+    for fn in (baseline, handler):
+        started = time.perf_counter()
+        for i in range(calls):
+            await fn(current_user=user_ids[i % users])
+        timings.append(time.perf_counter() - started)
+    return (timings[1] - timings[0]) / calls * 1e6
+
+
+async def bench_sync(redis_url: str, users: int) -> float:
+    """Milliseconds for one Redis sync of a bucket per user"""
+    limiter = RateLimiter(redis_url=redis_url)
+    limiter.register("bench", 100, 60)
+    for i in range(users):
+        limiter.acquire("bench", f"user{i}")
+    await limiter._connect()
+    started = time.perf_counter()
+    await limiter.sync()
+    elapsed = time.perf_counter() - started
+    await limiter.stop()
+    return elapsed * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Measure rate limiter overhead")
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--redis", default=None, help="Redis URL for the sync benchmark")
+    args = parser.parse_args()
+
+    overhead = await bench_decorator(args.calls, args.users)
+    print(f"fast path overhead: {overhead:.2f} us/request over {args.calls} calls, {args.users} users")
+    if args.redis:
+        print(f"redis sync: {await bench_sync(args.redis, args.users):.1f} ms for {args.users} buckets")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
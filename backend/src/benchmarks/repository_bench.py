@@ -0,0 +1,143 @@
+# Repository throughput benchmark - rows/sec per operation on the shared engine
+#
+# Runs against DATABASE_URL; point it at a scratch database. The default is a
+# temporary SQLite file so the numbers include real disk I/O.
+#
+# Usage (from backend/src):
+#   python -m benchmarks.repository_bench --rows 5000
+#   DATABASE_URL=postgresql+asyncpg://localhost/bench python -m benchmarks.repository_bench
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+
+def _configure_database():
+    if "DATABASE_URL" not in os.environ:
+        path = os.path.join(tempfile.mkdtemp(prefix="repo-bench-"), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+
+
+_configure_database()
+
+from database import dispose_engine, get_engine  # noqa: E402
+from utils.repository import get_repository  # noqa: E402
+
+STATUSES = ["active", "inactive", "pending", "archived"]
+TYPES = ["standard", "premium", "enterprise", "custom"]
+
+
+def make_item(i: int, rng: random.Random) -> dict:
+    return {
+        "name": f"Bench item {i}",
+        "description": f"Benchmark row {i} for the repository engine",
+        "status": rng.choice(STATUSES),
+        "type": rng.choice(TYPES),
+        "tags": [f"tag{rng.randint(0, 20)}", "bench"],
+        "metadata": {"index": i}
+    }
+
+
+async def timed(label: str, rows: int, coro_factory, concurrency: int, results: list):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(i):
+        async with semaphore:
+            await coro_factory(i)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[run(i) for i in range(rows)])
+    elapsed = time.perf_counter() - started
+    results.append((label, rows, elapsed))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Measure repository rows/sec per operation")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=100, help="Rows per bulk_create call")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--table", default="bench_items")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    repository = get_repository(args.table)
+    async with get_engine().begin() as conn:
+        await conn.run_sync(repository.table.drop, checkfirst=True)
+        await conn.run_sync(repository.statistics.counters.drop, checkfirst=True)
+    repository._table_ready = False
+
+    results = []
+    ids = []
+
+    async def create(i):
+        ids.append((await repository.create(make_item(i, rng), "bench"))["id"])
+
+    async def bulk(i):
+        await repository.bulk_create([make_item(i * args.batch + j, rng) for j in range(args.batch)], "bench")
+
+    await timed("create", args.rows, create, args.concurrency, results)
+
+    batches = max(1, args.rows // args.batch)
+    started = time.perf_counter()
+    for i in range(batches):
+        await bulk(i)
+    results.append(("bulk_create", batches * args.batch, time.perf_counter() - started))
+
+    await timed("get", args.rows, lambda i: repository.get(rng.choice(ids)), args.concurrency, results)
+
+    async def page(i):
+        rows, _ = await repository.list(
+            {"status": STATUSES[i % len(STATUSES)]},
+            offset=(i % 10) * args.page_size, limit=args.page_size
+        )
+        return rows
+
+    pages = max(1, args.rows // args.page_size)
+    started = time.perf_counter()
+    for i in range(pages):
+        await page(i)
+    results.append(("list (filtered page)", pages * args.page_size, time.perf_counter() - started))
+
+    # Walk every page: offset pages get slower with depth, keyset pages do not
+    for label, mode in (("walk (offset)", "offset"), ("walk (keyset)", "cursor")):
+        pagination = {"page": 1, "per_page": args.page_size, "mode": mode, "cursor": None, "count": "none"}
+        walked = 0
+        started = time.perf_counter()
+        while True:
+            result = await repository.paginate(None, pagination)
+            walked += len(result.items)
+            if not result.has_next:
+                break
+            pagination["page"] += 1
+            pagination["cursor"] = result.next_cursor
+        results.append((label, walked, time.perf_counter() - started))
+
+    started = time.perf_counter()
+    for _ in range(100):
+        await repository.stats()
+    results.append(("stats", 100, time.perf_counter() - started))
+
+    await timed(
+        "patch", args.rows,
+        lambda i: repository.update(ids[i % len(ids)], {"description": f"patched {i}"}, "bench"),
+        args.concurrency, results
+    )
+    await timed("delete (soft)", len(ids) // 2, lambda i: repository.delete(ids[i]), args.concurrency, results)
+    await timed(
+        "delete (hard)", len(ids) // 2,
+        lambda i: repository.delete(ids[len(ids) // 2 + i], hard=True), args.concurrency, results
+    )
+
+    print(f"database: {os.environ['DATABASE_URL']}")
+    print(f"{'operation':<24}{'rows':>10}{'seconds':>10}{'rows/sec':>12}")
+    for label, rows, elapsed in results:
+        print(f"{label:<24}{rows:>10}{elapsed:>10.2f}{rows / elapsed:>12.0f}")
+
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
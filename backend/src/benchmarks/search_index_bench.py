@@ -0,0 +1,84 @@
+# Search index benchmark - build, query latency and snapshot round trip
+#
+# Works on the index alone (no database), with synthetic rows shaped like
+# the CRUD resources.
+#
+# Usage (from backend/src):
+#   python -m benchmarks.search_index_bench --docs 1000000
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from utils.search_index import SearchIndex
+
+WORDS = [f"word{i}" for i in range(20000)]
+STATUSES = ["active", "inactive", "pending", "archived"]
+TYPES = ["standard", "premium", "enterprise", "custom"]
+
+
+def make_rows(count: int, rng: random.Random):
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        yield {
+            "id": i + 1,
+            "name": " ".join(rng.choices(WORDS[:2000], k=3)),
+            "description": " ".join(rng.choices(WORDS, k=12)),
+            "tags": [f"tag{rng.randint(0, 50)}"],
+            "status": rng.choice(STATUSES),
+            "type": rng.choice(TYPES),
+            "created_at": start + timedelta(seconds=i)
+        }
+
+
+def timed_queries(index: SearchIndex, queries, **filters) -> list:
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, **filters)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure search index build and query times")
+    parser.add_argument("--docs", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    index = SearchIndex("bench", tempfile.mkdtemp(prefix="search-bench-"))
+    started = time.perf_counter()
+    index.finish_rebuild(make_rows(args.docs, rng), datetime.utcnow())
+    print(f"build: {args.docs} docs in {time.perf_counter() - started:.2f}s")
+
+    queries = [" ".join(rng.choices(WORDS[:2000], k=2)) for _ in range(args.queries)]
+    partials = [rng.choice(WORDS[:2000])[:6] for _ in range(args.queries)]
+    # Type-ahead: the first one to three letters of a word
+    prefixes = [rng.choice(WORDS[:2000])[:rng.randint(1, 3)] for _ in range(args.queries)]
+    cases = [
+        ("two terms", queries, {}),
+        ("two terms + status/type", queries, {"status": "active", "type": "premium"}),
+        ("two terms + tag", queries, {"tags": ["tag7"]}),
+        ("two terms by created_at", queries, {"order": "created_at"}),
+        ("partial word", partials, {}),
+        ("short prefix", prefixes, {}),
+    ]
+    print(f"{'query':<28}{'p50 ms':>10}{'p95 ms':>10}")
+    for label, batch, filters in cases:
+        latencies = sorted(timed_queries(index, batch, **filters))
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(f"{label:<28}{statistics.median(latencies):>10.2f}{p95:>10.2f}")
+
+    started = time.perf_counter()
+    index.save()
+    saved = time.perf_counter() - started
+    started = time.perf_counter()
+    SearchIndex("bench", index.directory).load()
+    print(f"snapshot: save {saved:.2f}s, load {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
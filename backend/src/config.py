@@ -0,0 +1,225 @@
+import os
+from typing import Dict, Optional
+from pydantic import BaseSettings, Field
+
+
+class Settings(BaseSettings):
+    """Mrs-Unkwn backend configuration, read from the environment or a .env file"""
+
+    # External services
+    OPENAI_API_KEY: str = Field(default="", description="API key for the AI tutor model")
+    REDIS_URL: str = Field(default="redis://localhost:6379/0", description="Redis connection URL")
+
+    # Database
+    DATABASE_URL: str = Field(
+        default="sqlite+aiosqlite:///./mrsunkwn.db",
+        description="SQLAlchemy async URL; postgresql+asyncpg://... in production"
+    )
+    DATABASE_POOL_SIZE: int = Field(default=10, description="Connections kept open in the pool")
+    DATABASE_MAX_OVERFLOW: int = Field(default=20, description="Extra connections allowed under load")
+    DATABASE_POOL_TIMEOUT: float = Field(default=30.0, description="Seconds to wait for a pooled connection")
+    DATABASE_POOL_RECYCLE: int = Field(default=1800, description="Seconds before a connection is replaced")
+    DATABASE_STATEMENT_CACHE_SIZE: int = Field(default=500, description="Compiled statements cached per engine")
+    DATABASE_ECHO: bool = Field(default=False, description="Log every SQL statement")
+    DATABASE_CREATE_TABLES: bool = Field(
+        default=True,
+        description="Create missing repository tables at startup (local SQLite setups)"
+    )
+    PAGINATION_COUNT_CAP: int = Field(
+        default=10000,
+        description="Rows counted at most when a list asks for an approximate total"
+    )
+    STATS_RECONCILE_INTERVAL: float = Field(
+        default=3600.0,
+        description="Seconds between recounts of the materialized resource statistics; 0 disables"
+    )
+
+    BULK_INGEST_CHUNK_SIZE: int = Field(
+        default=1000,
+        description="Rows validated and inserted per transaction by the streaming bulk endpoints"
+    )
+    BULK_INGEST_MAX_LINE_BYTES: int = Field(
+        default=1024 * 1024,
+        description="Longest NDJSON line accepted by the streaming bulk endpoints"
+    )
+    EXPORT_BATCH_SIZE: int = Field(
+        default=1000,
+        description="Rows fetched per round trip from the server-side cursor of the export endpoints"
+    )
+    EXPORT_CHUNK_BYTES: int = Field(
+        default=64 * 1024,
+        description="Encoded bytes collected before the export endpoints send a chunk"
+    )
+
+    # Full-text search
+    SEARCH_INDEX_ENABLED: bool = Field(
+        default=True,
+        description="Answer search queries from the local inverted index instead of LIKE scans"
+    )
+    SEARCH_INDEX_DIR: str = Field(
+        default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "search_index"),
+        description="Directory holding one snapshot per indexed resource, shared by all workers"
+    )
+    SEARCH_INDEX_SNAPSHOT_OPS: int = Field(
+        default=50000,
+        description="Indexed changes after which a fresh snapshot is written"
+    )
+    SEARCH_INDEX_REFRESH_INTERVAL: float = Field(
+        default=1.0,
+        description="Seconds between catch-ups of a worker's index with rows written by other workers"
+    )
+    SEARCH_INDEX_COMPACT_RATIO: float = Field(
+        default=0.25,
+        description="Share of tombstoned documents that triggers compaction"
+    )
+
+    # Anti-cheat process pool
+    ANTI_CHEAT_POOL_WORKERS: int = Field(
+        default=max(1, (os.cpu_count() or 2) - 1),
+        description="Worker processes for CPU-bound anti-cheat analysis"
+    )
+    ANTI_CHEAT_POOL_QUEUE_DEPTH: int = Field(
+        default=4,
+        description="Tasks allowed in flight per worker before the pool reports saturation"
+    )
+    ANTI_CHEAT_TASK_TIMEOUT: float = Field(
+        default=2.0,
+        description="Seconds a single detector task may run before it is abandoned"
+    )
+    ANTI_CHEAT_SUBMIT_TIMEOUT: Optional[float] = Field(
+        default=0.05,
+        description="Seconds to wait for a free pool slot before shedding the task"
+    )
+    ANTI_CHEAT_POOL_MAX_ABANDONED: int = Field(
+        default=2,
+        description="Detector tasks left running past their timeout before the pool's workers are replaced"
+    )
+
+    # Input cadence
+    CADENCE_MAX_USERS: int = Field(
+        default=50000,
+        description="Users whose cadence windows are kept per worker; least recently active go first"
+    )
+    CADENCE_IDLE_TTL: float = Field(
+        default=1800.0,
+        description="Seconds without input events after which a user's cadence windows are dropped"
+    )
+
+    # Network origin classification
+    IP_RANGE_LISTS_DIR: str = Field(
+        default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "ip_ranges"),
+        description="Directory of <category>.txt CIDR lists (vpn, datacenter, tor)"
+    )
+    IP_RANGE_RELOAD_INTERVAL: float = Field(
+        default=60.0,
+        description="Seconds between checks for changed IP range lists"
+    )
+
+    # Rate limiting
+    RATE_LIMIT_ENABLED: bool = Field(default=True, description="Enforce the per-route rate limits")
+    RATE_LIMIT_REDIS_SYNC: bool = Field(
+        default=True,
+        description="Share rate limit counts across workers through Redis"
+    )
+    RATE_LIMIT_SYNC_INTERVAL: float = Field(
+        default=0.25,
+        description="Seconds between pushes of local rate limit counts to Redis"
+    )
+
+    # Response compression
+    COMPRESSION_ENABLED: bool = Field(default=True, description="Compress responses with br or gzip when the client accepts it")
+    COMPRESSION_MIN_SIZE: int = Field(default=1024, description="Smallest body in bytes worth compressing")
+    COMPRESSION_MIN_SAVINGS: float = Field(
+        default=0.1,
+        description="Share of bytes compression must save; below it the body goes out uncompressed"
+    )
+    COMPRESSION_GZIP_LEVEL: int = Field(default=6, description="gzip level for response bodies")
+    COMPRESSION_BROTLI_QUALITY: int = Field(default=5, description="Brotli quality for response bodies")
+    COMPRESSION_CACHE_ENTRIES: int = Field(default=1024, description="Compressed GET bodies cached by ETag")
+    COMPRESSION_CACHE_MAX_BYTES: int = Field(
+        default=64 * 1024 * 1024,
+        description="Memory bound of the compressed body cache"
+    )
+
+    # Batch endpoint
+    BATCH_MAX_REQUESTS: int = Field(default=20, description="Sub-requests allowed in one POST /api/batch")
+    BATCH_CONCURRENCY: int = Field(default=8, description="Sub-requests of one batch running at the same time")
+    BATCH_TIMEOUT: float = Field(default=30.0, description="Seconds a single sub-request may take")
+
+    # Activity log
+    ACTIVITY_LOG_BATCH_SIZE: int = Field(default=500, description="Buffered activity records that trigger a flush")
+    ACTIVITY_LOG_FLUSH_INTERVAL: float = Field(default=2.0, description="Seconds between flushes of the activity buffer")
+    ACTIVITY_LOG_MAX_BUFFER: int = Field(
+        default=50000,
+        description="Records held while storage is failing; the oldest are dropped beyond this"
+    )
+    ACTIVITY_LOG_SAMPLE_RATES: Dict[str, float] = Field(
+        default={"view_*": 0.1},
+        description="Share of records kept per activity type pattern (fnmatch, JSON in the environment); "
+                    "unlisted types are always kept"
+    )
+
+    # Authorization cache
+    AUTHZ_CACHE_TTL: float = Field(default=30.0, description="Seconds a granted access decision is reused")
+    AUTHZ_CACHE_DENY_TTL: float = Field(default=5.0, description="Seconds a denied access decision is reused")
+    AUTHZ_CACHE_MAX_ENTRIES: int = Field(default=100000, description="Decisions kept per worker; least recently used go first")
+
+    # Idempotency keys
+    IDEMPOTENCY_TTL: float = Field(default=86400.0, description="Seconds a response is replayed for its Idempotency-Key")
+    IDEMPOTENCY_MAX_ENTRIES: int = Field(default=10000, description="Stored responses per worker")
+    IDEMPOTENCY_MAX_BODY: int = Field(
+        default=1024 * 1024,
+        description="Largest request or response body, in bytes, handled under an Idempotency-Key"
+    )
+    IDEMPOTENCY_WAIT_TIMEOUT: float = Field(
+        default=60.0,
+        description="Seconds a duplicate waits for the in-flight request with the same key"
+    )
+
+    # Metrics
+    METRICS_ENABLED: bool = Field(default=True, description="Record per-route request metrics and serve them on /metrics")
+    METRICS_MULTIPROCESS_DIR: Optional[str] = Field(
+        default=None,
+        description="Directory where each worker writes its metrics so /metrics covers all workers; unset for one worker"
+    )
+    METRICS_SYNC_INTERVAL: float = Field(
+        default=5.0,
+        description="Seconds between writes of a worker's metrics to METRICS_MULTIPROCESS_DIR"
+    )
+
+    # Diagnostics
+    ADMIN_DIAGNOSTICS_TOKEN: Optional[str] = Field(
+        default=None,
+        description="Token the X-Admin-Token header must carry for the admin diagnostics endpoints; unset disables them"
+    )
+    PROFILER_MAX_SECONDS: float = Field(default=60.0, description="Longest sampling profile one request may run")
+    PROFILER_MIN_INTERVAL: float = Field(default=0.001, description="Shortest seconds between profiler samples")
+
+    # Startup
+    LAZY_ROUTERS: bool = Field(
+        default=True,
+        description="Import endpoint modules on first request instead of at startup"
+    )
+    ROUTER_WARMUP: bool = Field(
+        default=True,
+        description="Import the remaining endpoint modules in the background after startup"
+    )
+    ROUTER_WARMUP_DELAY: float = Field(
+        default=1.0,
+        description="Seconds after startup before the router warmup begins"
+    )
+    ROUTER_RETRY_BACKOFF: float = Field(
+        default=30.0,
+        description="Seconds before a router that failed to import is tried again; doubles with each failure"
+    )
+    ROUTER_RETRY_MAX_BACKOFF: float = Field(
+        default=600.0,
+        description="Longest wait between import attempts of a failing router"
+    )
+
+    class Config:
+        env_file = ".env"
+        case_sensitive = True
+
+
+settings = Settings()
@@ -0,0 +1,95 @@
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import MetaData, event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from config import settings
+from utils.search_index import search_text
+
+logger = logging.getLogger(__name__)
+
+# Tables owned by the shared repository engine (utils.repository)
+metadata = MetaData()
+
+_engine: Optional[AsyncEngine] = None
+_session_factory: Optional[async_sessionmaker] = None
+
+
+def _engine_options(url: str) -> dict:
+    options = {
+        "echo": settings.DATABASE_ECHO,
+        # Compiled SQL per statement shape, reused across requests
+        "query_cache_size": settings.DATABASE_STATEMENT_CACHE_SIZE,
+    }
+    if url.startswith("sqlite"):
+        if ":memory:" in url or url.split("://", 1)[-1] in ("", "/"):
+            # One shared connection, otherwise every checkout sees an empty database
+            options["poolclass"] = StaticPool
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options.update(
+            pool_size=settings.DATABASE_POOL_SIZE,
+            max_overflow=settings.DATABASE_MAX_OVERFLOW,
+            pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+            pool_recycle=settings.DATABASE_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+    return options
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside the writer; NORMAL sync is durable enough for local use
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+    # SQL search_words() of the repository's search filter (utils.repository)
+    dbapi_connection.create_function("search_words", 1, search_text, deterministic=True)
+
+
+def get_engine() -> AsyncEngine:
+    """Get the process-wide async engine, creating its connection pool on first use"""
+    global _engine, _session_factory
+    if _engine is None:
+        _engine = create_async_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL))
+        if _engine.dialect.name == "sqlite":
+            event.listen(_engine.sync_engine, "connect", _sqlite_pragmas)
+        _session_factory = async_sessionmaker(_engine, expire_on_commit=False)
+    return _engine
+
+
+def get_session_factory() -> async_sessionmaker:
+    get_engine()
+    return _session_factory
+
+
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[AsyncSession]:
+    """Session wrapped in a transaction: commit on success, roll back on error"""
+    async with get_session_factory()() as session:
+        async with session.begin():
+            yield session
+
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """Dependency to get a database session"""
+    async with get_session_factory()() as session:
+        yield session
+
+
+async def init_db():
+    """Create the repository tables that do not exist yet"""
+    async with get_engine().begin() as conn:
+        await conn.run_sync(metadata.create_all)
+
+
+async def dispose_engine():
+    """Close every pooled connection"""
+    global _engine, _session_factory
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+        _session_factory = None
@@ -1,12 +1,26 @@
 
-from fastapi import APIRouter, HTTPException, Depends, Query, Path, status
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Path, Request, Response, status
+from fastapi.responses import StreamingResponse
 from typing import List, Optional, Dict, Any, Union
 from pydantic import BaseModel, Field, validator
-from datetime import datetime, timedelta
+from datetime import datetime
 from enum import Enum
 import logging
 import asyncio
-from functools import wraps
+import os
+import secrets
+
+from utils.bulk_ingest import IngestResponse, ingest_ndjson
+from utils.export import ExportFormat, export_response
+from utils.fast_json import FastJSONResponse
+from utils.conditional import (
+    expected_versions, item_etag, not_modified, not_modified_response, precondition_failed
+)
+from utils.rate_limiter import rate_limit
+from utils.pagination import CountMode, PaginationMode
+from utils.profiler import ProfilerBusyError, get_memory_tracer, get_profiler
+from utils.repository import AsyncRepository, InvalidQueryError, VersionConflictError, get_repository
+from config import settings
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -62,6 +76,12 @@ class AdminCreate(AdminBase):
     """Model for creating admin"""
     created_by: Optional[str] = Field(None, description="ID of the user creating this admin")
     
+    @validator('status')
+    def validate_status(cls, v):
+        if v == AdminStatus.DELETED:
+            raise ValueError('Admin cannot be created as deleted')
+        return v
+    
     class Config:
         schema_extra = {
             "example": {
@@ -90,6 +110,12 @@ class AdminUpdate(BaseModel):
         if v is not None and not v.strip():
             raise ValueError('Name cannot be empty or only whitespace')
         return v.strip() if v else v
+    
+    @validator('status')
+    def validate_status(cls, v):
+        if v == AdminStatus.DELETED:
+            raise ValueError('Use DELETE to delete admin')
+        return v
 
 class AdminInDB(AdminBase):
     """Model for admin in database"""
@@ -124,12 +150,14 @@ class AdminResponse(AdminInDB):
 class AdminList(BaseModel):
     """Model for paginated admin list response"""
     items: List[AdminResponse]
-    total: int
-    page: int
+    total: Optional[int] = Field(None, description="Matching items; omitted when count=none")
+    total_is_estimate: bool = Field(default=False, description="Total is a lower bound (count=approximate)")
+    page: Optional[int] = Field(None, description="Page number; omitted in cursor mode")
     per_page: int
-    pages: int
+    pages: Optional[int] = None
     has_next: bool
     has_prev: bool
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to fetch the next page")
 
 class AdminStats(BaseModel):
     """Model for admin statistics"""
@@ -150,25 +178,25 @@ async def get_current_user():
     # TODO: Implement actual authentication logic
     return "user123"
 
-def validate_pagination(page: int = Query(1, ge=1), per_page: int = Query(20, ge=1, le=100)):
+def get_admin_repository() -> AsyncRepository:
+    """Dependency to get the admin repository"""
+    return get_repository("admin")
+
+def validate_pagination(
+    page: int = Query(1, ge=1),
+    per_page: int = Query(20, ge=1, le=100),
+    mode: PaginationMode = Query(PaginationMode.OFFSET, description="offset (page numbers) or cursor (keyset)"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; implies cursor mode"),
+    count: CountMode = Query(CountMode.EXACT, description="Total count: exact, approximate or none")
+):
     """Validate pagination parameters"""
-    return {"page": page, "per_page": per_page}
-
-# Rate limiting decorator
-def rate_limit(max_calls: int, time_window: int):
-    """Rate limiting decorator"""
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            # TODO: Implement rate limiting logic
-            return await func(*args, **kwargs)
-        return wrapper
-    return decorator
+    return {"page": page, "per_page": per_page, "mode": mode, "cursor": cursor, "count": count}
 
 # Main CRUD endpoints
 @router.get(
     "/",
     response_model=AdminList,
+    response_class=FastJSONResponse,
     summary="Get all admins",
     description="Retrieve a paginated list of all admins with optional filtering"
 )
@@ -183,7 +211,11 @@ async def get_admins(
     created_before: Optional[datetime] = Query(None, description="Filter items created before this date"),
     sort_by: Optional[str] = Query("created_at", description="Field to sort by"),
     sort_order: Optional[str] = Query("desc", regex="^(asc|desc)$", description="Sort order"),
-    current_user: str = Depends(get_current_user)
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return; course.name style names pick fields of expanded relations"),
+    expand: Optional[str] = Query(None, description="Comma-separated relations to embed in each item"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_admin_repository)
 ):
     """Get all admins with advanced filtering and pagination"""
     try:
@@ -204,79 +236,143 @@ async def get_admins(
         if created_before:
             filters["created_before"] = created_before
         
-        # TODO: Implement actual database query with filters
-        # Mock response for now
-        mock_items = [
-            AdminResponse(
-                id=i,
-                name=f"Sample Admin {i}",
-                description=f"Description for admin {i}",
-                status=AdminStatus.ACTIVE,
-                type=AdminType.STANDARD,
-                tags=["sample", f"tag{i}"],
-                metadata={"index": i},
-                created_at=datetime.utcnow() - timedelta(days=i),
-                created_by=current_user,
-                version=1
-            )
-            for i in range(1, min(pagination["per_page"] + 1, 11))
-        ]
-        
-        total = 100  # Mock total count
-        pages = (total + pagination["per_page"] - 1) // pagination["per_page"]
-        
-        response = AdminList(
-            items=mock_items,
-            total=total,
-            page=pagination["page"],
-            per_page=pagination["per_page"],
-            pages=pages,
-            has_next=pagination["page"] < pages,
-            has_prev=pagination["page"] > 1
+        # Only the requested fields are selected; relations load in one query each
+        projection = repository.projection(fields, expand)
+        result = await repository.paginate(
+            filters, pagination, sort_by=sort_by, sort_order=sort_order, projection=projection
         )
         
-        logger.info(f"Successfully fetched {len(mock_items)} admins")
-        return response
+        # Unchanged page: skip building and serializing the items
+        etag = projection.etag(result.items, result.meta())
+        if not_modified(if_none_match, etag):
+            return not_modified_response(etag)
+        
+        # Repository rows were validated on write; serialize them as they are
+        items = projection.dump(AdminResponse, result.items)
         
+        logger.info(f"Successfully fetched {len(items)} admins")
+        return FastJSONResponse({"items": items, **result.meta()}, headers={"ETag": etag})
+        
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching admins: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error fetching admins: {str(e)}")
 
+# Registered before /{item_id} so "stats" is not parsed as an id
+@router.get(
+    "/stats",
+    response_model=AdminStats,
+    summary="Get admin statistics",
+    description="Get comprehensive statistics about admins"
+)
+async def get_admin_stats(
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_admin_repository)
+):
+    """Get admin statistics"""
+    try:
+        logger.info(f"Fetching admin statistics for user {current_user}")
+        
+        stats = AdminStats(**await repository.stats())
+        
+        logger.info(f"Successfully calculated admin statistics")
+        return stats
+        
+    except Exception as e:
+        logger.error(f"Error calculating admin statistics: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error calculating statistics: {str(e)}")
+
+# Registered before /{item_id} so "export" is not parsed as an id
+@router.get(
+    "/export",
+    summary="Export admins",
+    description="Stream every admin matching the filters as CSV or NDJSON, optionally as a gzip file",
+    response_class=StreamingResponse
+)
+@rate_limit(max_calls=10, time_window=60)
+async def export_admins(
+    format: ExportFormat = Query(ExportFormat.CSV, description="csv or ndjson"),
+    gzip: bool = Query(False, description="Send the export as a .gz file"),
+    status: Optional[AdminStatus] = Query(None, description="Filter by status"),
+    type: Optional[AdminType] = Query(None, description="Filter by type"),
+    search: Optional[str] = Query(None, min_length=1, description="Search in name and description"),
+    tags: Optional[str] = Query(None, description="Comma-separated list of tags to filter by"),
+    created_after: Optional[datetime] = Query(None, description="Filter items created after this date"),
+    created_before: Optional[datetime] = Query(None, description="Filter items created before this date"),
+    sort_by: Optional[str] = Query("id", description="Field to sort by"),
+    sort_order: Optional[str] = Query("asc", regex="^(asc|desc)$", description="Sort order"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to export; course.name style names pick fields of expanded relations"),
+    expand: Optional[str] = Query(None, description="Comma-separated relations to embed in each item"),
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_admin_repository)
+):
+    """Export admins"""
+    try:
+        logger.info(f"Exporting admins as {format.value} for user {current_user}")
+
+        filters = {}
+        if status:
+            filters["status"] = status
+        if type:
+            filters["type"] = type
+        if search:
+            filters["search"] = search
+        if tags:
+            filters["tags"] = tags.split(",")
+        if created_after:
+            filters["created_after"] = created_after
+        if created_before:
+            filters["created_before"] = created_before
+
+        # Rows come off a server-side cursor one batch at a time and are encoded as they arrive
+        projection = repository.projection(fields, expand)
+        batches = (
+            projection.dump(AdminResponse, rows)
+            async for rows in repository.stream(filters, sort_by=sort_by, sort_order=sort_order, projection=projection)
+        )
+        return await export_response(batches, repository.field_names(projection), format, "admin", gzip=gzip)
+
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error exporting admins: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error exporting admins: {str(e)}")
+
 @router.get(
     "/{item_id}",
     response_model=AdminResponse,
+    response_class=FastJSONResponse,
     summary="Get admin by ID",
     description="Retrieve a specific admin by its ID"
 )
 async def get_admin(
     item_id: int = Path(..., gt=0, description="The ID of the admin to retrieve"),
-    current_user: str = Depends(get_current_user)
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return; course.name style names pick fields of expanded relations"),
+    expand: Optional[str] = Query(None, description="Comma-separated relations to embed"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_admin_repository)
 ):
     """Get admin by ID"""
     try:
         logger.info(f"Fetching admin {item_id} for user {current_user}")
         
-        # TODO: Implement actual database query
-        # Mock response for now
-        if item_id > 1000:
+        projection = repository.projection(fields, expand)
+        row = await repository.get(item_id, projection)
+        if row is None:
             raise HTTPException(status_code=404, detail=f"Admin not found")
         
-        response = AdminResponse(
-            id=item_id,
-            name=f"Sample Admin {item_id}",
-            description=f"Description for admin {item_id}",
-            status=AdminStatus.ACTIVE,
-            type=AdminType.STANDARD,
-            tags=["sample"],
-            metadata={"id": item_id},
-            created_at=datetime.utcnow() - timedelta(days=1),
-            created_by=current_user,
-            version=1
-        )
+        # Partial or expanded representations get a weak ETag of their own
+        etag = item_etag(row["id"], row["version"]) if projection.is_full else projection.etag([row])
+        if not_modified(if_none_match, etag):
+            return not_modified_response(etag)
         
         logger.info(f"Successfully fetched admin {item_id}")
-        return response
+        return FastJSONResponse(projection.dump(AdminResponse, [row])[0], headers={"ETag": etag})
         
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -292,25 +388,19 @@ async def get_admin(
 )
 async def create_admin(
     request: AdminCreate,
-    current_user: str = Depends(get_current_user)
+    http_response: Response = None,
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_admin_repository)
 ):
     """Create new admin"""
     try:
         logger.info(f"Creating new admin for user {current_user}: {request.name}")
         
-        # TODO: Implement actual database creation
-        # Mock response for now
-        new_id = 12345  # Mock generated ID
+        row = await repository.create(request.dict(exclude={"created_by"}), current_user)
+        http_response.headers["ETag"] = item_etag(row["id"], row["version"])
+        response = AdminResponse(**row)
         
-        response = AdminResponse(
-            id=new_id,
-            **request.dict(),
-            created_at=datetime.utcnow(),
-            created_by=current_user,
-            version=1
-        )
-        
-        logger.info(f"Successfully created admin {new_id}")
+        logger.info(f"Successfully created admin {response.id}")
         return response
         
     except Exception as e:
@@ -326,36 +416,32 @@ async def create_admin(
 async def update_admin(
     item_id: int = Path(..., gt=0, description="The ID of the admin to update"),
     request: AdminUpdate = ...,
-    current_user: str = Depends(get_current_user)
+    if_match: Optional[str] = Header(None),
+    http_response: Response = None,
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_admin_repository)
 ):
     """Update admin by ID"""
     try:
         logger.info(f"Updating admin {item_id} for user {current_user}")
         
-        # TODO: Implement actual database update
-        # Check if item exists first
-        if item_id > 1000:
+        row = await repository.update(
+            item_id,
+            request.dict(exclude={"updated_by"}, exclude_none=True),
+            current_user,
+            expected_versions=expected_versions(if_match, item_id)
+        )
+        if row is None:
             raise HTTPException(status_code=404, detail=f"Admin not found")
         
-        # Mock response for now
-        response = AdminResponse(
-            id=item_id,
-            name=request.name or f"Updated Admin {item_id}",
-            description=request.description or f"Updated description for admin {item_id}",
-            status=request.status or AdminStatus.ACTIVE,
-            type=request.type or AdminType.STANDARD,
-            tags=request.tags or ["updated"],
-            metadata=request.metadata or {"updated": True},
-            created_at=datetime.utcnow() - timedelta(days=1),
-            updated_at=datetime.utcnow(),
-            created_by="original_user",
-            updated_by=current_user,
-            version=2
-        )
+        http_response.headers["ETag"] = item_etag(row["id"], row["version"])
+        response = AdminResponse(**row)
         
         logger.info(f"Successfully updated admin {item_id}")
         return response
         
+    except VersionConflictError as e:
+        raise precondition_failed(item_etag(item_id, e.version))
     except HTTPException:
         raise
     except Exception as e:
@@ -371,37 +457,32 @@ async def update_admin(
 async def patch_admin(
     item_id: int = Path(..., gt=0, description="The ID of the admin to patch"),
     request: AdminUpdate = ...,
-    current_user: str = Depends(get_current_user)
+    if_match: Optional[str] = Header(None),
+    http_response: Response = None,
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_admin_repository)
 ):
     """Partially update admin by ID"""
     try:
         logger.info(f"Patching admin {item_id} for user {current_user}")
         
-        # TODO: Implement actual database patch
-        if item_id > 1000:
-            raise HTTPException(status_code=404, detail=f"Admin not found")
+        # Only the fields sent in the request are changed
+        updated_fields = request.dict(exclude={"updated_by"}, exclude_unset=True)
         
-        # Mock response - only update provided fields
-        updated_fields = {k: v for k, v in request.dict().items() if v is not None}
-        
-        response = AdminResponse(
-            id=item_id,
-            name=f"Patched Admin {item_id}",
-            description=f"Patched description for admin {item_id}",
-            status=AdminStatus.ACTIVE,
-            type=AdminType.STANDARD,
-            tags=["patched"],
-            metadata={"patched_fields": list(updated_fields.keys())},
-            created_at=datetime.utcnow() - timedelta(days=1),
-            updated_at=datetime.utcnow(),
-            created_by="original_user",
-            updated_by=current_user,
-            version=3
+        row = await repository.update(
+            item_id, updated_fields, current_user, expected_versions=expected_versions(if_match, item_id)
         )
+        if row is None:
+            raise HTTPException(status_code=404, detail=f"Admin not found")
+        
+        http_response.headers["ETag"] = item_etag(row["id"], row["version"])
+        response = AdminResponse(**row)
         
         logger.info(f"Successfully patched admin {item_id} with fields: {list(updated_fields.keys())}")
         return response
         
+    except VersionConflictError as e:
+        raise precondition_failed(item_etag(item_id, e.version))
     except HTTPException:
         raise
     except Exception as e:
@@ -417,16 +498,14 @@ async def patch_admin(
 async def delete_admin(
     item_id: int = Path(..., gt=0, description="The ID of the admin to delete"),
     force: bool = Query(False, description="Force delete without moving to trash"),
-    current_user: str = Depends(get_current_user)
+    if_match: Optional[str] = Header(None),
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_admin_repository)
 ):
     """Delete admin by ID"""
     try:
         logger.info(f"Deleting admin {item_id} for user {current_user} (force={force})")
         
-        # TODO: Implement actual database deletion
-        if item_id > 1000:
-            raise HTTPException(status_code=404, detail=f"Admin not found")
-        
         if force:
             # Hard delete
             logger.info(f"Force deleting admin {item_id}")
@@ -434,8 +513,16 @@ async def delete_admin(
             # Soft delete (mark as deleted)
             logger.info(f"Soft deleting admin {item_id}")
         
+        deleted = await repository.delete(
+            item_id, hard=force, user=current_user, expected_versions=expected_versions(if_match, item_id)
+        )
+        if not deleted:
+            raise HTTPException(status_code=404, detail=f"Admin not found")
+        
         logger.info(f"Successfully deleted admin {item_id}")
         
+    except VersionConflictError as e:
+        raise precondition_failed(item_etag(item_id, e.version))
     except HTTPException:
         raise
     except Exception as e:
@@ -443,45 +530,6 @@ async def delete_admin(
         raise HTTPException(status_code=500, detail=f"Error deleting admin: {str(e)}")
 
 # Additional utility endpoints
-@router.get(
-    "/stats",
-    response_model=AdminStats,
-    summary="Get admin statistics",
-    description="Get comprehensive statistics about admins"
-)
-async def get_admin_stats(
-    current_user: str = Depends(get_current_user)
-):
-    """Get admin statistics"""
-    try:
-        logger.info(f"Fetching admin statistics for user {current_user}")
-        
-        # TODO: Implement actual statistics calculation
-        stats = AdminStats(
-            total_count=1250,
-            active_count=1000,
-            inactive_count=150,
-            pending_count=75,
-            archived_count=20,
-            deleted_count=5,
-            by_type={
-                "standard": 800,
-                "premium": 300,
-                "enterprise": 100,
-                "custom": 50
-            },
-            created_today=15,
-            created_this_week=105,
-            created_this_month=420
-        )
-        
-        logger.info(f"Successfully calculated admin statistics")
-        return stats
-        
-    except Exception as e:
-        logger.error(f"Error calculating admin statistics: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error calculating statistics: {str(e)}")
-
 @router.post(
     "/bulk",
     response_model=List[AdminResponse],
@@ -490,7 +538,8 @@ async def get_admin_stats(
 )
 async def bulk_create_admins(
     requests: List[AdminCreate],
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_admin_repository)
 ):
     """Bulk create admins"""
     try:
@@ -499,17 +548,11 @@ async def bulk_create_admins(
         if len(requests) > 100:
             raise HTTPException(status_code=400, detail="Maximum 100 items allowed per bulk operation")
         
-        # TODO: Implement actual bulk database creation
-        responses = []
-        for i, request in enumerate(requests):
-            response = AdminResponse(
-                id=10000 + i,
-                **request.dict(),
-                created_at=datetime.utcnow(),
-                created_by=current_user,
-                version=1
-            )
-            responses.append(response)
+        rows = await repository.bulk_create(
+            [request.dict(exclude={"created_by"}) for request in requests],
+            current_user
+        )
+        responses = [AdminResponse(**row) for row in rows]
         
         logger.info(f"Successfully bulk created {len(responses)} admins")
         return responses
@@ -520,52 +563,148 @@ async def bulk_create_admins(
         logger.error(f"Error bulk creating admins: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error bulk creating admins: {str(e)}")
 
+@router.post(
+    "/bulk/stream",
+    summary="Stream bulk create admins",
+    description="Create any number of admins from an NDJSON body (one admin per line); "
+                "results stream back as NDJSON, one line per input line plus a summary",
+    response_class=IngestResponse
+)
+async def stream_bulk_create_admins(
+    request: Request,
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_admin_repository)
+):
+    """Stream bulk create admins"""
+    logger.info(f"Streaming bulk create of admins for user {current_user}")
+    return IngestResponse(
+        ingest_ndjson(request.stream(), AdminCreate, repository, current_user, exclude={"created_by"})
+    )
+
 @router.post(
     "/search",
     response_model=AdminList,
+    response_class=FastJSONResponse,
     summary="Advanced search admins",
     description="Perform advanced search across admins with complex criteria"
 )
 async def search_admins(
     search_query: Dict[str, Any],
     pagination: dict = Depends(validate_pagination),
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_admin_repository)
 ):
     """Advanced search for admins"""
     try:
         logger.info(f"Advanced search for admins by user {current_user}: {search_query}")
         
-        # TODO: Implement actual advanced search logic
-        # Mock response for now
-        mock_items = [
-            AdminResponse(
-                id=i,
-                name=f"Search Result Admin {i}",
-                description=f"Matched search criteria: {search_query}",
-                status=AdminStatus.ACTIVE,
-                type=AdminType.STANDARD,
-                tags=["search", "result"],
-                metadata={"search_score": 0.95 - (i * 0.1)},
-                created_at=datetime.utcnow() - timedelta(days=i),
-                created_by=current_user,
-                version=1
-            )
-            for i in range(1, 6)
-        ]
-        
-        response = AdminList(
-            items=mock_items,
-            total=5,
-            page=pagination["page"],
-            per_page=pagination["per_page"],
-            pages=1,
-            has_next=False,
-            has_prev=False
+        # Criteria use the same names as the list endpoint's query parameters
+        filters = dict(search_query)
+        # Full-text matches come back best first unless another order is asked for
+        sort_by = filters.pop("sort_by", "relevance" if filters.get("search") else "created_at")
+        sort_order = filters.pop("sort_order", "desc")
+        projection = repository.projection(filters.pop("fields", None), filters.pop("expand", None))
+        if isinstance(filters.get("tags"), str):
+            filters["tags"] = filters["tags"].split(",")
+        
+        result = await repository.paginate(
+            filters, pagination, sort_by=sort_by, sort_order=sort_order, projection=projection
         )
+        items = projection.dump(AdminResponse, result.items)
         
-        logger.info(f"Advanced search returned {len(mock_items)} results")
-        return response
+        logger.info(f"Advanced search returned {len(items)} results")
+        return FastJSONResponse({"items": items, **result.meta()})
         
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error in advanced search: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error in search: {str(e)}")
+
+# Diagnostics endpoints; each request is answered by, and describes, the worker that received it
+def require_diagnostics_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency admitting only callers holding ADMIN_DIAGNOSTICS_TOKEN"""
+    if not settings.ADMIN_DIAGNOSTICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Diagnostics are disabled")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_DIAGNOSTICS_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+class MemoryTraceGroup(str, Enum):
+    LINENO = "lineno"
+    FILENAME = "filename"
+    TRACEBACK = "traceback"
+
+@router.post(
+    "/diagnostics/profile",
+    summary="Profile this worker",
+    description="Sample the worker's stacks for a number of seconds and return them as collapsed stacks "
+                "(one 'frame;frame;frame count' line per stack) for flamegraph.pl or speedscope",
+    response_class=Response,
+    dependencies=[Depends(require_diagnostics_admin)]
+)
+async def profile_worker(
+    seconds: float = Query(10.0, gt=0, description="How long to sample"),
+    interval_ms: float = Query(5.0, gt=0, description="Milliseconds between samples"),
+    all_threads: bool = Query(False, description="Sample every thread, not just the event loop")
+):
+    """Run a time-boxed sampling profile"""
+    try:
+        logger.info(f"Profiling worker {os.getpid()} for {seconds}s")
+        result = await get_profiler().profile(seconds, interval_ms / 1000, all_threads=all_threads)
+        return Response(
+            result["collapsed"],
+            media_type="text/plain",
+            headers={
+                "X-Worker-Pid": str(os.getpid()),
+                "X-Profile-Samples": str(result["samples"]),
+                "X-Profile-Seconds": f"{result['seconds']:.3f}"
+            }
+        )
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error profiling worker: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error profiling worker: {str(e)}")
+
+@router.post(
+    "/diagnostics/memory/start",
+    summary="Start memory tracing",
+    description="Start tracemalloc on this worker; the current allocations become the baseline",
+    dependencies=[Depends(require_diagnostics_admin)]
+)
+async def start_memory_trace(
+    frames: int = Query(1, ge=1, le=50, description="Stack frames kept per allocation")
+):
+    """Start tracemalloc"""
+    return await asyncio.to_thread(get_memory_tracer().start, frames)
+
+@router.get(
+    "/diagnostics/memory",
+    summary="Memory growth",
+    description="Allocation sources that grew the most since the baseline",
+    dependencies=[Depends(require_diagnostics_admin)]
+)
+async def get_memory_trace(
+    limit: int = Query(25, ge=1, le=500),
+    group_by: MemoryTraceGroup = Query(MemoryTraceGroup.LINENO),
+    reset_baseline: bool = Query(False, description="Make this snapshot the baseline for the next one")
+):
+    """Diff a tracemalloc snapshot against the baseline"""
+    tracer = get_memory_tracer()
+    if not tracer.tracing:
+        raise HTTPException(status_code=409, detail="Memory tracing is not running; start it first")
+    try:
+        return await asyncio.to_thread(tracer.snapshot, limit, group_by.value, reset_baseline)
+    except Exception as e:
+        logger.error(f"Error taking memory snapshot: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error taking memory snapshot: {str(e)}")
+
+@router.post(
+    "/diagnostics/memory/stop",
+    summary="Stop memory tracing",
+    description="Stop tracemalloc on this worker and drop the baseline",
+    dependencies=[Depends(require_diagnostics_admin)]
+)
+async def stop_memory_trace():
+    """Stop tracemalloc"""
+    return get_memory_tracer().stop()
@@ -1,5 +1,6 @@
 
-from fastapi import APIRouter, HTTPException, Depends, Query, Path, status, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Query, Path, Request, status
+from fastapi.responses import StreamingResponse
 from typing import List, Optional, Dict, Any, Union
 from pydantic import BaseModel, Field, validator
 from datetime import datetime, timedelta
@@ -14,7 +15,9 @@ from models.analytics import Analytics
 from services.analytics_service import AnalyticsService
 from services.ai_tutor_service import AITutorService
 from services.anti_cheat_service import AntiCheatService
-from monitoring.activity_logger import log_user_activity
+from monitoring.activity_logger import activity_table, get_activity_sink, stream_activity
+from utils.authz_cache import FAMILY, RESOURCE, STUDENT, get_authz_cache
+from utils.export import ExportFormat, export_response
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -135,37 +138,98 @@ class AnalyticsResponse(AnalyticsBase):
         }
 
 # Mrs-Unkwn specific dependency functions
+def authz_resource(item_id: str) -> str:
+    """Authorization cache key of an item"""
+    return f"analytics:{item_id}"
+
+async def load_family_access(
+    item_ids: List[str],
+    current_user,
+    db: Session
+) -> Dict[str, bool]:
+    """Family access of the user to each item, in one query"""
+    # TODO: Implement family access verification
+    return {item_id: True for item_id in item_ids}
+
 async def verify_family_access(
     item_id: str, 
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Verify user has family access to resource"""
-    # TODO: Implement family access verification
-    return True
+    """Verify user has family access to resource; decisions are cached"""
+    async def load():
+        return (await load_family_access([item_id], current_user, db)).get(item_id, False)
+    
+    return await get_authz_cache().check(
+        current_user.id,
+        authz_resource(item_id),
+        "family_access",
+        load,
+        scopes=[(FAMILY, getattr(current_user, "family_id", None))]
+    )
+
+async def verify_student_access(
+    student_id: str,
+    current_user,
+    db: Session
+) -> bool:
+    """Verify the user may see a student's data: the student themselves or their family; decisions are cached"""
+    if str(student_id) == str(current_user.id):
+        return True
+    
+    async def load():
+        return (await load_family_access([student_id], current_user, db)).get(student_id, False)
+    
+    return await get_authz_cache().check(
+        current_user.id,
+        f"student:{student_id}",
+        "family_access",
+        load,
+        scopes=[(FAMILY, getattr(current_user, "family_id", None)), (STUDENT, str(student_id))]
+    )
+
+async def verify_family_access_many(
+    item_ids: List[str],
+    current_user,
+    db: Session
+) -> Dict[str, bool]:
+    """Family access for a page of items: cached decisions plus at most one query"""
+    resources = {authz_resource(item_id): item_id for item_id in item_ids}
+    
+    async def load_many(missing: List[str]) -> Dict[str, bool]:
+        loaded = await load_family_access([resources[resource] for resource in missing], current_user, db)
+        return {authz_resource(item_id): allowed for item_id, allowed in loaded.items()}
+    
+    decisions = await get_authz_cache().check_many(
+        current_user.id,
+        list(resources),
+        "family_access",
+        load_many,
+        scopes=[(FAMILY, getattr(current_user, "family_id", None))]
+    )
+    return {item_id: decisions[resource] for resource, item_id in resources.items()}
 
 async def check_parental_controls(
     student_id: str,
     action: str,
     db: Session = Depends(get_db)
 ):
-    """Check if action is allowed by parental controls"""
-    # TODO: Implement parental control checks
-    return True
+    """Check if action is allowed by parental controls; decisions are cached"""
+    async def load():
+        # TODO: Implement parental control checks
+        return True
+    
+    return await get_authz_cache().check(
+        student_id, "parental_controls", action, load, scopes=[(STUDENT, student_id)]
+    )
 
-async def log_learning_activity(
+def log_learning_activity(
     user_id: str,
     activity_type: str,
-    details: Dict[str, Any],
-    background_tasks: BackgroundTasks
+    details: Dict[str, Any]
 ):
-    """Log learning activity for analytics"""
-    background_tasks.add_task(
-        log_user_activity,
-        user_id=user_id,
-        activity_type=activity_type,
-        details=details
-    )
+    """Log learning activity for analytics; buffered and written in batches"""
+    get_activity_sink().record(user_id, activity_type, details)
 
 # Main CRUD endpoints with Mrs-Unkwn features
 @router.get(
@@ -186,17 +250,15 @@ async def get_analyticss(
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    db: Session = Depends(get_db)
 ):
     """Get analyticss with Mrs-Unkwn family filtering and analytics"""
     try:
         # Log access attempt
-        await log_learning_activity(
+        log_learning_activity(
             current_user.id, 
             "view_analyticss", 
-            {"family_id": family_id, "filters": {"subject": subject, "status": status}},
-            background_tasks
+            {"family_id": family_id, "filters": {"subject": subject, "status": status}}
         )
         
         # Verify family access
@@ -223,6 +285,10 @@ async def get_analyticss(
             per_page=per_page
         )
         
+        # One bulk decision for the page instead of a check per item
+        access = await verify_family_access_many([str(item.id) for item in items], current_user, db)
+        items = [item for item in items if access[str(item.id)]]
+        
         logger.info(f"Retrieved {len(items)} analyticss for user {current_user.id}")
         return items
         
@@ -242,8 +308,7 @@ async def get_analyticss(
 async def create_analytics(
     request: AnalyticsCreate,
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    current_user = Depends(get_current_user)
 ):
     """Create new analytics with Mrs-Unkwn features"""
     try:
@@ -274,11 +339,10 @@ async def create_analytics(
             await ai_service.initialize_for_analytics(new_item.id)
         
         # Log creation activity
-        await log_learning_activity(
+        log_learning_activity(
             current_user.id,
             "create_analytics",
-            {"item_id": new_item.id, "name": request.name},
-            background_tasks
+            {"item_id": new_item.id, "name": request.name}
         )
         
         logger.info(f"Created analytics {new_item.id} for user {current_user.id}")
@@ -290,6 +354,54 @@ async def create_analytics(
         logger.error(f"Error creating analytics: {str(e)}")
         raise HTTPException(status_code=500, detail="Error creating resource")
 
+# Registered before /{item_id} so "export" is not parsed as an id
+@router.get(
+    "/export",
+    summary="Export learning activity",
+    description="Stream a student's learning activity log as CSV or NDJSON, optionally as a gzip file",
+    response_class=StreamingResponse
+)
+async def export_learning_activity(
+    format: ExportFormat = Query(ExportFormat.CSV, description="csv or ndjson"),
+    gzip: bool = Query(False, description="Send the export as a .gz file"),
+    student_id: Optional[str] = Query(None, description="Student whose activity to export; defaults to the current user"),
+    activity_type: Optional[str] = Query(None, description="Filter by activity type"),
+    date_from: Optional[datetime] = Query(None, description="Filter from date"),
+    date_to: Optional[datetime] = Query(None, description="Filter to date"),
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Export learning activity with Mrs-Unkwn parental controls"""
+    try:
+        user_id = student_id or str(current_user.id)
+        if user_id != str(current_user.id):
+            # Parental controls are the student's policy; first the caller must belong to the student's family
+            if not await verify_student_access(user_id, current_user, db):
+                raise HTTPException(status_code=403, detail="Access forbidden")
+            allowed = await check_parental_controls(user_id, "export_analytics", db)
+            if not allowed:
+                raise HTTPException(status_code=403, detail="Action blocked by parental controls")
+
+        log_learning_activity(
+            current_user.id,
+            "export_analytics",
+            {"student_id": user_id, "format": format.value, "date_from": date_from, "date_to": date_to}
+        )
+
+        # A year of activity never sits in memory: rows are encoded batch by batch off the cursor
+        batches = stream_activity(
+            user_id=user_id, activity_type=activity_type, occurred_after=date_from, occurred_before=date_to
+        )
+        return await export_response(
+            batches, activity_table.c.keys(), format, f"learning-activity-{user_id}", gzip=gzip
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error exporting learning activity: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error exporting data")
+
 @router.get(
     "/{item_id}",
     response_model=AnalyticsResponse,
@@ -300,8 +412,7 @@ async def get_analytics(
     item_id: str = Path(..., description="ID of the analytics"),
     include_live_data: bool = Query(True, description="Include real-time monitoring data"),
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    db: Session = Depends(get_db)
 ):
     """Get analytics with Mrs-Unkwn monitoring integration"""
     try:
@@ -324,11 +435,10 @@ async def get_analytics(
                 item.metadata["active_alerts"] = len(alerts)
         
         # Log access
-        await log_learning_activity(
+        log_learning_activity(
             current_user.id,
             "view_analytics",
-            {"item_id": item_id},
-            background_tasks
+            {"item_id": item_id}
         )
         
         return item
@@ -346,12 +456,12 @@ async def get_analytics(
     description="Interact with AI tutor for this analytics"
 )
 async def ai_tutor_interaction(
+    http_request: Request,
     item_id: str = Path(...),
     message: str = Field(..., min_length=1, max_length=2000),
     interaction_type: str = Field(default="question"),
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    db: Session = Depends(get_db)
 ):
     """Handle AI tutor interaction with anti-cheat monitoring"""
     try:
@@ -364,7 +474,11 @@ async def ai_tutor_interaction(
         is_suspicious = await anti_cheat_service.analyze_interaction(
             user_id=current_user.id,
             message=message,
-            context={"item_id": item_id, "type": interaction_type}
+            context={
+                "item_id": item_id,
+                "type": interaction_type,
+                "client_ip": http_request.client.host if http_request.client else None
+            }
         )
         
         if is_suspicious:
@@ -385,7 +499,7 @@ async def ai_tutor_interaction(
         )
         
         # Log interaction
-        await log_learning_activity(
+        log_learning_activity(
             current_user.id,
             "ai_interaction",
             {
@@ -393,8 +507,7 @@ async def ai_tutor_interaction(
                 "interaction_type": interaction_type,
                 "message_length": len(message),
                 "response_type": response.get("type", "unknown")
-            },
-            background_tasks
+            }
         )
         
         return response
@@ -447,8 +560,7 @@ async def parent_intervention(
     action: str = Field(..., regex="^(pause|resume|block|allow|redirect)$"),
     message: Optional[str] = Field(None, max_length=500),
     current_user = Depends(get_current_parent),
-    db: Session = Depends(get_db),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    db: Session = Depends(get_db)
 ):
     """Handle parent intervention in learning session"""
     try:
@@ -465,16 +577,18 @@ async def parent_intervention(
             parent_id=current_user.id
         )
         
+        # Blocking or allowing changes who may access the analytics
+        get_authz_cache().invalidate(RESOURCE, authz_resource(item_id))
+        
         # Log intervention
-        await log_learning_activity(
+        log_learning_activity(
             current_user.id,
             "parent_intervention",
             {
                 "item_id": item_id,
                 "action": action,
                 "has_message": bool(message)
-            },
-            background_tasks
+            }
         )
         
         return {"success": True, "action": action, "result": result}
@@ -0,0 +1,112 @@
+from fastapi import APIRouter, HTTPException, Request
+from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, validator
+import logging
+
+from config import settings
+from utils.batch import SubRequest, run_batch
+from utils.fast_json import FastJSONResponse
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Create router with prefix and tags
+router = APIRouter(
+    prefix="/api/batch",
+    tags=["batch"],
+    responses={
+        400: {"description": "Invalid batch"},
+        422: {"description": "Validation error"}
+    }
+)
+
+METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE")
+
+class BatchItem(BaseModel):
+    """One sub-request of a batch"""
+    id: Optional[str] = Field(None, description="Reference for depends_on and the results; defaults to the index")
+    method: str = Field("GET", description="HTTP method")
+    path: str = Field(..., description="Path of an API route, e.g. /api/families/12; may include a query string")
+    query: Dict[str, Any] = Field(default_factory=dict, description="Query parameters")
+    headers: Dict[str, str] = Field(default_factory=dict, description="Extra headers; Authorization is inherited")
+    body: Optional[Any] = Field(None, description="JSON body")
+    depends_on: List[str] = Field(default_factory=list, description="Ids of earlier sub-requests to wait for")
+
+    @validator('method')
+    def validate_method(cls, v):
+        if v.upper() not in METHODS:
+            raise ValueError(f'Method must be one of {", ".join(METHODS)}')
+        return v.upper()
+
+    @validator('path')
+    def validate_path(cls, v):
+        if not v.startswith("/api/"):
+            raise ValueError('Path must be an /api/ route')
+        if v.split("?")[0].rstrip("/") == router.prefix:
+            raise ValueError('Batches cannot be nested')
+        return v
+
+class BatchRequest(BaseModel):
+    """Sub-requests to run in one round trip"""
+    requests: List[BatchItem] = Field(..., min_items=1)
+
+class BatchResult(BaseModel):
+    """Outcome of one sub-request"""
+    id: str
+    status: int
+    headers: Dict[str, str]
+    body: Optional[Any] = None
+    duration_ms: float
+
+class BatchResponse(BaseModel):
+    """Results in the order of the sub-requests"""
+    responses: List[BatchResult]
+
+def build_sub_requests(batch: BatchRequest) -> List[SubRequest]:
+    """Assign ids and check that every dependency points to an earlier sub-request"""
+    seen = set()
+    sub_requests = []
+    for index, item in enumerate(batch.requests):
+        item_id = item.id or str(index)
+        if item_id in seen:
+            raise HTTPException(status_code=400, detail=f"Duplicate sub-request id {item_id}")
+        unknown = [dependency for dependency in item.depends_on if dependency not in seen]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Sub-request {item_id} depends on {', '.join(unknown)}, which must come earlier"
+            )
+        seen.add(item_id)
+        sub_requests.append(SubRequest(
+            id=item_id,
+            method=item.method,
+            path=item.path,
+            query=item.query,
+            headers=item.headers,
+            body=item.body,
+            depends_on=item.depends_on
+        ))
+    return sub_requests
+
+# The documented path is POST /api/batch; "/" alone would answer it with a 307 redirect, a wasted round trip
+@router.post("/", response_model=BatchResponse, response_class=FastJSONResponse, include_in_schema=False)
+@router.post(
+    "",
+    response_model=BatchResponse,
+    response_class=FastJSONResponse,
+    summary="Run several API calls in one request",
+    description="Dispatch sub-requests in process; independent ones run concurrently. "
+                "Each result carries its own status, so one failure does not fail the batch."
+)
+async def run_batch_request(batch: BatchRequest, request: Request):
+    """Run a batch of sub-requests"""
+    if len(batch.requests) > settings.BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maximum {settings.BATCH_MAX_REQUESTS} sub-requests allowed per batch"
+        )
+    sub_requests = build_sub_requests(batch)
+    logger.info(f"Running batch of {len(sub_requests)} sub-requests")
+
+    results = await run_batch(request.app, request.scope, sub_requests)
+    return FastJSONResponse({"responses": [result.__dict__ for result in results]})
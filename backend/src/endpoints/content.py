@@ -1,5 +1,5 @@
 
-from fastapi import APIRouter, HTTPException, Depends, Query, Path, status, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Query, Path, Request, status
 from typing import List, Optional, Dict, Any, Union
 from pydantic import BaseModel, Field, validator
 from datetime import datetime, timedelta
@@ -14,7 +14,8 @@ from models.content import Content
 from services.content_service import ContentService
 from services.ai_tutor_service import AITutorService
 from services.anti_cheat_service import AntiCheatService
-from monitoring.activity_logger import log_user_activity
+from monitoring.activity_logger import get_activity_sink
+from utils.authz_cache import FAMILY, RESOURCE, STUDENT, get_authz_cache
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -135,37 +136,78 @@ class ContentResponse(ContentBase):
         }
 
 # Mrs-Unkwn specific dependency functions
+def authz_resource(item_id: str) -> str:
+    """Authorization cache key of an item"""
+    return f"content:{item_id}"
+
+async def load_family_access(
+    item_ids: List[str],
+    current_user,
+    db: Session
+) -> Dict[str, bool]:
+    """Family access of the user to each item, in one query"""
+    # TODO: Implement family access verification
+    return {item_id: True for item_id in item_ids}
+
 async def verify_family_access(
     item_id: str, 
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Verify user has family access to resource"""
-    # TODO: Implement family access verification
-    return True
+    """Verify user has family access to resource; decisions are cached"""
+    async def load():
+        return (await load_family_access([item_id], current_user, db)).get(item_id, False)
+    
+    return await get_authz_cache().check(
+        current_user.id,
+        authz_resource(item_id),
+        "family_access",
+        load,
+        scopes=[(FAMILY, getattr(current_user, "family_id", None))]
+    )
+
+async def verify_family_access_many(
+    item_ids: List[str],
+    current_user,
+    db: Session
+) -> Dict[str, bool]:
+    """Family access for a page of items: cached decisions plus at most one query"""
+    resources = {authz_resource(item_id): item_id for item_id in item_ids}
+    
+    async def load_many(missing: List[str]) -> Dict[str, bool]:
+        loaded = await load_family_access([resources[resource] for resource in missing], current_user, db)
+        return {authz_resource(item_id): allowed for item_id, allowed in loaded.items()}
+    
+    decisions = await get_authz_cache().check_many(
+        current_user.id,
+        list(resources),
+        "family_access",
+        load_many,
+        scopes=[(FAMILY, getattr(current_user, "family_id", None))]
+    )
+    return {item_id: decisions[resource] for resource, item_id in resources.items()}
 
 async def check_parental_controls(
     student_id: str,
     action: str,
     db: Session = Depends(get_db)
 ):
-    """Check if action is allowed by parental controls"""
-    # TODO: Implement parental control checks
-    return True
+    """Check if action is allowed by parental controls; decisions are cached"""
+    async def load():
+        # TODO: Implement parental control checks
+        return True
+    
+    return await get_authz_cache().check(
+        student_id, "parental_controls", action, load, scopes=[(STUDENT, student_id)]
+    )
 
-async def log_learning_activity(
+def log_learning_activity(
     user_id: str,
     activity_type: str,
-    details: Dict[str, Any],
-    background_tasks: BackgroundTasks
+    details: Dict[str, Any]
 ):
-    """Log learning activity for analytics"""
-    background_tasks.add_task(
-        log_user_activity,
-        user_id=user_id,
-        activity_type=activity_type,
-        details=details
-    )
+    """Log learning activity for analytics; buffered and written in batches"""
+    get_activity_sink().record(user_id, activity_type, details)
 
 # Main CRUD endpoints with Mrs-Unkwn features
 @router.get(
@@ -186,17 +228,15 @@ async def get_contents(
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    db: Session = Depends(get_db)
 ):
     """Get contents with Mrs-Unkwn family filtering and analytics"""
     try:
         # Log access attempt
-        await log_learning_activity(
+        log_learning_activity(
             current_user.id, 
             "view_contents", 
-            {"family_id": family_id, "filters": {"subject": subject, "status": status}},
-            background_tasks
+            {"family_id": family_id, "filters": {"subject": subject, "status": status}}
         )
         
         # Verify family access
@@ -223,6 +263,10 @@ async def get_contents(
             per_page=per_page
         )
         
+        # One bulk decision for the page instead of a check per item
+        access = await verify_family_access_many([str(item.id) for item in items], current_user, db)
+        items = [item for item in items if access[str(item.id)]]
+        
         logger.info(f"Retrieved {len(items)} contents for user {current_user.id}")
         return items
         
@@ -242,8 +286,7 @@ async def get_contents(
 async def create_content(
     request: ContentCreate,
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    current_user = Depends(get_current_user)
 ):
     """Create new content with Mrs-Unkwn features"""
     try:
@@ -274,11 +317,10 @@ async def create_content(
             await ai_service.initialize_for_content(new_item.id)
         
         # Log creation activity
-        await log_learning_activity(
+        log_learning_activity(
             current_user.id,
             "create_content",
-            {"item_id": new_item.id, "name": request.name},
-            background_tasks
+            {"item_id": new_item.id, "name": request.name}
         )
         
         logger.info(f"Created content {new_item.id} for user {current_user.id}")
@@ -300,8 +342,7 @@ async def get_content(
     item_id: str = Path(..., description="ID of the content"),
     include_live_data: bool = Query(True, description="Include real-time monitoring data"),
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    db: Session = Depends(get_db)
 ):
     """Get content with Mrs-Unkwn monitoring integration"""
     try:
@@ -324,11 +365,10 @@ async def get_content(
                 item.metadata["active_alerts"] = len(alerts)
         
         # Log access
-        await log_learning_activity(
+        log_learning_activity(
             current_user.id,
             "view_content",
-            {"item_id": item_id},
-            background_tasks
+            {"item_id": item_id}
         )
         
         return item
@@ -346,12 +386,12 @@ async def get_content(
     description="Interact with AI tutor for this content"
 )
 async def ai_tutor_interaction(
+    http_request: Request,
     item_id: str = Path(...),
     message: str = Field(..., min_length=1, max_length=2000),
     interaction_type: str = Field(default="question"),
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    db: Session = Depends(get_db)
 ):
     """Handle AI tutor interaction with anti-cheat monitoring"""
     try:
@@ -364,7 +404,11 @@ async def ai_tutor_interaction(
         is_suspicious = await anti_cheat_service.analyze_interaction(
             user_id=current_user.id,
             message=message,
-            context={"item_id": item_id, "type": interaction_type}
+            context={
+                "item_id": item_id,
+                "type": interaction_type,
+                "client_ip": http_request.client.host if http_request.client else None
+            }
         )
         
         if is_suspicious:
@@ -385,7 +429,7 @@ async def ai_tutor_interaction(
         )
         
         # Log interaction
-        await log_learning_activity(
+        log_learning_activity(
             current_user.id,
             "ai_interaction",
             {
@@ -393,8 +437,7 @@ async def ai_tutor_interaction(
                 "interaction_type": interaction_type,
                 "message_length": len(message),
                 "response_type": response.get("type", "unknown")
-            },
-            background_tasks
+            }
         )
         
         return response
@@ -447,8 +490,7 @@ async def parent_intervention(
     action: str = Field(..., regex="^(pause|resume|block|allow|redirect)$"),
     message: Optional[str] = Field(None, max_length=500),
     current_user = Depends(get_current_parent),
-    db: Session = Depends(get_db),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    db: Session = Depends(get_db)
 ):
     """Handle parent intervention in learning session"""
     try:
@@ -465,16 +507,18 @@ async def parent_intervention(
             parent_id=current_user.id
         )
         
+        # Blocking or allowing changes who may access the content
+        get_authz_cache().invalidate(RESOURCE, authz_resource(item_id))
+        
         # Log intervention
-        await log_learning_activity(
+        log_learning_activity(
             current_user.id,
             "parent_intervention",
             {
                 "item_id": item_id,
                 "action": action,
                 "has_message": bool(message)
-            },
-            background_tasks
+            }
         )
         
         return {"success": True, "action": action, "result": result}
@@ -1,5 +1,5 @@
 
-from fastapi import APIRouter, HTTPException, Depends, Query, Path, status, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Query, Path, Request, status
 from typing import List, Optional, Dict, Any, Union
 from pydantic import BaseModel, Field, validator
 from datetime import datetime, timedelta
@@ -14,7 +14,10 @@ from models.device_monitoring import Device_Monitoring
 from services.device_monitoring_service import Device_MonitoringService
 from services.ai_tutor_service import AITutorService
 from services.anti_cheat_service import AntiCheatService
-from monitoring.activity_logger import log_user_activity
+from monitoring.activity_logger import get_activity_sink
+from utils.authz_cache import FAMILY, RESOURCE, STUDENT, get_authz_cache
+from monitoring.inputcadenceanalyzer import InputEventKind, get_input_cadence_analyzer
+from monitoring.iprangeindex import get_ip_range_index
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -134,38 +137,97 @@ class Device_MonitoringResponse(Device_MonitoringBase):
             }
         }
 
+class InputEventBatch(BaseModel):
+    """Columnar batch of keystroke/input timing events from a student device"""
+    timestamps: List[float] = Field(..., max_items=20000, description="Event times in milliseconds")
+    kinds: List[InputEventKind] = Field(..., max_items=20000, description="0 = key, 1 = paste, 2 = delete")
+    chars: Optional[List[int]] = Field(None, max_items=20000, description="Characters inserted per event")
+    
+    @validator('kinds')
+    def validate_kinds_length(cls, v, values):
+        if 'timestamps' in values and len(v) != len(values['timestamps']):
+            raise ValueError('kinds must have the same length as timestamps')
+        return v
+    
+    @validator('chars')
+    def validate_chars_length(cls, v, values):
+        if v is not None and 'timestamps' in values and len(v) != len(values['timestamps']):
+            raise ValueError('chars must have the same length as timestamps')
+        return v
+
 # Mrs-Unkwn specific dependency functions
+def authz_resource(item_id: str) -> str:
+    """Authorization cache key of an item"""
+    return f"device_monitoring:{item_id}"
+
+async def load_family_access(
+    item_ids: List[str],
+    current_user,
+    db: Session
+) -> Dict[str, bool]:
+    """Family access of the user to each item, in one query"""
+    # TODO: Implement family access verification
+    return {item_id: True for item_id in item_ids}
+
 async def verify_family_access(
     item_id: str, 
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Verify user has family access to resource"""
-    # TODO: Implement family access verification
-    return True
+    """Verify user has family access to resource; decisions are cached"""
+    async def load():
+        return (await load_family_access([item_id], current_user, db)).get(item_id, False)
+    
+    return await get_authz_cache().check(
+        current_user.id,
+        authz_resource(item_id),
+        "family_access",
+        load,
+        scopes=[(FAMILY, getattr(current_user, "family_id", None))]
+    )
+
+async def verify_family_access_many(
+    item_ids: List[str],
+    current_user,
+    db: Session
+) -> Dict[str, bool]:
+    """Family access for a page of items: cached decisions plus at most one query"""
+    resources = {authz_resource(item_id): item_id for item_id in item_ids}
+    
+    async def load_many(missing: List[str]) -> Dict[str, bool]:
+        loaded = await load_family_access([resources[resource] for resource in missing], current_user, db)
+        return {authz_resource(item_id): allowed for item_id, allowed in loaded.items()}
+    
+    decisions = await get_authz_cache().check_many(
+        current_user.id,
+        list(resources),
+        "family_access",
+        load_many,
+        scopes=[(FAMILY, getattr(current_user, "family_id", None))]
+    )
+    return {item_id: decisions[resource] for resource, item_id in resources.items()}
 
 async def check_parental_controls(
     student_id: str,
     action: str,
     db: Session = Depends(get_db)
 ):
-    """Check if action is allowed by parental controls"""
-    # TODO: Implement parental control checks
-    return True
+    """Check if action is allowed by parental controls; decisions are cached"""
+    async def load():
+        # TODO: Implement parental control checks
+        return True
+    
+    return await get_authz_cache().check(
+        student_id, "parental_controls", action, load, scopes=[(STUDENT, student_id)]
+    )
 
-async def log_learning_activity(
+def log_learning_activity(
     user_id: str,
     activity_type: str,
-    details: Dict[str, Any],
-    background_tasks: BackgroundTasks
+    details: Dict[str, Any]
 ):
-    """Log learning activity for analytics"""
-    background_tasks.add_task(
-        log_user_activity,
-        user_id=user_id,
-        activity_type=activity_type,
-        details=details
-    )
+    """Log learning activity for analytics; buffered and written in batches"""
+    get_activity_sink().record(user_id, activity_type, details)
 
 # Main CRUD endpoints with Mrs-Unkwn features
 @router.get(
@@ -186,17 +248,15 @@ async def get_device_monitorings(
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    db: Session = Depends(get_db)
 ):
     """Get device_monitorings with Mrs-Unkwn family filtering and analytics"""
     try:
         # Log access attempt
-        await log_learning_activity(
+        log_learning_activity(
             current_user.id, 
             "view_device_monitorings", 
-            {"family_id": family_id, "filters": {"subject": subject, "status": status}},
-            background_tasks
+            {"family_id": family_id, "filters": {"subject": subject, "status": status}}
         )
         
         # Verify family access
@@ -223,6 +283,10 @@ async def get_device_monitorings(
             per_page=per_page
         )
         
+        # One bulk decision for the page instead of a check per item
+        access = await verify_family_access_many([str(item.id) for item in items], current_user, db)
+        items = [item for item in items if access[str(item.id)]]
+        
         logger.info(f"Retrieved {len(items)} device_monitorings for user {current_user.id}")
         return items
         
@@ -240,10 +304,10 @@ async def get_device_monitorings(
     description="Create new device monitoring with AI tutor integration"
 )
 async def create_device_monitoring(
+    http_request: Request,
     request: Device_MonitoringCreate,
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    current_user = Depends(get_current_user)
 ):
     """Create new device_monitoring with Mrs-Unkwn features"""
     try:
@@ -264,6 +328,10 @@ async def create_device_monitoring(
         if not await verify_family_access(request.family_id, current_user, db):
             raise HTTPException(status_code=403, detail="Family access required")
         
+        # Tag the session with its network origin (VPN, datacenter, Tor)
+        client_ip = http_request.client.host if http_request.client else None
+        request.metadata["network"] = get_ip_range_index().tag(client_ip)
+        
         # Create through service layer
         service = Device_MonitoringService(db)
         new_item = await service.create_device_monitoring(request, current_user.id)
@@ -274,11 +342,10 @@ async def create_device_monitoring(
             await ai_service.initialize_for_device_monitoring(new_item.id)
         
         # Log creation activity
-        await log_learning_activity(
+        log_learning_activity(
             current_user.id,
             "create_device_monitoring",
-            {"item_id": new_item.id, "name": request.name},
-            background_tasks
+            {"item_id": new_item.id, "name": request.name}
         )
         
         logger.info(f"Created device_monitoring {new_item.id} for user {current_user.id}")
@@ -300,8 +367,7 @@ async def get_device_monitoring(
     item_id: str = Path(..., description="ID of the device_monitoring"),
     include_live_data: bool = Query(True, description="Include real-time monitoring data"),
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    db: Session = Depends(get_db)
 ):
     """Get device_monitoring with Mrs-Unkwn monitoring integration"""
     try:
@@ -324,11 +390,10 @@ async def get_device_monitoring(
                 item.metadata["active_alerts"] = len(alerts)
         
         # Log access
-        await log_learning_activity(
+        log_learning_activity(
             current_user.id,
             "view_device_monitoring",
-            {"item_id": item_id},
-            background_tasks
+            {"item_id": item_id}
         )
         
         return item
@@ -346,12 +411,12 @@ async def get_device_monitoring(
     description="Interact with AI tutor for this device_monitoring"
 )
 async def ai_tutor_interaction(
+    http_request: Request,
     item_id: str = Path(...),
     message: str = Field(..., min_length=1, max_length=2000),
     interaction_type: str = Field(default="question"),
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    db: Session = Depends(get_db)
 ):
     """Handle AI tutor interaction with anti-cheat monitoring"""
     try:
@@ -364,7 +429,11 @@ async def ai_tutor_interaction(
         is_suspicious = await anti_cheat_service.analyze_interaction(
             user_id=current_user.id,
             message=message,
-            context={"item_id": item_id, "type": interaction_type}
+            context={
+                "item_id": item_id,
+                "type": interaction_type,
+                "client_ip": http_request.client.host if http_request.client else None
+            }
         )
         
         if is_suspicious:
@@ -385,7 +454,7 @@ async def ai_tutor_interaction(
         )
         
         # Log interaction
-        await log_learning_activity(
+        log_learning_activity(
             current_user.id,
             "ai_interaction",
             {
@@ -393,8 +462,7 @@ async def ai_tutor_interaction(
                 "interaction_type": interaction_type,
                 "message_length": len(message),
                 "response_type": response.get("type", "unknown")
-            },
-            background_tasks
+            }
         )
         
         return response
@@ -447,8 +515,7 @@ async def parent_intervention(
     action: str = Field(..., regex="^(pause|resume|block|allow|redirect)$"),
     message: Optional[str] = Field(None, max_length=500),
     current_user = Depends(get_current_parent),
-    db: Session = Depends(get_db),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    db: Session = Depends(get_db)
 ):
     """Handle parent intervention in learning session"""
     try:
@@ -465,16 +532,18 @@ async def parent_intervention(
             parent_id=current_user.id
         )
         
+        # Blocking or allowing changes who may access the device_monitoring
+        get_authz_cache().invalidate(RESOURCE, authz_resource(item_id))
+        
         # Log intervention
-        await log_learning_activity(
+        log_learning_activity(
             current_user.id,
             "parent_intervention",
             {
                 "item_id": item_id,
                 "action": action,
                 "has_message": bool(message)
-            },
-            background_tasks
+            }
         )
         
         return {"success": True, "action": action, "result": result}
@@ -482,3 +551,41 @@ async def parent_intervention(
     except Exception as e:
         logger.error(f"Error in parent intervention: {str(e)}")
         raise HTTPException(status_code=500, detail="Error executing intervention")
+
+# Device telemetry ingestion
+@router.post(
+    "/{item_id}/input-events",
+    summary="Ingest Input Events",
+    description="Ingest a batch of keystroke timing events and compute typing cadence features"
+)
+async def ingest_input_events(
+    batch: InputEventBatch,
+    item_id: str = Path(...),
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Compute cadence features for the anti-cheat detectors"""
+    try:
+        # Verify access
+        if not await verify_family_access(item_id, current_user, db):
+            raise HTTPException(status_code=403, detail="Access forbidden")
+        
+        features = get_input_cadence_analyzer().ingest_batch(
+            current_user.id,
+            batch.timestamps,
+            batch.kinds,
+            batch.chars
+        )
+        
+        return {
+            "accepted": len(batch.timestamps),
+            "features": features
+        }
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error ingesting input events: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error ingesting input events")
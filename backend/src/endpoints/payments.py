@@ -1,12 +1,22 @@
 
-from fastapi import APIRouter, HTTPException, Depends, Query, Path, status
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Path, Request, Response, status
+from fastapi.responses import StreamingResponse
 from typing import List, Optional, Dict, Any, Union
 from pydantic import BaseModel, Field, validator
-from datetime import datetime, timedelta
+from datetime import datetime
 from enum import Enum
 import logging
 import asyncio
-from functools import wraps
+
+from utils.bulk_ingest import IngestResponse, ingest_ndjson
+from utils.export import ExportFormat, export_response
+from utils.fast_json import FastJSONResponse
+from utils.conditional import (
+    expected_versions, item_etag, not_modified, not_modified_response, precondition_failed
+)
+from utils.rate_limiter import rate_limit
+from utils.pagination import CountMode, PaginationMode
+from utils.repository import AsyncRepository, InvalidQueryError, VersionConflictError, get_repository
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -62,6 +72,12 @@ class PaymentsCreate(PaymentsBase):
     """Model for creating payments"""
     created_by: Optional[str] = Field(None, description="ID of the user creating this payments")
     
+    @validator('status')
+    def validate_status(cls, v):
+        if v == PaymentsStatus.DELETED:
+            raise ValueError('Payments cannot be created as deleted')
+        return v
+    
     class Config:
         schema_extra = {
             "example": {
@@ -90,6 +106,12 @@ class PaymentsUpdate(BaseModel):
         if v is not None and not v.strip():
             raise ValueError('Name cannot be empty or only whitespace')
         return v.strip() if v else v
+    
+    @validator('status')
+    def validate_status(cls, v):
+        if v == PaymentsStatus.DELETED:
+            raise ValueError('Use DELETE to delete payments')
+        return v
 
 class PaymentsInDB(PaymentsBase):
     """Model for payments in database"""
@@ -124,12 +146,14 @@ class PaymentsResponse(PaymentsInDB):
 class PaymentsList(BaseModel):
     """Model for paginated payments list response"""
     items: List[PaymentsResponse]
-    total: int
-    page: int
+    total: Optional[int] = Field(None, description="Matching items; omitted when count=none")
+    total_is_estimate: bool = Field(default=False, description="Total is a lower bound (count=approximate)")
+    page: Optional[int] = Field(None, description="Page number; omitted in cursor mode")
     per_page: int
-    pages: int
+    pages: Optional[int] = None
     has_next: bool
     has_prev: bool
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to fetch the next page")
 
 class PaymentsStats(BaseModel):
     """Model for payments statistics"""
@@ -150,25 +174,25 @@ async def get_current_user():
     # TODO: Implement actual authentication logic
     return "user123"
 
-def validate_pagination(page: int = Query(1, ge=1), per_page: int = Query(20, ge=1, le=100)):
-    """Validate pagination parameters"""
-    return {"page": page, "per_page": per_page}
+def get_payments_repository() -> AsyncRepository:
+    """Dependency to get the payments repository"""
+    return get_repository("payments")
 
-# Rate limiting decorator
-def rate_limit(max_calls: int, time_window: int):
-    """Rate limiting decorator"""
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            # TODO: Implement rate limiting logic
-            return await func(*args, **kwargs)
-        return wrapper
-    return decorator
+def validate_pagination(
+    page: int = Query(1, ge=1),
+    per_page: int = Query(20, ge=1, le=100),
+    mode: PaginationMode = Query(PaginationMode.OFFSET, description="offset (page numbers) or cursor (keyset)"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; implies cursor mode"),
+    count: CountMode = Query(CountMode.EXACT, description="Total count: exact, approximate or none")
+):
+    """Validate pagination parameters"""
+    return {"page": page, "per_page": per_page, "mode": mode, "cursor": cursor, "count": count}
 
 # Main CRUD endpoints
 @router.get(
     "/",
     response_model=PaymentsList,
+    response_class=FastJSONResponse,
     summary="Get all paymentss",
     description="Retrieve a paginated list of all paymentss with optional filtering"
 )
@@ -183,7 +207,11 @@ async def get_paymentss(
     created_before: Optional[datetime] = Query(None, description="Filter items created before this date"),
     sort_by: Optional[str] = Query("created_at", description="Field to sort by"),
     sort_order: Optional[str] = Query("desc", regex="^(asc|desc)$", description="Sort order"),
-    current_user: str = Depends(get_current_user)
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return; course.name style names pick fields of expanded relations"),
+    expand: Optional[str] = Query(None, description="Comma-separated relations to embed in each item"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_payments_repository)
 ):
     """Get all paymentss with advanced filtering and pagination"""
     try:
@@ -204,79 +232,143 @@ async def get_paymentss(
         if created_before:
             filters["created_before"] = created_before
         
-        # TODO: Implement actual database query with filters
-        # Mock response for now
-        mock_items = [
-            PaymentsResponse(
-                id=i,
-                name=f"Sample Payments {i}",
-                description=f"Description for payments {i}",
-                status=PaymentsStatus.ACTIVE,
-                type=PaymentsType.STANDARD,
-                tags=["sample", f"tag{i}"],
-                metadata={"index": i},
-                created_at=datetime.utcnow() - timedelta(days=i),
-                created_by=current_user,
-                version=1
-            )
-            for i in range(1, min(pagination["per_page"] + 1, 11))
-        ]
-        
-        total = 100  # Mock total count
-        pages = (total + pagination["per_page"] - 1) // pagination["per_page"]
-        
-        response = PaymentsList(
-            items=mock_items,
-            total=total,
-            page=pagination["page"],
-            per_page=pagination["per_page"],
-            pages=pages,
-            has_next=pagination["page"] < pages,
-            has_prev=pagination["page"] > 1
+        # Only the requested fields are selected; relations load in one query each
+        projection = repository.projection(fields, expand)
+        result = await repository.paginate(
+            filters, pagination, sort_by=sort_by, sort_order=sort_order, projection=projection
         )
         
-        logger.info(f"Successfully fetched {len(mock_items)} paymentss")
-        return response
+        # Unchanged page: skip building and serializing the items
+        etag = projection.etag(result.items, result.meta())
+        if not_modified(if_none_match, etag):
+            return not_modified_response(etag)
         
+        # Repository rows were validated on write; serialize them as they are
+        items = projection.dump(PaymentsResponse, result.items)
+        
+        logger.info(f"Successfully fetched {len(items)} paymentss")
+        return FastJSONResponse({"items": items, **result.meta()}, headers={"ETag": etag})
+        
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching paymentss: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error fetching paymentss: {str(e)}")
 
+# Registered before /{item_id} so "stats" is not parsed as an id
+@router.get(
+    "/stats",
+    response_model=PaymentsStats,
+    summary="Get payments statistics",
+    description="Get comprehensive statistics about paymentss"
+)
+async def get_payments_stats(
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_payments_repository)
+):
+    """Get payments statistics"""
+    try:
+        logger.info(f"Fetching payments statistics for user {current_user}")
+        
+        stats = PaymentsStats(**await repository.stats())
+        
+        logger.info(f"Successfully calculated payments statistics")
+        return stats
+        
+    except Exception as e:
+        logger.error(f"Error calculating payments statistics: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error calculating statistics: {str(e)}")
+
+# Registered before /{item_id} so "export" is not parsed as an id
+@router.get(
+    "/export",
+    summary="Export paymentss",
+    description="Stream every payments matching the filters as CSV or NDJSON, optionally as a gzip file",
+    response_class=StreamingResponse
+)
+@rate_limit(max_calls=10, time_window=60)
+async def export_paymentss(
+    format: ExportFormat = Query(ExportFormat.CSV, description="csv or ndjson"),
+    gzip: bool = Query(False, description="Send the export as a .gz file"),
+    status: Optional[PaymentsStatus] = Query(None, description="Filter by status"),
+    type: Optional[PaymentsType] = Query(None, description="Filter by type"),
+    search: Optional[str] = Query(None, min_length=1, description="Search in name and description"),
+    tags: Optional[str] = Query(None, description="Comma-separated list of tags to filter by"),
+    created_after: Optional[datetime] = Query(None, description="Filter items created after this date"),
+    created_before: Optional[datetime] = Query(None, description="Filter items created before this date"),
+    sort_by: Optional[str] = Query("id", description="Field to sort by"),
+    sort_order: Optional[str] = Query("asc", regex="^(asc|desc)$", description="Sort order"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to export; course.name style names pick fields of expanded relations"),
+    expand: Optional[str] = Query(None, description="Comma-separated relations to embed in each item"),
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_payments_repository)
+):
+    """Export paymentss"""
+    try:
+        logger.info(f"Exporting paymentss as {format.value} for user {current_user}")
+
+        filters = {}
+        if status:
+            filters["status"] = status
+        if type:
+            filters["type"] = type
+        if search:
+            filters["search"] = search
+        if tags:
+            filters["tags"] = tags.split(",")
+        if created_after:
+            filters["created_after"] = created_after
+        if created_before:
+            filters["created_before"] = created_before
+
+        # Rows come off a server-side cursor one batch at a time and are encoded as they arrive
+        projection = repository.projection(fields, expand)
+        batches = (
+            projection.dump(PaymentsResponse, rows)
+            async for rows in repository.stream(filters, sort_by=sort_by, sort_order=sort_order, projection=projection)
+        )
+        return await export_response(batches, repository.field_names(projection), format, "payments", gzip=gzip)
+
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error exporting paymentss: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error exporting paymentss: {str(e)}")
+
 @router.get(
     "/{item_id}",
     response_model=PaymentsResponse,
+    response_class=FastJSONResponse,
     summary="Get payments by ID",
     description="Retrieve a specific payments by its ID"
 )
 async def get_payments(
     item_id: int = Path(..., gt=0, description="The ID of the payments to retrieve"),
-    current_user: str = Depends(get_current_user)
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return; course.name style names pick fields of expanded relations"),
+    expand: Optional[str] = Query(None, description="Comma-separated relations to embed"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_payments_repository)
 ):
     """Get payments by ID"""
     try:
         logger.info(f"Fetching payments {item_id} for user {current_user}")
         
-        # TODO: Implement actual database query
-        # Mock response for now
-        if item_id > 1000:
+        projection = repository.projection(fields, expand)
+        row = await repository.get(item_id, projection)
+        if row is None:
             raise HTTPException(status_code=404, detail=f"Payments not found")
         
-        response = PaymentsResponse(
-            id=item_id,
-            name=f"Sample Payments {item_id}",
-            description=f"Description for payments {item_id}",
-            status=PaymentsStatus.ACTIVE,
-            type=PaymentsType.STANDARD,
-            tags=["sample"],
-            metadata={"id": item_id},
-            created_at=datetime.utcnow() - timedelta(days=1),
-            created_by=current_user,
-            version=1
-        )
+        # Partial or expanded representations get a weak ETag of their own
+        etag = item_etag(row["id"], row["version"]) if projection.is_full else projection.etag([row])
+        if not_modified(if_none_match, etag):
+            return not_modified_response(etag)
         
         logger.info(f"Successfully fetched payments {item_id}")
-        return response
+        return FastJSONResponse(projection.dump(PaymentsResponse, [row])[0], headers={"ETag": etag})
         
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -292,25 +384,19 @@ async def get_payments(
 )
 async def create_payments(
     request: PaymentsCreate,
-    current_user: str = Depends(get_current_user)
+    http_response: Response = None,
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_payments_repository)
 ):
     """Create new payments"""
     try:
         logger.info(f"Creating new payments for user {current_user}: {request.name}")
         
-        # TODO: Implement actual database creation
-        # Mock response for now
-        new_id = 12345  # Mock generated ID
-        
-        response = PaymentsResponse(
-            id=new_id,
-            **request.dict(),
-            created_at=datetime.utcnow(),
-            created_by=current_user,
-            version=1
-        )
+        row = await repository.create(request.dict(exclude={"created_by"}), current_user)
+        http_response.headers["ETag"] = item_etag(row["id"], row["version"])
+        response = PaymentsResponse(**row)
         
-        logger.info(f"Successfully created payments {new_id}")
+        logger.info(f"Successfully created payments {response.id}")
         return response
         
     except Exception as e:
@@ -326,36 +412,32 @@ async def create_payments(
 async def update_payments(
     item_id: int = Path(..., gt=0, description="The ID of the payments to update"),
     request: PaymentsUpdate = ...,
-    current_user: str = Depends(get_current_user)
+    if_match: Optional[str] = Header(None),
+    http_response: Response = None,
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_payments_repository)
 ):
     """Update payments by ID"""
     try:
         logger.info(f"Updating payments {item_id} for user {current_user}")
         
-        # TODO: Implement actual database update
-        # Check if item exists first
-        if item_id > 1000:
+        row = await repository.update(
+            item_id,
+            request.dict(exclude={"updated_by"}, exclude_none=True),
+            current_user,
+            expected_versions=expected_versions(if_match, item_id)
+        )
+        if row is None:
             raise HTTPException(status_code=404, detail=f"Payments not found")
         
-        # Mock response for now
-        response = PaymentsResponse(
-            id=item_id,
-            name=request.name or f"Updated Payments {item_id}",
-            description=request.description or f"Updated description for payments {item_id}",
-            status=request.status or PaymentsStatus.ACTIVE,
-            type=request.type or PaymentsType.STANDARD,
-            tags=request.tags or ["updated"],
-            metadata=request.metadata or {"updated": True},
-            created_at=datetime.utcnow() - timedelta(days=1),
-            updated_at=datetime.utcnow(),
-            created_by="original_user",
-            updated_by=current_user,
-            version=2
-        )
+        http_response.headers["ETag"] = item_etag(row["id"], row["version"])
+        response = PaymentsResponse(**row)
         
         logger.info(f"Successfully updated payments {item_id}")
         return response
         
+    except VersionConflictError as e:
+        raise precondition_failed(item_etag(item_id, e.version))
     except HTTPException:
         raise
     except Exception as e:
@@ -371,37 +453,32 @@ async def update_payments(
 async def patch_payments(
     item_id: int = Path(..., gt=0, description="The ID of the payments to patch"),
     request: PaymentsUpdate = ...,
-    current_user: str = Depends(get_current_user)
+    if_match: Optional[str] = Header(None),
+    http_response: Response = None,
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_payments_repository)
 ):
     """Partially update payments by ID"""
     try:
         logger.info(f"Patching payments {item_id} for user {current_user}")
         
-        # TODO: Implement actual database patch
-        if item_id > 1000:
-            raise HTTPException(status_code=404, detail=f"Payments not found")
+        # Only the fields sent in the request are changed
+        updated_fields = request.dict(exclude={"updated_by"}, exclude_unset=True)
         
-        # Mock response - only update provided fields
-        updated_fields = {k: v for k, v in request.dict().items() if v is not None}
-        
-        response = PaymentsResponse(
-            id=item_id,
-            name=f"Patched Payments {item_id}",
-            description=f"Patched description for payments {item_id}",
-            status=PaymentsStatus.ACTIVE,
-            type=PaymentsType.STANDARD,
-            tags=["patched"],
-            metadata={"patched_fields": list(updated_fields.keys())},
-            created_at=datetime.utcnow() - timedelta(days=1),
-            updated_at=datetime.utcnow(),
-            created_by="original_user",
-            updated_by=current_user,
-            version=3
+        row = await repository.update(
+            item_id, updated_fields, current_user, expected_versions=expected_versions(if_match, item_id)
         )
+        if row is None:
+            raise HTTPException(status_code=404, detail=f"Payments not found")
+        
+        http_response.headers["ETag"] = item_etag(row["id"], row["version"])
+        response = PaymentsResponse(**row)
         
         logger.info(f"Successfully patched payments {item_id} with fields: {list(updated_fields.keys())}")
         return response
         
+    except VersionConflictError as e:
+        raise precondition_failed(item_etag(item_id, e.version))
     except HTTPException:
         raise
     except Exception as e:
@@ -417,16 +494,14 @@ async def patch_payments(
 async def delete_payments(
     item_id: int = Path(..., gt=0, description="The ID of the payments to delete"),
     force: bool = Query(False, description="Force delete without moving to trash"),
-    current_user: str = Depends(get_current_user)
+    if_match: Optional[str] = Header(None),
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_payments_repository)
 ):
     """Delete payments by ID"""
     try:
         logger.info(f"Deleting payments {item_id} for user {current_user} (force={force})")
         
-        # TODO: Implement actual database deletion
-        if item_id > 1000:
-            raise HTTPException(status_code=404, detail=f"Payments not found")
-        
         if force:
             # Hard delete
             logger.info(f"Force deleting payments {item_id}")
@@ -434,8 +509,16 @@ async def delete_payments(
             # Soft delete (mark as deleted)
             logger.info(f"Soft deleting payments {item_id}")
         
+        deleted = await repository.delete(
+            item_id, hard=force, user=current_user, expected_versions=expected_versions(if_match, item_id)
+        )
+        if not deleted:
+            raise HTTPException(status_code=404, detail=f"Payments not found")
+        
         logger.info(f"Successfully deleted payments {item_id}")
         
+    except VersionConflictError as e:
+        raise precondition_failed(item_etag(item_id, e.version))
     except HTTPException:
         raise
     except Exception as e:
@@ -443,45 +526,6 @@ async def delete_payments(
         raise HTTPException(status_code=500, detail=f"Error deleting payments: {str(e)}")
 
 # Additional utility endpoints
-@router.get(
-    "/stats",
-    response_model=PaymentsStats,
-    summary="Get payments statistics",
-    description="Get comprehensive statistics about paymentss"
-)
-async def get_payments_stats(
-    current_user: str = Depends(get_current_user)
-):
-    """Get payments statistics"""
-    try:
-        logger.info(f"Fetching payments statistics for user {current_user}")
-        
-        # TODO: Implement actual statistics calculation
-        stats = PaymentsStats(
-            total_count=1250,
-            active_count=1000,
-            inactive_count=150,
-            pending_count=75,
-            archived_count=20,
-            deleted_count=5,
-            by_type={
-                "standard": 800,
-                "premium": 300,
-                "enterprise": 100,
-                "custom": 50
-            },
-            created_today=15,
-            created_this_week=105,
-            created_this_month=420
-        )
-        
-        logger.info(f"Successfully calculated payments statistics")
-        return stats
-        
-    except Exception as e:
-        logger.error(f"Error calculating payments statistics: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error calculating statistics: {str(e)}")
-
 @router.post(
     "/bulk",
     response_model=List[PaymentsResponse],
@@ -490,7 +534,8 @@ async def get_payments_stats(
 )
 async def bulk_create_paymentss(
     requests: List[PaymentsCreate],
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_payments_repository)
 ):
     """Bulk create paymentss"""
     try:
@@ -499,17 +544,11 @@ async def bulk_create_paymentss(
         if len(requests) > 100:
             raise HTTPException(status_code=400, detail="Maximum 100 items allowed per bulk operation")
         
-        # TODO: Implement actual bulk database creation
-        responses = []
-        for i, request in enumerate(requests):
-            response = PaymentsResponse(
-                id=10000 + i,
-                **request.dict(),
-                created_at=datetime.utcnow(),
-                created_by=current_user,
-                version=1
-            )
-            responses.append(response)
+        rows = await repository.bulk_create(
+            [request.dict(exclude={"created_by"}) for request in requests],
+            current_user
+        )
+        responses = [PaymentsResponse(**row) for row in rows]
         
         logger.info(f"Successfully bulk created {len(responses)} paymentss")
         return responses
@@ -520,52 +559,60 @@ async def bulk_create_paymentss(
         logger.error(f"Error bulk creating paymentss: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error bulk creating paymentss: {str(e)}")
 
+@router.post(
+    "/bulk/stream",
+    summary="Stream bulk create paymentss",
+    description="Create any number of paymentss from an NDJSON body (one payments per line); "
+                "results stream back as NDJSON, one line per input line plus a summary",
+    response_class=IngestResponse
+)
+async def stream_bulk_create_paymentss(
+    request: Request,
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_payments_repository)
+):
+    """Stream bulk create paymentss"""
+    logger.info(f"Streaming bulk create of paymentss for user {current_user}")
+    return IngestResponse(
+        ingest_ndjson(request.stream(), PaymentsCreate, repository, current_user, exclude={"created_by"})
+    )
+
 @router.post(
     "/search",
     response_model=PaymentsList,
+    response_class=FastJSONResponse,
     summary="Advanced search paymentss",
     description="Perform advanced search across paymentss with complex criteria"
 )
 async def search_paymentss(
     search_query: Dict[str, Any],
     pagination: dict = Depends(validate_pagination),
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_payments_repository)
 ):
     """Advanced search for paymentss"""
     try:
         logger.info(f"Advanced search for paymentss by user {current_user}: {search_query}")
         
-        # TODO: Implement actual advanced search logic
-        # Mock response for now
-        mock_items = [
-            PaymentsResponse(
-                id=i,
-                name=f"Search Result Payments {i}",
-                description=f"Matched search criteria: {search_query}",
-                status=PaymentsStatus.ACTIVE,
-                type=PaymentsType.STANDARD,
-                tags=["search", "result"],
-                metadata={"search_score": 0.95 - (i * 0.1)},
-                created_at=datetime.utcnow() - timedelta(days=i),
-                created_by=current_user,
-                version=1
-            )
-            for i in range(1, 6)
-        ]
-        
-        response = PaymentsList(
-            items=mock_items,
-            total=5,
-            page=pagination["page"],
-            per_page=pagination["per_page"],
-            pages=1,
-            has_next=False,
-            has_prev=False
+        # Criteria use the same names as the list endpoint's query parameters
+        filters = dict(search_query)
+        # Full-text matches come back best first unless another order is asked for
+        sort_by = filters.pop("sort_by", "relevance" if filters.get("search") else "created_at")
+        sort_order = filters.pop("sort_order", "desc")
+        projection = repository.projection(filters.pop("fields", None), filters.pop("expand", None))
+        if isinstance(filters.get("tags"), str):
+            filters["tags"] = filters["tags"].split(",")
+        
+        result = await repository.paginate(
+            filters, pagination, sort_by=sort_by, sort_order=sort_order, projection=projection
         )
+        items = projection.dump(PaymentsResponse, result.items)
         
-        logger.info(f"Advanced search returned {len(mock_items)} results")
-        return response
+        logger.info(f"Advanced search returned {len(items)} results")
+        return FastJSONResponse({"items": items, **result.meta()})
         
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error in advanced search: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error in search: {str(e)}")
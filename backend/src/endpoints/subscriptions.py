@@ -1,12 +1,22 @@
 
-from fastapi import APIRouter, HTTPException, Depends, Query, Path, status
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Path, Request, Response, status
+from fastapi.responses import StreamingResponse
 from typing import List, Optional, Dict, Any, Union
 from pydantic import BaseModel, Field, validator
-from datetime import datetime, timedelta
+from datetime import datetime
 from enum import Enum
 import logging
 import asyncio
-from functools import wraps
+
+from utils.bulk_ingest import IngestResponse, ingest_ndjson
+from utils.export import ExportFormat, export_response
+from utils.fast_json import FastJSONResponse
+from utils.conditional import (
+    expected_versions, item_etag, not_modified, not_modified_response, precondition_failed
+)
+from utils.rate_limiter import rate_limit
+from utils.pagination import CountMode, PaginationMode
+from utils.repository import AsyncRepository, InvalidQueryError, VersionConflictError, get_repository
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -62,6 +72,12 @@ class SubscriptionsCreate(SubscriptionsBase):
     """Model for creating subscriptions"""
     created_by: Optional[str] = Field(None, description="ID of the user creating this subscriptions")
     
+    @validator('status')
+    def validate_status(cls, v):
+        if v == SubscriptionsStatus.DELETED:
+            raise ValueError('Subscriptions cannot be created as deleted')
+        return v
+    
     class Config:
         schema_extra = {
             "example": {
@@ -90,6 +106,12 @@ class SubscriptionsUpdate(BaseModel):
         if v is not None and not v.strip():
             raise ValueError('Name cannot be empty or only whitespace')
         return v.strip() if v else v
+    
+    @validator('status')
+    def validate_status(cls, v):
+        if v == SubscriptionsStatus.DELETED:
+            raise ValueError('Use DELETE to delete subscriptions')
+        return v
 
 class SubscriptionsInDB(SubscriptionsBase):
     """Model for subscriptions in database"""
@@ -124,12 +146,14 @@ class SubscriptionsResponse(SubscriptionsInDB):
 class SubscriptionsList(BaseModel):
     """Model for paginated subscriptions list response"""
     items: List[SubscriptionsResponse]
-    total: int
-    page: int
+    total: Optional[int] = Field(None, description="Matching items; omitted when count=none")
+    total_is_estimate: bool = Field(default=False, description="Total is a lower bound (count=approximate)")
+    page: Optional[int] = Field(None, description="Page number; omitted in cursor mode")
     per_page: int
-    pages: int
+    pages: Optional[int] = None
     has_next: bool
     has_prev: bool
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to fetch the next page")
 
 class SubscriptionsStats(BaseModel):
     """Model for subscriptions statistics"""
@@ -150,25 +174,25 @@ async def get_current_user():
     # TODO: Implement actual authentication logic
     return "user123"
 
-def validate_pagination(page: int = Query(1, ge=1), per_page: int = Query(20, ge=1, le=100)):
-    """Validate pagination parameters"""
-    return {"page": page, "per_page": per_page}
+def get_subscriptions_repository() -> AsyncRepository:
+    """Dependency to get the subscriptions repository"""
+    return get_repository("subscriptions")
 
-# Rate limiting decorator
-def rate_limit(max_calls: int, time_window: int):
-    """Rate limiting decorator"""
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            # TODO: Implement rate limiting logic
-            return await func(*args, **kwargs)
-        return wrapper
-    return decorator
+def validate_pagination(
+    page: int = Query(1, ge=1),
+    per_page: int = Query(20, ge=1, le=100),
+    mode: PaginationMode = Query(PaginationMode.OFFSET, description="offset (page numbers) or cursor (keyset)"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; implies cursor mode"),
+    count: CountMode = Query(CountMode.EXACT, description="Total count: exact, approximate or none")
+):
+    """Validate pagination parameters"""
+    return {"page": page, "per_page": per_page, "mode": mode, "cursor": cursor, "count": count}
 
 # Main CRUD endpoints
 @router.get(
     "/",
     response_model=SubscriptionsList,
+    response_class=FastJSONResponse,
     summary="Get all subscriptionss",
     description="Retrieve a paginated list of all subscriptionss with optional filtering"
 )
@@ -183,7 +207,11 @@ async def get_subscriptionss(
     created_before: Optional[datetime] = Query(None, description="Filter items created before this date"),
     sort_by: Optional[str] = Query("created_at", description="Field to sort by"),
     sort_order: Optional[str] = Query("desc", regex="^(asc|desc)$", description="Sort order"),
-    current_user: str = Depends(get_current_user)
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return; course.name style names pick fields of expanded relations"),
+    expand: Optional[str] = Query(None, description="Comma-separated relations to embed in each item"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_subscriptions_repository)
 ):
     """Get all subscriptionss with advanced filtering and pagination"""
     try:
@@ -204,79 +232,143 @@ async def get_subscriptionss(
         if created_before:
             filters["created_before"] = created_before
         
-        # TODO: Implement actual database query with filters
-        # Mock response for now
-        mock_items = [
-            SubscriptionsResponse(
-                id=i,
-                name=f"Sample Subscriptions {i}",
-                description=f"Description for subscriptions {i}",
-                status=SubscriptionsStatus.ACTIVE,
-                type=SubscriptionsType.STANDARD,
-                tags=["sample", f"tag{i}"],
-                metadata={"index": i},
-                created_at=datetime.utcnow() - timedelta(days=i),
-                created_by=current_user,
-                version=1
-            )
-            for i in range(1, min(pagination["per_page"] + 1, 11))
-        ]
-        
-        total = 100  # Mock total count
-        pages = (total + pagination["per_page"] - 1) // pagination["per_page"]
-        
-        response = SubscriptionsList(
-            items=mock_items,
-            total=total,
-            page=pagination["page"],
-            per_page=pagination["per_page"],
-            pages=pages,
-            has_next=pagination["page"] < pages,
-            has_prev=pagination["page"] > 1
+        # Only the requested fields are selected; relations load in one query each
+        projection = repository.projection(fields, expand)
+        result = await repository.paginate(
+            filters, pagination, sort_by=sort_by, sort_order=sort_order, projection=projection
         )
         
-        logger.info(f"Successfully fetched {len(mock_items)} subscriptionss")
-        return response
+        # Unchanged page: skip building and serializing the items
+        etag = projection.etag(result.items, result.meta())
+        if not_modified(if_none_match, etag):
+            return not_modified_response(etag)
         
+        # Repository rows were validated on write; serialize them as they are
+        items = projection.dump(SubscriptionsResponse, result.items)
+        
+        logger.info(f"Successfully fetched {len(items)} subscriptionss")
+        return FastJSONResponse({"items": items, **result.meta()}, headers={"ETag": etag})
+        
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching subscriptionss: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error fetching subscriptionss: {str(e)}")
 
+# Registered before /{item_id} so "stats" is not parsed as an id
+@router.get(
+    "/stats",
+    response_model=SubscriptionsStats,
+    summary="Get subscriptions statistics",
+    description="Get comprehensive statistics about subscriptionss"
+)
+async def get_subscriptions_stats(
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_subscriptions_repository)
+):
+    """Get subscriptions statistics"""
+    try:
+        logger.info(f"Fetching subscriptions statistics for user {current_user}")
+        
+        stats = SubscriptionsStats(**await repository.stats())
+        
+        logger.info(f"Successfully calculated subscriptions statistics")
+        return stats
+        
+    except Exception as e:
+        logger.error(f"Error calculating subscriptions statistics: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error calculating statistics: {str(e)}")
+
+# Registered before /{item_id} so "export" is not parsed as an id
+@router.get(
+    "/export",
+    summary="Export subscriptionss",
+    description="Stream every subscriptions matching the filters as CSV or NDJSON, optionally as a gzip file",
+    response_class=StreamingResponse
+)
+@rate_limit(max_calls=10, time_window=60)
+async def export_subscriptionss(
+    format: ExportFormat = Query(ExportFormat.CSV, description="csv or ndjson"),
+    gzip: bool = Query(False, description="Send the export as a .gz file"),
+    status: Optional[SubscriptionsStatus] = Query(None, description="Filter by status"),
+    type: Optional[SubscriptionsType] = Query(None, description="Filter by type"),
+    search: Optional[str] = Query(None, min_length=1, description="Search in name and description"),
+    tags: Optional[str] = Query(None, description="Comma-separated list of tags to filter by"),
+    created_after: Optional[datetime] = Query(None, description="Filter items created after this date"),
+    created_before: Optional[datetime] = Query(None, description="Filter items created before this date"),
+    sort_by: Optional[str] = Query("id", description="Field to sort by"),
+    sort_order: Optional[str] = Query("asc", regex="^(asc|desc)$", description="Sort order"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to export; course.name style names pick fields of expanded relations"),
+    expand: Optional[str] = Query(None, description="Comma-separated relations to embed in each item"),
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_subscriptions_repository)
+):
+    """Export subscriptionss"""
+    try:
+        logger.info(f"Exporting subscriptionss as {format.value} for user {current_user}")
+
+        filters = {}
+        if status:
+            filters["status"] = status
+        if type:
+            filters["type"] = type
+        if search:
+            filters["search"] = search
+        if tags:
+            filters["tags"] = tags.split(",")
+        if created_after:
+            filters["created_after"] = created_after
+        if created_before:
+            filters["created_before"] = created_before
+
+        # Rows come off a server-side cursor one batch at a time and are encoded as they arrive
+        projection = repository.projection(fields, expand)
+        batches = (
+            projection.dump(SubscriptionsResponse, rows)
+            async for rows in repository.stream(filters, sort_by=sort_by, sort_order=sort_order, projection=projection)
+        )
+        return await export_response(batches, repository.field_names(projection), format, "subscriptions", gzip=gzip)
+
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error exporting subscriptionss: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error exporting subscriptionss: {str(e)}")
+
 @router.get(
     "/{item_id}",
     response_model=SubscriptionsResponse,
+    response_class=FastJSONResponse,
     summary="Get subscriptions by ID",
     description="Retrieve a specific subscriptions by its ID"
 )
 async def get_subscriptions(
     item_id: int = Path(..., gt=0, description="The ID of the subscriptions to retrieve"),
-    current_user: str = Depends(get_current_user)
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return; course.name style names pick fields of expanded relations"),
+    expand: Optional[str] = Query(None, description="Comma-separated relations to embed"),
+    if_none_match: Optional[str] = Header(None),
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_subscriptions_repository)
 ):
     """Get subscriptions by ID"""
     try:
         logger.info(f"Fetching subscriptions {item_id} for user {current_user}")
         
-        # TODO: Implement actual database query
-        # Mock response for now
-        if item_id > 1000:
+        projection = repository.projection(fields, expand)
+        row = await repository.get(item_id, projection)
+        if row is None:
             raise HTTPException(status_code=404, detail=f"Subscriptions not found")
         
-        response = SubscriptionsResponse(
-            id=item_id,
-            name=f"Sample Subscriptions {item_id}",
-            description=f"Description for subscriptions {item_id}",
-            status=SubscriptionsStatus.ACTIVE,
-            type=SubscriptionsType.STANDARD,
-            tags=["sample"],
-            metadata={"id": item_id},
-            created_at=datetime.utcnow() - timedelta(days=1),
-            created_by=current_user,
-            version=1
-        )
+        # Partial or expanded representations get a weak ETag of their own
+        etag = item_etag(row["id"], row["version"]) if projection.is_full else projection.etag([row])
+        if not_modified(if_none_match, etag):
+            return not_modified_response(etag)
         
         logger.info(f"Successfully fetched subscriptions {item_id}")
-        return response
+        return FastJSONResponse(projection.dump(SubscriptionsResponse, [row])[0], headers={"ETag": etag})
         
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -292,25 +384,19 @@ async def get_subscriptions(
 )
 async def create_subscriptions(
     request: SubscriptionsCreate,
-    current_user: str = Depends(get_current_user)
+    http_response: Response = None,
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_subscriptions_repository)
 ):
     """Create new subscriptions"""
     try:
         logger.info(f"Creating new subscriptions for user {current_user}: {request.name}")
         
-        # TODO: Implement actual database creation
-        # Mock response for now
-        new_id = 12345  # Mock generated ID
-        
-        response = SubscriptionsResponse(
-            id=new_id,
-            **request.dict(),
-            created_at=datetime.utcnow(),
-            created_by=current_user,
-            version=1
-        )
+        row = await repository.create(request.dict(exclude={"created_by"}), current_user)
+        http_response.headers["ETag"] = item_etag(row["id"], row["version"])
+        response = SubscriptionsResponse(**row)
         
-        logger.info(f"Successfully created subscriptions {new_id}")
+        logger.info(f"Successfully created subscriptions {response.id}")
         return response
         
     except Exception as e:
@@ -326,36 +412,32 @@ async def create_subscriptions(
 async def update_subscriptions(
     item_id: int = Path(..., gt=0, description="The ID of the subscriptions to update"),
     request: SubscriptionsUpdate = ...,
-    current_user: str = Depends(get_current_user)
+    if_match: Optional[str] = Header(None),
+    http_response: Response = None,
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_subscriptions_repository)
 ):
     """Update subscriptions by ID"""
     try:
         logger.info(f"Updating subscriptions {item_id} for user {current_user}")
         
-        # TODO: Implement actual database update
-        # Check if item exists first
-        if item_id > 1000:
+        row = await repository.update(
+            item_id,
+            request.dict(exclude={"updated_by"}, exclude_none=True),
+            current_user,
+            expected_versions=expected_versions(if_match, item_id)
+        )
+        if row is None:
             raise HTTPException(status_code=404, detail=f"Subscriptions not found")
         
-        # Mock response for now
-        response = SubscriptionsResponse(
-            id=item_id,
-            name=request.name or f"Updated Subscriptions {item_id}",
-            description=request.description or f"Updated description for subscriptions {item_id}",
-            status=request.status or SubscriptionsStatus.ACTIVE,
-            type=request.type or SubscriptionsType.STANDARD,
-            tags=request.tags or ["updated"],
-            metadata=request.metadata or {"updated": True},
-            created_at=datetime.utcnow() - timedelta(days=1),
-            updated_at=datetime.utcnow(),
-            created_by="original_user",
-            updated_by=current_user,
-            version=2
-        )
+        http_response.headers["ETag"] = item_etag(row["id"], row["version"])
+        response = SubscriptionsResponse(**row)
         
         logger.info(f"Successfully updated subscriptions {item_id}")
         return response
         
+    except VersionConflictError as e:
+        raise precondition_failed(item_etag(item_id, e.version))
     except HTTPException:
         raise
     except Exception as e:
@@ -371,37 +453,32 @@ async def update_subscriptions(
 async def patch_subscriptions(
     item_id: int = Path(..., gt=0, description="The ID of the subscriptions to patch"),
     request: SubscriptionsUpdate = ...,
-    current_user: str = Depends(get_current_user)
+    if_match: Optional[str] = Header(None),
+    http_response: Response = None,
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_subscriptions_repository)
 ):
     """Partially update subscriptions by ID"""
     try:
         logger.info(f"Patching subscriptions {item_id} for user {current_user}")
         
-        # TODO: Implement actual database patch
-        if item_id > 1000:
-            raise HTTPException(status_code=404, detail=f"Subscriptions not found")
+        # Only the fields sent in the request are changed
+        updated_fields = request.dict(exclude={"updated_by"}, exclude_unset=True)
         
-        # Mock response - only update provided fields
-        updated_fields = {k: v for k, v in request.dict().items() if v is not None}
-        
-        response = SubscriptionsResponse(
-            id=item_id,
-            name=f"Patched Subscriptions {item_id}",
-            description=f"Patched description for subscriptions {item_id}",
-            status=SubscriptionsStatus.ACTIVE,
-            type=SubscriptionsType.STANDARD,
-            tags=["patched"],
-            metadata={"patched_fields": list(updated_fields.keys())},
-            created_at=datetime.utcnow() - timedelta(days=1),
-            updated_at=datetime.utcnow(),
-            created_by="original_user",
-            updated_by=current_user,
-            version=3
+        row = await repository.update(
+            item_id, updated_fields, current_user, expected_versions=expected_versions(if_match, item_id)
         )
+        if row is None:
+            raise HTTPException(status_code=404, detail=f"Subscriptions not found")
+        
+        http_response.headers["ETag"] = item_etag(row["id"], row["version"])
+        response = SubscriptionsResponse(**row)
         
         logger.info(f"Successfully patched subscriptions {item_id} with fields: {list(updated_fields.keys())}")
         return response
         
+    except VersionConflictError as e:
+        raise precondition_failed(item_etag(item_id, e.version))
     except HTTPException:
         raise
     except Exception as e:
@@ -417,16 +494,14 @@ async def patch_subscriptions(
 async def delete_subscriptions(
     item_id: int = Path(..., gt=0, description="The ID of the subscriptions to delete"),
     force: bool = Query(False, description="Force delete without moving to trash"),
-    current_user: str = Depends(get_current_user)
+    if_match: Optional[str] = Header(None),
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_subscriptions_repository)
 ):
     """Delete subscriptions by ID"""
     try:
         logger.info(f"Deleting subscriptions {item_id} for user {current_user} (force={force})")
         
-        # TODO: Implement actual database deletion
-        if item_id > 1000:
-            raise HTTPException(status_code=404, detail=f"Subscriptions not found")
-        
         if force:
             # Hard delete
             logger.info(f"Force deleting subscriptions {item_id}")
@@ -434,8 +509,16 @@ async def delete_subscriptions(
             # Soft delete (mark as deleted)
             logger.info(f"Soft deleting subscriptions {item_id}")
         
+        deleted = await repository.delete(
+            item_id, hard=force, user=current_user, expected_versions=expected_versions(if_match, item_id)
+        )
+        if not deleted:
+            raise HTTPException(status_code=404, detail=f"Subscriptions not found")
+        
         logger.info(f"Successfully deleted subscriptions {item_id}")
         
+    except VersionConflictError as e:
+        raise precondition_failed(item_etag(item_id, e.version))
     except HTTPException:
         raise
     except Exception as e:
@@ -443,45 +526,6 @@ async def delete_subscriptions(
         raise HTTPException(status_code=500, detail=f"Error deleting subscriptions: {str(e)}")
 
 # Additional utility endpoints
-@router.get(
-    "/stats",
-    response_model=SubscriptionsStats,
-    summary="Get subscriptions statistics",
-    description="Get comprehensive statistics about subscriptionss"
-)
-async def get_subscriptions_stats(
-    current_user: str = Depends(get_current_user)
-):
-    """Get subscriptions statistics"""
-    try:
-        logger.info(f"Fetching subscriptions statistics for user {current_user}")
-        
-        # TODO: Implement actual statistics calculation
-        stats = SubscriptionsStats(
-            total_count=1250,
-            active_count=1000,
-            inactive_count=150,
-            pending_count=75,
-            archived_count=20,
-            deleted_count=5,
-            by_type={
-                "standard": 800,
-                "premium": 300,
-                "enterprise": 100,
-                "custom": 50
-            },
-            created_today=15,
-            created_this_week=105,
-            created_this_month=420
-        )
-        
-        logger.info(f"Successfully calculated subscriptions statistics")
-        return stats
-        
-    except Exception as e:
-        logger.error(f"Error calculating subscriptions statistics: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error calculating statistics: {str(e)}")
-
 @router.post(
     "/bulk",
     response_model=List[SubscriptionsResponse],
@@ -490,7 +534,8 @@ async def get_subscriptions_stats(
 )
 async def bulk_create_subscriptionss(
     requests: List[SubscriptionsCreate],
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_subscriptions_repository)
 ):
     """Bulk create subscriptionss"""
     try:
@@ -499,17 +544,11 @@ async def bulk_create_subscriptionss(
         if len(requests) > 100:
             raise HTTPException(status_code=400, detail="Maximum 100 items allowed per bulk operation")
         
-        # TODO: Implement actual bulk database creation
-        responses = []
-        for i, request in enumerate(requests):
-            response = SubscriptionsResponse(
-                id=10000 + i,
-                **request.dict(),
-                created_at=datetime.utcnow(),
-                created_by=current_user,
-                version=1
-            )
-            responses.append(response)
+        rows = await repository.bulk_create(
+            [request.dict(exclude={"created_by"}) for request in requests],
+            current_user
+        )
+        responses = [SubscriptionsResponse(**row) for row in rows]
         
         logger.info(f"Successfully bulk created {len(responses)} subscriptionss")
         return responses
@@ -520,52 +559,60 @@ async def bulk_create_subscriptionss(
         logger.error(f"Error bulk creating subscriptionss: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error bulk creating subscriptionss: {str(e)}")
 
+@router.post(
+    "/bulk/stream",
+    summary="Stream bulk create subscriptionss",
+    description="Create any number of subscriptionss from an NDJSON body (one subscriptions per line); "
+                "results stream back as NDJSON, one line per input line plus a summary",
+    response_class=IngestResponse
+)
+async def stream_bulk_create_subscriptionss(
+    request: Request,
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_subscriptions_repository)
+):
+    """Stream bulk create subscriptionss"""
+    logger.info(f"Streaming bulk create of subscriptionss for user {current_user}")
+    return IngestResponse(
+        ingest_ndjson(request.stream(), SubscriptionsCreate, repository, current_user, exclude={"created_by"})
+    )
+
 @router.post(
     "/search",
     response_model=SubscriptionsList,
+    response_class=FastJSONResponse,
     summary="Advanced search subscriptionss",
     description="Perform advanced search across subscriptionss with complex criteria"
 )
 async def search_subscriptionss(
     search_query: Dict[str, Any],
     pagination: dict = Depends(validate_pagination),
-    current_user: str = Depends(get_current_user)
+    current_user: str = Depends(get_current_user),
+    repository: AsyncRepository = Depends(get_subscriptions_repository)
 ):
     """Advanced search for subscriptionss"""
     try:
         logger.info(f"Advanced search for subscriptionss by user {current_user}: {search_query}")
         
-        # TODO: Implement actual advanced search logic
-        # Mock response for now
-        mock_items = [
-            SubscriptionsResponse(
-                id=i,
-                name=f"Search Result Subscriptions {i}",
-                description=f"Matched search criteria: {search_query}",
-                status=SubscriptionsStatus.ACTIVE,
-                type=SubscriptionsType.STANDARD,
-                tags=["search", "result"],
-                metadata={"search_score": 0.95 - (i * 0.1)},
-                created_at=datetime.utcnow() - timedelta(days=i),
-                created_by=current_user,
-                version=1
-            )
-            for i in range(1, 6)
-        ]
-        
-        response = SubscriptionsList(
-            items=mock_items,
-            total=5,
-            page=pagination["page"],
-            per_page=pagination["per_page"],
-            pages=1,
-            has_next=False,
-            has_prev=False
+        # Criteria use the same names as the list endpoint's query parameters
+        filters = dict(search_query)
+        # Full-text matches come back best first unless another order is asked for
+        sort_by = filters.pop("sort_by", "relevance" if filters.get("search") else "created_at")
+        sort_order = filters.pop("sort_order", "desc")
+        projection = repository.projection(filters.pop("fields", None), filters.pop("expand", None))
+        if isinstance(filters.get("tags"), str):
+            filters["tags"] = filters["tags"].split(",")
+        
+        result = await repository.paginate(
+            filters, pagination, sort_by=sort_by, sort_order=sort_order, projection=projection
         )
+        items = projection.dump(SubscriptionsResponse, result.items)
         
-        logger.info(f"Advanced search returned {len(mock_items)} results")
-        return response
+        logger.info(f"Advanced search returned {len(items)} results")
+        return FastJSONResponse({"items": items, **result.meta()})
         
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error in advanced search: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error in search: {str(e)}")
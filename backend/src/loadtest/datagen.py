@@ -0,0 +1,475 @@
+# Synthetic data generator - families, users, sessions and monitoring events at volume
+#
+# Generates families with their parents and students, learning sessions, and
+# per session the AI interactions, browser and clipboard activity and
+# anti-cheat alerts, then bulk-loads them into DATABASE_URL:
+#   families, users, learning_sessions, anti_cheat   (repository resource tables)
+#   user_activity                                   (ai_interaction, browser_activity, clipboard_activity)
+# Relations use the repository convention: metadata.family_id, metadata.user_id
+# and metadata.session_id hold the related rows' ids.
+#
+# Output is a pure function of --seed and the shape options: families are
+# generated in fixed chunks, each from its own seeded generator, so the same
+# rows come out whatever --processes is. Row counts per chunk are drawn from
+# a separate stream first, which gives every chunk a fixed id range without
+# coordination. Worker processes generate and load chunks in parallel with
+# COPY on PostgreSQL and one executemany per table and chunk elsewhere.
+# Load into tables that have no rows from an earlier run with the same ids.
+#
+# Usage (from backend/src):
+#   python -m loadtest.datagen --families 10000
+#   DATABASE_URL=postgresql+asyncpg://localhost/perf python -m loadtest.datagen --families 1000000 --processes 8
+#   python -m loadtest.datagen --families 100000 --dry-run     # generation speed only
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Table, func, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from config import settings
+from database import metadata
+from monitoring.activity_logger import activity_table
+from utils.fast_json import dumps
+from utils.repository import resource_table
+
+FAMILIES, USERS, SESSIONS, ALERTS, ACTIVITY = "families", "users", "learning_sessions", "anti_cheat", "user_activity"
+
+SURNAMES = [
+    "Schmidt", "Nguyen", "Garcia", "Okafor", "Kowalski", "Rossi", "Yilmaz", "Novak", "Larsen", "Dubois",
+    "Tanaka", "Silva", "Ivanova", "Murphy", "Khan", "Müller", "Jensen", "Costa", "Horvat", "Andersson",
+]
+FIRST_NAMES = [
+    "Emma", "Noah", "Mia", "Leon", "Sofia", "Elias", "Lina", "Finn", "Amira", "Jonas",
+    "Lea", "Mateo", "Hannah", "Luca", "Zoe", "Ben", "Ida", "Paul", "Nora", "Emil",
+]
+TIMEZONES = ["Europe/Berlin", "Europe/Vienna", "Europe/Zurich", "Europe/London", "America/New_York"]
+TIMEZONE_WEIGHTS = [0.55, 0.15, 0.1, 0.1, 0.1]
+# Ordered by popularity; sessions pick subjects Zipf-like
+SUBJECTS = ["mathematics", "english", "science", "languages", "history", "programming", "geography", "art", "music"]
+# Share of session starts per local hour: school mornings, homework afternoons and evenings
+HOUR_WEIGHTS = np.array([
+    0.1, 0.05, 0.02, 0.02, 0.02, 0.1, 0.6, 1.2, 1.5, 1.6, 1.6, 1.5,
+    1.3, 1.8, 3.0, 4.2, 4.6, 4.4, 3.8, 3.9, 3.6, 2.5, 1.2, 0.4,
+])
+HOUR_WEIGHTS = HOUR_WEIGHTS / HOUR_WEIGHTS.sum()
+INTERACTION_TYPES = ["question", "follow_up", "hint_request", "verification"]
+RESPONSE_TYPES = ["socratic_question", "hint", "encouragement", "explanation"]
+DOMAINS = [
+    "mrs-unkwn.app", "wikipedia.org", "khanacademy.org", "youtube.com", "google.com",
+    "docs.google.com", "chat.openai.com", "brainly.com", "chegg.com", "photomath.com",
+]
+# Browser domain weights for honest students and for those who cheat
+DOMAIN_WEIGHTS = (
+    np.array([40, 15, 10, 12, 15, 5, 1, 1, 0.5, 0.5]),
+    np.array([25, 8, 3, 10, 12, 4, 18, 8, 6, 6]),
+)
+SOURCE_APPS = ["Mrs-Unkwn", "Google Docs", "Chrome", "Word", "ChatGPT"]
+SOURCE_APP_WEIGHTS = (np.array([50, 30, 12, 7, 1]), np.array([15, 15, 30, 10, 30]))
+ALERT_PATTERNS = [
+    "direct_copy_paste", "ai_generated_content", "external_ai_usage", "rapid_completion",
+    "unusual_vocabulary", "browser_searching", "private_browsing", "vpn_usage",
+]
+ALERT_PATTERN_WEIGHTS = np.array([25, 20, 18, 10, 8, 10, 6, 3])
+SEVERITIES = ["low", "medium", "high", "critical"]
+MAX_STUDENTS_PER_FAMILY = 6
+MAX_SESSIONS_PER_STUDENT = 500
+
+
+@dataclass(frozen=True)
+class GenerationConfig:
+    families: int
+    seed: int = 7
+    days: int = 30
+    end: datetime = datetime(2026, 1, 1)
+    chunk_size: int = 500
+    cheater_share: float = 0.05
+    sessions_per_day: float = 0.6
+
+    @property
+    def chunks(self) -> int:
+        return -(-self.families // self.chunk_size)
+
+    @property
+    def start(self) -> datetime:
+        return self.end - timedelta(days=self.days)
+
+
+@dataclass
+class ChunkPlan:
+    """Row counts of one chunk, drawn from the chunk's own count stream"""
+    families: int
+    parents: np.ndarray
+    students: np.ndarray
+    activity: np.ndarray
+    cheater: np.ndarray
+    sessions: np.ndarray
+
+    @property
+    def counts(self) -> Tuple[int, int, int]:
+        return self.families, int(self.parents.sum() + self.students.sum()), int(self.sessions.sum())
+
+
+def _rng(config: GenerationConfig, chunk: int, stream: int) -> np.random.Generator:
+    return np.random.default_rng([config.seed, chunk, stream])
+
+
+def plan_chunk(config: GenerationConfig, chunk: int) -> ChunkPlan:
+    rng = _rng(config, chunk, 0)
+    families = min(config.chunk_size, config.families - chunk * config.chunk_size)
+    parents = np.where(rng.random(families) < 0.7, 2, 1)
+    students = np.minimum(rng.geometric(0.55, families), MAX_STUDENTS_PER_FAMILY)
+    total_students = int(students.sum())
+    # Heavy-tailed engagement: most students use the app a little, a few use it a lot
+    activity = rng.lognormal(0.0, 0.9, total_students)
+    cheater = rng.random(total_students) < config.cheater_share
+    sessions = np.minimum(
+        rng.poisson(config.days * config.sessions_per_day * activity), MAX_SESSIONS_PER_STUDENT
+    )
+    return ChunkPlan(families, parents, students, activity, cheater, sessions)
+
+
+def chunk_counts(config: GenerationConfig, chunk: int) -> Tuple[int, int, int]:
+    return plan_chunk(config, chunk).counts
+
+
+def _times(base: datetime, seconds: np.ndarray) -> List[datetime]:
+    return [base + timedelta(seconds=s) for s in seconds.tolist()]
+
+
+def _json(value: Any) -> str:
+    return dumps(value).decode("utf-8")
+
+
+def generate_chunk(
+    config: GenerationConfig,
+    chunk: int,
+    first_ids: Tuple[int, int, int]
+) -> List[Tuple[str, Sequence[str], List[tuple]]]:
+    """Rows of one chunk per table; ids of families, users and sessions start at first_ids"""
+    plan = plan_chunk(config, chunk)
+    rng = _rng(config, chunk, 1)
+    first_family, first_user, first_session = first_ids
+    period_start = config.start
+
+    # Families, then their members: parents first, then students
+    family_ids = np.arange(first_family, first_family + plan.families)
+    family_created = _times(period_start, -rng.uniform(0, 730 * 86400, plan.families))
+    surnames = rng.integers(0, len(SURNAMES), plan.families)
+    timezones = rng.choice(len(TIMEZONES), plan.families, p=TIMEZONE_WEIGHTS)
+    plans = rng.choice(["standard", "premium", "enterprise"], plan.families, p=[0.6, 0.35, 0.05])
+    statuses = rng.choice(["active", "inactive", "archived"], plan.families, p=[0.92, 0.06, 0.02])
+    families = [
+        (
+            fid, f"{SURNAMES[s]} family", None, status, kind, _json([TIMEZONES[tz]]),
+            _json({"timezone": TIMEZONES[tz], "parents": int(p), "children": int(c)}),
+            created, None, "datagen", None, 1
+        )
+        for fid, s, tz, kind, status, p, c, created in zip(
+            family_ids.tolist(), surnames.tolist(), timezones.tolist(), plans.tolist(), statuses.tolist(),
+            plan.parents.tolist(), plan.students.tolist(), family_created
+        )
+    ]
+
+    users = []
+    student_ids: List[int] = []
+    student_families: List[int] = []
+    first_names = rng.integers(0, len(FIRST_NAMES), int(plan.parents.sum() + plan.students.sum())).tolist()
+    grades = rng.integers(5, 13, int(plan.students.sum())).tolist()
+    user_id = first_user
+    for f in range(plan.families):
+        fid = int(family_ids[f])
+        surname = SURNAMES[surnames[f]]
+        for role, count in (("parent", plan.parents[f]), ("student", plan.students[f])):
+            for _ in range(int(count)):
+                meta = {"family_id": fid, "role": role}
+                tags = [role]
+                if role == "student":
+                    grade = grades[len(student_ids)]
+                    meta.update(grade_level=grade, birth_year=config.end.year - grade - 6)
+                    tags.append(f"grade:{grade}")
+                    student_ids.append(user_id)
+                    student_families.append(fid)
+                users.append((
+                    user_id, f"{FIRST_NAMES[first_names[user_id - first_user]]} {surname}", None, "active", role,
+                    _json(tags), _json(meta), family_created[f] + timedelta(minutes=5), None, "datagen", None, 1
+                ))
+                user_id += 1
+
+    # Sessions: per student, start times follow the daily rhythm, durations are log-normal
+    session_student = np.repeat(np.arange(len(student_ids)), plan.sessions)
+    n_sessions = len(session_student)
+    session_ids = np.arange(first_session, first_session + n_sessions)
+    starts = (
+        rng.integers(0, config.days, n_sessions) * 86400
+        + rng.choice(24, n_sessions, p=HOUR_WEIGHTS) * 3600
+        + rng.uniform(0, 3600, n_sessions)
+    )
+    durations = np.clip(rng.lognormal(np.log(1500), 0.6, n_sessions), 60, 4 * 3600).astype(np.int64)
+    subject_weights = 1.0 / np.arange(1, len(SUBJECTS) + 1)
+    subjects = rng.choice(len(SUBJECTS), n_sessions, p=subject_weights / subject_weights.sum())
+    completed = rng.random(n_sessions) < 0.93
+    session_cheater = plan.cheater[session_student]
+    session_users = np.asarray(student_ids, dtype=np.int64)[session_student] if n_sessions else np.zeros(0, np.int64)
+    session_families = np.asarray(student_families, dtype=np.int64)[session_student] if n_sessions else np.zeros(0, np.int64)
+    session_starts = _times(period_start, starts)
+
+    # Events per session scale with its length; students who cheat paste and search more
+    n_ai = rng.poisson(durations / 240 * np.where(session_cheater, 1.5, 1.0))
+    n_browser = rng.poisson(durations / 180)
+    n_clipboard = rng.poisson(np.where(session_cheater, 1.8, 0.2))
+    alert = rng.random(n_sessions) < np.where(session_cheater, 0.3, 0.01)
+
+    sessions = [
+        (
+            sid, f"{SUBJECTS[subject].capitalize()} session", None, "completed" if done else "abandoned",
+            SUBJECTS[subject], _json([SUBJECTS[subject]]),
+            _json({"user_id": uid, "family_id": fid, "duration_s": duration, "ai_interactions": ai}),
+            started, started + timedelta(seconds=duration), "datagen", None, 1
+        )
+        for sid, subject, done, uid, fid, duration, ai, started in zip(
+            session_ids.tolist(), subjects.tolist(), completed.tolist(), session_users.tolist(),
+            session_families.tolist(), durations.tolist(), n_ai.tolist(), session_starts
+        )
+    ]
+
+    activity: List[tuple] = []
+
+    def events(counts: np.ndarray):
+        """Session index and time of each event, spread over its session"""
+        index = np.repeat(np.arange(n_sessions), counts)
+        return index, starts[index] + rng.uniform(0, 1, len(index)) * durations[index]
+
+    index, at = events(n_ai)
+    kinds = rng.choice(len(INTERACTION_TYPES), len(index), p=[0.5, 0.3, 0.15, 0.05])
+    responses = rng.integers(0, len(RESPONSE_TYPES), len(index))
+    lengths = np.clip(rng.lognormal(np.log(90), 0.8, len(index)), 1, 2000).astype(np.int64)
+    for i, kind, response, length, occurred in zip(
+        index.tolist(), kinds.tolist(), responses.tolist(), lengths.tolist(), _times(period_start, at)
+    ):
+        activity.append((str(session_users[i]), "ai_interaction", _json({
+            "item_id": int(session_ids[i]), "interaction_type": INTERACTION_TYPES[kind],
+            "message_length": length, "response_type": RESPONSE_TYPES[response]
+        }), occurred, 1.0))
+
+    index, at = events(n_browser)
+    cheating = session_cheater[index]
+    domains = np.where(
+        cheating,
+        rng.choice(len(DOMAINS), len(index), p=DOMAIN_WEIGHTS[1] / DOMAIN_WEIGHTS[1].sum()),
+        rng.choice(len(DOMAINS), len(index), p=DOMAIN_WEIGHTS[0] / DOMAIN_WEIGHTS[0].sum())
+    )
+    private = rng.random(len(index)) < np.where(cheating, 0.15, 0.01)
+    dwell = np.clip(rng.lognormal(np.log(45), 1.0, len(index)), 1, 3600).astype(np.int64)
+    for i, domain, is_private, seconds, occurred in zip(
+        index.tolist(), domains.tolist(), private.tolist(), dwell.tolist(), _times(period_start, at)
+    ):
+        activity.append((str(session_users[i]), "browser_activity", _json({
+            "session_id": int(session_ids[i]), "domain": DOMAINS[domain],
+            "is_private_mode": is_private, "duration_s": seconds
+        }), occurred, 1.0))
+
+    index, at = events(n_clipboard)
+    cheating = session_cheater[index]
+    apps = np.where(
+        cheating,
+        rng.choice(len(SOURCE_APPS), len(index), p=SOURCE_APP_WEIGHTS[1] / SOURCE_APP_WEIGHTS[1].sum()),
+        rng.choice(len(SOURCE_APPS), len(index), p=SOURCE_APP_WEIGHTS[0] / SOURCE_APP_WEIGHTS[0].sum())
+    )
+    pasted = np.clip(rng.lognormal(np.where(cheating, np.log(600), np.log(40)), 0.9), 1, 20000).astype(np.int64)
+    for i, app, length, occurred in zip(index.tolist(), apps.tolist(), pasted.tolist(), _times(period_start, at)):
+        activity.append((str(session_users[i]), "clipboard_activity", _json({
+            "session_id": int(session_ids[i]), "source_app": SOURCE_APPS[app], "length": length
+        }), occurred, 1.0))
+
+    # Alerts: rare and weak for honest students, frequent and confident for those who cheat
+    index = np.flatnonzero(alert)
+    cheating = session_cheater[index]
+    patterns = rng.choice(len(ALERT_PATTERNS), len(index), p=ALERT_PATTERN_WEIGHTS / ALERT_PATTERN_WEIGHTS.sum())
+    confidence = np.where(cheating, rng.beta(6, 2, len(index)), rng.beta(2, 5, len(index)))
+    severity = np.digitize(confidence, [0.4, 0.65, 0.85])
+    raised = starts[index] + rng.uniform(0.2, 1.0, len(index)) * durations[index]
+    alerts = [
+        (
+            ALERT_PATTERNS[pattern].replace("_", " ").capitalize(), None,
+            "open" if level >= 2 else "resolved", SEVERITIES[level], _json([ALERT_PATTERNS[pattern]]),
+            _json({
+                "user_id": int(session_users[i]), "family_id": int(session_families[i]),
+                "session_id": int(session_ids[i]), "pattern": ALERT_PATTERNS[pattern],
+                "confidence": round(score, 4)
+            }),
+            occurred, None, "anti_cheat", None, 1
+        )
+        for i, pattern, score, level, occurred in zip(
+            index.tolist(), patterns.tolist(), confidence.tolist(), severity.tolist(), _times(period_start, raised)
+        )
+    ]
+
+    resource_columns = (
+        "name", "description", "status", "type", "tags", "metadata",
+        "created_at", "updated_at", "created_by", "updated_by", "version"
+    )
+    return [
+        (FAMILIES, ("id",) + resource_columns, families),
+        (USERS, ("id",) + resource_columns, users),
+        (SESSIONS, ("id",) + resource_columns, sessions),
+        (ALERTS, resource_columns, alerts),
+        (ACTIVITY, ("user_id", "activity_type", "details", "occurred_at", "sample_rate"), activity),
+    ]
+
+
+def tables() -> Dict[str, Table]:
+    return {
+        FAMILIES: resource_table(FAMILIES),
+        USERS: resource_table(USERS),
+        SESSIONS: resource_table(SESSIONS),
+        ALERTS: resource_table(ALERTS),
+        ACTIVITY: activity_table,
+    }
+
+
+def create_engine(url: str) -> AsyncEngine:
+    """Engine for one loader process; SQLite writers from several processes queue on its lock"""
+    connect_args = {"timeout": 600} if url.startswith("sqlite") else {}
+    return create_async_engine(url, poolclass=NullPool, connect_args=connect_args)
+
+
+def _sqlite_value(value: Any) -> Any:
+    # The format SQLAlchemy's SQLite DateTime type stores and parses
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f") if isinstance(value, datetime) else value
+
+
+async def write_chunk(engine: AsyncEngine, batches: List[Tuple[str, Sequence[str], List[tuple]]]):
+    """Load one chunk's rows in one transaction: COPY on PostgreSQL, executemany elsewhere"""
+    async with engine.begin() as conn:
+        for name, columns, rows in batches:
+            if not rows:
+                continue
+            if conn.dialect.name == "postgresql":
+                raw = await conn.get_raw_connection()
+                await raw.driver_connection.copy_records_to_table(name, records=rows, columns=list(columns))
+                continue
+            if conn.dialect.name == "sqlite":
+                rows = [tuple(_sqlite_value(value) for value in row) for row in rows]
+            marker = "?" if conn.dialect.paramstyle == "qmark" else "%s"
+            statement = f"INSERT INTO {name} ({', '.join(columns)}) VALUES ({', '.join([marker] * len(columns))})"
+            await conn.exec_driver_sql(statement, rows)
+
+
+async def _load_chunks(
+    config: GenerationConfig,
+    chunks: List[int],
+    first_ids: Dict[int, Tuple[int, int, int]],
+    url: str,
+    dry_run: bool
+) -> Counter:
+    engine = None if dry_run else create_engine(url)
+    rows: Counter = Counter()
+    try:
+        for chunk in chunks:
+            batches = generate_chunk(config, chunk, first_ids[chunk])
+            if engine is not None:
+                await write_chunk(engine, batches)
+            for name, _, batch in batches:
+                rows[name] += len(batch)
+    finally:
+        if engine is not None:
+            await engine.dispose()
+    return rows
+
+
+def load_chunks(config, chunks, first_ids, url, dry_run) -> Counter:
+    """Worker process entry point"""
+    return asyncio.run(_load_chunks(config, chunks, first_ids, url, dry_run))
+
+
+async def prepare(url: str) -> Tuple[int, int, int]:
+    """Create missing tables; the first free ids of families, users and sessions"""
+    engine = create_engine(url)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(metadata.create_all, tables=list(tables().values()), checkfirst=True)
+            first = []
+            for name in (FAMILIES, USERS, SESSIONS):
+                table = tables()[name]
+                first.append((await conn.scalar(select(func.coalesce(func.max(table.c.id), 0)))) + 1)
+        return tuple(first)
+    finally:
+        await engine.dispose()
+
+
+async def finish(url: str):
+    """Move PostgreSQL id sequences past the explicitly inserted ids"""
+    engine = create_engine(url)
+    try:
+        async with engine.begin() as conn:
+            if conn.dialect.name != "postgresql":
+                return
+            for name in (FAMILIES, USERS, SESSIONS):
+                await conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), COALESCE((SELECT MAX(id) FROM {name}), 1))"
+                ))
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and bulk-load synthetic families, students and events")
+    parser.add_argument("--families", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--days", type=int, default=30, help="Length of the simulated period")
+    parser.add_argument("--end", default="2026-01-01", help="Last day of the simulated period (ISO date)")
+    parser.add_argument("--cheater-share", type=float, default=0.05, help="Share of students who cheat")
+    parser.add_argument("--sessions-per-day", type=float, default=0.6, help="Sessions per day of a typical student")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Families per chunk; part of the seed")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--dry-run", action="store_true", help="Generate without loading")
+    args = parser.parse_args()
+
+    config = GenerationConfig(
+        families=args.families, seed=args.seed, days=args.days, end=datetime.fromisoformat(args.end),
+        chunk_size=args.chunk_size, cheater_share=args.cheater_share, sessions_per_day=args.sessions_per_day
+    )
+    url = settings.DATABASE_URL
+    started = time.perf_counter()
+    base = (1, 1, 1) if args.dry_run else asyncio.run(prepare(url))
+
+    with ProcessPoolExecutor(args.processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+        chunks = list(range(config.chunks))
+        counts = list(pool.map(chunk_counts, [config] * len(chunks), chunks, chunksize=64))
+        # Each chunk's ids start where the previous chunk's end
+        first_ids, next_ids = {}, list(base)
+        for chunk, chunk_rows in zip(chunks, counts):
+            first_ids[chunk] = tuple(next_ids)
+            next_ids = [first + count for first, count in zip(next_ids, chunk_rows)]
+        planned = time.perf_counter()
+
+        totals: Counter = Counter()
+        futures = [
+            pool.submit(load_chunks, config, chunks[worker::args.processes], first_ids, url, args.dry_run)
+            for worker in range(min(args.processes, len(chunks)))
+        ]
+        for future in as_completed(futures):
+            totals.update(future.result())
+
+    if not args.dry_run:
+        asyncio.run(finish(url))
+    elapsed = time.perf_counter() - started
+    total = sum(totals.values())
+    target = "generated (dry run)" if args.dry_run else f"loaded into {url.split('://', 1)[0]}"
+    print(f"{total:,} rows {target} in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s, planning {planned - started:.1f}s)")
+    for name in (FAMILIES, USERS, SESSIONS, ACTIVITY, ALERTS):
+        print(f"  {name:<20}{totals[name]:>14,}")
+
+
+if __name__ == "__main__":
+    main()
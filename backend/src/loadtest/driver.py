@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import random
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+
+from loadtest.scenario import Flow, RequestSpec, Scenario, ScenarioError, render
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RouteSamples:
+    latencies: List[float] = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+    errors: int = 0
+
+
+class Recorder:
+    """Per-route latencies and outcomes of the measured part of a run"""
+
+    def __init__(self):
+        self.routes: Dict[str, RouteSamples] = defaultdict(RouteSamples)
+        self.flows: Counter = Counter()
+        # Flow runs not started because max_in_flight was reached; the client, not the app, was the limit
+        self.dropped = 0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def record(self, label: str, status: int, seconds: float, ok: bool):
+        samples = self.routes[label]
+        samples.latencies.append(seconds)
+        samples.statuses[str(status) if status else "transport_error"] += 1
+        if not ok:
+            samples.errors += 1
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+
+async def send(client: httpx.AsyncClient, request: RequestSpec, variables: Dict) -> httpx.Response:
+    return await client.request(
+        request.method,
+        render(request.path, variables),
+        params=render(request.query, variables) or None,
+        json=render(request.json, variables),
+        headers=render(request.headers, variables) or None
+    )
+
+
+async def run_setup(client: httpx.AsyncClient, scenario: Scenario, rng: random.Random):
+    """Create the data the flows point at and put the captured ids into pools"""
+    for step in scenario.setup:
+        captured = scenario.pools.setdefault(step.capture, [])
+        for n in range(step.count):
+            response = await send(client, step.request, scenario.variables(rng, n))
+            if response.status_code not in step.request.expect:
+                raise ScenarioError(
+                    f"Setup {step.request.label} answered {response.status_code}: {response.text[:200]}"
+                )
+            value = response.json()
+            for part in step.field.split("."):
+                value = value[part]
+            captured.append(value)
+        logger.info(f"Setup captured {len(captured)} values for {{{step.capture}}}")
+
+
+async def run_flow(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    flow: Flow,
+    rng: random.Random,
+    n: int,
+    recorder: Optional[Recorder]
+):
+    variables = scenario.variables(rng, n)
+    for request in flow.requests:
+        started = time.perf_counter()
+        try:
+            response = await send(client, request, variables)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            logger.debug(f"{request.label} failed: {type(e).__name__}: {e}")
+            status = 0
+        elapsed = time.perf_counter() - started
+        if recorder is not None:
+            recorder.record(request.label, status, elapsed, status in request.expect)
+        if status not in request.expect:
+            # Later steps of the flow depend on this one
+            return
+        if request.think_ms:
+            await asyncio.sleep(request.think_ms / 1000)
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    rps: Optional[float] = None,
+    duration: Optional[float] = None,
+    warmup: Optional[float] = None,
+    seed: int = 7,
+    poisson: bool = True
+) -> Recorder:
+    """
+    Run the scenario's flows open-loop at a target rate of flow starts
+
+    Flows start on a schedule independent of how fast the app answers
+    (Poisson arrivals by default), so a slow app shows up as latency
+    rather than as less load. Flows started during warmup run but are not
+    recorded. Stops starting flows after warmup + duration and waits for
+    the ones in flight.
+    """
+    rps = rps or scenario.rps
+    duration = scenario.duration if duration is None else duration
+    warmup = scenario.warmup if warmup is None else warmup
+    rng = random.Random(seed)
+    recorder = Recorder()
+    tasks = set()
+    loop = asyncio.get_running_loop()
+
+    began = loop.time()
+    measure_from = began + warmup
+    stop_at = measure_from + duration
+    next_start = began
+    n = 0
+    while True:
+        next_start += rng.expovariate(rps) if poisson else 1.0 / rps
+        if next_start >= stop_at:
+            break
+        delay = next_start - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        measuring = next_start >= measure_from
+        if measuring and recorder.started is None:
+            recorder.started = time.monotonic()
+        if len(tasks) >= scenario.max_in_flight:
+            if measuring:
+                recorder.dropped += 1
+            continue
+        flow = scenario.pick_flow(rng)
+        if measuring:
+            recorder.flows[flow.name] += 1
+        # Each flow run draws from its own generator so the schedule stays the same however the app answers
+        task = loop.create_task(run_flow(
+            client, scenario, flow, random.Random(rng.random()), n, recorder if measuring else None
+        ))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        n += 1
+
+    if recorder.started is None:
+        recorder.started = time.monotonic()
+    recorder.finished = time.monotonic()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return recorder
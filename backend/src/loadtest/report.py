@@ -0,0 +1,117 @@
+import json
+import math
+from typing import Any, Dict, List, Sequence
+
+from loadtest.driver import Recorder
+
+
+def percentile(ordered: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending sequence"""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(recorder: Recorder, scenario_name: str, target_rps: float) -> Dict[str, Any]:
+    """Throughput, latency percentiles and error rate per route, plus totals"""
+    elapsed = max(recorder.elapsed, 1e-9)
+    routes = {}
+    all_latencies: List[float] = []
+    total_errors = 0
+    for label, samples in sorted(recorder.routes.items()):
+        ordered = sorted(samples.latencies)
+        all_latencies.extend(ordered)
+        total_errors += samples.errors
+        routes[label] = _stats(ordered, samples.errors, elapsed)
+        routes[label]["statuses"] = dict(samples.statuses)
+    all_latencies.sort()
+    return {
+        "scenario": scenario_name,
+        "target_rps": target_rps,
+        "duration_s": round(elapsed, 3),
+        "flows": dict(recorder.flows),
+        "dropped_flows": recorder.dropped,
+        "totals": _stats(all_latencies, total_errors, elapsed),
+        "routes": routes
+    }
+
+
+def _stats(ordered: Sequence[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    count = len(ordered)
+    return {
+        "requests": count,
+        "throughput_rps": round(count / elapsed, 2),
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "mean_ms": round(sum(ordered) / count * 1000, 2) if count else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p90_ms": round(percentile(ordered, 90) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2) if count else 0.0
+    }
+
+
+def print_report(summary: Dict[str, Any]):
+    print(f"scenario:      {summary['scenario']} at {summary['target_rps']:g} flows/s for {summary['duration_s']:.1f}s")
+    print(f"flows:         {', '.join(f'{name} {count}' for name, count in sorted(summary['flows'].items()))}")
+    if summary["dropped_flows"]:
+        print(f"dropped:       {summary['dropped_flows']} flow starts (max_in_flight reached on the client)")
+    print()
+    print(f"{'route':<44}{'reqs':>8}{'rps':>9}{'err %':>8}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    rows = list(summary["routes"].items()) + [("TOTAL", summary["totals"])]
+    for label, stats in rows:
+        print(
+            f"{label[:43]:<44}{stats['requests']:>8}{stats['throughput_rps']:>9.1f}{stats['error_rate'] * 100:>8.2f}"
+            f"{stats['p50_ms']:>9.1f}{stats['p90_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['max_ms']:>9.1f}"
+        )
+    failing = {
+        label: stats["statuses"] for label, stats in summary["routes"].items() if stats["error_rate"] > 0
+    }
+    if failing:
+        print()
+        for label, statuses in failing.items():
+            print(f"  {label}: {', '.join(f'{status} x{count}' for status, count in sorted(statuses.items()))}")
+
+
+def compare(
+    summary: Dict[str, Any],
+    baseline: Dict[str, Any],
+    latency_tolerance: float = 0.2,
+    error_tolerance: float = 0.01,
+    throughput_tolerance: float = 0.1,
+    min_latency_ms: float = 5.0
+) -> List[str]:
+    """
+    Regressions against a baseline summary
+
+    A route regresses when its p50 or p99 grew by more than
+    latency_tolerance (and by at least min_latency_ms, so noise on
+    sub-millisecond routes does not count), its error rate grew by more
+    than error_tolerance, or its throughput fell by more than
+    throughput_tolerance. Routes missing from either side are reported.
+    """
+    regressions = []
+    current, before = summary["routes"], baseline["routes"]
+    for label in sorted(set(current) | set(before)):
+        now, then = current.get(label), before.get(label)
+        if now is None or then is None:
+            regressions.append(f"{label}: only in {'baseline' if now is None else 'current run'}")
+            continue
+        for key in ("p50_ms", "p99_ms"):
+            if now[key] > then[key] * (1 + latency_tolerance) and now[key] - then[key] >= min_latency_ms:
+                regressions.append(f"{label}: {key} {then[key]:.1f} -> {now[key]:.1f}")
+        if now["error_rate"] > then["error_rate"] + error_tolerance:
+            regressions.append(f"{label}: error rate {then['error_rate']:.2%} -> {now['error_rate']:.2%}")
+        if now["throughput_rps"] < then["throughput_rps"] * (1 - throughput_tolerance):
+            regressions.append(f"{label}: throughput {then['throughput_rps']:.1f} -> {now['throughput_rps']:.1f} rps")
+    return regressions
+
+
+def save_summary(summary: Dict[str, Any], path: str):
+    with open(path, "w") as fh:
+        json.dump(summary, fh, indent=1, sort_keys=True)
+
+
+def load_summary(path: str) -> Dict[str, Any]:
+    with open(path) as fh:
+        return json.load(fh)
@@ -0,0 +1,92 @@
+# HTTP load test - mixed traffic against a booted app, per-route latency report
+#
+# Boots app.py under uvicorn with local stand-ins for the database and Redis
+# (see loadtest/standins.py), runs a scenario's flows open-loop at the
+# given rate and reports throughput, latency percentiles and error rates per
+# route. --target skips the boot and drives an already running server.
+#
+# Usage (from backend/src):
+#   python -m loadtest.run loadtest/scenarios/mixed.json --rps 50 --duration 60
+#   python -m loadtest.run loadtest/scenarios/mixed.json --save-baseline baseline.json
+#   python -m loadtest.run loadtest/scenarios/mixed.json --baseline baseline.json
+#   python -m loadtest.run loadtest/scenarios/crud.json --target http://localhost:8000
+import argparse
+import asyncio
+import logging
+import random
+import sys
+
+import httpx
+
+from loadtest.driver import drive, run_setup
+from loadtest.report import compare, load_summary, print_report, save_summary, summarize
+from loadtest.scenario import load_scenario
+from loadtest.standins import StandinStack
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Drive mixed HTTP traffic against the app")
+    parser.add_argument("scenario", help="Scenario JSON file")
+    parser.add_argument("--rps", type=float, help="Flow starts per second (default: the scenario's)")
+    parser.add_argument("--duration", type=float, help="Measured seconds (default: the scenario's)")
+    parser.add_argument("--warmup", type=float, help="Unmeasured seconds before (default: the scenario's)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--constant", action="store_true", help="Evenly spaced flow starts instead of Poisson")
+    parser.add_argument("--target", help="Base URL of a running server; skips booting the app")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the booted app")
+    parser.add_argument("--json", dest="json_out", help="Write the summary as JSON")
+    parser.add_argument("--baseline", help="Summary of an earlier run to compare against")
+    parser.add_argument("--save-baseline", help="Write this run's summary as a baseline")
+    parser.add_argument("--latency-tolerance", type=float, default=0.2, help="Relative p50/p99 growth treated as a regression")
+    parser.add_argument("--error-tolerance", type=float, default=0.01, help="Absolute error-rate growth treated as a regression")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    scenario = load_scenario(args.scenario)
+    rps = args.rps or scenario.rps
+
+    stack = None
+    base_url = args.target
+    if base_url is None:
+        stack = StandinStack(scenario.env, workers=args.workers)
+        base_url = await stack.start()
+        print(f"App under test on {base_url} (data in {stack.workdir})")
+
+    try:
+        limits = httpx.Limits(max_connections=scenario.max_in_flight, max_keepalive_connections=scenario.max_in_flight)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+            await run_setup(client, scenario, random.Random(args.seed))
+            recorder = await drive(
+                client, scenario, rps=rps, duration=args.duration, warmup=args.warmup,
+                seed=args.seed, poisson=not args.constant
+            )
+    finally:
+        if stack is not None:
+            stack.stop()
+
+    summary = summarize(recorder, scenario.name, rps)
+    print()
+    print_report(summary)
+
+    if args.json_out:
+        save_summary(summary, args.json_out)
+    if args.save_baseline:
+        save_summary(summary, args.save_baseline)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        regressions = compare(
+            summary, load_summary(args.baseline),
+            latency_tolerance=args.latency_tolerance, error_tolerance=args.error_tolerance
+        )
+        print(f"\nRegressions against {args.baseline}: {len(regressions)}")
+        for regression in regressions:
+            print(f"  {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,203 @@
+# Load-test scenarios - traffic mixes read from JSON data files
+#
+# A scenario file describes the traffic, not the code that sends it:
+#
+#   {
+#     "name": "mixed",
+#     "rps": 50, "duration": 60, "warmup": 5, "max_in_flight": 500,
+#     "env": {"RATE_LIMIT_ENABLED": "false"},        # extra settings for the booted app
+#     "pools": {"student_id": {"prefix": "student_", "count": 500}},
+#     "values": {"question": ["How do I ...", "..."]},
+#     "setup": [{"capture": "session_id", "count": 200, "method": "POST", "path": "/api/sessions/", "json": {...}}],
+#     "flows": [{"name": "student_session", "weight": 5, "requests": [
+#       {"name": "post question", "method": "POST", "path": "/api/messages/",
+#        "json": {"name": "{question}", "description": "Asked in {session_id}"}, "expect": [201]}
+#     ]}]
+#   }
+#
+# "{name}" placeholders in paths, query values and JSON bodies are filled per
+# flow run from the pools (ids), values (free text) and setup captures, so
+# the requests of one flow run share the same ids. "{n}" is a running number.
+# A placeholder that makes up a whole JSON value keeps the value's type.
+import json
+import random
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+class ScenarioError(ValueError):
+    """A scenario file that cannot be run"""
+
+
+@dataclass
+class RequestSpec:
+    method: str
+    path: str
+    name: Optional[str] = None
+    query: Dict[str, Any] = field(default_factory=dict)
+    json: Any = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    expect: List[int] = field(default_factory=lambda: [200, 201, 204])
+    think_ms: float = 0.0
+
+    @property
+    def label(self) -> str:
+        """Report key: the explicit name, else method and path template"""
+        return self.name or f"{self.method} {self.path}"
+
+
+@dataclass
+class Flow:
+    name: str
+    weight: float
+    requests: List[RequestSpec]
+
+
+@dataclass
+class SetupStep:
+    capture: str
+    count: int
+    request: RequestSpec
+    # Field of the response JSON whose value goes into the pool
+    field: str = "id"
+
+
+@dataclass
+class Scenario:
+    name: str
+    flows: List[Flow]
+    rps: float = 20.0
+    duration: float = 30.0
+    warmup: float = 0.0
+    max_in_flight: int = 500
+    env: Dict[str, str] = field(default_factory=dict)
+    pools: Dict[str, List[Any]] = field(default_factory=dict)
+    values: Dict[str, List[Any]] = field(default_factory=dict)
+    setup: List[SetupStep] = field(default_factory=list)
+    description: str = ""
+
+    def pick_flow(self, rng: random.Random) -> Flow:
+        return rng.choices(self.flows, weights=[flow.weight for flow in self.flows])[0]
+
+    def variables(self, rng: random.Random, n: int) -> "Variables":
+        """Placeholder values for one flow run"""
+        return Variables(self, rng, n)
+
+
+class Variables(dict):
+    """Lazily drawn placeholder values; each name is drawn once per flow run"""
+
+    def __init__(self, scenario: Scenario, rng: random.Random, n: int):
+        super().__init__(n=n)
+        self.scenario = scenario
+        self.rng = rng
+
+    def __missing__(self, name: str) -> Any:
+        choices = self.scenario.pools.get(name) or self.scenario.values.get(name)
+        if not choices:
+            raise ScenarioError(f"No pool or value list for placeholder {{{name}}}")
+        value = self[name] = self.rng.choice(choices)
+        return value
+
+
+def render(template: Any, variables: Dict[str, Any]) -> Any:
+    """Fill the placeholders of a path, query or JSON body"""
+    if isinstance(template, str):
+        whole = PLACEHOLDER.fullmatch(template)
+        if whole:
+            return variables[whole.group(1)]
+        return PLACEHOLDER.sub(lambda match: str(variables[match.group(1)]), template)
+    if isinstance(template, dict):
+        return {key: render(value, variables) for key, value in template.items()}
+    if isinstance(template, list):
+        return [render(value, variables) for value in template]
+    return template
+
+
+def _request(data: Dict[str, Any]) -> RequestSpec:
+    try:
+        return RequestSpec(
+            method=data.get("method", "GET").upper(),
+            path=data["path"],
+            name=data.get("name"),
+            query=data.get("query", {}),
+            json=data.get("json"),
+            headers=data.get("headers", {}),
+            expect=data.get("expect", [200, 201, 204]),
+            think_ms=float(data.get("think_ms", 0.0))
+        )
+    except KeyError as e:
+        raise ScenarioError(f"Request without {e.args[0]}: {data}")
+
+
+def _pool(name: str, spec: Any) -> List[Any]:
+    if isinstance(spec, list):
+        return spec
+    if isinstance(spec, dict) and "count" in spec:
+        return [f"{spec.get('prefix', name + '_')}{i}" for i in range(int(spec["count"]))]
+    raise ScenarioError(f"Pool {name} must be a list or {{\"prefix\": ..., \"count\": ...}}")
+
+
+def parse_scenario(data: Dict[str, Any]) -> Scenario:
+    flows = [
+        Flow(flow["name"], float(flow.get("weight", 1.0)), [_request(request) for request in flow["requests"]])
+        for flow in data.get("flows", [])
+    ]
+    if not flows:
+        raise ScenarioError("A scenario needs at least one flow")
+    setup = [
+        SetupStep(step["capture"], int(step.get("count", 1)), _request(step), step.get("field", "id"))
+        for step in data.get("setup", [])
+    ]
+    scenario = Scenario(
+        name=data.get("name", "scenario"),
+        description=data.get("description", ""),
+        flows=flows,
+        rps=float(data.get("rps", 20.0)),
+        duration=float(data.get("duration", 30.0)),
+        warmup=float(data.get("warmup", 0.0)),
+        max_in_flight=int(data.get("max_in_flight", 500)),
+        env={key: str(value) for key, value in data.get("env", {}).items()},
+        pools={name: _pool(name, spec) for name, spec in data.get("pools", {}).items()},
+        values=data.get("values", {}),
+        setup=setup
+    )
+    _check_placeholders(scenario)
+    return scenario
+
+
+def _placeholders(template: Any) -> List[str]:
+    if isinstance(template, str):
+        return PLACEHOLDER.findall(template)
+    if isinstance(template, dict):
+        return [name for value in template.values() for name in _placeholders(value)]
+    if isinstance(template, list):
+        return [name for value in template for name in _placeholders(value)]
+    return []
+
+
+def _check_placeholders(scenario: Scenario):
+    """Fail on load, not halfway through a run, for placeholders nothing fills"""
+    known = {"n"} | set(scenario.pools) | set(scenario.values)
+    for step in scenario.setup:
+        _check_request(step.request, known)
+        # Captures become available to the steps after them
+        known.add(step.capture)
+    for flow in scenario.flows:
+        for request in flow.requests:
+            _check_request(request, known)
+
+
+def _check_request(request: RequestSpec, known: set):
+    used = _placeholders([request.path, request.query, request.json, request.headers])
+    unknown = sorted(set(used) - known)
+    if unknown:
+        raise ScenarioError(f"{request.label} uses placeholders with no pool or values: {', '.join(unknown)}")
+
+
+def load_scenario(path: str) -> Scenario:
+    with open(path) as fh:
+        return parse_scenario(json.load(fh))
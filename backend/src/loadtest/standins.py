@@ -0,0 +1,99 @@
+# Load-test stand-ins - local replacements for the app's external services
+#
+# Database: a fresh SQLite file per run (DATABASE_URL), tables created on boot.
+# Redis:    the rate limiter runs in its per-worker mode (RATE_LIMIT_REDIS_SYNC=false).
+#
+# There is no model stand-in: the AI tutor router does not import in this
+# tree and nothing in the app takes a model base URL, so scenarios stay on
+# the routers that load.
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+SOURCE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def app_environment(workdir: str, overrides: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Environment for an app server wired to the stand-ins"""
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(workdir, 'loadtest.db')}",
+        "DATABASE_CREATE_TABLES": "true",
+        "SEARCH_INDEX_DIR": os.path.join(workdir, "search"),
+        "RATE_LIMIT_REDIS_SYNC": "false",
+        "PYTHONPATH": os.pathsep.join(filter(None, [SOURCE_ROOT, os.environ.get("PYTHONPATH")])),
+    })
+    env.update(overrides or {})
+    return env
+
+
+class Server:
+    """A uvicorn server process serving an ASGI app on a free local port"""
+
+    def __init__(self, target: str, env: Dict[str, str], workers: int = 1, extra_args: Optional[List[str]] = None):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.command = [
+            sys.executable, "-m", "uvicorn", target,
+            "--host", "127.0.0.1", "--port", str(self.port),
+            "--workers", str(workers), "--log-level", "warning",
+            *(extra_args or [])
+        ]
+        self.env = env
+        self.process: Optional[subprocess.Popen] = None
+
+    async def start(self, health_path: str = "/", timeout: float = 60.0):
+        self.process = subprocess.Popen(self.command, cwd=SOURCE_ROOT, env=self.env)
+        deadline = time.monotonic() + timeout
+        async with httpx.AsyncClient(base_url=self.url, timeout=2.0) as client:
+            while time.monotonic() < deadline:
+                if self.process.poll() is not None:
+                    raise RuntimeError(f"{' '.join(self.command)} exited with {self.process.returncode}")
+                try:
+                    await client.get(health_path)
+                    return
+                except httpx.TransportError:
+                    await asyncio.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"{self.url} did not come up within {timeout:.0f}s")
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+
+class StandinStack:
+    """The app under test, booted against the stand-ins for one load-test run"""
+
+    def __init__(self, env_overrides: Optional[Dict[str, str]] = None, workers: int = 1):
+        self.workdir = tempfile.mkdtemp(prefix="loadtest-")
+        self.env_overrides = env_overrides or {}
+        self.workers = workers
+        self.app: Optional[Server] = None
+
+    async def start(self) -> str:
+        """Boot the app; its base URL"""
+        self.app = Server("app:app", app_environment(self.workdir, self.env_overrides), workers=self.workers)
+        await self.app.start("/api/status")
+        return self.app.url
+
+    def stop(self):
+        if self.app is not None:
+            self.app.stop()
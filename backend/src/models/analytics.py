@@ -4,10 +4,13 @@ from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from utils.repository import get_repository
+
 class AnalyticsStatus(str, Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
     PENDING = "pending"
+    ARCHIVED = "archived"
 
 class AnalyticsBase(BaseModel):
     """Base model for Analytics"""
@@ -35,34 +38,35 @@ class AnalyticsResponse(AnalyticsInDB):
     """Model for Analytics API response"""
     pass
 
-# Database operations (placeholder for actual DB implementation)
+# Database operations backed by the shared repository engine
 class AnalyticsDB:
+    table = "analytics"
+    
     @staticmethod
     async def create(data: AnalyticsCreate) -> AnalyticsInDB:
         """Create new analytics in database"""
-        # TODO: Implement database creation
-        return AnalyticsInDB(id=1, **data.dict())
+        row = await get_repository(AnalyticsDB.table).create(data.dict())
+        return AnalyticsInDB(**row)
     
     @staticmethod
     async def get_by_id(id: int) -> Optional[AnalyticsInDB]:
         """Get analytics by ID from database"""
-        # TODO: Implement database query
-        return None
+        row = await get_repository(AnalyticsDB.table).get(id)
+        return AnalyticsInDB(**row) if row else None
     
     @staticmethod
     async def get_all() -> List[AnalyticsInDB]:
         """Get all analyticss from database"""
-        # TODO: Implement database query
-        return []
+        rows = await get_repository(AnalyticsDB.table).all()
+        return [AnalyticsInDB(**row) for row in rows]
     
     @staticmethod
     async def update(id: int, data: AnalyticsUpdate) -> Optional[AnalyticsInDB]:
         """Update analytics in database"""
-        # TODO: Implement database update
-        return None
+        row = await get_repository(AnalyticsDB.table).update(id, data.dict(exclude_none=True))
+        return AnalyticsInDB(**row) if row else None
     
     @staticmethod
     async def delete(id: int) -> bool:
         """Delete analytics from database"""
-        # TODO: Implement database deletion
-        return False
+        return await get_repository(AnalyticsDB.table).delete(id)
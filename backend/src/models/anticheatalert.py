@@ -3,10 +3,12 @@ from pydantic import BaseModel, Field, validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
 from enum import Enum
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, JSON, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
+from utils.pagination import CountMode, count_cap, encode_cursor, keyset_clause
+
 Base = declarative_base()
 
 class MrsUnkwnStatus(str, Enum):
@@ -64,6 +66,11 @@ class AntiCheatAlertDB(Base):
     # Relationships
     user = relationship("User", back_populates="anticheatalerts")
     family = relationship("Family", back_populates="anticheatalerts")
+    
+    # Per-user history pages seek on (user_id, created_at, id)
+    __table_args__ = (
+        Index("ix_anticheatalerts_user_created_id", "user_id", "created_at", "id"),
+    )
 
 # Pydantic Models (API)
 class AntiCheatAlertBase(BaseModel):
@@ -187,12 +194,14 @@ class AntiCheatAlertResponse(AntiCheatAlertInDB):
 class AntiCheatAlertList(BaseModel):
     """Model for paginated AntiCheatAlert list response"""
     items: List[AntiCheatAlertResponse] = Field(..., description="List of anticheatalerts")
-    total: int = Field(..., description="Total number of items")
-    page: int = Field(..., description="Current page number")
+    total: Optional[int] = Field(None, description="Total number of items; omitted when not counted")
+    total_is_estimate: bool = Field(default=False, description="Total is a lower bound")
+    page: Optional[int] = Field(None, description="Current page number; omitted in cursor mode")
     per_page: int = Field(..., description="Items per page")
-    pages: int = Field(..., description="Total number of pages")
+    pages: Optional[int] = Field(None, description="Total number of pages")
     has_next: bool = Field(..., description="Has next page")
     has_prev: bool = Field(..., description="Has previous page")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page")
 
 class AntiCheatAlertAnalytics(BaseModel):
     """Model for AntiCheatAlert analytics data"""
@@ -240,26 +249,62 @@ class AntiCheatAlertOperations:
         ).first()
         
         return AntiCheatAlertInDB.from_orm(db_item) if db_item else None
-    
-    async def get_by_user(self, user_id: str, page: int = 1, per_page: int = 20) -> AntiCheatAlertList:
-        """Get anticheatalerts by user ID"""
-        offset = (page - 1) * per_page
-        
+
+    async def get_many(self, item_ids: List[str]) -> Dict[str, AntiCheatAlertInDB]:
+        """Get anticheatalerts by IDs in one query, keyed by ID; unknown IDs are left out"""
+        if not item_ids:
+            return {}
+        db_items = await self.db.query(AntiCheatAlertDB).filter(
+            AntiCheatAlertDB.id.in_(item_ids)
+        ).all()
+
+        return {db_item.id: AntiCheatAlertInDB.from_orm(db_item) for db_item in db_items}
+
+    async def get_by_user(
+        self,
+        user_id: str,
+        page: int = 1,
+        per_page: int = 20,
+        cursor: Optional[str] = None,
+        count: CountMode = CountMode.EXACT
+    ) -> AntiCheatAlertList:
+        """Get anticheatalerts by user ID, newest first; cursor="" starts a keyset walk, next_cursor continues it"""
         query = self.db.query(AntiCheatAlertDB).filter(
             AntiCheatAlertDB.user_id == user_id
         )
         
-        total = await query.count()
-        items = await query.offset(offset).limit(per_page).all()
+        total = None
+        cap = count_cap(count)
+        if count == CountMode.EXACT:
+            total = await query.count()
+        elif count == CountMode.APPROXIMATE:
+            total = await query.limit(cap).count()
+        
+        ordered = query.order_by(AntiCheatAlertDB.created_at.desc(), AntiCheatAlertDB.id.desc())
+        if cursor is not None:
+            # Keyset page: seek past the cursor instead of skipping rows
+            if cursor:
+                ordered = ordered.filter(
+                    keyset_clause(AntiCheatAlertDB.created_at, AntiCheatAlertDB.id, cursor)
+                )
+            items = await ordered.limit(per_page + 1).all()
+        else:
+            items = await ordered.offset((page - 1) * per_page).limit(per_page + 1).all()
+        
+        has_next = len(items) > per_page
+        items = items[:per_page]
         
-        return AntiCheatAlertList(
+        # from_orm already validated every item; construct() skips validating them again
+        return AntiCheatAlertList.construct(
             items=[AntiCheatAlertResponse.from_orm(item) for item in items],
             total=total,
-            page=page,
+            total_is_estimate=cap is not None and total >= cap,
+            page=None if cursor is not None else page,
             per_page=per_page,
-            pages=(total + per_page - 1) // per_page,
-            has_next=page * per_page < total,
-            has_prev=page > 1
+            pages=(total + per_page - 1) // per_page if total is not None else None,
+            has_next=has_next,
+            has_prev=bool(cursor) if cursor is not None else page > 1,
+            next_cursor=encode_cursor(items[-1].created_at, items[-1].id) if has_next and items else None
         )
     
     async def update(self, item_id: str, data: AntiCheatAlertUpdate) -> Optional[AntiCheatAlertInDB]:
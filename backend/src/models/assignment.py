@@ -4,10 +4,13 @@ from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from utils.repository import get_repository
+
 class AssignmentStatus(str, Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
     PENDING = "pending"
+    ARCHIVED = "archived"
 
 class AssignmentBase(BaseModel):
     """Base model for Assignment"""
@@ -35,34 +38,35 @@ class AssignmentResponse(AssignmentInDB):
     """Model for Assignment API response"""
     pass
 
-# Database operations (placeholder for actual DB implementation)
+# Database operations backed by the shared repository engine
 class AssignmentDB:
+    table = "assignments"
+    
     @staticmethod
     async def create(data: AssignmentCreate) -> AssignmentInDB:
         """Create new assignment in database"""
-        # TODO: Implement database creation
-        return AssignmentInDB(id=1, **data.dict())
+        row = await get_repository(AssignmentDB.table).create(data.dict())
+        return AssignmentInDB(**row)
     
     @staticmethod
     async def get_by_id(id: int) -> Optional[AssignmentInDB]:
         """Get assignment by ID from database"""
-        # TODO: Implement database query
-        return None
+        row = await get_repository(AssignmentDB.table).get(id)
+        return AssignmentInDB(**row) if row else None
     
     @staticmethod
     async def get_all() -> List[AssignmentInDB]:
         """Get all assignments from database"""
-        # TODO: Implement database query
-        return []
+        rows = await get_repository(AssignmentDB.table).all()
+        return [AssignmentInDB(**row) for row in rows]
     
     @staticmethod
     async def update(id: int, data: AssignmentUpdate) -> Optional[AssignmentInDB]:
         """Update assignment in database"""
-        # TODO: Implement database update
-        return None
+        row = await get_repository(AssignmentDB.table).update(id, data.dict(exclude_none=True))
+        return AssignmentInDB(**row) if row else None
     
     @staticmethod
     async def delete(id: int) -> bool:
         """Delete assignment from database"""
-        # TODO: Implement database deletion
-        return False
+        return await get_repository(AssignmentDB.table).delete(id)
@@ -4,10 +4,13 @@ from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from utils.repository import get_repository
+
 class CalendarStatus(str, Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
     PENDING = "pending"
+    ARCHIVED = "archived"
 
 class CalendarBase(BaseModel):
     """Base model for Calendar"""
@@ -35,34 +38,35 @@ class CalendarResponse(CalendarInDB):
     """Model for Calendar API response"""
     pass
 
-# Database operations (placeholder for actual DB implementation)
+# Database operations backed by the shared repository engine
 class CalendarDB:
+    table = "calendar"
+    
     @staticmethod
     async def create(data: CalendarCreate) -> CalendarInDB:
         """Create new calendar in database"""
-        # TODO: Implement database creation
-        return CalendarInDB(id=1, **data.dict())
+        row = await get_repository(CalendarDB.table).create(data.dict())
+        return CalendarInDB(**row)
     
     @staticmethod
     async def get_by_id(id: int) -> Optional[CalendarInDB]:
         """Get calendar by ID from database"""
-        # TODO: Implement database query
-        return None
+        row = await get_repository(CalendarDB.table).get(id)
+        return CalendarInDB(**row) if row else None
     
     @staticmethod
     async def get_all() -> List[CalendarInDB]:
         """Get all calendars from database"""
-        # TODO: Implement database query
-        return []
+        rows = await get_repository(CalendarDB.table).all()
+        return [CalendarInDB(**row) for row in rows]
     
     @staticmethod
     async def update(id: int, data: CalendarUpdate) -> Optional[CalendarInDB]:
         """Update calendar in database"""
-        # TODO: Implement database update
-        return None
+        row = await get_repository(CalendarDB.table).update(id, data.dict(exclude_none=True))
+        return CalendarInDB(**row) if row else None
     
     @staticmethod
     async def delete(id: int) -> bool:
         """Delete calendar from database"""
-        # TODO: Implement database deletion
-        return False
+        return await get_repository(CalendarDB.table).delete(id)
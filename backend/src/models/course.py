@@ -4,10 +4,13 @@ from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from utils.repository import get_repository
+
 class CourseStatus(str, Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
     PENDING = "pending"
+    ARCHIVED = "archived"
 
 class CourseBase(BaseModel):
     """Base model for Course"""
@@ -35,34 +38,35 @@ class CourseResponse(CourseInDB):
     """Model for Course API response"""
     pass
 
-# Database operations (placeholder for actual DB implementation)
+# Database operations backed by the shared repository engine
 class CourseDB:
+    table = "courses"
+    
     @staticmethod
     async def create(data: CourseCreate) -> CourseInDB:
         """Create new course in database"""
-        # TODO: Implement database creation
-        return CourseInDB(id=1, **data.dict())
+        row = await get_repository(CourseDB.table).create(data.dict())
+        return CourseInDB(**row)
     
     @staticmethod
     async def get_by_id(id: int) -> Optional[CourseInDB]:
         """Get course by ID from database"""
-        # TODO: Implement database query
-        return None
+        row = await get_repository(CourseDB.table).get(id)
+        return CourseInDB(**row) if row else None
     
     @staticmethod
     async def get_all() -> List[CourseInDB]:
         """Get all courses from database"""
-        # TODO: Implement database query
-        return []
+        rows = await get_repository(CourseDB.table).all()
+        return [CourseInDB(**row) for row in rows]
     
     @staticmethod
     async def update(id: int, data: CourseUpdate) -> Optional[CourseInDB]:
         """Update course in database"""
-        # TODO: Implement database update
-        return None
+        row = await get_repository(CourseDB.table).update(id, data.dict(exclude_none=True))
+        return CourseInDB(**row) if row else None
     
     @staticmethod
     async def delete(id: int) -> bool:
         """Delete course from database"""
-        # TODO: Implement database deletion
-        return False
+        return await get_repository(CourseDB.table).delete(id)
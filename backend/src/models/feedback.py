@@ -4,10 +4,13 @@ from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from utils.repository import get_repository
+
 class FeedbackStatus(str, Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
     PENDING = "pending"
+    ARCHIVED = "archived"
 
 class FeedbackBase(BaseModel):
     """Base model for Feedback"""
@@ -35,34 +38,35 @@ class FeedbackResponse(FeedbackInDB):
     """Model for Feedback API response"""
     pass
 
-# Database operations (placeholder for actual DB implementation)
+# Database operations backed by the shared repository engine
 class FeedbackDB:
+    table = "feedback"
+    
     @staticmethod
     async def create(data: FeedbackCreate) -> FeedbackInDB:
         """Create new feedback in database"""
-        # TODO: Implement database creation
-        return FeedbackInDB(id=1, **data.dict())
+        row = await get_repository(FeedbackDB.table).create(data.dict())
+        return FeedbackInDB(**row)
     
     @staticmethod
     async def get_by_id(id: int) -> Optional[FeedbackInDB]:
         """Get feedback by ID from database"""
-        # TODO: Implement database query
-        return None
+        row = await get_repository(FeedbackDB.table).get(id)
+        return FeedbackInDB(**row) if row else None
     
     @staticmethod
     async def get_all() -> List[FeedbackInDB]:
         """Get all feedbacks from database"""
-        # TODO: Implement database query
-        return []
+        rows = await get_repository(FeedbackDB.table).all()
+        return [FeedbackInDB(**row) for row in rows]
     
     @staticmethod
     async def update(id: int, data: FeedbackUpdate) -> Optional[FeedbackInDB]:
         """Update feedback in database"""
-        # TODO: Implement database update
-        return None
+        row = await get_repository(FeedbackDB.table).update(id, data.dict(exclude_none=True))
+        return FeedbackInDB(**row) if row else None
     
     @staticmethod
     async def delete(id: int) -> bool:
         """Delete feedback from database"""
-        # TODO: Implement database deletion
-        return False
+        return await get_repository(FeedbackDB.table).delete(id)
@@ -4,10 +4,13 @@ from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from utils.repository import get_repository
+
 class FileStatus(str, Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
     PENDING = "pending"
+    ARCHIVED = "archived"
 
 class FileBase(BaseModel):
     """Base model for File"""
@@ -35,34 +38,35 @@ class FileResponse(FileInDB):
     """Model for File API response"""
     pass
 
-# Database operations (placeholder for actual DB implementation)
+# Database operations backed by the shared repository engine
 class FileDB:
+    table = "files"
+    
     @staticmethod
     async def create(data: FileCreate) -> FileInDB:
         """Create new file in database"""
-        # TODO: Implement database creation
-        return FileInDB(id=1, **data.dict())
+        row = await get_repository(FileDB.table).create(data.dict())
+        return FileInDB(**row)
     
     @staticmethod
     async def get_by_id(id: int) -> Optional[FileInDB]:
         """Get file by ID from database"""
-        # TODO: Implement database query
-        return None
+        row = await get_repository(FileDB.table).get(id)
+        return FileInDB(**row) if row else None
     
     @staticmethod
     async def get_all() -> List[FileInDB]:
         """Get all files from database"""
-        # TODO: Implement database query
-        return []
+        rows = await get_repository(FileDB.table).all()
+        return [FileInDB(**row) for row in rows]
     
     @staticmethod
     async def update(id: int, data: FileUpdate) -> Optional[FileInDB]:
         """Update file in database"""
-        # TODO: Implement database update
-        return None
+        row = await get_repository(FileDB.table).update(id, data.dict(exclude_none=True))
+        return FileInDB(**row) if row else None
     
     @staticmethod
     async def delete(id: int) -> bool:
         """Delete file from database"""
-        # TODO: Implement database deletion
-        return False
+        return await get_repository(FileDB.table).delete(id)
@@ -4,10 +4,13 @@ from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from utils.repository import get_repository
+
 class GradeStatus(str, Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
     PENDING = "pending"
+    ARCHIVED = "archived"
 
 class GradeBase(BaseModel):
     """Base model for Grade"""
@@ -35,34 +38,35 @@ class GradeResponse(GradeInDB):
     """Model for Grade API response"""
     pass
 
-# Database operations (placeholder for actual DB implementation)
+# Database operations backed by the shared repository engine
 class GradeDB:
+    table = "grades"
+    
     @staticmethod
     async def create(data: GradeCreate) -> GradeInDB:
         """Create new grade in database"""
-        # TODO: Implement database creation
-        return GradeInDB(id=1, **data.dict())
+        row = await get_repository(GradeDB.table).create(data.dict())
+        return GradeInDB(**row)
     
     @staticmethod
     async def get_by_id(id: int) -> Optional[GradeInDB]:
         """Get grade by ID from database"""
-        # TODO: Implement database query
-        return None
+        row = await get_repository(GradeDB.table).get(id)
+        return GradeInDB(**row) if row else None
     
     @staticmethod
     async def get_all() -> List[GradeInDB]:
         """Get all grades from database"""
-        # TODO: Implement database query
-        return []
+        rows = await get_repository(GradeDB.table).all()
+        return [GradeInDB(**row) for row in rows]
     
     @staticmethod
     async def update(id: int, data: GradeUpdate) -> Optional[GradeInDB]:
         """Update grade in database"""
-        # TODO: Implement database update
-        return None
+        row = await get_repository(GradeDB.table).update(id, data.dict(exclude_none=True))
+        return GradeInDB(**row) if row else None
     
     @staticmethod
     async def delete(id: int) -> bool:
         """Delete grade from database"""
-        # TODO: Implement database deletion
-        return False
+        return await get_repository(GradeDB.table).delete(id)
@@ -4,10 +4,13 @@ from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from utils.repository import get_repository
+
 class LessonStatus(str, Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
     PENDING = "pending"
+    ARCHIVED = "archived"
 
 class LessonBase(BaseModel):
     """Base model for Lesson"""
@@ -35,34 +38,35 @@ class LessonResponse(LessonInDB):
     """Model for Lesson API response"""
     pass
 
-# Database operations (placeholder for actual DB implementation)
+# Database operations backed by the shared repository engine
 class LessonDB:
+    table = "lessons"
+    
     @staticmethod
     async def create(data: LessonCreate) -> LessonInDB:
         """Create new lesson in database"""
-        # TODO: Implement database creation
-        return LessonInDB(id=1, **data.dict())
+        row = await get_repository(LessonDB.table).create(data.dict())
+        return LessonInDB(**row)
     
     @staticmethod
     async def get_by_id(id: int) -> Optional[LessonInDB]:
         """Get lesson by ID from database"""
-        # TODO: Implement database query
-        return None
+        row = await get_repository(LessonDB.table).get(id)
+        return LessonInDB(**row) if row else None
     
     @staticmethod
     async def get_all() -> List[LessonInDB]:
         """Get all lessons from database"""
-        # TODO: Implement database query
-        return []
+        rows = await get_repository(LessonDB.table).all()
+        return [LessonInDB(**row) for row in rows]
     
     @staticmethod
     async def update(id: int, data: LessonUpdate) -> Optional[LessonInDB]:
         """Update lesson in database"""
-        # TODO: Implement database update
-        return None
+        row = await get_repository(LessonDB.table).update(id, data.dict(exclude_none=True))
+        return LessonInDB(**row) if row else None
     
     @staticmethod
     async def delete(id: int) -> bool:
         """Delete lesson from database"""
-        # TODO: Implement database deletion
-        return False
+        return await get_repository(LessonDB.table).delete(id)
@@ -4,10 +4,13 @@ from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from utils.repository import get_repository
+
 class MessageStatus(str, Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
     PENDING = "pending"
+    ARCHIVED = "archived"
 
 class MessageBase(BaseModel):
     """Base model for Message"""
@@ -35,34 +38,35 @@ class MessageResponse(MessageInDB):
     """Model for Message API response"""
     pass
 
-# Database operations (placeholder for actual DB implementation)
+# Database operations backed by the shared repository engine
 class MessageDB:
+    table = "messages"
+    
     @staticmethod
     async def create(data: MessageCreate) -> MessageInDB:
         """Create new message in database"""
-        # TODO: Implement database creation
-        return MessageInDB(id=1, **data.dict())
+        row = await get_repository(MessageDB.table).create(data.dict())
+        return MessageInDB(**row)
     
     @staticmethod
     async def get_by_id(id: int) -> Optional[MessageInDB]:
         """Get message by ID from database"""
-        # TODO: Implement database query
-        return None
+        row = await get_repository(MessageDB.table).get(id)
+        return MessageInDB(**row) if row else None
     
     @staticmethod
     async def get_all() -> List[MessageInDB]:
         """Get all messages from database"""
-        # TODO: Implement database query
-        return []
+        rows = await get_repository(MessageDB.table).all()
+        return [MessageInDB(**row) for row in rows]
     
     @staticmethod
     async def update(id: int, data: MessageUpdate) -> Optional[MessageInDB]:
         """Update message in database"""
-        # TODO: Implement database update
-        return None
+        row = await get_repository(MessageDB.table).update(id, data.dict(exclude_none=True))
+        return MessageInDB(**row) if row else None
     
     @staticmethod
     async def delete(id: int) -> bool:
         """Delete message from database"""
-        # TODO: Implement database deletion
-        return False
+        return await get_repository(MessageDB.table).delete(id)
@@ -4,10 +4,13 @@ from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from utils.repository import get_repository
+
 class NotificationStatus(str, Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
     PENDING = "pending"
+    ARCHIVED = "archived"
 
 class NotificationBase(BaseModel):
     """Base model for Notification"""
@@ -35,34 +38,35 @@ class NotificationResponse(NotificationInDB):
     """Model for Notification API response"""
     pass
 
-# Database operations (placeholder for actual DB implementation)
+# Database operations backed by the shared repository engine
 class NotificationDB:
+    table = "notifications"
+    
     @staticmethod
     async def create(data: NotificationCreate) -> NotificationInDB:
         """Create new notification in database"""
-        # TODO: Implement database creation
-        return NotificationInDB(id=1, **data.dict())
+        row = await get_repository(NotificationDB.table).create(data.dict())
+        return NotificationInDB(**row)
     
     @staticmethod
     async def get_by_id(id: int) -> Optional[NotificationInDB]:
         """Get notification by ID from database"""
-        # TODO: Implement database query
-        return None
+        row = await get_repository(NotificationDB.table).get(id)
+        return NotificationInDB(**row) if row else None
     
     @staticmethod
     async def get_all() -> List[NotificationInDB]:
         """Get all notifications from database"""
-        # TODO: Implement database query
-        return []
+        rows = await get_repository(NotificationDB.table).all()
+        return [NotificationInDB(**row) for row in rows]
     
     @staticmethod
     async def update(id: int, data: NotificationUpdate) -> Optional[NotificationInDB]:
         """Update notification in database"""
-        # TODO: Implement database update
-        return None
+        row = await get_repository(NotificationDB.table).update(id, data.dict(exclude_none=True))
+        return NotificationInDB(**row) if row else None
     
     @staticmethod
     async def delete(id: int) -> bool:
         """Delete notification from database"""
-        # TODO: Implement database deletion
-        return False
+        return await get_repository(NotificationDB.table).delete(id)
@@ -4,10 +4,13 @@ from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from utils.repository import get_repository
+
 class PaymentStatus(str, Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
     PENDING = "pending"
+    ARCHIVED = "archived"
 
 class PaymentBase(BaseModel):
     """Base model for Payment"""
@@ -35,34 +38,35 @@ class PaymentResponse(PaymentInDB):
     """Model for Payment API response"""
     pass
 
-# Database operations (placeholder for actual DB implementation)
+# Database operations backed by the shared repository engine
 class PaymentDB:
+    table = "payments"
+    
     @staticmethod
     async def create(data: PaymentCreate) -> PaymentInDB:
         """Create new payment in database"""
-        # TODO: Implement database creation
-        return PaymentInDB(id=1, **data.dict())
+        row = await get_repository(PaymentDB.table).create(data.dict())
+        return PaymentInDB(**row)
     
     @staticmethod
     async def get_by_id(id: int) -> Optional[PaymentInDB]:
         """Get payment by ID from database"""
-        # TODO: Implement database query
-        return None
+        row = await get_repository(PaymentDB.table).get(id)
+        return PaymentInDB(**row) if row else None
     
     @staticmethod
     async def get_all() -> List[PaymentInDB]:
         """Get all payments from database"""
-        # TODO: Implement database query
-        return []
+        rows = await get_repository(PaymentDB.table).all()
+        return [PaymentInDB(**row) for row in rows]
     
     @staticmethod
     async def update(id: int, data: PaymentUpdate) -> Optional[PaymentInDB]:
         """Update payment in database"""
-        # TODO: Implement database update
-        return None
+        row = await get_repository(PaymentDB.table).update(id, data.dict(exclude_none=True))
+        return PaymentInDB(**row) if row else None
     
     @staticmethod
     async def delete(id: int) -> bool:
         """Delete payment from database"""
-        # TODO: Implement database deletion
-        return False
+        return await get_repository(PaymentDB.table).delete(id)
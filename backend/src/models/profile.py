@@ -4,10 +4,13 @@ from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from utils.repository import get_repository
+
 class ProfileStatus(str, Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
     PENDING = "pending"
+    ARCHIVED = "archived"
 
 class ProfileBase(BaseModel):
     """Base model for Profile"""
@@ -35,34 +38,35 @@ class ProfileResponse(ProfileInDB):
     """Model for Profile API response"""
     pass
 
-# Database operations (placeholder for actual DB implementation)
+# Database operations backed by the shared repository engine
 class ProfileDB:
+    table = "profiles"
+    
     @staticmethod
     async def create(data: ProfileCreate) -> ProfileInDB:
         """Create new profile in database"""
-        # TODO: Implement database creation
-        return ProfileInDB(id=1, **data.dict())
+        row = await get_repository(ProfileDB.table).create(data.dict())
+        return ProfileInDB(**row)
     
     @staticmethod
     async def get_by_id(id: int) -> Optional[ProfileInDB]:
         """Get profile by ID from database"""
-        # TODO: Implement database query
-        return None
+        row = await get_repository(ProfileDB.table).get(id)
+        return ProfileInDB(**row) if row else None
     
     @staticmethod
     async def get_all() -> List[ProfileInDB]:
         """Get all profiles from database"""
-        # TODO: Implement database query
-        return []
+        rows = await get_repository(ProfileDB.table).all()
+        return [ProfileInDB(**row) for row in rows]
     
     @staticmethod
     async def update(id: int, data: ProfileUpdate) -> Optional[ProfileInDB]:
         """Update profile in database"""
-        # TODO: Implement database update
-        return None
+        row = await get_repository(ProfileDB.table).update(id, data.dict(exclude_none=True))
+        return ProfileInDB(**row) if row else None
     
     @staticmethod
     async def delete(id: int) -> bool:
         """Delete profile from database"""
-        # TODO: Implement database deletion
-        return False
+        return await get_repository(ProfileDB.table).delete(id)
@@ -4,10 +4,13 @@ from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from utils.repository import get_repository
+
 class ProgressStatus(str, Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
     PENDING = "pending"
+    ARCHIVED = "archived"
 
 class ProgressBase(BaseModel):
     """Base model for Progress"""
@@ -35,34 +38,35 @@ class ProgressResponse(ProgressInDB):
     """Model for Progress API response"""
     pass
 
-# Database operations (placeholder for actual DB implementation)
+# Database operations backed by the shared repository engine
 class ProgressDB:
+    table = "progress"
+    
     @staticmethod
     async def create(data: ProgressCreate) -> ProgressInDB:
         """Create new progress in database"""
-        # TODO: Implement database creation
-        return ProgressInDB(id=1, **data.dict())
+        row = await get_repository(ProgressDB.table).create(data.dict())
+        return ProgressInDB(**row)
     
     @staticmethod
     async def get_by_id(id: int) -> Optional[ProgressInDB]:
         """Get progress by ID from database"""
-        # TODO: Implement database query
-        return None
+        row = await get_repository(ProgressDB.table).get(id)
+        return ProgressInDB(**row) if row else None
     
     @staticmethod
     async def get_all() -> List[ProgressInDB]:
         """Get all progresss from database"""
-        # TODO: Implement database query
-        return []
+        rows = await get_repository(ProgressDB.table).all()
+        return [ProgressInDB(**row) for row in rows]
     
     @staticmethod
     async def update(id: int, data: ProgressUpdate) -> Optional[ProgressInDB]:
         """Update progress in database"""
-        # TODO: Implement database update
-        return None
+        row = await get_repository(ProgressDB.table).update(id, data.dict(exclude_none=True))
+        return ProgressInDB(**row) if row else None
     
     @staticmethod
     async def delete(id: int) -> bool:
         """Delete progress from database"""
-        # TODO: Implement database deletion
-        return False
+        return await get_repository(ProgressDB.table).delete(id)
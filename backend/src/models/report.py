@@ -4,10 +4,13 @@ from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from utils.repository import get_repository
+
 class ReportStatus(str, Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
     PENDING = "pending"
+    ARCHIVED = "archived"
 
 class ReportBase(BaseModel):
     """Base model for Report"""
@@ -35,34 +38,35 @@ class ReportResponse(ReportInDB):
     """Model for Report API response"""
     pass
 
-# Database operations (placeholder for actual DB implementation)
+# Database operations backed by the shared repository engine
 class ReportDB:
+    table = "reports"
+    
     @staticmethod
     async def create(data: ReportCreate) -> ReportInDB:
         """Create new report in database"""
-        # TODO: Implement database creation
-        return ReportInDB(id=1, **data.dict())
+        row = await get_repository(ReportDB.table).create(data.dict())
+        return ReportInDB(**row)
     
     @staticmethod
     async def get_by_id(id: int) -> Optional[ReportInDB]:
         """Get report by ID from database"""
-        # TODO: Implement database query
-        return None
+        row = await get_repository(ReportDB.table).get(id)
+        return ReportInDB(**row) if row else None
     
     @staticmethod
     async def get_all() -> List[ReportInDB]:
         """Get all reports from database"""
-        # TODO: Implement database query
-        return []
+        rows = await get_repository(ReportDB.table).all()
+        return [ReportInDB(**row) for row in rows]
     
     @staticmethod
     async def update(id: int, data: ReportUpdate) -> Optional[ReportInDB]:
         """Update report in database"""
-        # TODO: Implement database update
-        return None
+        row = await get_repository(ReportDB.table).update(id, data.dict(exclude_none=True))
+        return ReportInDB(**row) if row else None
     
     @staticmethod
     async def delete(id: int) -> bool:
         """Delete report from database"""
-        # TODO: Implement database deletion
-        return False
+        return await get_repository(ReportDB.table).delete(id)
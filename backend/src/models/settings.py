@@ -4,10 +4,13 @@ from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from utils.repository import get_repository
+
 class SettingsStatus(str, Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
     PENDING = "pending"
+    ARCHIVED = "archived"
 
 class SettingsBase(BaseModel):
     """Base model for Settings"""
@@ -35,34 +38,35 @@ class SettingsResponse(SettingsInDB):
     """Model for Settings API response"""
     pass
 
-# Database operations (placeholder for actual DB implementation)
+# Database operations backed by the shared repository engine
 class SettingsDB:
+    table = "settings"
+    
     @staticmethod
     async def create(data: SettingsCreate) -> SettingsInDB:
         """Create new settings in database"""
-        # TODO: Implement database creation
-        return SettingsInDB(id=1, **data.dict())
+        row = await get_repository(SettingsDB.table).create(data.dict())
+        return SettingsInDB(**row)
     
     @staticmethod
     async def get_by_id(id: int) -> Optional[SettingsInDB]:
         """Get settings by ID from database"""
-        # TODO: Implement database query
-        return None
+        row = await get_repository(SettingsDB.table).get(id)
+        return SettingsInDB(**row) if row else None
     
     @staticmethod
     async def get_all() -> List[SettingsInDB]:
         """Get all settingss from database"""
-        # TODO: Implement database query
-        return []
+        rows = await get_repository(SettingsDB.table).all()
+        return [SettingsInDB(**row) for row in rows]
     
     @staticmethod
     async def update(id: int, data: SettingsUpdate) -> Optional[SettingsInDB]:
         """Update settings in database"""
-        # TODO: Implement database update
-        return None
+        row = await get_repository(SettingsDB.table).update(id, data.dict(exclude_none=True))
+        return SettingsInDB(**row) if row else None
     
     @staticmethod
     async def delete(id: int) -> bool:
         """Delete settings from database"""
-        # TODO: Implement database deletion
-        return False
+        return await get_repository(SettingsDB.table).delete(id)
@@ -4,10 +4,13 @@ from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from utils.repository import get_repository
+
 class SubscriptionStatus(str, Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
     PENDING = "pending"
+    ARCHIVED = "archived"
 
 class SubscriptionBase(BaseModel):
     """Base model for Subscription"""
@@ -35,34 +38,35 @@ class SubscriptionResponse(SubscriptionInDB):
     """Model for Subscription API response"""
     pass
 
-# Database operations (placeholder for actual DB implementation)
+# Database operations backed by the shared repository engine
 class SubscriptionDB:
+    table = "subscriptions"
+    
     @staticmethod
     async def create(data: SubscriptionCreate) -> SubscriptionInDB:
         """Create new subscription in database"""
-        # TODO: Implement database creation
-        return SubscriptionInDB(id=1, **data.dict())
+        row = await get_repository(SubscriptionDB.table).create(data.dict())
+        return SubscriptionInDB(**row)
     
     @staticmethod
     async def get_by_id(id: int) -> Optional[SubscriptionInDB]:
         """Get subscription by ID from database"""
-        # TODO: Implement database query
-        return None
+        row = await get_repository(SubscriptionDB.table).get(id)
+        return SubscriptionInDB(**row) if row else None
     
     @staticmethod
     async def get_all() -> List[SubscriptionInDB]:
         """Get all subscriptions from database"""
-        # TODO: Implement database query
-        return []
+        rows = await get_repository(SubscriptionDB.table).all()
+        return [SubscriptionInDB(**row) for row in rows]
     
     @staticmethod
     async def update(id: int, data: SubscriptionUpdate) -> Optional[SubscriptionInDB]:
         """Update subscription in database"""
-        # TODO: Implement database update
-        return None
+        row = await get_repository(SubscriptionDB.table).update(id, data.dict(exclude_none=True))
+        return SubscriptionInDB(**row) if row else None
     
     @staticmethod
     async def delete(id: int) -> bool:
         """Delete subscription from database"""
-        # TODO: Implement database deletion
-        return False
+        return await get_repository(SubscriptionDB.table).delete(id)
@@ -4,10 +4,13 @@ from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from utils.repository import get_repository
+
 class SupportStatus(str, Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
     PENDING = "pending"
+    ARCHIVED = "archived"
 
 class SupportBase(BaseModel):
     """Base model for Support"""
@@ -35,34 +38,35 @@ class SupportResponse(SupportInDB):
     """Model for Support API response"""
     pass
 
-# Database operations (placeholder for actual DB implementation)
+# Database operations backed by the shared repository engine
 class SupportDB:
+    table = "support"
+    
     @staticmethod
     async def create(data: SupportCreate) -> SupportInDB:
         """Create new support in database"""
-        # TODO: Implement database creation
-        return SupportInDB(id=1, **data.dict())
+        row = await get_repository(SupportDB.table).create(data.dict())
+        return SupportInDB(**row)
     
     @staticmethod
     async def get_by_id(id: int) -> Optional[SupportInDB]:
         """Get support by ID from database"""
-        # TODO: Implement database query
-        return None
+        row = await get_repository(SupportDB.table).get(id)
+        return SupportInDB(**row) if row else None
     
     @staticmethod
     async def get_all() -> List[SupportInDB]:
         """Get all supports from database"""
-        # TODO: Implement database query
-        return []
+        rows = await get_repository(SupportDB.table).all()
+        return [SupportInDB(**row) for row in rows]
     
     @staticmethod
     async def update(id: int, data: SupportUpdate) -> Optional[SupportInDB]:
         """Update support in database"""
-        # TODO: Implement database update
-        return None
+        row = await get_repository(SupportDB.table).update(id, data.dict(exclude_none=True))
+        return SupportInDB(**row) if row else None
     
     @staticmethod
     async def delete(id: int) -> bool:
         """Delete support from database"""
-        # TODO: Implement database deletion
-        return False
+        return await get_repository(SupportDB.table).delete(id)
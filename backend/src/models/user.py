@@ -4,10 +4,13 @@ from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
+from utils.repository import get_repository
+
 class UserStatus(str, Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
     PENDING = "pending"
+    ARCHIVED = "archived"
 
 class UserBase(BaseModel):
     """Base model for User"""
@@ -35,34 +38,35 @@ class UserResponse(UserInDB):
     """Model for User API response"""
     pass
 
-# Database operations (placeholder for actual DB implementation)
+# Database operations backed by the shared repository engine
 class UserDB:
+    table = "users"
+    
     @staticmethod
     async def create(data: UserCreate) -> UserInDB:
         """Create new user in database"""
-        # TODO: Implement database creation
-        return UserInDB(id=1, **data.dict())
+        row = await get_repository(UserDB.table).create(data.dict())
+        return UserInDB(**row)
     
     @staticmethod
     async def get_by_id(id: int) -> Optional[UserInDB]:
         """Get user by ID from database"""
-        # TODO: Implement database query
-        return None
+        row = await get_repository(UserDB.table).get(id)
+        return UserInDB(**row) if row else None
     
     @staticmethod
     async def get_all() -> List[UserInDB]:
         """Get all users from database"""
-        # TODO: Implement database query
-        return []
+        rows = await get_repository(UserDB.table).all()
+        return [UserInDB(**row) for row in rows]
     
     @staticmethod
     async def update(id: int, data: UserUpdate) -> Optional[UserInDB]:
         """Update user in database"""
-        # TODO: Implement database update
-        return None
+        row = await get_repository(UserDB.table).update(id, data.dict(exclude_none=True))
+        return UserInDB(**row) if row else None
     
     @staticmethod
     async def delete(id: int) -> bool:
         """Delete user from database"""
-        # TODO: Implement database deletion
-        return False
+        return await get_repository(UserDB.table).delete(id)
@@ -0,0 +1,243 @@
+# ActivityLogger - Mrs-Unkwn Monitoring System
+import asyncio
+import json
+import logging
+import random
+from collections import deque
+from datetime import datetime
+from fnmatch import fnmatchcase
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from sqlalchemy import Column, DateTime, Float, Index, Integer, String, Table, Text, insert, select
+
+from config import settings
+from database import get_engine, metadata
+from utils.fast_json import dumps
+
+logger = logging.getLogger(__name__)
+
+activity_table = Table(
+    "user_activity", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("user_id", String(64), nullable=True),
+    Column("activity_type", String(64), nullable=False),
+    Column("details", Text, nullable=True),
+    Column("occurred_at", DateTime, nullable=False),
+    # Share of this activity type that was kept; weight a row by 1 / sample_rate
+    Column("sample_rate", Float, nullable=False, default=1.0),
+    Index("ix_user_activity_user_occurred", "user_id", "occurred_at"),
+)
+
+
+class ActivitySink:
+    """
+    Application-wide buffer for user activity records
+
+    record() only appends to memory; a background task writes the buffer
+    with one multi-row INSERT when it reaches ACTIVITY_LOG_BATCH_SIZE
+    records or every ACTIVITY_LOG_FLUSH_INTERVAL seconds. High-volume
+    activity types are sampled per ACTIVITY_LOG_SAMPLE_RATES before they
+    are buffered. Records of a failed flush are kept for the next one, up
+    to ACTIVITY_LOG_MAX_BUFFER; stop() writes whatever is left.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.ACTIVITY_LOG_BATCH_SIZE,
+        flush_interval: float = settings.ACTIVITY_LOG_FLUSH_INTERVAL,
+        max_buffer: int = settings.ACTIVITY_LOG_MAX_BUFFER,
+        sample_rates: Optional[Dict[str, float]] = None
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sample_rates = settings.ACTIVITY_LOG_SAMPLE_RATES if sample_rates is None else sample_rates
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=max_buffer)
+        self._rates: Dict[str, float] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._table_ready = False
+        self.stats = {"recorded": 0, "sampled_out": 0, "flushed": 0, "flushes": 0, "flush_errors": 0, "dropped": 0}
+
+    def sample_rate(self, activity_type: str) -> float:
+        """Share of records of an activity type that are kept; an exact entry beats patterns"""
+        rate = self._rates.get(activity_type)
+        if rate is None:
+            rate = self.sample_rates.get(activity_type)
+            if rate is None:
+                rate = next(
+                    (value for pattern, value in self.sample_rates.items() if fnmatchcase(activity_type, pattern)),
+                    1.0
+                )
+            rate = self._rates[activity_type] = min(max(rate, 0.0), 1.0)
+        return rate
+
+    def record(self, user_id: Optional[str], activity_type: str, details: Optional[Dict[str, Any]] = None):
+        """Buffer one activity record, unless sampling drops it; never blocks"""
+        rate = self.sample_rate(activity_type)
+        if rate < 1.0 and random.random() >= rate:
+            self.stats["sampled_out"] += 1
+            return
+        if len(self._buffer) == self._buffer.maxlen:
+            self.stats["dropped"] += 1
+        self._buffer.append({
+            "user_id": None if user_id is None else str(user_id),
+            "activity_type": activity_type,
+            "details": details,
+            "occurred_at": datetime.utcnow(),
+            "sample_rate": rate
+        })
+        self.stats["recorded"] += 1
+        self._ensure_flusher()
+        if len(self._buffer) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _ensure_flusher(self):
+        if self._flush_task is not None or self._stopping:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._flush_task = loop.create_task(self._flush_loop())
+
+    async def start(self):
+        """Start the background flush"""
+        self._ensure_flusher()
+
+    async def stop(self):
+        """Stop the background flush and write every buffered record"""
+        if self._flush_task is not None:
+            # Never cancelled: a flush in flight finishes (or puts its records back) before the loop exits
+            self._stopping = True
+            self._wakeup.set()
+            try:
+                await self._flush_task
+            except Exception as e:
+                logger.error(f"Error stopping activity flush: {str(e)}")
+            self._flush_task = None
+        # Records from a failed flush are put back; one retry, then they are lost with the process
+        for _ in range(2):
+            if not self._buffer or await self.flush():
+                break
+        if self._buffer:
+            logger.error(f"Dropping {len(self._buffer)} activity records on shutdown")
+            self.stats["dropped"] += len(self._buffer)
+            self._buffer.clear()
+        self._stopping = False
+
+    async def _flush_loop(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def _ensure_table(self):
+        if self._table_ready:
+            return
+        if settings.DATABASE_CREATE_TABLES:
+            async with get_engine().begin() as conn:
+                await conn.run_sync(activity_table.create, checkfirst=True)
+        self._table_ready = True
+
+    @staticmethod
+    def _row(record: Dict[str, Any]) -> Dict[str, Any]:
+        details = record["details"]
+        if details is not None:
+            try:
+                details = dumps(details).decode("utf-8")
+            except TypeError:
+                details = str(details)
+        return {**record, "details": details}
+
+    def _put_back(self, records: List[Dict[str, Any]]):
+        # Older records go back in front of anything recorded meanwhile
+        room = self._buffer.maxlen - len(self._buffer)
+        kept = records[-room:] if room > 0 else []
+        self.stats["dropped"] += len(records) - len(kept)
+        self._buffer.extendleft(reversed(kept))
+
+    async def flush(self) -> bool:
+        """Write the buffered records; False if the write failed and they were put back"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._buffer:
+                return True
+            records: List[Dict[str, Any]] = list(self._buffer)
+            self._buffer.clear()
+            try:
+                await self._ensure_table()
+                async with get_engine().begin() as conn:
+                    await conn.execute(insert(activity_table), [self._row(record) for record in records])
+            except asyncio.CancelledError:
+                # The INSERT was rolled back; keep the records for whoever flushes next
+                self._put_back(records)
+                raise
+            except Exception as e:
+                logger.error(f"Error flushing {len(records)} activity records: {str(e)}")
+                self.stats["flush_errors"] += 1
+                self._put_back(records)
+                return False
+            self.stats["flushes"] += 1
+            self.stats["flushed"] += len(records)
+            return True
+
+
+_activity_sink: Optional[ActivitySink] = None
+
+
+def get_activity_sink() -> ActivitySink:
+    """Get the process-wide activity sink"""
+    global _activity_sink
+    if _activity_sink is None:
+        _activity_sink = ActivitySink()
+    return _activity_sink
+
+
+async def stream_activity(
+    user_id: Optional[str] = None,
+    activity_type: Optional[str] = None,
+    occurred_after: Optional[datetime] = None,
+    occurred_before: Optional[datetime] = None,
+    batch_size: Optional[int] = None
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Written activity records, oldest first, in batches from a server-side cursor"""
+    c = activity_table.c
+    statement = select(activity_table).order_by(c.occurred_at, c.id)
+    if user_id is not None:
+        statement = statement.where(c.user_id == user_id)
+    if activity_type is not None:
+        statement = statement.where(c.activity_type == activity_type)
+    if occurred_after is not None:
+        statement = statement.where(c.occurred_at >= occurred_after)
+    if occurred_before is not None:
+        statement = statement.where(c.occurred_at <= occurred_before)
+    await get_activity_sink()._ensure_table()
+    async with get_engine().connect() as conn:
+        result = await conn.stream(
+            statement, execution_options={"yield_per": batch_size or settings.EXPORT_BATCH_SIZE}
+        )
+        async for partition in result.partitions():
+            rows = []
+            for row in partition:
+                record = dict(row._mapping)
+                if record["details"]:
+                    try:
+                        record["details"] = json.loads(record["details"])
+                    except ValueError:
+                        # Details that could not be encoded were written as plain text
+                        pass
+                rows.append(record)
+            yield rows
+
+
+async def log_user_activity(user_id: Optional[str], activity_type: str, details: Optional[Dict[str, Any]] = None):
+    """Record a user activity; it is written with the next batch"""
+    get_activity_sink().record(user_id, activity_type, details)
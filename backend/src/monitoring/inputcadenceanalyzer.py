@@ -0,0 +1,226 @@
+# InputCadenceAnalyzer - Mrs-Unkwn Monitoring System
+import logging
+import time
+import numpy as np
+from collections import OrderedDict, deque
+from dataclasses import dataclass, asdict
+from enum import IntEnum
+from typing import Deque, Dict, List, Any, Optional
+from datetime import datetime, timedelta
+
+from config import settings
+
+
+class InputEventKind(IntEnum):
+    KEY = 0
+    PASTE = 1
+    DELETE = 2
+
+
+@dataclass
+class CadenceFeatures:
+    """Typing cadence features computed over one window of input events"""
+    window_start: float
+    window_end: float
+    key_events: int
+    paste_events: int
+    typed_chars: int
+    pasted_chars: int
+    paste_to_type_ratio: float
+    mean_interval_ms: float
+    median_interval_ms: float
+    interval_cv: float
+    fast_interval_ratio: float
+    burst_count: int
+    mean_burst_length: float
+    max_burst_length: int
+    chars_per_minute: float
+    computed_at: datetime
+
+
+class InputCadenceAnalyzer:
+    """
+    Mrs-Unkwn monitoring system for Keystroke and Input Cadence Analysis
+
+    Windows are kept per user for the users who sent input events lately:
+    users idle for CADENCE_IDLE_TTL seconds are dropped, and beyond
+    CADENCE_MAX_USERS the least recently active go first.
+    """
+
+    # Pause between keystrokes that ends a typing burst
+    BURST_GAP_MS = 1000.0
+    # Keystroke intervals below this are faster than human typing
+    FAST_INTERVAL_MS = 25.0
+
+    def __init__(
+        self,
+        windows_per_user: int = 20,
+        max_users: int = settings.CADENCE_MAX_USERS,
+        idle_ttl: float = settings.CADENCE_IDLE_TTL
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.windows_per_user = windows_per_user
+        self.max_users = max_users
+        self.idle_ttl = idle_ttl
+        # Least recently active user first
+        self._windows: "OrderedDict[str, Deque[CadenceFeatures]]" = OrderedDict()
+        self._last_seen: Dict[str, float] = {}
+
+    def _user_windows(self, user_id: str) -> Deque[CadenceFeatures]:
+        """A user's windows, marked as active now; drops idle users and the overflow"""
+        now = time.monotonic()
+        windows = self._windows.get(user_id)
+        if windows is None:
+            windows = self._windows[user_id] = deque(maxlen=self.windows_per_user)
+        else:
+            self._windows.move_to_end(user_id)
+        self._last_seen[user_id] = now
+        while len(self._windows) > 1:
+            oldest = next(iter(self._windows))
+            if len(self._windows) <= self.max_users and now - self._last_seen[oldest] < self.idle_ttl:
+                break
+            del self._windows[oldest]
+            del self._last_seen[oldest]
+        return windows
+
+    async def start_monitoring(self, user_id: str) -> bool:
+        """Start monitoring for user"""
+        try:
+            self.logger.info(f"Starting InputCadenceAnalyzer for user {user_id}")
+            self._user_windows(user_id)
+            return True
+        except Exception as e:
+            self.logger.error(f"Error starting monitoring: {str(e)}")
+            return False
+
+    async def stop_monitoring(self, user_id: str) -> bool:
+        """Stop monitoring for user"""
+        try:
+            self.logger.info(f"Stopping InputCadenceAnalyzer for user {user_id}")
+            self._windows.pop(user_id, None)
+            self._last_seen.pop(user_id, None)
+            return True
+        except Exception as e:
+            self.logger.error(f"Error stopping monitoring: {str(e)}")
+            return False
+
+    async def get_monitoring_data(self, user_id: str) -> Dict[str, Any]:
+        """Get current monitoring data"""
+        latest = self.get_latest_features(user_id)
+        return {
+            "user_id": user_id,
+            "monitoring_active": user_id in self._windows,
+            "last_update": latest.computed_at if latest else None,
+            "data": asdict(latest) if latest else {}
+        }
+
+    def ingest_batch(
+        self,
+        user_id: str,
+        timestamps: List[float],
+        kinds: List[int],
+        chars: Optional[List[int]] = None
+    ) -> Optional[CadenceFeatures]:
+        """Compute cadence features for a batch of input events and keep them for the detectors"""
+        features = self.compute_features(
+            np.asarray(timestamps, dtype=np.float64),
+            np.asarray(kinds, dtype=np.int8),
+            np.asarray(chars, dtype=np.int32) if chars is not None else None
+        )
+        if features is not None:
+            self._user_windows(user_id).append(features)
+        return features
+
+    def compute_features(
+        self,
+        timestamps: np.ndarray,
+        kinds: np.ndarray,
+        chars: Optional[np.ndarray] = None
+    ) -> Optional[CadenceFeatures]:
+        """Vectorized cadence features over one window; timestamps are in milliseconds"""
+        if timestamps.size == 0:
+            return None
+        if timestamps.shape != kinds.shape:
+            raise ValueError("timestamps and kinds must have the same length")
+        if chars is None:
+            # A keystroke inserts one character; paste sizes are unknown
+            chars = np.ones(timestamps.shape, dtype=np.int32)
+        elif chars.shape != timestamps.shape:
+            raise ValueError("chars must have the same length as timestamps")
+
+        # Clients batch from several listeners, so order is not guaranteed
+        if timestamps.size > 1 and np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind="stable")
+            timestamps, kinds, chars = timestamps[order], kinds[order], chars[order]
+
+        key_mask = kinds == InputEventKind.KEY
+        paste_mask = kinds == InputEventKind.PASTE
+        key_times = timestamps[key_mask]
+
+        typed_chars = int(chars[key_mask].sum())
+        pasted_chars = int(chars[paste_mask].sum())
+        total_chars = typed_chars + pasted_chars
+
+        intervals = np.diff(key_times)
+        if intervals.size:
+            mean_interval = float(intervals.mean())
+            median_interval = float(np.median(intervals))
+            interval_cv = float(intervals.std() / mean_interval) if mean_interval > 0 else 0.0
+            fast_ratio = float(np.count_nonzero(intervals < self.FAST_INTERVAL_MS) / intervals.size)
+
+            # Bursts are runs of keystrokes separated by pauses longer than the gap
+            breaks = np.flatnonzero(intervals > self.BURST_GAP_MS)
+            burst_lengths = np.diff(np.concatenate(([0], breaks + 1, [key_times.size])))
+            typing_ms = float(intervals[intervals <= self.BURST_GAP_MS].sum())
+        else:
+            mean_interval = median_interval = interval_cv = fast_ratio = 0.0
+            burst_lengths = np.array([key_times.size]) if key_times.size else np.array([0])
+            typing_ms = 0.0
+
+        return CadenceFeatures(
+            window_start=float(timestamps[0]),
+            window_end=float(timestamps[-1]),
+            key_events=int(key_times.size),
+            paste_events=int(np.count_nonzero(paste_mask)),
+            typed_chars=typed_chars,
+            pasted_chars=pasted_chars,
+            paste_to_type_ratio=pasted_chars / total_chars if total_chars else 0.0,
+            mean_interval_ms=mean_interval,
+            median_interval_ms=median_interval,
+            interval_cv=interval_cv,
+            fast_interval_ratio=fast_ratio,
+            burst_count=int(np.count_nonzero(burst_lengths)),
+            mean_burst_length=float(burst_lengths.mean()),
+            max_burst_length=int(burst_lengths.max()),
+            chars_per_minute=typed_chars / (typing_ms / 60000) if typing_ms > 0 else 0.0,
+            computed_at=datetime.utcnow()
+        )
+
+    def get_latest_features(
+        self,
+        user_id: str,
+        max_age: timedelta = timedelta(minutes=10)
+    ) -> Optional[CadenceFeatures]:
+        """Most recent cadence window for a user, if it is fresh enough"""
+        windows = self._windows.get(user_id)
+        if not windows:
+            return None
+        latest = windows[-1]
+        if datetime.utcnow() - latest.computed_at > max_age:
+            return None
+        return latest
+
+    def get_recent_features(self, user_id: str) -> List[CadenceFeatures]:
+        """All retained cadence windows for a user, oldest first"""
+        return list(self._windows.get(user_id, ()))
+
+
+_input_cadence_analyzer: Optional[InputCadenceAnalyzer] = None
+
+
+def get_input_cadence_analyzer() -> InputCadenceAnalyzer:
+    """Get the process-wide input cadence analyzer"""
+    global _input_cadence_analyzer
+    if _input_cadence_analyzer is None:
+        _input_cadence_analyzer = InputCadenceAnalyzer()
+    return _input_cadence_analyzer
@@ -0,0 +1,258 @@
+# IPRangeIndex - Mrs-Unkwn Monitoring System
+import asyncio
+import logging
+import os
+import socket
+from typing import Dict, FrozenSet, List, Any, Optional, Tuple
+from datetime import datetime
+
+from config import settings
+
+_EMPTY: FrozenSet[str] = frozenset()
+
+
+class _RadixNode:
+    __slots__ = ("key", "length", "value", "children")
+
+    def __init__(self, key: int, length: int, value: Optional[FrozenSet[str]] = None):
+        self.key = key
+        self.length = length
+        self.value = value
+        self.children: List[Optional["_RadixNode"]] = [None, None]
+
+
+class IPRadixTree:
+    """
+    Path-compressed binary radix (patricia) tree over fixed-width addresses
+
+    Each node stores a network prefix and the set of labels attached to it.
+    A lookup walks at most one node per distinct prefix on the address's
+    path and returns the union of labels of every prefix containing it.
+    """
+
+    def __init__(self, width: int):
+        self.width = width
+        self.root = _RadixNode(0, 0)
+        self.size = 0
+
+    def _bit(self, key: int, position: int) -> int:
+        return (key >> (self.width - 1 - position)) & 1
+
+    def insert(self, key: int, length: int, label: str):
+        """Attach a label to the prefix key/length"""
+        width = self.width
+        key &= ~((1 << (width - length)) - 1)
+        node = self.root
+        while True:
+            if node.length == length and node.key == key:
+                if node.value is None:
+                    self.size += 1
+                node.value = (node.value or _EMPTY) | {label}
+                return
+
+            bit = self._bit(key, node.length)
+            child = node.children[bit]
+            if child is None:
+                node.children[bit] = _RadixNode(key, length, frozenset((label,)))
+                self.size += 1
+                return
+
+            common = min(length, child.length, width - (key ^ child.key).bit_length())
+            if common == child.length:
+                # The child's prefix contains the new one; descend
+                node = child
+                continue
+
+            new = _RadixNode(key, length, frozenset((label,)))
+            self.size += 1
+            if common == length:
+                # The new prefix contains the child's; insert it above the child
+                new.children[self._bit(child.key, length)] = child
+                node.children[bit] = new
+                return
+
+            # Prefixes diverge below `common`; branch there
+            branch = _RadixNode(key & ~((1 << (width - common)) - 1), common)
+            branch.children[self._bit(key, common)] = new
+            branch.children[self._bit(child.key, common)] = child
+            node.children[bit] = branch
+            return
+
+    def lookup(self, address: int) -> FrozenSet[str]:
+        """Union of labels of every stored prefix containing the address"""
+        width = self.width
+        found = _EMPTY
+        node = self.root
+        while node is not None:
+            length = node.length
+            if (address ^ node.key) >> (width - length):
+                break
+            if node.value is not None:
+                found = found | node.value
+            if length == width:
+                break
+            node = node.children[(address >> (width - 1 - length)) & 1]
+        return found
+
+
+def parse_address(ip: str) -> Optional[Tuple[int, int]]:
+    """Parse an IP string into (version, integer); IPv4-mapped IPv6 becomes IPv4"""
+    if ":" not in ip:
+        try:
+            return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big")
+        except OSError:
+            return None
+    try:
+        value = int.from_bytes(socket.inet_pton(socket.AF_INET6, ip.split("%", 1)[0]), "big")
+    except OSError:
+        return None
+    if value >> 32 == 0xFFFF:
+        return 4, value & 0xFFFFFFFF
+    return 6, value
+
+
+def parse_network(cidr: str) -> Optional[Tuple[int, int, int]]:
+    """Parse a CIDR string into (version, network integer, prefix length)"""
+    address, _, length = cidr.partition("/")
+    parsed = parse_address(address)
+    if parsed is None:
+        return None
+    version, value = parsed
+    width = 32 if version == 4 else 128
+    if not length:
+        return version, value, width
+    if not length.isdigit() or int(length) > width:
+        return None
+    return version, value, int(length)
+
+
+class IPRangeIndex:
+    """
+    Mrs-Unkwn monitoring system for network origin classification
+
+    Loads CIDR lists of VPN providers, datacenters and Tor exits from a local
+    directory (one `<category>.txt` file per category, one CIDR per line,
+    `#` comments allowed) into radix trees. Reloads build new trees off to
+    the side and swap them in with a single assignment, so lookups never see
+    a half-loaded index. No network access is involved.
+    """
+
+    def __init__(self, directory: str = settings.IP_RANGE_LISTS_DIR):
+        self.logger = logging.getLogger(__name__)
+        self.directory = directory
+        self._trees: Tuple[IPRadixTree, IPRadixTree] = (IPRadixTree(32), IPRadixTree(128))
+        self._signature: Optional[Tuple] = None
+        self._reload_task: Optional[asyncio.Task] = None
+        self.loaded_at: Optional[datetime] = None
+        self.counts: Dict[str, int] = {}
+
+    def _list_files(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".txt")
+        )
+
+    def _current_signature(self) -> Tuple:
+        signature = []
+        for path in self._list_files():
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def load(self) -> bool:
+        """Build fresh trees from the list files and swap them in"""
+        signature = self._current_signature()
+        ipv4, ipv6 = IPRadixTree(32), IPRadixTree(128)
+        counts: Dict[str, int] = {}
+        invalid = 0
+
+        for path in self._list_files():
+            category = os.path.splitext(os.path.basename(path))[0]
+            counts[category] = 0
+            with open(path) as fh:
+                for line in fh:
+                    entry = line.split("#", 1)[0].strip()
+                    if not entry:
+                        continue
+                    network = parse_network(entry)
+                    if network is None:
+                        invalid += 1
+                        continue
+                    version, value, length = network
+                    (ipv4 if version == 4 else ipv6).insert(value, length, category)
+                    counts[category] += 1
+
+        self._trees = (ipv4, ipv6)
+        self._signature = signature
+        self.counts = counts
+        self.loaded_at = datetime.utcnow()
+        self.logger.info(
+            f"IP range index loaded from {self.directory}: {counts}"
+            + (f", {invalid} invalid entries skipped" if invalid else "")
+        )
+        return True
+
+    def reload_if_changed(self) -> bool:
+        """Reload the lists if any file was added, removed or modified"""
+        if self._current_signature() == self._signature:
+            return False
+        return self.load()
+
+    async def start_auto_reload(self, interval: float = settings.IP_RANGE_RELOAD_INTERVAL):
+        """Load the lists now and poll the directory for changes"""
+        await asyncio.to_thread(self.load)
+        if self._reload_task is None:
+            self._reload_task = asyncio.get_running_loop().create_task(self._auto_reload(interval))
+
+    async def stop_auto_reload(self):
+        if self._reload_task is not None:
+            self._reload_task.cancel()
+            try:
+                await self._reload_task
+            except asyncio.CancelledError:
+                pass
+            self._reload_task = None
+
+    async def _auto_reload(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.reload_if_changed)
+            except Exception as e:
+                self.logger.error(f"Error reloading IP range lists: {str(e)}")
+
+    def classify(self, ip: Optional[str]) -> FrozenSet[str]:
+        """Categories of every listed range containing the address"""
+        if not ip:
+            return _EMPTY
+        parsed = parse_address(ip)
+        if parsed is None:
+            return _EMPTY
+        version, value = parsed
+        ipv4, ipv6 = self._trees
+        return (ipv4 if version == 4 else ipv6).lookup(value)
+
+    def tag(self, ip: Optional[str]) -> Dict[str, Any]:
+        """Network origin tags for a device session or interaction"""
+        categories = self.classify(ip)
+        return {
+            "ip_address": ip,
+            "categories": sorted(categories),
+            "is_vpn": "vpn" in categories,
+            "is_datacenter": "datacenter" in categories,
+            "is_tor": "tor" in categories
+        }
+
+
+_ip_range_index: Optional[IPRangeIndex] = None
+
+
+def get_ip_range_index() -> IPRangeIndex:
+    """Get the process-wide IP range index"""
+    global _ip_range_index
+    if _ip_range_index is None:
+        _ip_range_index = IPRangeIndex()
+    return _ip_range_index
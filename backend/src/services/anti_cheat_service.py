@@ -4,15 +4,13 @@ import json
 import logging
 import hashlib
 import re
+import time
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from enum import Enum
 import numpy as np
 from sqlalchemy.orm import Session
-from sklearn.ensemble import IsolationForest
-from textblob import TextBlob
-import difflib
 
 from models.anti_cheat_alert import AntiCheatAlert, SuspicionLevel, ViolationType
 from models.device_session import DeviceSession
@@ -21,11 +19,27 @@ from models.clipboard_activity import ClipboardActivity
 from models.ai_usage_detection import AIUsageDetection
 from services.notification_service import NotificationService
 from services.device_monitoring_service import DeviceMonitoringService
+from monitoring.inputcadenceanalyzer import CadenceFeatures, get_input_cadence_analyzer
+from monitoring.iprangeindex import get_ip_range_index
 from utils.ml_models import BehaviorAnalysisModel, TextSimilarityModel
+from utils.metrics import get_metrics_registry
+from utils.process_pool import DetectorProcessPool, PoolSaturatedError, get_detector_pool
+from utils.text_analysis import (
+    analyze_text_complexity,
+    calculate_text_similarity,
+    detect_ai_patterns,
+    estimate_vocabulary_level,
+    max_text_similarity,
+    vocabulary_profile
+)
 from config import settings
 
 logger = logging.getLogger(__name__)
 
+detector_latency = get_metrics_registry().histogram(
+    "anticheat_detector_duration_seconds", "Time each anti-cheat detector takes per message", ("detector",)
+)
+
 class CheatingPattern(str, Enum):
     DIRECT_COPY_PASTE = "direct_copy_paste"
     AI_GENERATED_CONTENT = "ai_generated_content"
@@ -58,12 +72,16 @@ class AntiCheatService:
     maintaining student privacy and providing educational guidance.
     """
     
-    def __init__(self, db: Session = None):
+    def __init__(self, db: Session = None, process_pool: Optional[DetectorProcessPool] = None):
         self.db = db
+        # CPU-heavy text analysis runs in worker processes, off the event loop
+        self.process_pool = process_pool or get_detector_pool()
         self.notification_service = NotificationService()
         self.device_monitoring = DeviceMonitoringService()
         self.behavior_model = BehaviorAnalysisModel()
         self.text_similarity_model = TextSimilarityModel()
+        self.input_cadence = get_input_cadence_analyzer()
+        self.ip_ranges = get_ip_range_index()
         
         # Known AI services and their patterns
         self.ai_services = {
@@ -104,32 +122,7 @@ class AntiCheatService:
     ) -> bool:
         """Analyze a single AI interaction for cheating indicators"""
         try:
-            alerts = []
-            
-            # 1. Analyze message content for direct solution requests
-            content_alert = await self._analyze_message_content(user_id, message, context)
-            if content_alert:
-                alerts.append(content_alert)
-            
-            # 2. Check timing patterns
-            timing_alert = await self._analyze_timing_patterns(user_id, context)
-            if timing_alert:
-                alerts.append(timing_alert)
-            
-            # 3. Check for copy-paste behavior
-            clipboard_alert = await self._check_clipboard_activity(user_id, message, context)
-            if clipboard_alert:
-                alerts.append(clipboard_alert)
-            
-            # 4. Analyze vocabulary and complexity
-            vocab_alert = await self._analyze_vocabulary_complexity(user_id, message, context)
-            if vocab_alert:
-                alerts.append(vocab_alert)
-            
-            # 5. Check concurrent browser activity
-            browser_alert = await self._check_concurrent_browser_activity(user_id, context)
-            if browser_alert:
-                alerts.append(browser_alert)
+            alerts = await self.detect_alerts(user_id, message, context)
             
             # Process alerts
             is_suspicious = False
@@ -146,6 +139,48 @@ class AntiCheatService:
             logger.error(f"Error analyzing interaction: {str(e)}")
             return False
     
+    async def detect_alerts(
+        self, 
+        user_id: str, 
+        message: str, 
+        context: Dict[str, Any]
+    ) -> List[SuspicionAlert]:
+        """Run every detector over an interaction and collect the raised alerts"""
+        detectors = [
+            # 1. Analyze message content for direct solution requests
+            ("message_content", lambda: self._analyze_message_content(user_id, message, context)),
+            # 2. Check timing patterns
+            ("timing_patterns", lambda: self._analyze_timing_patterns(user_id, context)),
+            # 3. Check for copy-paste behavior
+            ("clipboard_activity", lambda: self._check_clipboard_activity(user_id, message, context)),
+            # 4. Analyze vocabulary and complexity
+            ("vocabulary_complexity", lambda: self._analyze_vocabulary_complexity(user_id, message, context)),
+            # 5. Check concurrent browser activity
+            ("browser_activity", lambda: self._check_concurrent_browser_activity(user_id, context)),
+            # 6. Check keystroke cadence streamed from the device
+            ("input_cadence", lambda: self._analyze_input_cadence(user_id, context)),
+            # 7. Check whether the request came through a VPN, datacenter or Tor exit
+            ("network_origin", lambda: self._check_network_origin(user_id, context)),
+        ]
+        
+        alerts = []
+        for name, detect in detectors:
+            started = time.perf_counter()
+            alert = await detect()
+            self._record_detector_latency(name, time.perf_counter() - started)
+            if alert:
+                alerts.append(alert)
+        
+        return alerts
+    
+    def _record_detector_latency(self, detector: str, seconds: float):
+        """Record per-detector timing in the anticheat_detector_duration_seconds histogram"""
+        detector_latency.labels(detector).observe(seconds)
+    
+    def _now(self) -> datetime:
+        """Current time as seen by the detectors"""
+        return datetime.utcnow()
+    
     async def _analyze_message_content(
         self, 
         user_id: str, 
@@ -212,7 +247,7 @@ class AntiCheatService:
                     },
                     severity=self._determine_severity(suspicion_score),
                     recommended_action=self._recommend_action(suspicion_score),
-                    timestamp=datetime.utcnow(),
+                    timestamp=self._now(),
                     context=context
                 )
             
@@ -245,7 +280,7 @@ class AntiCheatService:
             rapid_interactions = sum(1 for interval in intervals if interval < 30)  # 30 seconds
             
             # Detect unusual time patterns
-            current_hour = datetime.utcnow().hour
+            current_hour = self._now().hour
             late_night_score = 1.0 if 23 <= current_hour or current_hour <= 5 else 0.0
             
             # Calculate suspicion based on timing
@@ -269,7 +304,7 @@ class AntiCheatService:
                     },
                     severity=self._determine_severity(timing_suspicion),
                     recommended_action="Monitor for rapid completion patterns",
-                    timestamp=datetime.utcnow(),
+                    timestamp=self._now(),
                     context=context
                 )
             
@@ -288,10 +323,7 @@ class AntiCheatService:
         """Check for suspicious clipboard activity"""
         try:
             # Get recent clipboard activity
-            recent_clipboard = await self.db.query(ClipboardActivity).filter(
-                ClipboardActivity.user_id == user_id,
-                ClipboardActivity.timestamp >= datetime.utcnow() - timedelta(minutes=10)
-            ).order_by(ClipboardActivity.timestamp.desc()).limit(10).all()
+            recent_clipboard = await self._get_recent_clipboard_activity(user_id, minutes=10)
             
             if not recent_clipboard:
                 return None
@@ -303,13 +335,13 @@ class AntiCheatService:
             external_copies = [clip for clip in recent_clipboard if clip.source_app not in ["Mrs-Unkwn", "internal"]]
             
             # Check message similarity to clipboard content
-            similarity_scores = []
-            for clip in recent_clipboard:
-                if clip.content_preview:
-                    similarity = self._calculate_text_similarity(message, clip.content_preview)
-                    similarity_scores.append(similarity)
-            
-            max_similarity = max(similarity_scores) if similarity_scores else 0.0
+            max_similarity = await self._run_detector_task(
+                max_text_similarity,
+                message,
+                [clip.content_preview for clip in recent_clipboard]
+            )
+            if max_similarity is None:
+                max_similarity = 0.0
             
             # Calculate suspicion score
             clipboard_suspicion = 0.0
@@ -336,7 +368,7 @@ class AntiCheatService:
                     },
                     severity=self._determine_severity(clipboard_suspicion),
                     recommended_action="Investigate copy-paste behavior",
-                    timestamp=datetime.utcnow(),
+                    timestamp=self._now(),
                     context=context
                 )
             
@@ -360,16 +392,15 @@ class AntiCheatService:
             if len(user_history) < 10:
                 return None  # Not enough data
             
-            # Analyze current message
-            current_analysis = self._analyze_text_complexity(message)
-            
-            # Analyze historical messages
-            historical_analyses = [self._analyze_text_complexity(msg) for msg in user_history]
+            # Analyze current and historical messages in the process pool
+            profile = await self._run_detector_task(vocabulary_profile, message, user_history)
+            if profile is None:
+                return None
             
-            # Calculate averages
-            avg_complexity = np.mean([analysis['complexity_score'] for analysis in historical_analyses])
-            avg_vocabulary_level = np.mean([analysis['vocabulary_level'] for analysis in historical_analyses])
-            avg_sentence_length = np.mean([analysis['avg_sentence_length'] for analysis in historical_analyses])
+            current_analysis = profile['current']
+            avg_complexity = profile['avg_complexity']
+            avg_vocabulary_level = profile['avg_vocabulary_level']
+            avg_sentence_length = profile['avg_sentence_length']
             
             # Check for significant deviations
             complexity_deviation = (current_analysis['complexity_score'] - avg_complexity) / max(avg_complexity, 0.1)
@@ -389,7 +420,7 @@ class AntiCheatService:
                 vocab_suspicion += 0.2
             
             # Check for AI-typical patterns
-            ai_patterns = self._detect_ai_patterns(message)
+            ai_patterns = profile['ai_patterns']
             if ai_patterns['score'] > 0.5:
                 vocab_suspicion += 0.3 * ai_patterns['score']
             
@@ -408,7 +439,7 @@ class AntiCheatService:
                     },
                     severity=self._determine_severity(vocab_suspicion),
                     recommended_action="Review vocabulary complexity anomaly",
-                    timestamp=datetime.utcnow(),
+                    timestamp=self._now(),
                     context=context
                 )
             
@@ -426,10 +457,7 @@ class AntiCheatService:
         """Check for concurrent browser activity during AI interaction"""
         try:
             # Get recent browser activity (last 5 minutes)
-            recent_activity = await self.db.query(BrowserActivity).filter(
-                BrowserActivity.user_id == user_id,
-                BrowserActivity.timestamp >= datetime.utcnow() - timedelta(minutes=5)
-            ).order_by(BrowserActivity.timestamp.desc()).limit(20).all()
+            recent_activity = await self._get_recent_browser_activity(user_id, minutes=5)
             
             if not recent_activity:
                 return None
@@ -478,7 +506,7 @@ class AntiCheatService:
                     },
                     severity=self._determine_severity(browser_suspicion),
                     recommended_action="Block external AI services and notify parents",
-                    timestamp=datetime.utcnow(),
+                    timestamp=self._now(),
                     context=context
                 )
             
@@ -488,6 +516,99 @@ class AntiCheatService:
             logger.error(f"Error checking browser activity: {str(e)}")
             return None
     
+    async def _analyze_input_cadence(
+        self, 
+        user_id: str, 
+        context: Dict[str, Any]
+    ) -> Optional[SuspicionAlert]:
+        """Check recent typing cadence for pasted or machine-speed input"""
+        try:
+            features = self._get_input_cadence(user_id)
+            if not features:
+                return None
+            
+            # Most of the text arrived through the clipboard
+            paste_suspicion = 0.0
+            if features.pasted_chars > 100 and features.paste_to_type_ratio > 0.6:
+                paste_suspicion = 0.4 + 0.5 * features.paste_to_type_ratio
+            
+            # Typing faster or more evenly than a person plausibly can
+            cadence_suspicion = 0.0
+            if features.key_events >= 30:
+                if features.chars_per_minute > 600:
+                    cadence_suspicion += 0.4
+                if features.fast_interval_ratio > 0.3:
+                    cadence_suspicion += 0.3
+                if features.interval_cv < 0.15:
+                    cadence_suspicion += 0.3
+            
+            suspicion = min(1.0, max(paste_suspicion, cadence_suspicion))
+            if suspicion > 0.3:
+                pattern = (
+                    CheatingPattern.DIRECT_COPY_PASTE
+                    if paste_suspicion >= cadence_suspicion
+                    else CheatingPattern.RAPID_COMPLETION
+                )
+                return SuspicionAlert(
+                    user_id=user_id,
+                    pattern=pattern,
+                    confidence=suspicion,
+                    evidence={
+                        "paste_to_type_ratio": features.paste_to_type_ratio,
+                        "pasted_chars": features.pasted_chars,
+                        "typed_chars": features.typed_chars,
+                        "chars_per_minute": features.chars_per_minute,
+                        "fast_interval_ratio": features.fast_interval_ratio,
+                        "interval_cv": features.interval_cv,
+                        "mean_burst_length": features.mean_burst_length
+                    },
+                    severity=self._determine_severity(suspicion),
+                    recommended_action="Review typing cadence and pasted content",
+                    timestamp=self._now(),
+                    context=context
+                )
+            
+            return None
+            
+        except Exception as e:
+            logger.error(f"Error analyzing input cadence: {str(e)}")
+            return None
+    
+    async def _check_network_origin(
+        self, 
+        user_id: str, 
+        context: Dict[str, Any]
+    ) -> Optional[SuspicionAlert]:
+        """Check the client address against the local VPN, datacenter and Tor range lists"""
+        try:
+            network = self.ip_ranges.tag(context.get("client_ip"))
+            if not network["categories"]:
+                return None
+            
+            # Tor and consumer VPNs hide the student's location on purpose;
+            # datacenter ranges also cover school proxies and cloud desktops
+            if network["is_tor"]:
+                suspicion = 0.7
+            elif network["is_vpn"]:
+                suspicion = 0.5
+            else:
+                suspicion = 0.35
+            
+            return SuspicionAlert(
+                user_id=user_id,
+                pattern=CheatingPattern.VPN_USAGE,
+                confidence=suspicion,
+                evidence=network,
+                severity=self._determine_severity(suspicion),
+                recommended_action="Confirm the device's network with the family",
+                timestamp=self._now(),
+                context=context
+            )
+            
+        except Exception as e:
+            logger.error(f"Error checking network origin: {str(e)}")
+            return None
+    
     async def handle_suspicious_activity(
         self, 
         user_id: str, 
@@ -520,113 +641,31 @@ class AntiCheatService:
         except Exception as e:
             logger.error(f"Error handling suspicious activity: {str(e)}")
     
+    async def _run_detector_task(self, fn, *args) -> Optional[Any]:
+        """Run CPU-bound detector work in the process pool, or None when shed"""
+        try:
+            return await self.process_pool.run(fn, *args)
+        except PoolSaturatedError:
+            logger.warning(f"Skipping {fn.__name__}: detector pool saturated")
+        except asyncio.TimeoutError:
+            logger.warning(f"Skipping {fn.__name__}: detector task timed out")
+        return None
+    
     def _analyze_text_complexity(self, text: str) -> Dict[str, Any]:
         """Analyze text complexity metrics"""
-        try:
-            blob = TextBlob(text)
-            sentences = blob.sentences
-            words = blob.words
-            
-            # Basic metrics
-            word_count = len(words)
-            sentence_count = len(sentences)
-            avg_sentence_length = word_count / max(sentence_count, 1)
-            
-            # Vocabulary complexity
-            unique_words = len(set(word.lower() for word in words))
-            vocabulary_richness = unique_words / max(word_count, 1)
-            
-            # Advanced vocabulary detection
-            complex_words = sum(1 for word in words if len(word) > 6)
-            complex_word_ratio = complex_words / max(word_count, 1)
-            
-            # Calculate overall complexity score
-            complexity_score = (
-                min(avg_sentence_length / 15, 1.0) * 0.3 +
-                vocabulary_richness * 0.4 +
-                complex_word_ratio * 0.3
-            )
-            
-            return {
-                "word_count": word_count,
-                "sentence_count": sentence_count,
-                "avg_sentence_length": avg_sentence_length,
-                "vocabulary_richness": vocabulary_richness,
-                "complex_word_ratio": complex_word_ratio,
-                "complexity_score": complexity_score,
-                "vocabulary_level": self._estimate_vocabulary_level(words)
-            }
-            
-        except Exception as e:
-            logger.error(f"Error analyzing text complexity: {str(e)}")
-            return {
-                "complexity_score": 0.5,
-                "vocabulary_level": 5,
-                "avg_sentence_length": len(text.split()) / max(text.count('.'), 1)
-            }
+        return analyze_text_complexity(text)
     
     def _detect_ai_patterns(self, text: str) -> Dict[str, Any]:
         """Detect patterns typical of AI-generated text"""
-        ai_indicators = {
-            "formal_structure": 0,
-            "perfect_grammar": 0,
-            "academic_language": 0,
-            "consistent_tone": 0,
-            "lack_of_personality": 0
-        }
-        
-        text_lower = text.lower()
-        
-        # Check for overly formal structure
-        formal_phrases = ["furthermore", "moreover", "nevertheless", "consequently", "thus", "therefore"]
-        ai_indicators["formal_structure"] = sum(1 for phrase in formal_phrases if phrase in text_lower) / 10
-        
-        # Check for academic language patterns
-        academic_words = ["utilize", "facilitate", "demonstrate", "implement", "comprehensive", "fundamental"]
-        ai_indicators["academic_language"] = sum(1 for word in academic_words if word in text_lower) / 10
-        
-        # Simple pattern detection
-        sentences = text.split('.')
-        if len(sentences) > 1:
-            # Check for consistent sentence length (AI tends to be consistent)
-            lengths = [len(s.split()) for s in sentences if s.strip()]
-            if lengths:
-                length_variance = np.var(lengths)
-                ai_indicators["consistent_tone"] = 1.0 if length_variance < 5 else 0.0
-        
-        # Calculate overall AI pattern score
-        ai_score = sum(ai_indicators.values()) / len(ai_indicators)
-        
-        return {
-            "score": min(1.0, ai_score),
-            "indicators": ai_indicators
-        }
+        return detect_ai_patterns(text)
     
     def _calculate_text_similarity(self, text1: str, text2: str) -> float:
         """Calculate similarity between two texts"""
-        try:
-            # Use difflib for basic similarity
-            similarity = difflib.SequenceMatcher(None, text1.lower(), text2.lower()).ratio()
-            return similarity
-        except Exception:
-            return 0.0
+        return calculate_text_similarity(text1, text2)
     
     def _estimate_vocabulary_level(self, words: List[str]) -> int:
         """Estimate vocabulary level (1-10 scale)"""
-        try:
-            # Simple heuristic based on word length and complexity
-            avg_word_length = np.mean([len(word) for word in words])
-            long_words = sum(1 for word in words if len(word) > 7)
-            long_word_ratio = long_words / max(len(words), 1)
-            
-            # Estimate level
-            level = min(10, max(1, int(
-                avg_word_length * 1.2 + long_word_ratio * 8
-            )))
-            
-            return level
-        except Exception:
-            return 5
+        return estimate_vocabulary_level(words)
     
     def _determine_severity(self, confidence: float) -> SuspicionLevel:
         """Determine severity level based on confidence"""
@@ -668,6 +707,24 @@ class AntiCheatService:
             logger.error(f"Error getting message history: {str(e)}")
             return []
     
+    async def _get_recent_clipboard_activity(self, user_id: str, minutes: int = 10) -> List[ClipboardActivity]:
+        """Get the user's clipboard events from the last few minutes"""
+        return await self.db.query(ClipboardActivity).filter(
+            ClipboardActivity.user_id == user_id,
+            ClipboardActivity.timestamp >= self._now() - timedelta(minutes=minutes)
+        ).order_by(ClipboardActivity.timestamp.desc()).limit(10).all()
+    
+    async def _get_recent_browser_activity(self, user_id: str, minutes: int = 5) -> List[BrowserActivity]:
+        """Get the user's browser events from the last few minutes"""
+        return await self.db.query(BrowserActivity).filter(
+            BrowserActivity.user_id == user_id,
+            BrowserActivity.timestamp >= self._now() - timedelta(minutes=minutes)
+        ).order_by(BrowserActivity.timestamp.desc()).limit(20).all()
+    
+    def _get_input_cadence(self, user_id: str) -> Optional[CadenceFeatures]:
+        """Get the user's latest typing cadence window"""
+        return self.input_cadence.get_latest_features(user_id)
+    
     async def _handle_suspicion_alert(self, alert: SuspicionAlert):
         """Handle a suspicion alert"""
         try:
@@ -14,7 +14,8 @@ from models.assessment import (
 )
 from services.notification_service import NotificationService
 from services.ai_tutor_service import AITutorService
-from utils.monitoring import log_user_activity
+from monitoring.activity_logger import log_user_activity
+from utils.dataloader import get_loader
 from config import settings
 
 logger = logging.getLogger(__name__)
@@ -30,6 +31,8 @@ class AssessmentService:
     def __init__(self, db: Session):
         self.db = db
         self.operations = AssessmentOperations(db)
+        # Shared by every service of the request: lookups in one tick become one IN (...) query
+        self.loader = get_loader("assessment", self.operations.get_many)
         self.notification_service = NotificationService()
         self.ai_tutor_service = AITutorService(db)
         
@@ -54,6 +57,7 @@ class AssessmentService:
             
             # Create the assessment
             result = await self.operations.create(data)
+            self.loader.prime(result.id, result)
             
             # Initialize AI tutor if enabled
             if data.ai_interaction_enabled:
@@ -87,7 +91,7 @@ class AssessmentService:
             logger.info(f"Fetching assessment {item_id} for user {user_id}")
             
             # Get the item
-            item = await self.operations.get_by_id(item_id)
+            item = await self.loader.load(item_id)
             if not item:
                 return None
             
@@ -113,6 +117,10 @@ class AssessmentService:
             logger.error(f"Error fetching assessment: {str(e)}")
             raise
     
+    async def get_assessments_by_ids(self, item_ids: List[str]) -> List[Optional[AssessmentInDB]]:
+        """Get assessments by ID in input order, None where missing; batched with other lookups"""
+        return await self.loader.load_many(item_ids)
+    
     async def get_user_assessments(
         self,
         user_id: str,
@@ -155,7 +163,7 @@ class AssessmentService:
             logger.info(f"Updating assessment {item_id} for user {user_id}")
             
             # Get existing item
-            existing = await self.operations.get_by_id(item_id)
+            existing = await self.loader.load(item_id)
             if not existing:
                 return None
             
@@ -171,6 +179,7 @@ class AssessmentService:
             
             # Update the item
             result = await self.operations.update(item_id, data)
+            self.loader.prime(item_id, result)
             
             # Update AI tutor configuration if needed
             if data.ai_interaction_enabled is not None:
@@ -207,7 +216,7 @@ class AssessmentService:
             logger.info(f"Deleting assessment {item_id} for user {user_id}")
             
             # Get existing item
-            existing = await self.operations.get_by_id(item_id)
+            existing = await self.loader.load(item_id)
             if not existing:
                 return False
             
@@ -226,6 +235,7 @@ class AssessmentService:
             
             # Delete the item
             success = await self.operations.delete(item_id)
+            self.loader.prime(item_id, None)
             
             if success:
                 # Log activity
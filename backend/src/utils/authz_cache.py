@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# (user, resource, action)
+DecisionKey = Tuple[str, str, str]
+# (kind, id), e.g. ("family", "family_456"); invalidating a scope drops every decision made under it
+Scope = Tuple[str, str]
+
+USER, FAMILY, STUDENT, RESOURCE = "user", "family", "student", "resource"
+
+
+class _Decision:
+    __slots__ = ("allowed", "expires", "scopes", "generations")
+
+    def __init__(self, allowed: bool, expires: float, scopes: Tuple[Scope, ...], generations: Tuple[int, ...]):
+        self.allowed = allowed
+        self.expires = expires
+        self.scopes = scopes
+        self.generations = generations
+
+
+class AuthzCache:
+    """
+    Authorization decisions cached per (user, resource, action)
+
+    Grants live for AUTHZ_CACHE_TTL seconds, denials for the shorter
+    AUTHZ_CACHE_DENY_TTL so a fix on the family side shows up quickly.
+    Each decision remembers the scopes it depends on (the user, the family,
+    the student, the resource); invalidate() bumps a scope's generation,
+    which retires every decision made under it in O(1) without scanning.
+    Concurrent misses on one key share a single check.
+
+    The cache is per process; other workers see a change once their TTL
+    runs out, so keep the TTLs short.
+    """
+
+    def __init__(
+        self,
+        ttl: float = settings.AUTHZ_CACHE_TTL,
+        deny_ttl: float = settings.AUTHZ_CACHE_DENY_TTL,
+        max_entries: int = settings.AUTHZ_CACHE_MAX_ENTRIES
+    ):
+        self.ttl = ttl
+        self.deny_ttl = deny_ttl
+        self.max_entries = max_entries
+        self._decisions: "OrderedDict[DecisionKey, _Decision]" = OrderedDict()
+        self._generations: Dict[Scope, int] = {}
+        self._pending: Dict[DecisionKey, asyncio.Future] = {}
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+    def _current(self, scopes: Tuple[Scope, ...]) -> Tuple[int, ...]:
+        return tuple(self._generations.get(scope, 0) for scope in scopes)
+
+    @staticmethod
+    def _scopes(user: str, resource: str, scopes: Iterable[Scope]) -> Tuple[Scope, ...]:
+        own = ((USER, str(user)), (RESOURCE, str(resource)))
+        return own + tuple((kind, str(value)) for kind, value in scopes if value is not None)
+
+    def get(self, key: DecisionKey) -> Optional[bool]:
+        """Cached decision, or None if there is none or it expired or was invalidated"""
+        decision = self._decisions.get(key)
+        if decision is None:
+            return None
+        if decision.expires <= time.monotonic() or decision.generations != self._current(decision.scopes):
+            del self._decisions[key]
+            return None
+        self._decisions.move_to_end(key)
+        return decision.allowed
+
+    def put(self, key: DecisionKey, allowed: bool, scopes: Tuple[Scope, ...], generations: Tuple[int, ...]):
+        """Store a decision made while the scopes were at the given generations"""
+        ttl = self.ttl if allowed else self.deny_ttl
+        if ttl <= 0:
+            return
+        self._decisions[key] = _Decision(allowed, time.monotonic() + ttl, scopes, generations)
+        self._decisions.move_to_end(key)
+        while len(self._decisions) > self.max_entries:
+            self._decisions.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def check(
+        self,
+        user: str,
+        resource: str,
+        action: str,
+        load: Callable[[], Awaitable[bool]],
+        scopes: Iterable[Scope] = ()
+    ) -> bool:
+        """Cached decision for one resource; load() decides on a miss"""
+        key = (str(user), str(resource), action)
+        allowed = self.get(key)
+        if allowed is not None:
+            self.stats["hits"] += 1
+            return allowed
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.stats["hits"] += 1
+            return await asyncio.shield(pending)
+
+        self.stats["misses"] += 1
+        all_scopes = self._scopes(user, resource, scopes)
+        # Taken before loading: an invalidation during the load retires the result at once
+        generations = self._current(all_scopes)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            allowed = bool(await load())
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters get the error; retrieve it here so an unwaited future does not warn
+            future.exception()
+            raise
+        finally:
+            self._pending.pop(key, None)
+        future.set_result(allowed)
+        self.put(key, allowed, all_scopes, generations)
+        return allowed
+
+    async def check_many(
+        self,
+        user: str,
+        resources: Sequence[str],
+        action: str,
+        load_many: Callable[[List[str]], Awaitable[Dict[str, bool]]],
+        scopes: Iterable[Scope] = ()
+    ) -> Dict[str, bool]:
+        """
+        Decisions for many resources, e.g. the items of a list page
+
+        Cached decisions are answered from memory and all misses go to one
+        load_many() call, so a page costs at most one check however many
+        items it has. Resources load_many() leaves out are denied.
+        """
+        scopes = tuple(scopes)
+        decisions: Dict[str, bool] = {}
+        missing: List[str] = []
+        for resource in dict.fromkeys(str(resource) for resource in resources):
+            allowed = self.get((str(user), resource, action))
+            if allowed is None:
+                missing.append(resource)
+            else:
+                decisions[resource] = allowed
+        self.stats["hits"] += len(decisions)
+        if not missing:
+            return decisions
+
+        self.stats["misses"] += len(missing)
+        generations = {resource: self._current(self._scopes(user, resource, scopes)) for resource in missing}
+        loaded = await load_many(missing)
+        for resource in missing:
+            allowed = bool(loaded.get(resource, False))
+            decisions[resource] = allowed
+            self.put((str(user), resource, action), allowed, self._scopes(user, resource, scopes), generations[resource])
+        return decisions
+
+    def invalidate(self, kind: str, value: Any):
+        """Retire every decision that depends on a scope"""
+        scope = (kind, str(value))
+        self._generations[scope] = self._generations.get(scope, 0) + 1
+        self.stats["invalidations"] += 1
+
+    def clear(self):
+        self._decisions.clear()
+
+
+_authz_cache: Optional[AuthzCache] = None
+
+
+def get_authz_cache() -> AuthzCache:
+    """Get the process-wide authorization decision cache"""
+    global _authz_cache
+    if _authz_cache is None:
+        _authz_cache = AuthzCache()
+    return _authz_cache
+
+
+def family_membership_changed(family_id: Any, user_ids: Iterable[Any] = ()):
+    """Call when members join or leave a family, or their roles change"""
+    cache = get_authz_cache()
+    cache.invalidate(FAMILY, family_id)
+    for user_id in user_ids:
+        if user_id is not None:
+            cache.invalidate(USER, user_id)
+    logger.info(f"Authorization decisions for family {family_id} invalidated")
+
+
+def parental_controls_changed(student_id: Any = None, family_id: Any = None):
+    """Call when parental controls of a student, or of a whole family, change"""
+    cache = get_authz_cache()
+    if student_id is not None:
+        cache.invalidate(STUDENT, student_id)
+    if family_id is not None:
+        cache.invalidate(FAMILY, family_id)
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urlencode
+
+from starlette.types import ASGIApp, Message, Scope
+
+from config import settings
+from utils.fast_json import dumps
+
+logger = logging.getLogger(__name__)
+
+# Outer request headers every sub-request inherits unless it sets them itself
+FORWARDED_HEADERS = (b"authorization", b"cookie", b"x-request-id", b"accept-language")
+# Sub-request response headers worth returning to the client
+RETURNED_HEADERS = ("etag", "content-type", "retry-after", "location")
+
+
+@dataclass
+class SubRequest:
+    """One call of a batch, addressed like a normal HTTP request to this app"""
+    id: str
+    method: str
+    path: str
+    query: Dict[str, Any] = field(default_factory=dict)
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: Any = None
+    depends_on: List[str] = field(default_factory=list)
+
+
+@dataclass
+class SubResponse:
+    id: str
+    status: int
+    headers: Dict[str, str]
+    body: Any
+    duration_ms: float
+
+
+class _Exchange:
+    """receive/send pair for one in-process request"""
+
+    def __init__(self, body: bytes):
+        self._body = body
+        self._body_sent = False
+        self.finished = asyncio.Event()
+        self.status = 500
+        self.headers: List[Tuple[bytes, bytes]] = []
+        self.chunks: List[bytes] = []
+
+    async def receive(self) -> Message:
+        if not self._body_sent:
+            self._body_sent = True
+            return {"type": "http.request", "body": self._body, "more_body": False}
+        # Nothing more to read; report a disconnect only once the response is done
+        await self.finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+            self.headers = message.get("headers", [])
+        elif message["type"] == "http.response.body":
+            self.chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                self.finished.set()
+
+
+def _decode(body: bytes, content_type: str) -> Any:
+    if not body:
+        return None
+    if "json" in content_type:
+        try:
+            return json.loads(body)
+        except ValueError:
+            pass
+    return body.decode("utf-8", errors="replace")
+
+
+async def dispatch(app: ASGIApp, parent: Scope, request: SubRequest) -> SubResponse:
+    """Run one sub-request through the app's middleware and router, in process"""
+    path, _, inline_query = request.path.partition("?")
+    query = urlencode(request.query, doseq=True) if request.query else inline_query
+    body = b"" if request.body is None else dumps(request.body)
+
+    own = {name.lower().encode("latin-1"): value.encode("latin-1") for name, value in request.headers.items()}
+    headers = [
+        (name, value) for name, value in parent.get("headers", [])
+        if name in FORWARDED_HEADERS and name not in own
+    ]
+    headers.extend(own.items())
+    if body and b"content-type" not in own:
+        headers.append((b"content-type", b"application/json"))
+    headers.append((b"content-length", str(len(body)).encode()))
+
+    scope = {
+        "type": "http",
+        "asgi": parent.get("asgi", {"version": "3.0"}),
+        "http_version": parent.get("http_version", "1.1"),
+        "method": request.method.upper(),
+        "scheme": parent.get("scheme", "http"),
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": parent.get("root_path", ""),
+        "query_string": query.encode(),
+        "headers": headers,
+        "client": parent.get("client"),
+        "server": parent.get("server"),
+        "state": {"batch_id": request.id},
+    }
+    exchange = _Exchange(body)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        await asyncio.wait_for(app(scope, exchange.receive, exchange.send), settings.BATCH_TIMEOUT)
+    except asyncio.TimeoutError:
+        exchange.status, exchange.chunks = 504, [dumps({"detail": "Sub-request timed out"})]
+        exchange.headers = [(b"content-type", b"application/json")]
+    except Exception as e:
+        # The error middleware has usually sent a 500 already; keep whatever it sent
+        logger.error(f"Error in batch sub-request {request.method} {request.path}: {str(e)}")
+        if not exchange.chunks:
+            exchange.status, exchange.chunks = 500, [dumps({"detail": "Internal server error"})]
+            exchange.headers = [(b"content-type", b"application/json")]
+    finally:
+        exchange.finished.set()
+
+    response_headers = {
+        name.decode("latin-1"): value.decode("latin-1") for name, value in exchange.headers
+        if name.decode("latin-1") in RETURNED_HEADERS
+    }
+    return SubResponse(
+        id=request.id,
+        status=exchange.status,
+        headers=response_headers,
+        body=_decode(b"".join(exchange.chunks), response_headers.get("content-type", "")),
+        duration_ms=round((loop.time() - started) * 1000, 2)
+    )
+
+
+def _failed_dependency(request: SubRequest, dependency: str) -> SubResponse:
+    return SubResponse(
+        id=request.id,
+        status=424,
+        headers={"content-type": "application/json"},
+        body={"detail": f"Dependency {dependency} failed"},
+        duration_ms=0.0
+    )
+
+
+async def run_batch(app: ASGIApp, parent: Scope, requests: List[SubRequest]) -> List[SubResponse]:
+    """
+    Run a batch; independent sub-requests run concurrently
+
+    A sub-request starts once everything in its depends_on has finished,
+    and is answered 424 without running if any of them failed (status >=
+    400). At most BATCH_CONCURRENCY sub-requests run at a time.
+    """
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run(request: SubRequest) -> SubResponse:
+        for dependency in request.depends_on:
+            if (await tasks[dependency]).status >= 400:
+                return _failed_dependency(request, dependency)
+        async with semaphore:
+            return await dispatch(app, parent, request)
+
+    # Dependencies point backwards only (checked by the caller), so every
+    # task a request waits for already exists when it is created
+    for request in requests:
+        tasks[request.id] = asyncio.create_task(run(request))
+    return list(await asyncio.gather(*tasks.values()))
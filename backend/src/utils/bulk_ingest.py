@@ -0,0 +1,142 @@
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type, Union
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from starlette.types import Receive, Scope, Send
+
+from config import settings
+from utils.repository import AsyncRepository
+
+logger = logging.getLogger(__name__)
+
+NDJSON = "application/x-ndjson"
+
+
+class LineTooLongError(ValueError):
+    """NDJSON line longer than BULK_INGEST_MAX_LINE_BYTES"""
+    pass
+
+
+class IngestResponse(StreamingResponse):
+    """
+    NDJSON response streamed while the request body is still being read
+
+    StreamingResponse listens for the client disconnecting by reading from
+    `receive`, which would swallow the body chunks the ingest generator is
+    waiting for. Here only the generator reads; a client that goes away
+    surfaces as ClientDisconnect from request.stream() instead.
+    """
+
+    media_type = NDJSON
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def ndjson_lines(
+    chunks: AsyncIterator[bytes],
+    max_line_bytes: Optional[int] = None
+) -> AsyncIterator[Tuple[int, Union[bytes, LineTooLongError]]]:
+    """
+    Split a byte stream into (line number, line) pairs without buffering the whole body
+
+    Numbers count every physical line, blank ones included, so they map
+    back to the client's file; blank lines themselves are not yielded. A
+    line over the limit is yielded as a LineTooLongError in place of its
+    bytes, and the rest of it is discarded up to the next newline.
+    """
+    limit = max_line_bytes or settings.BULK_INGEST_MAX_LINE_BYTES
+    pending = b""
+    number = 0
+    skipping = False
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            number += 1
+            if skipping or len(line) > limit:
+                skipping = False
+                yield number, LineTooLongError(f"Line longer than {limit} bytes")
+            elif line.strip():
+                yield number, line
+        if len(pending) > limit:
+            # Only the newline ending this line matters now; drop what we have
+            skipping = True
+            pending = b""
+    if skipping:
+        yield number + 1, LineTooLongError(f"Line longer than {limit} bytes")
+    elif pending.strip():
+        yield number + 1, pending
+
+
+def _result(line: int, **fields) -> bytes:
+    return json.dumps({"line": line, **fields}, default=str).encode() + b"\n"
+
+
+async def _insert_chunk(
+    repository: AsyncRepository,
+    chunk: List[Tuple[int, Dict[str, Any]]],
+    user: Optional[str]
+) -> Tuple[List[bytes], bool]:
+    """Per-row results of inserting one chunk, and whether the insert failed"""
+    try:
+        rows = await repository.bulk_create([item for _, item in chunk], user)
+    except Exception as e:
+        # The chunk's transaction rolled back; none of its rows were written
+        logger.error(f"Error ingesting chunk at line {chunk[0][0]}: {str(e)}")
+        return [_result(line, status="error", error=f"Insert failed: {str(e)}") for line, _ in chunk], True
+    return [_result(line, status="created", id=row["id"]) for (line, _), row in zip(chunk, rows)], False
+
+
+async def ingest_ndjson(
+    chunks: AsyncIterator[bytes],
+    model: Type[BaseModel],
+    repository: AsyncRepository,
+    user: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+    exclude: Optional[set] = None
+) -> AsyncIterator[bytes]:
+    """
+    Validate and insert an NDJSON stream of create payloads chunk by chunk
+
+    Yields one NDJSON result per input line as soon as its chunk is
+    committed: {"line", "status": "created", "id"} or {"line", "status":
+    "invalid" | "error", "error"}. The last line is a summary. Each chunk
+    is one multi-row INSERT in its own transaction, so a failed chunk does
+    not undo earlier ones.
+    """
+    size = chunk_size or settings.BULK_INGEST_CHUNK_SIZE
+    chunk: List[Tuple[int, Dict[str, Any]]] = []
+    counts = {"created": 0, "invalid": 0, "error": 0}
+    records = 0
+
+    async def flush():
+        results, failed = await _insert_chunk(repository, chunk, user)
+        counts["error" if failed else "created"] += len(results)
+        chunk.clear()
+        return results
+
+    async for line_number, line in ndjson_lines(chunks):
+        records += 1
+        try:
+            if isinstance(line, LineTooLongError):
+                raise line
+            item = model.parse_obj(json.loads(line)).dict(exclude=exclude)
+        except (ValueError, ValidationError) as e:
+            counts["invalid"] += 1
+            yield _result(line_number, status="invalid", error=str(e))
+            continue
+        chunk.append((line_number, item))
+        if len(chunk) >= size:
+            for result in await flush():
+                yield result
+    if chunk:
+        for result in await flush():
+            yield result
+    yield json.dumps({"summary": {"lines": records, **counts}}).encode() + b"\n"
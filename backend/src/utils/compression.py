@@ -0,0 +1,294 @@
+import asyncio
+import gzip
+import logging
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip is offered on its own without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/x-ndjson", "application/javascript",
+    "application/xml", "application/problem+json", "image/svg+xml"
+)
+
+# Bodies above this are compressed at a lower level; CPU grows faster than the savings
+LARGE_BODY = 1024 * 1024
+# Bodies above this are compressed off the event loop
+THREAD_BODY = 256 * 1024
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Content codings and their q-values from an Accept-Encoding header"""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def negotiate(header: Optional[str]) -> Optional[str]:
+    """Best coding this server offers for an Accept-Encoding header; br over gzip on ties"""
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    offered = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_quality = None, 0.0
+    for coding in offered:
+        quality = accepted.get(coding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(body: bytes, coding: str) -> bytes:
+    large = len(body) > LARGE_BODY
+    if coding == "br":
+        quality = min(settings.COMPRESSION_BROTLI_QUALITY, 3) if large else settings.COMPRESSION_BROTLI_QUALITY
+        return brotli.compress(body, quality=quality)
+    level = min(settings.COMPRESSION_GZIP_LEVEL, 3) if large else settings.COMPRESSION_GZIP_LEVEL
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class _StreamCompressor:
+    """Incremental encoder; every chunk is flushed so streamed lines arrive promptly"""
+
+    def __init__(self, coding: str):
+        self.coding = coding
+        if coding == "br":
+            self._encoder = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._encoder = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.coding == "br":
+            return self._encoder.process(data) + self._encoder.flush()
+        return self._encoder.compress(data) + self._encoder.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.coding == "br":
+            return self._encoder.finish()
+        return self._encoder.flush(zlib.Z_FINISH)
+
+
+@dataclass
+class _Savings:
+    """Moving average of the share of bytes compression saved on one endpoint"""
+    ratio: float = 1.0
+    samples: int = 0
+    skipped: int = 0
+
+
+class CompressedBodyCache:
+    """LRU of compressed GET bodies keyed by path, ETag and coding, bounded in bytes"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: Tuple[str, str, str], body: bytes):
+        if len(body) > self.max_bytes // 4:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = body
+            self._bytes += len(body)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with br or gzip, as the client accepts
+
+    Bodies under COMPRESSION_MIN_SIZE and non-text types go out as they
+    are. Complete bodies are compressed in one go and sent uncompressed if
+    that saved less than COMPRESSION_MIN_SAVINGS; endpoints whose responses
+    keep failing that test are only probed now and then. Streamed bodies
+    are compressed chunk by chunk. Compressed GET bodies that carry an
+    ETag are cached, so a polled resource that did not change is not
+    compressed again.
+    """
+
+    # Responses an endpoint needs before its savings average is trusted, and
+    # how often a skipped endpoint is probed again
+    MIN_SAMPLES = 8
+    PROBE_EVERY = 32
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None, min_savings: Optional[float] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+        self.min_savings = settings.COMPRESSION_MIN_SAVINGS if min_savings is None else min_savings
+        self.cache = CompressedBodyCache(settings.COMPRESSION_CACHE_ENTRIES, settings.COMPRESSION_CACHE_MAX_BYTES)
+        self._savings: Dict[object, _Savings] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+        await _Responder(self, scope, coding, send).run(receive)
+
+    def worth_trying(self, endpoint: object) -> bool:
+        savings = self._savings.get(endpoint)
+        if savings is None or savings.samples < self.MIN_SAMPLES or savings.ratio >= self.min_savings:
+            return True
+        savings.skipped += 1
+        return savings.skipped % self.PROBE_EVERY == 0
+
+    def record(self, endpoint: object, original: int, compressed: int):
+        savings = self._savings.setdefault(endpoint, _Savings())
+        saved = 1 - compressed / original if original else 0.0
+        savings.ratio = saved if not savings.samples else 0.8 * savings.ratio + 0.2 * saved
+        savings.samples += 1
+
+
+class _Responder:
+    """Per-request state: holds the response start until the first body chunk decides"""
+
+    def __init__(self, middleware: CompressionMiddleware, scope: Scope, coding: str, send: Send):
+        self.middleware = middleware
+        self.scope = scope
+        self.coding = coding
+        self.send = send
+        self.start: Optional[Message] = None
+        self.stream: Optional[_StreamCompressor] = None
+        self.passthrough = False
+
+    async def run(self, receive: Receive):
+        await self.middleware.app(self.scope, receive, self.intercept)
+
+    def _compressible(self, message: Message) -> bool:
+        if message["status"] in (204, 206, 304) or message["status"] < 200:
+            return False
+        headers = Headers(raw=message["headers"])
+        if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    async def intercept(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            self.passthrough = not self._compressible(message)
+            if self.passthrough:
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.stream is not None:
+            data = self.stream.chunk(body) if body else b""
+            if not more_body:
+                data += self.stream.finish()
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+            return
+
+        if more_body:
+            await self._start_stream(body)
+        else:
+            await self._send_whole(body)
+
+    def _headers(self) -> MutableHeaders:
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers.add_vary_header("Accept-Encoding")
+        return headers
+
+    async def _send_whole(self, body: bytes):
+        endpoint = self.scope.get("endpoint")
+        if len(body) < self.middleware.minimum_size or not self.middleware.worth_trying(endpoint):
+            self._headers()
+            await self.send(self.start)
+            await self.send({"type": "http.response.body", "body": body})
+            return
+
+        headers = self._headers()
+        cache_key = None
+        etag = headers.get("etag")
+        if etag and self.scope["method"] == "GET" and self.start["status"] == 200 \
+                and "no-store" not in headers.get("cache-control", ""):
+            query = self.scope.get("query_string", b"").decode("latin-1")
+            cache_key = (f"{self.scope['path']}?{query}", etag, self.coding)
+            compressed = self.middleware.cache.get(cache_key)
+            if compressed is not None:
+                await self._send_compressed(headers, compressed)
+                return
+
+        if len(body) > THREAD_BODY:
+            compressed = await asyncio.to_thread(compress, body, self.coding)
+        else:
+            compressed = compress(body, self.coding)
+        self.middleware.record(endpoint, len(body), len(compressed))
+        if len(compressed) > len(body) * (1 - self.middleware.min_savings):
+            # Not worth the client's decompression either
+            await self.send(self.start)
+            await self.send({"type": "http.response.body", "body": body})
+            return
+        if cache_key is not None:
+            self.middleware.cache.put(cache_key, compressed)
+        await self._send_compressed(headers, compressed)
+
+    async def _send_compressed(self, headers: MutableHeaders, compressed: bytes):
+        # The ETag is left as is so If-Match / If-None-Match keep working across codings
+        headers["Content-Encoding"] = self.coding
+        headers["Content-Length"] = str(len(compressed))
+        await self.send(self.start)
+        await self.send({"type": "http.response.body", "body": compressed})
+
+    async def _start_stream(self, body: bytes):
+        headers = self._headers()
+        headers["Content-Encoding"] = self.coding
+        if "content-length" in headers:
+            del headers["content-length"]
+        self.stream = _StreamCompressor(self.coding)
+        await self.send(self.start)
+        await self.send({"type": "http.response.body", "body": self.stream.chunk(body) if body else b"", "more_body": True})
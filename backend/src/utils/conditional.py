@@ -0,0 +1,75 @@
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from fastapi import HTTPException, Response, status
+
+
+def item_etag(item_id: Any, version: int) -> str:
+    """Strong ETag of one row; the version changes on every write"""
+    return f'"{item_id}-{version}"'
+
+
+def list_etag(rows: Iterable[Dict[str, Any]], meta: Optional[Dict[str, Any]] = None) -> str:
+    """Weak ETag of a list page from its rows' ids and versions and the page fields"""
+    digest = hashlib.blake2b(digest_size=12)
+    for row in rows:
+        digest.update(f"{row['id']}-{row['version']};".encode())
+    if meta:
+        digest.update(json.dumps(meta, sort_keys=True, default=str).encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def _entity_tags(header: str) -> List[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def _opaque(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def not_modified(if_none_match: Optional[str], etag: str) -> bool:
+    """True if If-None-Match matches the current ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    tags = _entity_tags(if_none_match)
+    return "*" in tags or _opaque(etag) in {_opaque(tag) for tag in tags}
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def expected_versions(if_match: Optional[str], item_id: Any) -> Optional[List[int]]:
+    """
+    Versions an If-Match header allows a write to replace
+
+    None means no precondition (no header, or "*"). Weak tags never match,
+    as If-Match requires strong comparison; tags of other rows are ignored.
+    Raises 412 if no tag in the header can match this row.
+    """
+    if not if_match:
+        return None
+    tags = _entity_tags(if_match)
+    if "*" in tags:
+        return None
+    versions = []
+    prefix = f'"{item_id}-'
+    for tag in tags:
+        if tag.startswith(prefix) and tag.endswith('"'):
+            try:
+                versions.append(int(tag[len(prefix):-1]))
+            except ValueError:
+                continue
+    if not versions:
+        raise precondition_failed()
+    return versions
+
+
+def precondition_failed(etag: Optional[str] = None) -> HTTPException:
+    """412 for a write whose If-Match no longer matches the stored version"""
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="Resource was modified; fetch it again and retry with the new ETag",
+        headers={"ETag": etag} if etag else None
+    )
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Iterable, List, Optional, Tuple, TypeVar
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# Keys per IN (...) query; larger batches are split
+MAX_BATCH_SIZE = 500
+
+
+class DataLoader(Generic[K, V]):
+    """
+    Coalesces single-key lookups into batched ones
+
+    Every load() issued in the same event-loop tick, e.g. by the tasks of
+    one asyncio.gather, is answered by one batch_load() call with all their
+    keys. batch_load returns the values it found keyed by key; missing keys
+    load as None. Results are memoized for the loader's lifetime, which is
+    one request when it comes from get_loader().
+    """
+
+    def __init__(
+        self,
+        batch_load: Callable[[List[K]], Awaitable[Dict[K, V]]],
+        max_batch_size: int = MAX_BATCH_SIZE
+    ):
+        self.batch_load = batch_load
+        self.max_batch_size = max_batch_size
+        self._results: Dict[K, asyncio.Future] = {}
+        # Keys waiting for the next batch, each with the future its load() callers await
+        self._queue: List[Tuple[K, asyncio.Future]] = []
+        self.stats = {"loads": 0, "batches": 0, "keys": 0}
+
+    async def load(self, key: K) -> Optional[V]:
+        """Value for a key"""
+        self.stats["loads"] += 1
+        future = self._results.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._results[key] = loop.create_future()
+            self._queue.append((key, future))
+            if len(self._queue) == 1:
+                # Runs after everything already scheduled for this tick has queued its keys
+                loop.call_soon(self._dispatch)
+        # Shared by every caller of the key; one caller being cancelled must not cancel it for the rest
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: Iterable[K]) -> List[Optional[V]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: K, value: Optional[V]):
+        """Set a key's value, e.g. after writing it, so later loads in the request see it"""
+        future = self._results[key] = asyncio.get_running_loop().create_future()
+        future.set_result(value)
+
+    def clear(self, key: K):
+        """Forget a key so the next load reads it again"""
+        future = self._results.get(key)
+        if future is not None and future.done():
+            del self._results[key]
+
+    def _dispatch(self):
+        # Futures come from the queue, not _results: prime() may have replaced a key's entry since load()
+        pending, self._queue = self._queue, []
+        for start in range(0, len(pending), self.max_batch_size):
+            asyncio.get_running_loop().create_task(self._run(pending[start:start + self.max_batch_size]))
+
+    async def _run(self, pending: List[Tuple[K, asyncio.Future]]):
+        self.stats["batches"] += 1
+        self.stats["keys"] += len(pending)
+        try:
+            found = await self.batch_load([key for key, _ in pending])
+        except Exception as e:
+            logger.error(f"Error loading batch of {len(pending)} keys: {str(e)}")
+            for key, future in pending:
+                # Failed keys are not memoized; a later load tries again
+                if self._results.get(key) is future:
+                    del self._results[key]
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in pending:
+            if not future.done():
+                future.set_result(found.get(key))
+
+
+_loaders: ContextVar[Optional[Dict[Hashable, DataLoader]]] = ContextVar("dataloaders", default=None)
+
+
+def get_loader(name: Hashable, batch_load: Callable[[List[Any]], Awaitable[Dict[Any, Any]]]) -> DataLoader:
+    """
+    The current request's loader for a name, created with batch_load on first use
+
+    Outside a request (no DataLoaderMiddleware scope) every call gets a
+    fresh loader, which still batches but shares nothing.
+    """
+    loaders = _loaders.get()
+    if loaders is None:
+        return DataLoader(batch_load)
+    loader = loaders.get(name)
+    if loader is None:
+        loader = loaders[name] = DataLoader(batch_load)
+    return loader
+
+
+class DataLoaderMiddleware:
+    """ASGI middleware giving each HTTP request its own set of loaders"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _loaders.set({})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _loaders.reset(token)
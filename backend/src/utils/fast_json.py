@@ -0,0 +1,72 @@
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Tuple, Type
+from uuid import UUID
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # Optional; the standard library encoder is the fallback
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Types neither encoder handles, encoded the way FastAPI's jsonable_encoder does"""
+    if isinstance(value, BaseModel):
+        return value.dict()
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON, through orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response for content that is already valid for its response model
+
+    Returning it from a route skips FastAPI's response_model validation
+    and jsonable_encoder pass; routes keep response_model for the OpenAPI
+    schema. Only hand it data that came from validated writes, e.g. rows
+    from the repository.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+_fields: Dict[Type[BaseModel], Tuple[Tuple[str, Any], ...]] = {}
+
+
+def _model_fields(model: Type[BaseModel]) -> Tuple[Tuple[str, Any], ...]:
+    fields = _fields.get(model)
+    if fields is None:
+        fields = _fields[model] = tuple(
+            (field.alias, field.default) for field in model.__fields__.values()
+        )
+    return fields
+
+
+def as_model_dicts(model: Type[BaseModel], rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rows cut down to a response model's fields, without validating them"""
+    fields = _model_fields(model)
+    return [{name: row.get(name, default) for name, default in fields} for row in rows]
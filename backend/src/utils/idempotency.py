@@ -0,0 +1,264 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+from utils.fast_json import dumps
+
+logger = logging.getLogger(__name__)
+
+HEADER = "idempotency-key"
+REPLAYED_HEADER = (b"idempotent-replayed", b"true")
+METHODS = ("POST", "PATCH")
+MAX_KEY_LENGTH = 255
+# Failures a retry may well get past; they are not stored, so a retry runs again
+RETRYABLE_STATUSES = (408, 409, 425, 429)
+
+# (caller, key); the caller is a hash of the credentials, so keys of different users never meet
+StoreKey = Tuple[str, str]
+
+
+@dataclass
+class StoredResponse:
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+
+
+@dataclass
+class _Entry:
+    fingerprint: str
+    expires: float = 0.0
+    response: Optional[StoredResponse] = None
+    # Set while the first request with the key runs; resolves to its response, or None if not stored
+    done: Optional[asyncio.Future] = field(default=None, repr=False)
+
+
+class IdempotencyStore:
+    """In-process LRU of responses by idempotency key, bounded in entries and by TTL"""
+
+    def __init__(self, ttl: float = settings.IDEMPOTENCY_TTL, max_entries: int = settings.IDEMPOTENCY_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[StoreKey, _Entry]" = OrderedDict()
+        self.stats = {"executed": 0, "replayed": 0, "waited": 0, "mismatched": 0}
+
+    def get(self, key: StoreKey) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.response is not None and entry.expires <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def claim(self, key: StoreKey, fingerprint: str) -> _Entry:
+        """Mark a key as in flight; duplicates wait on the returned entry"""
+        entry = self._entries[key] = _Entry(fingerprint, done=asyncio.get_running_loop().create_future())
+        self._evict()
+        return entry
+
+    def complete(self, key: StoreKey, entry: _Entry, response: Optional[StoredResponse]):
+        """Store the response of a claimed key, or release the key if response is None"""
+        if response is not None:
+            entry.response = response
+            entry.expires = time.monotonic() + self.ttl
+        elif self._entries.get(key) is entry:
+            del self._entries[key]
+        if not entry.done.done():
+            entry.done.set_result(response)
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.response is None:
+                # Never evict an in-flight key; its waiters hold on to the entry anyway
+                self._entries.move_to_end(key)
+                if all(other.response is None for other in self._entries.values()):
+                    return
+                continue
+            del self._entries[key]
+
+
+_idempotency_store: Optional[IdempotencyStore] = None
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """Get the process-wide idempotency store"""
+    global _idempotency_store
+    if _idempotency_store is None:
+        _idempotency_store = IdempotencyStore()
+    return _idempotency_store
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware honouring Idempotency-Key on POST and PATCH requests
+
+    The first request with a key runs as usual and its response is stored
+    for IDEMPOTENCY_TTL seconds; a retry with the same key and the same
+    request gets the stored response back (marked Idempotent-Replayed)
+    without running the endpoint again. A duplicate arriving while the
+    first one still runs waits for its response. Reusing a key for a
+    different request is answered 422.
+
+    Server errors and retryable statuses are not stored, so a retry after
+    them runs again. Keys are scoped to the caller's credentials. Bodies
+    over IDEMPOTENCY_MAX_BODY are not covered. The store is per worker.
+    """
+
+    def __init__(self, app: ASGIApp, store: Optional[IdempotencyStore] = None):
+        self.app = app
+        self.store = store or get_idempotency_store()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] not in METHODS:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        idempotency_key = headers.get(HEADER)
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            await _send_error(send, 400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+            return
+
+        body, complete = await _read_body(receive, settings.IDEMPOTENCY_MAX_BODY)
+        replay_receive = _replaying(body, complete, receive)
+        if not complete:
+            logger.warning(f"Request body over {settings.IDEMPOTENCY_MAX_BODY} bytes; Idempotency-Key ignored")
+            await self.app(scope, replay_receive, send)
+            return
+
+        caller = hashlib.blake2b(
+            (headers.get("authorization", "") + "\0" + headers.get("cookie", "")).encode(), digest_size=16
+        ).hexdigest()
+        key = (caller, idempotency_key)
+        fingerprint = _fingerprint(scope, body)
+
+        while True:
+            entry = self.store.get(key)
+            if entry is None:
+                break
+            if entry.fingerprint != fingerprint:
+                self.store.stats["mismatched"] += 1
+                await _send_error(send, 422, "Idempotency-Key was already used for a different request")
+                return
+            if entry.response is None:
+                self.store.stats["waited"] += 1
+                try:
+                    await asyncio.wait_for(asyncio.shield(entry.done), settings.IDEMPOTENCY_WAIT_TIMEOUT)
+                except asyncio.TimeoutError:
+                    await _send_error(send, 409, "A request with this Idempotency-Key is still in progress")
+                    return
+                # Not stored (e.g. it failed): the next loop claims the key and runs the request again
+                continue
+            self.store.stats["replayed"] += 1
+            await _replay(send, entry.response)
+            return
+
+        entry = self.store.claim(key, fingerprint)
+        self.store.stats["executed"] += 1
+        recorder = _Recorder(send, settings.IDEMPOTENCY_MAX_BODY)
+        response = None
+        try:
+            await self.app(scope, replay_receive, recorder.send)
+            response = recorder.stored()
+        finally:
+            self.store.complete(key, entry, response)
+
+
+def _fingerprint(scope: Scope, body: bytes) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{scope['method']} {scope['path']}?".encode())
+    digest.update(scope.get("query_string", b""))
+    digest.update(b"\0")
+    digest.update(body)
+    return digest.hexdigest()
+
+
+async def _read_body(receive: Receive, limit: int) -> Tuple[bytes, bool]:
+    """Request body, and whether it was read to the end within the limit"""
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return b"".join(chunks), False
+        chunk = message.get("body", b"")
+        chunks.append(chunk)
+        size += len(chunk)
+        if not message.get("more_body", False):
+            return b"".join(chunks), True
+        if size > limit:
+            return b"".join(chunks), False
+
+
+def _replaying(body: bytes, complete: bool, receive: Receive) -> Receive:
+    """receive() that hands out the already read body first, then the rest of the stream"""
+    sent = False
+
+    async def replay() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": not complete}
+        return await receive()
+
+    return replay
+
+
+class _Recorder:
+    """send() wrapper passing the response through while keeping a copy to store"""
+
+    def __init__(self, send: Send, limit: int):
+        self._send = send
+        self.limit = limit
+        self.status = 500
+        self.headers: List[Tuple[bytes, bytes]] = []
+        self.chunks: List[bytes] = []
+        self.size = 0
+        self.finished = False
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+            self.headers = list(message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            self.size += len(body)
+            if self.size <= self.limit:
+                self.chunks.append(body)
+            if not message.get("more_body", False):
+                self.finished = True
+        await self._send(message)
+
+    def stored(self) -> Optional[StoredResponse]:
+        if not self.finished or self.size > self.limit:
+            return None
+        if self.status >= 500 or self.status in RETRYABLE_STATUSES:
+            return None
+        return StoredResponse(self.status, self.headers, b"".join(self.chunks))
+
+
+async def _replay(send: Send, response: StoredResponse):
+    await send({"type": "http.response.start", "status": response.status, "headers": response.headers + [REPLAYED_HEADER]})
+    await send({"type": "http.response.body", "body": response.body})
+
+
+async def _send_error(send: Send, status: int, detail: str):
+    body = dumps({"detail": detail})
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    })
+    await send({"type": "http.response.body", "body": body})
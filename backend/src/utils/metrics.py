@@ -0,0 +1,422 @@
+import asyncio
+import bisect
+import glob
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+from utils.fast_json import dumps
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+# Label for requests no route matched (404s, probes); their raw paths would be unbounded
+UNMATCHED_ROUTE = "<unmatched>"
+KNOWN_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+Labels = Tuple[str, ...]
+
+
+class _CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        self.value += amount
+
+    def sample(self) -> float:
+        return self.value
+
+
+class _GaugeValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = float(value)
+
+    def sample(self) -> float:
+        return self.value
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # Per bucket, not cumulative; the last one is +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def sample(self) -> List[Any]:
+        return [list(self.counts), self.sum]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Labels, Any] = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: Any, **named: Any):
+        """The time series for a set of label values, created on first use"""
+        if named:
+            values = tuple(named[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {key}")
+            child = self._children[key] = self._new_child()
+        return child
+
+    def samples(self) -> Dict[Labels, Any]:
+        return {key: child.sample() for key, child in self._children.items()}
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. requests served"""
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. requests in flight"""
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets, e.g. latencies"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics with a Prometheus text export
+
+    Services register their own metrics through counter(), gauge() and
+    histogram(); registering a name again returns the existing metric.
+    Updates are plain in-memory arithmetic on the event loop.
+
+    With METRICS_MULTIPROCESS_DIR set every worker writes its samples to
+    <dir>/<pid>.json every METRICS_SYNC_INTERVAL seconds, and render() sums
+    the files of all workers, so any worker answers /metrics for the whole
+    server. Counters and histograms of workers that exited are kept;
+    gauges only count for live workers. Empty the directory on deploy.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = settings.METRICS_MULTIPROCESS_DIR,
+        sync_interval: float = settings.METRICS_SYNC_INTERVAL
+    ):
+        self.directory = directory
+        self.sync_interval = sync_interval
+        self._metrics: Dict[str, _Metric] = {}
+        self._sync_task: Optional[asyncio.Task] = None
+
+    def _register(self, cls: Type[_Metric], name: str, documentation: str, labelnames: Sequence[str], **options) -> Any:
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, documentation, labelnames, **options)
+        elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+            raise ValueError(f"Metric {name} is already registered as a {metric.kind} with labels {metric.labelnames}")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """This worker's metrics as plain data"""
+        return {
+            name: {
+                "kind": metric.kind,
+                "help": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "buckets": list(getattr(metric, "buckets", ())),
+                "samples": [[list(labels), value] for labels, value in metric.samples().items()]
+            }
+            for name, metric in self._metrics.items()
+        }
+
+    def write_snapshot(self, snapshot: Optional[Dict[str, Dict[str, Any]]] = None):
+        """Write this worker's metrics, or a snapshot of them, to the shared directory"""
+        if not self.directory:
+            return
+        if snapshot is None:
+            snapshot = self.snapshot()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        partial = f"{path}.tmp"
+        with open(partial, "wb") as handle:
+            handle.write(dumps({"pid": os.getpid(), "written": time.time(), "metrics": snapshot}))
+        # Readers see the old file or the new one, never half of one
+        os.replace(partial, path)
+
+    def _worker_snapshots(self) -> List[Tuple[Dict[str, Any], bool]]:
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                with open(path, "rb") as handle:
+                    data = json.load(handle)
+            except (OSError, ValueError) as e:
+                logger.error(f"Error reading metrics file {path}: {str(e)}")
+                continue
+            if data.get("pid") != os.getpid():
+                snapshots.append((data["metrics"], _alive(data["pid"])))
+        return snapshots
+
+    def collect(self, snapshot: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+        """Metrics of this worker, summed with every other worker's when a shared directory is set"""
+        merged = self.snapshot() if snapshot is None else snapshot
+        for family in merged.values():
+            family["samples"] = {tuple(labels): value for labels, value in family["samples"]}
+        if not self.directory:
+            return merged
+        for metrics, alive in self._worker_snapshots():
+            for name, family in metrics.items():
+                if family["kind"] == "gauge" and not alive:
+                    continue
+                target = merged.get(name)
+                if target is None:
+                    target = merged[name] = {**family, "samples": {}}
+                elif target["kind"] != family["kind"] or target["buckets"] != family["buckets"]:
+                    continue
+                samples = target["samples"]
+                for labels, value in family["samples"]:
+                    labels = tuple(labels)
+                    current = samples.get(labels)
+                    if current is None:
+                        samples[labels] = value
+                    elif family["kind"] == "histogram":
+                        samples[labels] = [[a + b for a, b in zip(current[0], value[0])], current[1] + value[1]]
+                    else:
+                        samples[labels] = current + value
+        return merged
+
+    def render(self, snapshot: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+        """
+        All metrics in the Prometheus text exposition format
+
+        Off the event loop, pass a snapshot() taken on it; the metrics
+        themselves are only safe to read where they are updated.
+        """
+        lines: List[str] = []
+        for name, family in sorted(self.collect(snapshot).items()):
+            lines.append(f"# HELP {name} {_escape_help(family['help'])}")
+            lines.append(f"# TYPE {name} {family['kind']}")
+            labelnames = family["labelnames"]
+            for labels, value in sorted(family["samples"].items()):
+                if family["kind"] != "histogram":
+                    lines.append(f"{name}{_labels(labelnames, labels)} {_number(value)}")
+                    continue
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip(list(family["buckets"]) + [float("inf")], counts):
+                    cumulative += count
+                    le = _labels(labelnames + ["le"], labels + ("+Inf" if bound == float("inf") else _number(bound),))
+                    lines.append(f"{name}_bucket{le} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labelnames, labels)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(labelnames, labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    async def start(self):
+        """Start writing this worker's metrics to the shared directory"""
+        if self.directory and self._sync_task is None:
+            self._sync_task = asyncio.get_running_loop().create_task(self._sync_loop())
+
+    async def stop(self):
+        """Stop the periodic write and write the final numbers"""
+        if self._sync_task is None:
+            return
+        self._sync_task.cancel()
+        try:
+            await self._sync_task
+        except asyncio.CancelledError:
+            pass
+        self._sync_task = None
+        try:
+            await asyncio.to_thread(self.write_snapshot, self.snapshot())
+        except OSError as e:
+            logger.error(f"Error writing metrics snapshot: {str(e)}")
+
+    async def _sync_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.write_snapshot, self.snapshot())
+            except OSError as e:
+                logger.error(f"Error writing metrics snapshot: {str(e)}")
+            await asyncio.sleep(self.sync_interval)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _number(value: float) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)) + "}"
+
+
+_metrics_registry: Optional[MetricsRegistry] = None
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Get the process-wide metrics registry"""
+    global _metrics_registry
+    if _metrics_registry is None:
+        _metrics_registry = MetricsRegistry()
+    return _metrics_registry
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route HTTP metrics
+
+    Routes are labelled by their path template (/api/files/{item_id}), so
+    the number of series stays bounded however many ids are requested.
+    Sizes are the bytes that actually crossed the wire.
+    """
+
+    def __init__(self, app: ASGIApp, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        registry = registry or get_metrics_registry()
+        self.requests = registry.counter(
+            "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+        )
+        self.latency = registry.histogram(
+            "http_request_duration_seconds", "Time from request to the last response byte", ("method", "route")
+        )
+        self.in_flight = registry.gauge("http_requests_in_flight", "HTTP requests being served", ("method",))
+        self.request_size = registry.histogram(
+            "http_request_size_bytes", "Request body sizes", ("method", "route"), buckets=SIZE_BUCKETS
+        )
+        self.response_size = registry.histogram(
+            "http_response_size_bytes", "Response body sizes", ("method", "route"), buckets=SIZE_BUCKETS
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"] if scope["method"] in KNOWN_METHODS else "OTHER"
+        in_flight = self.in_flight.labels(method)
+        status = 500
+        request_bytes = response_bytes = 0
+
+        async def counting_receive() -> Message:
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message: Message):
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.dec()
+            # Set by FastAPI's routing on the shared scope once a route matched
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            self.requests.labels(method, route, status).inc()
+            self.latency.labels(method, route).observe(elapsed)
+            self.request_size.labels(method, route).observe(request_bytes)
+            self.response_size.labels(method, route).observe(response_bytes)
@@ -0,0 +1,90 @@
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import tuple_
+
+from config import settings
+
+
+class PaginationMode(str, Enum):
+    OFFSET = "offset"
+    CURSOR = "cursor"
+
+
+class CountMode(str, Enum):
+    EXACT = "exact"
+    # Count at most PAGINATION_COUNT_CAP rows; bounded cost on large tables
+    APPROXIMATE = "approximate"
+    NONE = "none"
+
+
+class InvalidCursorError(ValueError):
+    """Cursor that was not produced by encode_cursor"""
+    pass
+
+
+def encode_cursor(created_at: datetime, item_id: Union[int, str]) -> str:
+    """Opaque cursor for the position after a row, on (created_at, id)"""
+    payload = json.dumps([created_at.isoformat(), item_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, Union[int, str]]:
+    """Position encoded by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(item_id, (int, str)):
+            raise ValueError("cursor id must be an int or string")
+        return datetime.fromisoformat(created_at), item_id
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {str(e)}")
+
+
+def keyset_clause(created_column, id_column, cursor: str, descending: bool = True):
+    """WHERE clause selecting the rows after the cursor in (created_at, id) order"""
+    created_at, item_id = decode_cursor(cursor)
+    if descending:
+        return tuple_(created_column, id_column) < tuple_(created_at, item_id)
+    return tuple_(created_column, id_column) > tuple_(created_at, item_id)
+
+
+def count_cap(mode: CountMode) -> Optional[int]:
+    """Row limit for a count query; None for an exact count"""
+    return settings.PAGINATION_COUNT_CAP if mode == CountMode.APPROXIMATE else None
+
+
+@dataclass
+class Page:
+    """One page of rows and the pagination fields of the list response models"""
+    items: List[Dict[str, Any]]
+    per_page: int
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+    page: Optional[int] = None
+    has_next: bool = False
+    has_prev: bool = False
+    next_cursor: Optional[str] = None
+
+    @property
+    def pages(self) -> Optional[int]:
+        if self.total is None:
+            return None
+        return (self.total + self.per_page - 1) // self.per_page
+
+    def meta(self) -> Dict[str, Any]:
+        """Everything but the items, for List(**page.meta())"""
+        return {
+            "total": self.total,
+            "total_is_estimate": self.total_is_estimate,
+            "page": self.page,
+            "per_page": self.per_page,
+            "pages": self.pages,
+            "has_next": self.has_next,
+            "has_prev": self.has_prev,
+            "next_cursor": self.next_cursor
+        }
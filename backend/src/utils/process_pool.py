@@ -0,0 +1,312 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Set
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSaturatedError(RuntimeError):
+    """Raised when no pool slot frees up within the submit timeout"""
+
+
+def _warm_worker():
+    """Process initializer: import the text analysis the detector tasks use"""
+    # A failed warm-up must not kill the worker; tasks then load lazily
+    try:
+        from textblob import TextBlob
+        # First parse pulls in the tokenizer and corpora
+        TextBlob("Warm up the sentence tokenizer. Then the word tokenizer.").words
+    except Exception as e:
+        logger.warning(f"TextBlob warm-up failed: {str(e)}")
+
+
+def _ping() -> bool:
+    """No-op task used to force worker start-up"""
+    time.sleep(0.05)
+    return True
+
+
+class DetectorProcessPool:
+    """
+    Managed process pool for CPU-bound anti-cheat work
+
+    Keeps TextBlob parsing, NumPy aggregation and model scoring off the event
+    loop. Submissions are bounded: once every slot is busy, callers wait at
+    most `submit_timeout` seconds before a PoolSaturatedError is raised, so a
+    burst of long essays sheds load instead of queueing without limit.
+
+    A task that times out while running cannot be interrupted, so its worker
+    stays busy. Once `max_abandoned` such tasks are running, the executor is
+    replaced; the old one gets `task_timeout` seconds to finish its other
+    tasks before its processes are killed and their slots freed.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = settings.ANTI_CHEAT_POOL_WORKERS,
+        queue_depth: int = settings.ANTI_CHEAT_POOL_QUEUE_DEPTH,
+        task_timeout: float = settings.ANTI_CHEAT_TASK_TIMEOUT,
+        submit_timeout: Optional[float] = settings.ANTI_CHEAT_SUBMIT_TIMEOUT,
+        max_abandoned: int = settings.ANTI_CHEAT_POOL_MAX_ABANDONED
+    ):
+        self.max_workers = max_workers
+        self.capacity = max_workers * queue_depth
+        self.task_timeout = task_timeout
+        self.submit_timeout = submit_timeout
+        self.max_abandoned = max(1, max_abandoned)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+        # Tasks submitted to the current executor and not finished yet, and those of them past their timeout
+        self._outstanding: Set[Future] = set()
+        self._abandoned: Set[Future] = set()
+        # Whether the current executor's workers are warm; tasks timing out before that are not stuck
+        self._ready = False
+        # Replaced executors waiting for their remaining tasks before their workers are killed
+        self._retiring: Set[asyncio.Task] = set()
+        self._warmup: Optional[asyncio.Task] = None
+        self.stats = {"submitted": 0, "completed": 0, "timed_out": 0, "rejected": 0, "restarts": 0, "recycles": 0}
+
+    @property
+    def in_flight(self) -> int:
+        """Number of tasks currently holding a pool slot"""
+        return self._in_flight
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker
+        )
+
+    async def start(self):
+        """Start worker processes and wait until every worker is warm"""
+        if self._executor is not None:
+            return
+        self._slots = asyncio.Semaphore(self.capacity)
+        self._executor = self._create_executor()
+        await self._warm(self._executor)
+
+    async def _warm(self, executor: ProcessPoolExecutor):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            loop.run_in_executor(executor, _ping) for _ in range(self.max_workers)
+        ])
+        if self._executor is executor:
+            self._ready = True
+        logger.info(
+            f"Detector process pool ready: {self.max_workers} workers warmed in "
+            f"{time.perf_counter() - started:.2f}s"
+        )
+
+    def start_warmup(self):
+        """Start and warm the workers in the background; the first task waits only if they are not up yet"""
+        if self._warmup is None and self._executor is None:
+            self._warmup = asyncio.get_running_loop().create_task(self._run_warmup())
+
+    async def _run_warmup(self, executor: Optional[ProcessPoolExecutor] = None):
+        try:
+            await (self.start() if executor is None else self._warm(executor))
+        except Exception as e:
+            # Workers that failed to start are replaced on the first task
+            logger.error(f"Error warming detector process pool: {str(e)}")
+
+    async def shutdown(self):
+        """Stop the worker processes, dropping queued tasks"""
+        if self._warmup is not None:
+            if not self._warmup.done():
+                self._warmup.cancel()
+                try:
+                    await self._warmup
+                except asyncio.CancelledError:
+                    pass
+            self._warmup = None
+        for task in list(self._retiring):
+            task.cancel()
+        if self._retiring:
+            await asyncio.gather(*self._retiring, return_exceptions=True)
+        if self._executor is None:
+            return
+        executor, self._executor = self._executor, None
+        if any(not task.done() for task in self._abandoned):
+            # Stuck workers would hold up the shutdown forever
+            for process in (executor._processes or {}).values():
+                process.kill()
+        await asyncio.to_thread(executor.shutdown, True, cancel_futures=True)
+        logger.info("Detector process pool stopped")
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """Run a picklable function in the pool and await its result"""
+        if self._executor is None:
+            await self.start()
+
+        try:
+            if self.submit_timeout is None:
+                await self._slots.acquire()
+            else:
+                await asyncio.wait_for(self._slots.acquire(), self.submit_timeout)
+        except asyncio.TimeoutError:
+            self.stats["rejected"] += 1
+            raise PoolSaturatedError(f"Detector pool saturated ({self.capacity} tasks in flight)")
+        self._in_flight += 1
+
+        # The slot is held until the worker really finishes, so abandoned
+        # tasks still count against capacity while they burn CPU
+        slots = self._slots
+
+        def _release_slot(done: Optional[Future] = None):
+            self._in_flight -= 1
+            self._outstanding.discard(done)
+            slots.release()
+
+        executor = self._executor
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            _release_slot()
+            await self._restart(executor)
+            raise
+        except Exception:
+            _release_slot()
+            raise
+
+        loop = asyncio.get_running_loop()
+
+        def _release(done: Future):
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_release_slot, done)
+
+        self._outstanding.add(future)
+        future.add_done_callback(_release)
+        self.stats["submitted"] += 1
+
+        try:
+            result = await asyncio.wait_for(
+                asyncio.wrap_future(future),
+                timeout if timeout is not None else self.task_timeout
+            )
+            self.stats["completed"] += 1
+            return result
+        except asyncio.TimeoutError:
+            self.stats["timed_out"] += 1
+            logger.warning(f"Detector task {getattr(fn, '__name__', fn)} exceeded its timeout")
+            if not future.cancel():
+                # Already running; only killing its worker gets the process back
+                self._abandon(executor, future)
+            raise
+        except BrokenProcessPool:
+            await self._restart(executor)
+            raise
+
+    async def _restart(self, broken: ProcessPoolExecutor):
+        """Replace a broken executor with a fresh one, unless another task already did"""
+        # Every task in flight on the broken executor fails and lands here; only the first replaces it
+        if self._executor is not broken:
+            return
+        logger.error("Detector process pool broke, restarting workers")
+        self.stats["restarts"] += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._replace_executor()
+
+    def _replace_executor(self):
+        """Swap in a fresh executor and warm its workers in the background"""
+        self._executor = self._create_executor()
+        self._outstanding, self._abandoned = set(), set()
+        self._ready = False
+        if self._warmup is not None and not self._warmup.done():
+            self._warmup.cancel()
+        self._warmup = asyncio.get_running_loop().create_task(self._run_warmup(self._executor))
+
+    def _abandon(self, executor: ProcessPoolExecutor, future: Future):
+        """Write off a task running past its timeout; replace the executor once too many are"""
+        if self._executor is not executor:
+            # Already replaced; its workers are killed when it retires
+            return
+        self._abandoned = {task for task in self._abandoned if not task.done()}
+        self._abandoned.add(future)
+        if len(self._abandoned) < self.max_abandoned or not self._ready:
+            # Until the workers are warm, tasks time out waiting for them rather than being stuck
+            return
+        logger.error(f"{len(self._abandoned)} detector tasks stuck past their timeout, replacing the workers")
+        self.stats["recycles"] += 1
+        running = self._outstanding - self._abandoned
+        self._replace_executor()
+        task = asyncio.get_running_loop().create_task(self._retire(executor, running))
+        self._retiring.add(task)
+        task.add_done_callback(self._retiring.discard)
+
+    async def _retire(self, executor: ProcessPoolExecutor, running: Set[Future]):
+        """Give a replaced executor's other tasks until their timeout, then kill its workers"""
+        # Grab the processes now: shutdown() forgets them
+        processes = list((executor._processes or {}).values())
+        try:
+            if running:
+                await asyncio.to_thread(wait, running, self.task_timeout)
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.kill()
+            # The executor notices its dead workers and fails what is left, which frees their slots
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class EventLoopLagMonitor:
+    """Measures event loop responsiveness by timing a periodic sleep"""
+
+    def __init__(self, interval: float = 0.1, window: int = 600):
+        self.interval = interval
+        self.samples = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def snapshot(self) -> Dict[str, float]:
+        """Lag percentiles in milliseconds over the sample window"""
+        if not self.samples:
+            return {"samples": 0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        # numpy is imported here rather than at module level to keep app startup light
+        import numpy as np
+        lags = np.array(self.samples) * 1000
+        return {
+            "samples": int(lags.size),
+            "p50_ms": float(np.percentile(lags, 50)),
+            "p99_ms": float(np.percentile(lags, 99)),
+            "max_ms": float(lags.max())
+        }
+
+
+_detector_pool: Optional[DetectorProcessPool] = None
+
+
+def get_detector_pool() -> DetectorProcessPool:
+    """Get the application-wide detector process pool"""
+    global _detector_pool
+    if _detector_pool is None:
+        _detector_pool = DetectorProcessPool()
+    return _detector_pool
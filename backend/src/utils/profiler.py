@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilerBusyError(RuntimeError):
+    """A profile is already running on this worker"""
+
+
+class SamplingProfiler:
+    """
+    Time-boxed statistical profiler for the running worker
+
+    A helper thread wakes every interval seconds, reads the current stack
+    of the event loop thread (or of every thread) from
+    sys._current_frames() and counts it. The result is in the collapsed
+    format flamegraph.pl and speedscope read: one "frame;frame;frame count"
+    line per distinct stack, outermost frame first. Nothing is installed
+    in the interpreter, so there is no cost outside a profile; during one
+    the cost is a stack walk per interval on the helper thread.
+    """
+
+    def __init__(self):
+        self._running = False
+        self._labels: Dict[Any, str] = {}
+        self._roots: List[str] = []
+        self.stats = {"profiles": 0, "samples": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            path = code.co_filename
+            # Relative to its import root, so stdlib and site-packages frames stay readable
+            root = next((root for root in self._roots if path.startswith(root)), "")
+            path = path[len(root):]
+            label = self._labels[code] = f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ":")
+        return label
+
+    def _stack(self, frame) -> List[str]:
+        stack = []
+        while frame is not None:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    def _sample_loop(self, thread_ids: Optional[set], interval: float, until: float, stacks: Counter):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        while self._running and time.monotonic() < until:
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (thread_ids is not None and ident not in thread_ids):
+                    continue
+                stack = self._stack(frame)
+                if thread_ids is None:
+                    stack.insert(0, names.get(ident) or f"thread-{ident}")
+                stacks[";".join(stack)] += 1
+            time.sleep(interval)
+
+    async def profile(self, seconds: float, interval: float = 0.005, all_threads: bool = False) -> Dict[str, Any]:
+        """Sample for a number of seconds; the collapsed stacks and sample count"""
+        if self._running:
+            raise ProfilerBusyError("A profile is already running on this worker")
+        seconds = min(max(seconds, 0.01), settings.PROFILER_MAX_SECONDS)
+        interval = max(interval, settings.PROFILER_MIN_INTERVAL)
+        # Called on the event loop, so this is the loop's thread
+        thread_ids = None if all_threads else {threading.get_ident()}
+        stacks: Counter = Counter()
+        self._roots = sorted(
+            {os.path.join(os.path.abspath(entry), "") for entry in sys.path if entry},
+            key=len,
+            reverse=True
+        )
+        self._running = True
+        started = time.monotonic()
+        sampler = threading.Thread(
+            target=self._sample_loop,
+            args=(thread_ids, interval, started + seconds, stacks),
+            name="sampling-profiler",
+            daemon=True
+        )
+        try:
+            sampler.start()
+            # The loop keeps serving while it is sampled; that is the point
+            await asyncio.sleep(seconds)
+        finally:
+            self._running = False
+            await asyncio.to_thread(sampler.join)
+            self._labels.clear()
+        samples = sum(stacks.values())
+        self.stats["profiles"] += 1
+        self.stats["samples"] += samples
+        logger.info(f"Profiled worker {os.getpid()} for {seconds:.1f}s: {samples} samples, {len(stacks)} stacks")
+        return {
+            "samples": samples,
+            "seconds": time.monotonic() - started,
+            "collapsed": "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+        }
+
+
+class MemoryTracer:
+    """
+    tracemalloc snapshots diffed against a baseline
+
+    Tracing is off until start(); allocations cost nothing extra before
+    that. While it is on, snapshot() lists the sources whose allocations
+    grew the most since the baseline, which start() takes.
+    """
+
+    def __init__(self):
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._started_at: Optional[float] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self._started_at = time.time()
+            self._baseline = self._take()
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._baseline = None
+        self._started_at = None
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            "pid": os.getpid(),
+            "tracing": tracemalloc.is_tracing(),
+            "frames": tracemalloc.get_traceback_limit() if tracemalloc.is_tracing() else 0,
+            "started_at": self._started_at,
+            "traced_bytes": current,
+            "peak_bytes": peak
+        }
+
+    @staticmethod
+    def _take() -> tracemalloc.Snapshot:
+        # The tracer's own bookkeeping is not what anyone is looking for
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def snapshot(self, limit: int = 25, group_by: str = "lineno", reset_baseline: bool = False) -> Dict[str, Any]:
+        """Top allocation sources by growth since the baseline; blocking, run it in a thread"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Memory tracing is not running; start it first")
+        current = self._take()
+        stats = current.compare_to(self._baseline, group_by) if self._baseline is not None else []
+        top = [
+            {
+                "source": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+                "size_bytes": stat.size,
+                "size_diff_bytes": stat.size_diff,
+                "count": stat.count,
+                "count_diff": stat.count_diff
+            }
+            for stat in stats[:limit]
+        ]
+        if reset_baseline:
+            self._baseline = current
+        return {**self.status(), "group_by": group_by, "top": top}
+
+
+_profiler: Optional[SamplingProfiler] = None
+_memory_tracer: Optional[MemoryTracer] = None
+
+
+def get_profiler() -> SamplingProfiler:
+    """Get this worker's sampling profiler"""
+    global _profiler
+    if _profiler is None:
+        _profiler = SamplingProfiler()
+    return _profiler
+
+
+def get_memory_tracer() -> MemoryTracer:
+    """Get this worker's memory tracer"""
+    global _memory_tracer
+    if _memory_tracer is None:
+        _memory_tracer = MemoryTracer()
+    return _memory_tracer
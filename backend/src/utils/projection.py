@@ -0,0 +1,140 @@
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel
+
+from utils.conditional import list_etag
+from utils.fast_json import as_model_dicts
+
+# Every sparse item keeps its id, so clients can still address it
+ALWAYS_RETURNED = ("id",)
+
+
+class InvalidProjectionError(ValueError):
+    """Unknown field or relation in a fields / expand parameter"""
+    pass
+
+
+def relation_key(relation: str) -> str:
+    """Metadata key holding the id of a row's related resource, e.g. course -> course_id"""
+    return f"{relation}_id"
+
+
+def relation_label(relation: str) -> str:
+    """Name of the selected related id in a row; never returned to clients"""
+    return f"_{relation}_id"
+
+
+def _names(value: Optional[str]) -> List[str]:
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+@dataclass
+class Projection:
+    """
+    Fields of a resource to read and return, and relations to embed
+
+    fields is None for every field. expand maps each relation to embed to
+    the fields wanted from it, or None for all of them.
+    """
+    fields: Optional[Tuple[str, ...]] = None
+    expand: Dict[str, Optional[Tuple[str, ...]]] = field(default_factory=dict)
+
+    @property
+    def is_full(self) -> bool:
+        return self.fields is None and not self.expand
+
+    def key(self) -> Tuple:
+        """Hashable form, for statement caches"""
+        return self.fields, tuple(self.expand.items())
+
+    def variant(self) -> Dict[str, Any]:
+        """What distinguishes this representation, for ETags; empty for the full one"""
+        if self.is_full:
+            return {}
+        return {"fields": self.fields, "expand": self.expand}
+
+    def related_rows(self, rows: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for row in rows:
+            for relation in self.expand:
+                if row.get(relation) is not None:
+                    yield row[relation]
+
+    def etag(self, rows: Sequence[Dict[str, Any]], meta: Optional[Dict[str, Any]] = None) -> str:
+        """Weak ETag that changes with the rows, their embedded rows and the projection"""
+        return list_etag(chain(rows, self.related_rows(rows)), {**(meta or {}), **self.variant()})
+
+    def dump(self, model: Type[BaseModel], rows: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Rows as response items: the requested fields plus the embedded relations"""
+        if self.fields is None:
+            items = as_model_dicts(model, rows)
+        else:
+            returned = ALWAYS_RETURNED + tuple(name for name in self.fields if name not in ALWAYS_RETURNED)
+            items = [{name: row[name] for name in returned} for row in rows]
+        for relation, fields in self.expand.items():
+            for item, row in zip(items, rows):
+                related = row.get(relation)
+                if related is not None:
+                    names = related.keys() if fields is None else ALWAYS_RETURNED + fields
+                    related = {name: related[name] for name in names if not name.startswith("_")}
+                item[relation] = related
+        return items
+
+    def columns(self, columns: Sequence[str], relations: Mapping[str, Sequence[str]]) -> List[str]:
+        """Flat field names of the items dump() returns; embedded fields as relation.field"""
+        if self.fields is None:
+            names = list(columns)
+        else:
+            names = list(ALWAYS_RETURNED) + [name for name in self.fields if name not in ALWAYS_RETURNED]
+        for relation, fields in self.expand.items():
+            related = relations[relation] if fields is None else ALWAYS_RETURNED + fields
+            names.extend(f"{relation}.{name}" for name in related)
+        return names
+
+
+def parse_projection(
+    fields: Optional[str],
+    expand: Optional[str],
+    columns: Sequence[str],
+    relations: Mapping[str, Sequence[str]]
+) -> Projection:
+    """
+    Projection from comma-separated fields and expand parameters
+
+    columns are the resource's fields; relations maps each relation that
+    can be embedded to the related resource's fields. A dotted field such
+    as course.name picks fields of an expanded relation.
+    """
+    expanded = _names(expand)
+    unknown = [relation for relation in expanded if relation not in relations]
+    if unknown:
+        allowed = ", ".join(sorted(relations)) or "none"
+        raise InvalidProjectionError(f"Cannot expand {', '.join(unknown)}; relations: {allowed}")
+
+    own: List[str] = []
+    related: Dict[str, List[str]] = {}
+    for name in _names(fields):
+        relation, dot, related_field = name.partition(".")
+        if not dot:
+            if name not in columns:
+                raise InvalidProjectionError(f"Unknown field {name}")
+            if name not in own:
+                own.append(name)
+            continue
+        if relation not in expanded:
+            raise InvalidProjectionError(f"Field {name} needs expand={relation}")
+        if related_field not in relations[relation]:
+            raise InvalidProjectionError(f"Unknown field {name}")
+        related.setdefault(relation, [])
+        if related_field not in related[relation]:
+            related[relation].append(related_field)
+
+    return Projection(
+        # Only dotted fields given: the resource's own fields stay complete
+        fields=tuple(own) if own else None,
+        expand={
+            relation: tuple(related[relation]) if relation in related else None
+            for relation in dict.fromkeys(expanded)
+        }
+    )
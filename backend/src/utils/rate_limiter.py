@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import math
+import time
+from functools import wraps
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _Bucket:
+    """Token bucket state for one (route, user) key"""
+    __slots__ = ("tokens", "updated", "pending")
+
+    def __init__(self, capacity: float, now: float):
+        self.tokens = capacity
+        self.updated = now
+        # Calls taken locally since the last Redis sync
+        self.pending = 0
+
+
+class _Limit:
+    __slots__ = ("name", "max_calls", "time_window", "rate")
+
+    def __init__(self, name: str, max_calls: int, time_window: int):
+        self.name = name
+        self.max_calls = max_calls
+        self.time_window = time_window
+        self.rate = max_calls / time_window
+
+
+class RateLimiter:
+    """
+    Per-route, per-user rate limiter with a local fast path
+
+    Each worker keeps a token bucket per key and decides on the request path
+    without any I/O. A background task pushes the calls each worker took to a
+    Redis sliding-window counter shared by all workers, reads back the global
+    count and clamps the local buckets to what is left of the window, so a
+    key can overshoot its limit by at most one sync interval of traffic.
+    Without Redis the limiter still enforces the limit per worker.
+    """
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = settings.REDIS_URL,
+        sync_interval: float = settings.RATE_LIMIT_SYNC_INTERVAL,
+        key_prefix: str = "ratelimit"
+    ):
+        self.redis_url = redis_url
+        self.sync_interval = sync_interval
+        self.key_prefix = key_prefix
+        self._limits: Dict[str, _Limit] = {}
+        self._buckets: Dict[Tuple[str, str], _Bucket] = {}
+        self._redis = None
+        self._sync_task: Optional[asyncio.Task] = None
+        self.stats = {"allowed": 0, "rejected": 0, "syncs": 0, "sync_errors": 0}
+
+    def register(self, name: str, max_calls: int, time_window: int):
+        self._limits[name] = _Limit(name, max_calls, time_window)
+
+    def acquire(self, name: str, user: str) -> Optional[float]:
+        """Take one call from the bucket; returns None if allowed, else seconds until retry"""
+        limit = self._limits[name]
+        now = time.monotonic()
+        key = (name, user)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(limit.max_calls, now)
+            self._ensure_sync()
+        else:
+            bucket.tokens = min(limit.max_calls, bucket.tokens + (now - bucket.updated) * limit.rate)
+            bucket.updated = now
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            bucket.pending += 1
+            self.stats["allowed"] += 1
+            return None
+
+        self.stats["rejected"] += 1
+        return (1 - bucket.tokens) / limit.rate
+
+    def _ensure_sync(self):
+        if self._sync_task is not None or not self.redis_url:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._sync_task = loop.create_task(self._sync_loop())
+
+    async def start(self):
+        """Connect to Redis and start the background sync"""
+        self._ensure_sync()
+
+    async def stop(self):
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    async def _connect(self) -> bool:
+        if self._redis is not None:
+            return True
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            logger.warning("redis package not installed; rate limits are enforced per worker only")
+            self.redis_url = None
+            return False
+        self._redis = aioredis.from_url(self.redis_url)
+        return True
+
+    async def _sync_loop(self):
+        if not await self._connect():
+            self._sync_task = None
+            return
+        healthy = True
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+                healthy = True
+            except Exception as e:
+                self.stats["sync_errors"] += 1
+                # Log once per outage; the local buckets keep enforcing meanwhile
+                if healthy:
+                    logger.error(f"Error syncing rate limits with Redis: {str(e)}")
+                healthy = False
+
+    async def sync(self):
+        """Push locally taken calls to Redis and clamp buckets to the global window"""
+        if not self._buckets:
+            return
+        now = time.time()
+        monotonic_now = time.monotonic()
+        keys = list(self._buckets.items())
+
+        pipe = self._redis.pipeline(transaction=False)
+        sent = []
+        for (name, user), bucket in keys:
+            limit = self._limits[name]
+            window = int(now // limit.time_window)
+            current = f"{self.key_prefix}:{name}:{user}:{window}"
+            previous = f"{self.key_prefix}:{name}:{user}:{window - 1}"
+            sent.append(bucket.pending)
+            pipe.incrby(current, bucket.pending)
+            pipe.expire(current, limit.time_window * 2)
+            pipe.get(previous)
+        results = await pipe.execute()
+        self.stats["syncs"] += 1
+        # Counted in Redis only now; a failed sync leaves them pending for the next one.
+        # Calls taken during the round trip stay pending too.
+        for (_, bucket), pending in zip(keys, sent):
+            bucket.pending -= pending
+
+        for index, ((name, user), bucket) in enumerate(keys):
+            limit = self._limits[name]
+            current_count = int(results[index * 3])
+            previous_count = int(results[index * 3 + 2] or 0)
+            # Sliding window: weight the previous window by how much of it still overlaps
+            elapsed = (now % limit.time_window) / limit.time_window
+            used = previous_count * (1 - elapsed) + current_count
+            bucket.tokens = min(bucket.tokens, max(0.0, limit.max_calls - used))
+
+            # Forget idle keys whose bucket has refilled
+            idle = monotonic_now - bucket.updated
+            if bucket.pending == 0 and idle > limit.time_window:
+                del self._buckets[(name, user)]
+
+
+def _user_key(current_user) -> str:
+    if current_user is None:
+        return "anonymous"
+    return str(getattr(current_user, "id", current_user))
+
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get the process-wide rate limiter"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter(redis_url=settings.REDIS_URL if settings.RATE_LIMIT_REDIS_SYNC else None)
+    return _rate_limiter
+
+
+def rate_limit(max_calls: int, time_window: int):
+    """Rate limiting decorator; limits each user to max_calls per time_window seconds on this route"""
+    def decorator(func):
+        name = f"{func.__module__}.{func.__name__}"
+        get_rate_limiter().register(name, max_calls, time_window)
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            if settings.RATE_LIMIT_ENABLED:
+                retry_after = get_rate_limiter().acquire(name, _user_key(kwargs.get("current_user")))
+                if retry_after is not None:
+                    raise HTTPException(
+                        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                        detail="Rate limit exceeded",
+                        headers={
+                            "Retry-After": str(max(1, math.ceil(retry_after))),
+                            "X-RateLimit-Limit": str(max_calls),
+                            "X-RateLimit-Remaining": "0"
+                        }
+                    )
+            return await func(*args, **kwargs)
+        return wrapper
+    return decorator
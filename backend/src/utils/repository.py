@@ -0,0 +1,830 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import (
+    JSON, Column, DateTime, Index, Integer, String, Table, Text,
+    bindparam, delete, false, func, insert, or_, select, tuple_, update
+)
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import GenericFunction
+
+from config import settings
+from database import get_engine, metadata
+from utils.pagination import (
+    CountMode, InvalidCursorError, Page, PaginationMode, count_cap, decode_cursor, encode_cursor
+)
+from utils.projection import InvalidProjectionError, Projection, parse_projection, relation_key, relation_label
+from utils.resource_stats import DELETED, change_deltas, get_resource_stats, row_deltas
+from utils.search_index import MIN_PARTIAL_TOKEN, ORDERS, SearchIndex, get_search_index, tokenize
+
+logger = logging.getLogger(__name__)
+
+FILTER_KEYS = ("status", "type", "search", "tags", "created_after", "created_before")
+# "relevance" ranks search results by BM25 score; it needs a search filter
+SORT_KEYS = ("id", "name", "status", "type", "created_at", "updated_at", "relevance")
+# Rows read per query while (re)building a search index
+INDEX_BATCH_SIZE = 5000
+INDEX_FIELDS = ("id", "name", "description", "tags", "status", "type", "created_at", "version")
+# Catch-up re-reads this much before the watermark: timestamps are taken
+# before commit, so a slow transaction can land behind a later read
+INDEX_CATCH_UP_OVERLAP = timedelta(seconds=5)
+WRITABLE_COLUMNS = ("name", "description", "status", "type", "tags", "metadata")
+# Read whatever the projection: ETags need id and version, cursors created_at
+ALWAYS_SELECTED = ("id", "version", "created_at")
+
+# Relations ?expand= can embed, per resource: relation name -> related resource.
+# A row refers to its related row by id in metadata["<relation>_id"].
+RELATIONS: Dict[str, Dict[str, str]] = {
+    "assignments": {"course": "courses", "lesson": "lessons"},
+    "calendar": {"course": "courses", "assignment": "assignments"},
+    "feedback": {"course": "courses", "lesson": "lessons"},
+    "files": {"course": "courses", "lesson": "lessons", "assignment": "assignments"},
+    "grades": {"assignment": "assignments", "course": "courses"},
+    "lessons": {"course": "courses"},
+    "payments": {"subscription": "subscriptions"},
+    "progress": {"course": "courses", "lesson": "lessons"},
+    "reports": {"course": "courses"},
+}
+
+
+class InvalidQueryError(ValueError):
+    """Unknown filter or sort field in a repository query"""
+    pass
+
+
+class VersionConflictError(Exception):
+    """Write whose expected version no longer matches the stored row"""
+
+    def __init__(self, item_id: int, version: int):
+        super().__init__(f"Row {item_id} is at version {version}")
+        self.item_id = item_id
+        self.version = version
+
+
+def resource_table(name: str) -> Table:
+    """The table behind one CRUD resource; every template resource shares this layout"""
+    if name in metadata.tables:
+        return metadata.tables[name]
+    return Table(
+        name, metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("name", String(255), nullable=False),
+        Column("description", Text, nullable=True),
+        Column("status", String(20), nullable=False, default="active"),
+        Column("type", String(20), nullable=False, default="standard"),
+        Column("tags", JSON, nullable=False, default=list),
+        Column("metadata", JSON, nullable=False, default=dict),
+        Column("created_at", DateTime, nullable=False),
+        Column("updated_at", DateTime, nullable=True),
+        Column("created_by", String(64), nullable=True),
+        Column("updated_by", String(64), nullable=True),
+        Column("version", Integer, nullable=False, default=1),
+        Index(f"ix_{name}_status_type", "status", "type"),
+        # Keyset pagination walks (created_at, id)
+        Index(f"ix_{name}_created_at_id", "created_at", "id"),
+        # Search index catch-up reads rows changed since its watermark
+        Index(f"ix_{name}_updated_at", "updated_at"),
+    )
+
+
+def _plain(value: Any) -> Any:
+    return value.value if isinstance(value, Enum) else value
+
+
+def _timestamp(name: str, value: Any) -> datetime:
+    """Naive UTC datetime, the way timestamps are stored"""
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            raise InvalidQueryError(f"Invalid timestamp for {name}: {value}")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _related_id(value: Any) -> Optional[int]:
+    """Id of a related row as stored in metadata; ids may have been written as strings"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+
+def _projected(projection: Optional[Projection]) -> Optional[Tuple]:
+    """Statement cache key part of a projection; None when every field is read"""
+    return None if projection is None or projection.is_full else projection.key()
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _word_pattern(token: str) -> str:
+    """LIKE pattern for a search token over search_words(): a word prefix, or a whole word if the token is short"""
+    pattern = _like_pattern(f" {token}")
+    return pattern if len(token) >= MIN_PARTIAL_TOKEN else f"{pattern[:-1]} %"
+
+
+class search_words(GenericFunction):
+    """
+    SQL search_words(text): the lowercased word tokens of a text between single spaces, with one at each end
+
+    LIKE patterns from _word_pattern() over it match tokens at word starts
+    the way the search index does. SQLite calls utils.search_index.search_text,
+    registered on each connection by database.py; PostgreSQL splits on
+    non-word characters with a regular expression.
+    """
+    type = Text()
+    inherit_cache = True
+
+
+@compiles(search_words, "postgresql")
+def _search_words_postgresql(element, compiler, **kw):
+    return f"(' ' || regexp_replace(lower({compiler.process(element.clauses, **kw)}), '\\W+', ' ', 'g') || ' ')"
+
+
+class AsyncRepository:
+    """
+    Generic async CRUD repository over one resource table
+
+    Filters and sorting come straight from the endpoints' query parameters.
+    Statements are built once per query shape with bound parameters, so the
+    engine's compiled cache serves every later request of the same shape.
+    Each call runs in its own transaction on a pooled Core connection; no
+    ORM session or identity map is involved.
+
+    Writes update the resource's materialized statistics in the same
+    transaction, so stats() reads counters instead of scanning the table.
+
+    Search filters are answered by the resource's inverted index when
+    SEARCH_INDEX_ENABLED is set; every write is applied to the index after
+    its transaction commits.
+
+    Reads take an optional Projection: only its fields are selected, and
+    each expanded relation is loaded for the whole page with one query.
+    """
+
+    def __init__(
+        self,
+        table: Table,
+        search_index: Optional[SearchIndex] = None,
+        relations: Optional[Dict[str, str]] = None
+    ):
+        self.table = table
+        self.columns = list(table.c)
+        self.search_index = search_index
+        self.relations = relations or {}
+        self.statistics = get_resource_stats(table)
+        self._statements: Dict[Tuple, Any] = {}
+        self._table_ready = False
+        self._table_lock = asyncio.Lock()
+        self._index_ready = search_index is None
+        self._index_lock = asyncio.Lock()
+        self._index_refreshed = 0.0
+
+    async def _ensure_table(self):
+        if self._table_ready:
+            return
+        # Concurrent first requests must not race each other's CREATE TABLE
+        async with self._table_lock:
+            if not self._table_ready:
+                async with get_engine().begin() as conn:
+                    if settings.DATABASE_CREATE_TABLES:
+                        await conn.run_sync(self.table.create, checkfirst=True)
+                        await conn.run_sync(self.statistics.counters.create, checkfirst=True)
+                    await self.statistics.ensure(conn)
+                self._table_ready = True
+
+    async def _catch_up_search_index(self):
+        """Apply the rows created or changed since the index watermark, whichever worker wrote them"""
+        index = self.search_index
+        c = self.table.c
+        statement = self._cached(("catch_up",), lambda: select(*[c[field] for field in INDEX_FIELDS]).where(
+            or_(c.created_at >= bindparam("since"), c.updated_at >= bindparam("since"))
+        ))
+        started = datetime.utcnow()
+        async with get_engine().begin() as conn:
+            rows = [
+                dict(row._mapping)
+                for row in await conn.execute(statement, {"since": index.watermark - INDEX_CATCH_UP_OVERLAP})
+            ]
+        if len(rows) >= INDEX_BATCH_SIZE:
+            await asyncio.to_thread(index.catch_up, rows, started)
+        else:
+            index.catch_up(rows, started)
+
+    async def _ensure_search_index(self):
+        """Load the search index and catch it up, or rebuild it from the table if it is missing or out of step"""
+        if self._index_ready:
+            return
+        async with self._index_lock:
+            if self._index_ready:
+                return
+            await self._ensure_table()
+            c = self.table.c
+            index = self.search_index
+            # Loading a large snapshot takes a while; keep it off the event loop
+            await asyncio.to_thread(index.load)
+            if not index.is_new:
+                await self._catch_up_search_index()
+            async with get_engine().begin() as conn:
+                live = (await conn.execute(
+                    select(func.count()).select_from(self.table).where(c.status != DELETED)
+                )).scalar_one()
+            if index.is_new or index.size != live:
+                logger.info(f"Rebuilding search index {index.name} from {live} rows")
+                started = datetime.utcnow()
+                index.begin_rebuild()
+                batch = select(*[c[field] for field in INDEX_FIELDS]).where(
+                    c.status != DELETED, c.id > bindparam("after_id")
+                ).order_by(c.id).limit(INDEX_BATCH_SIZE)
+                rows, after_id = [], 0
+                while True:
+                    async with get_engine().begin() as conn:
+                        chunk = [dict(row._mapping) for row in await conn.execute(batch, {"after_id": after_id})]
+                    rows.extend(chunk)
+                    if len(chunk) < INDEX_BATCH_SIZE:
+                        break
+                    after_id = chunk[-1]["id"]
+                await asyncio.to_thread(index.finish_rebuild, rows, started)
+            self._index_refreshed = time.monotonic()
+            self._index_ready = True
+
+    async def _refresh_search_index(self):
+        """Make the search index current, catching up at most every SEARCH_INDEX_REFRESH_INTERVAL seconds"""
+        await self._ensure_search_index()
+        now = time.monotonic()
+        if now - self._index_refreshed < settings.SEARCH_INDEX_REFRESH_INTERVAL or self._index_lock.locked():
+            return
+        async with self._index_lock:
+            self._index_refreshed = now
+            try:
+                await self._catch_up_search_index()
+            except Exception as e:
+                # Searches keep answering from the index as it is; the next refresh retries
+                logger.error(f"Error catching up search index {self.search_index.name}: {str(e)}")
+
+    def _index_rows(self, op: str, rows: List[Dict[str, Any]]):
+        """Apply committed writes to the search index; the table stays the source of truth"""
+        if self.search_index is None or not rows:
+            return
+        try:
+            self.search_index.apply(op, rows)
+        except Exception as e:
+            # The next catch-up reads the row again, or the next process start rebuilds the index
+            logger.error(f"Error updating search index {self.search_index.name}: {str(e)}")
+
+    def _filter_clauses(self, filters: Dict[str, Any]) -> Tuple[List, Dict[str, Any], Tuple]:
+        """Translate endpoint filters into WHERE clauses, bind values and a cache key"""
+        unknown = set(filters) - set(FILTER_KEYS)
+        if unknown:
+            raise InvalidQueryError(f"Unknown filter: {', '.join(sorted(unknown))}")
+
+        c = self.table.c
+        clauses, params, shape = [], {}, []
+        if filters.get("status") is not None:
+            clauses.append(c.status == bindparam("status"))
+            params["status"] = _plain(filters["status"])
+            shape.append("status")
+        else:
+            clauses.append(c.status != DELETED)
+        if filters.get("type") is not None:
+            clauses.append(c.type == bindparam("type"))
+            params["type"] = _plain(filters["type"])
+            shape.append("type")
+        if filters.get("search"):
+            # Same rule as the search index: every token begins a word of the name, description or tags,
+            # or is one when it is short
+            tokens = list(dict.fromkeys(tokenize(filters["search"])))
+            if not tokens:
+                clauses.append(false())
+            for i, token in enumerate(tokens):
+                clauses.append(or_(*[
+                    search_words(text).like(bindparam(f"search_{i}"), escape="\\")
+                    for text in (c.name, c.description, c.tags.cast(Text))
+                ]))
+                params[f"search_{i}"] = _word_pattern(token)
+            shape.append(f"search{len(tokens)}")
+        tags = [tag for tag in filters.get("tags") or [] if tag]
+        if tags:
+            # Match any tag; JSON arrays are stored as text on every backend we run
+            tags_text = func.lower(c.tags.cast(Text))
+            clauses.append(or_(*[
+                tags_text.like(bindparam(f"tag_{i}"), escape="\\") for i in range(len(tags))
+            ]))
+            for i, tag in enumerate(tags):
+                params[f"tag_{i}"] = _like_pattern(f'"{tag}"')
+            shape.append(f"tags{len(tags)}")
+        if filters.get("created_after") is not None:
+            clauses.append(c.created_at >= bindparam("created_after"))
+            params["created_after"] = _timestamp("created_after", filters["created_after"])
+            shape.append("created_after")
+        if filters.get("created_before") is not None:
+            clauses.append(c.created_at <= bindparam("created_before"))
+            params["created_before"] = _timestamp("created_before", filters["created_before"])
+            shape.append("created_before")
+        return clauses, params, tuple(shape)
+
+    def _cached(self, key: Tuple, build):
+        statement = self._statements.get(key)
+        if statement is None:
+            statement = self._statements[key] = build()
+        return statement
+
+    def projection(self, fields: Optional[str] = None, expand: Optional[str] = None) -> Projection:
+        """Projection for comma-separated fields and expand query parameters"""
+        try:
+            return parse_projection(fields, expand, self.table.c.keys(), {
+                relation: resource_table(resource).c.keys() for relation, resource in self.relations.items()
+            })
+        except InvalidProjectionError as e:
+            raise InvalidQueryError(str(e))
+
+    def _selection(self, projection: Optional[Projection]) -> List:
+        """Columns a read selects: the projected fields, plus the ids of expanded relations"""
+        if projection is None or projection.is_full:
+            return self.columns
+        c = self.table.c
+        if projection.fields is None:
+            selected = list(self.columns)
+        else:
+            wanted = set(projection.fields) | set(ALWAYS_SELECTED)
+            selected = [column for column in self.columns if column.key in wanted]
+        for relation in projection.expand:
+            # Only the id is read out of the metadata, not the whole document
+            selected.append(c["metadata"][relation_key(relation)].label(relation_label(relation)))
+        return selected
+
+    async def _expand(self, rows: List[Dict[str, Any]], projection: Optional[Projection]):
+        """Embed each expanded relation in the rows, one query per relation"""
+        if projection is None or not projection.expand or not rows:
+            return
+
+        related_ids = {
+            relation: [_related_id(row.pop(relation_label(relation), None)) for row in rows]
+            for relation in projection.expand
+        }
+
+        async def load(relation: str, fields: Optional[Tuple[str, ...]]) -> Dict[int, Dict[str, Any]]:
+            ids = set(related_ids[relation]) - {None}
+            if not ids:
+                return {}
+            return await get_repository(self.relations[relation]).get_many(ids, fields)
+
+        loaded = await asyncio.gather(*(load(relation, fields) for relation, fields in projection.expand.items()))
+        for relation, related in zip(projection.expand, loaded):
+            for row, related_id in zip(rows, related_ids[relation]):
+                row[relation] = related.get(related_id)
+
+    async def get_many(
+        self,
+        ids: Iterable[int],
+        fields: Optional[Tuple[str, ...]] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """Live rows by id in one query, keyed by id; missing and soft-deleted ids are left out"""
+        return await self._by_ids(list(ids), Projection(fields=fields))
+
+    async def _by_ids(self, ids: List[int], projection: Optional[Projection]) -> Dict[int, Dict[str, Any]]:
+        if not ids:
+            return {}
+        statement = self._cached(("by_ids", _projected(projection)), lambda: select(*self._selection(projection)).where(
+            self.table.c.id.in_(bindparam("ids", expanding=True)), self.table.c.status != DELETED
+        ))
+        await self._ensure_table()
+        async with get_engine().begin() as conn:
+            return {row.id: dict(row._mapping) for row in await conn.execute(statement, {"ids": ids})}
+
+    async def list(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        sort_by: str = "created_at",
+        sort_order: str = "desc",
+        offset: int = 0,
+        limit: int = 20
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """One page of rows matching the filters, and the total match count"""
+        if sort_by not in SORT_KEYS or sort_by == "relevance":
+            raise InvalidQueryError(f"Cannot sort by {sort_by}")
+        if sort_order not in ("asc", "desc"):
+            raise InvalidQueryError(f"Invalid sort order {sort_order}")
+        clauses, params, shape = self._filter_clauses(filters or {})
+
+        def build_page():
+            column = self.table.c[sort_by]
+            order = [column.desc(), self.table.c.id.desc()] if sort_order == "desc" else [column.asc(), self.table.c.id.asc()]
+            return (
+                select(*self.columns).where(*clauses).order_by(*order)
+                .limit(bindparam("limit")).offset(bindparam("offset"))
+            )
+
+        page = self._cached(("list", shape, sort_by, sort_order), build_page)
+        count = self._cached(
+            ("count", shape),
+            lambda: select(func.count()).select_from(self.table).where(*clauses)
+        )
+
+        await self._ensure_table()
+        async with get_engine().begin() as conn:
+            total = (await conn.execute(count, params)).scalar_one()
+            rows = await conn.execute(page, {**params, "limit": limit, "offset": offset})
+            return [dict(row._mapping) for row in rows], total
+
+    async def paginate(
+        self,
+        filters: Optional[Dict[str, Any]],
+        pagination: Dict[str, Any],
+        sort_by: str = "created_at",
+        sort_order: str = "desc",
+        projection: Optional[Projection] = None
+    ) -> Page:
+        """
+        One page in offset or keyset (cursor) mode
+
+        Keyset pages seek on the (created_at, id) index, so page 1000 costs
+        the same as page 1. The total is exact, capped or skipped depending
+        on pagination["count"].
+
+        Search filters go to the inverted index, which ranks by relevance or
+        orders by created_at or id; other sorts and cursor pages fall back to
+        a LIKE scan.
+        """
+        if sort_by not in SORT_KEYS:
+            raise InvalidQueryError(f"Cannot sort by {sort_by}")
+        if sort_order not in ("asc", "desc"):
+            raise InvalidQueryError(f"Invalid sort order {sort_order}")
+        per_page = pagination["per_page"]
+        cursor = pagination.get("cursor")
+        keyset = cursor is not None or pagination.get("mode") == PaginationMode.CURSOR
+        filters = filters or {}
+        if (
+            filters.get("search") and self.search_index is not None and sort_by in ORDERS
+            and not keyset and filters.get("status") != DELETED
+        ):
+            return await self._search_page(filters, pagination, sort_by, sort_order, projection)
+        if sort_by == "relevance":
+            raise InvalidQueryError("Sorting by relevance needs a search term and offset pagination")
+        if keyset and sort_by != "created_at":
+            raise InvalidQueryError("Cursor pagination only sorts by created_at")
+        clauses, params, shape = self._filter_clauses(filters)
+        c = self.table.c
+        selected = self._selection(projection)
+        projected = _projected(projection)
+        descending = sort_order == "desc"
+        order = [c[sort_by].desc(), c.id.desc()] if descending else [c[sort_by].asc(), c.id.asc()]
+
+        if keyset:
+            if cursor:
+                try:
+                    params["after_created_at"], params["after_id"] = decode_cursor(cursor)
+                except InvalidCursorError as e:
+                    raise InvalidQueryError(str(e))
+
+            def build_keyset():
+                where = list(clauses)
+                if cursor:
+                    position = tuple_(bindparam("after_created_at"), bindparam("after_id"))
+                    key = tuple_(c.created_at, c.id)
+                    where.append(key < position if descending else key > position)
+                return select(*selected).where(*where).order_by(*order).limit(bindparam("limit"))
+
+            statement = self._cached(("keyset", shape, sort_order, bool(cursor), projected), build_keyset)
+            page_params = {**params, "limit": per_page + 1}
+        else:
+            statement = self._cached(("list", shape, sort_by, sort_order, projected), lambda: (
+                select(*selected).where(*clauses).order_by(*order)
+                .limit(bindparam("limit")).offset(bindparam("offset"))
+            ))
+            # One extra row tells whether there is a next page without counting
+            page_params = {**params, "limit": per_page + 1, "offset": (pagination["page"] - 1) * per_page}
+
+        count_mode = pagination.get("count", CountMode.EXACT)
+        cap = count_cap(count_mode)
+        await self._ensure_table()
+        async with get_engine().begin() as conn:
+            rows = [dict(row._mapping) for row in await conn.execute(statement, page_params)]
+            total = None
+            if count_mode != CountMode.NONE:
+                count = self._cached(("count", shape, cap is not None), lambda: (
+                    select(func.count()).select_from(self.table).where(*clauses) if cap is None
+                    else select(func.count()).select_from(
+                        select(c.id).where(*clauses).limit(bindparam("cap")).subquery()
+                    )
+                ))
+                total = (await conn.execute(count, {**params, "cap": cap} if cap else params)).scalar_one()
+
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        await self._expand(rows, projection)
+        if keyset:
+            return Page(
+                items=rows,
+                per_page=per_page,
+                total=total,
+                total_is_estimate=cap is not None and total >= cap,
+                has_next=has_next,
+                has_prev=bool(cursor),
+                next_cursor=encode_cursor(rows[-1]["created_at"], rows[-1]["id"]) if has_next else None
+            )
+        return Page(
+            items=rows,
+            per_page=per_page,
+            total=total,
+            total_is_estimate=cap is not None and total >= cap,
+            page=pagination["page"],
+            has_next=has_next,
+            has_prev=pagination["page"] > 1
+        )
+
+    async def _search_page(
+        self,
+        filters: Dict[str, Any],
+        pagination: Dict[str, Any],
+        sort_by: str,
+        sort_order: str,
+        projection: Optional[Projection] = None
+    ) -> Page:
+        """One offset page of search matches from the inverted index"""
+        # Validates the filters and normalizes the timestamps
+        _, params, _ = self._filter_clauses(filters)
+        await self._refresh_search_index()
+        per_page, page = pagination["per_page"], pagination["page"]
+        # Off the event loop: a query matching much of the index takes a while to rank
+        hits, total = await asyncio.to_thread(
+            self.search_index.search,
+            filters["search"],
+            status=params.get("status"),
+            type=params.get("type"),
+            tags=[tag for tag in filters.get("tags") or [] if tag],
+            created_after=params.get("created_after"),
+            created_before=params.get("created_before"),
+            offset=(page - 1) * per_page,
+            limit=per_page,
+            order=sort_by,
+            descending=sort_order == "desc"
+        )
+        found = await self._by_ids([item_id for item_id, _ in hits], projection)
+        rows = [found[item_id] for item_id, _ in hits if item_id in found]
+        if len(rows) < len(hits):
+            # Hard-deleted by another worker, which catch-up cannot see
+            self._index_rows("delete", [{"id": item_id} for item_id, _ in hits if item_id not in found])
+            total -= len(hits) - len(rows)
+        await self._expand(rows, projection)
+        count_mode = pagination.get("count", CountMode.EXACT)
+        return Page(
+            items=rows,
+            per_page=per_page,
+            total=None if count_mode == CountMode.NONE else total,
+            page=page,
+            has_next=page * per_page < total,
+            has_prev=page > 1
+        )
+
+    async def all(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Every row matching the filters, oldest first"""
+        clauses, params, shape = self._filter_clauses(filters or {})
+        statement = self._cached(
+            ("all", shape),
+            lambda: select(*self.columns).where(*clauses).order_by(self.table.c.id.asc())
+        )
+        await self._ensure_table()
+        async with get_engine().begin() as conn:
+            rows = await conn.execute(statement, params)
+            return [dict(row._mapping) for row in rows]
+
+    async def stream(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        sort_by: str = "id",
+        sort_order: str = "asc",
+        projection: Optional[Projection] = None,
+        batch_size: Optional[int] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Every row matching the filters, in batches from a server-side cursor
+
+        Only one batch is held at a time, whatever the number of matches;
+        expanded relations are loaded per batch. The connection stays
+        checked out until the iterator is exhausted or closed. Search
+        filters are a LIKE scan here, not an index lookup.
+        """
+        if sort_by not in SORT_KEYS or sort_by == "relevance":
+            raise InvalidQueryError(f"Cannot sort by {sort_by}")
+        if sort_order not in ("asc", "desc"):
+            raise InvalidQueryError(f"Invalid sort order {sort_order}")
+        clauses, params, shape = self._filter_clauses(filters or {})
+        c = self.table.c
+        order = [c[sort_by].desc(), c.id.desc()] if sort_order == "desc" else [c[sort_by].asc(), c.id.asc()]
+        statement = self._cached(("stream", shape, sort_by, sort_order, _projected(projection)), lambda: (
+            select(*self._selection(projection)).where(*clauses).order_by(*order)
+        ))
+        await self._ensure_table()
+        async with get_engine().connect() as conn:
+            result = await conn.stream(
+                statement, params, execution_options={"yield_per": batch_size or settings.EXPORT_BATCH_SIZE}
+            )
+            async for partition in result.partitions():
+                rows = [dict(row._mapping) for row in partition]
+                await self._expand(rows, projection)
+                yield rows
+
+    def field_names(self, projection: Optional[Projection] = None) -> List[str]:
+        """Field names of the items a projection returns; embedded fields as relation.field"""
+        return (projection or Projection()).columns(self.table.c.keys(), {
+            relation: resource_table(resource).c.keys() for relation, resource in self.relations.items()
+        })
+
+    async def get(self, item_id: int, projection: Optional[Projection] = None) -> Optional[Dict[str, Any]]:
+        """A row by id; soft-deleted rows are not returned"""
+        statement = self._cached(("get", _projected(projection)), lambda: select(*self._selection(projection)).where(
+            self.table.c.id == bindparam("id"), self.table.c.status != DELETED
+        ))
+        await self._ensure_table()
+        async with get_engine().begin() as conn:
+            row = (await conn.execute(statement, {"id": item_id})).first()
+        if row is None:
+            return None
+        row = dict(row._mapping)
+        await self._expand([row], projection)
+        return row
+
+    def _new_row(self, data: Dict[str, Any], user: Optional[str], now: datetime) -> Dict[str, Any]:
+        row = {key: _plain(data[key]) for key in WRITABLE_COLUMNS if key in data}
+        row.setdefault("tags", [])
+        row.setdefault("metadata", {})
+        row.update(created_at=now, created_by=user, version=1)
+        return row
+
+    async def create(self, data: Dict[str, Any], user: Optional[str] = None) -> Dict[str, Any]:
+        """Insert one row and return it as stored"""
+        statement = self._cached(("create",), lambda: insert(self.table).returning(*self.columns))
+        await self._ensure_table()
+        async with get_engine().begin() as conn:
+            row = dict((await conn.execute(statement, self._new_row(data, user, datetime.utcnow()))).one()._mapping)
+            await self.statistics.apply(conn, row_deltas(row))
+        self._index_rows("upsert", [row])
+        return row
+
+    async def bulk_create(self, items: List[Dict[str, Any]], user: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Insert many rows with multi-row INSERTs; rows come back in input order"""
+        if not items:
+            return []
+        # SQLite cannot sort RETURNING by parameter order without falling back to
+        # one INSERT per row; it hands out rowids in VALUES order, so sort by id
+        by_id = get_engine().dialect.name == "sqlite"
+        statement = self._cached(
+            ("bulk_create", by_id),
+            lambda: insert(self.table).returning(*self.columns, sort_by_parameter_order=not by_id)
+        )
+        now = datetime.utcnow()
+        # executemany needs the same keys in every row
+        rows = [
+            {"description": None, "status": "active", "type": "standard", **self._new_row(item, user, now)}
+            for item in items
+        ]
+        await self._ensure_table()
+        async with get_engine().begin() as conn:
+            created = [dict(row._mapping) for row in await conn.execute(statement, rows)]
+            if by_id:
+                created.sort(key=lambda row: row["id"])
+            deltas = Counter()
+            for row in created:
+                deltas.update(row_deltas(row))
+            await self.statistics.apply(conn, deltas)
+        self._index_rows("upsert", created)
+        return created
+
+    async def update(
+        self,
+        item_id: int,
+        data: Dict[str, Any],
+        user: Optional[str] = None,
+        expected_versions: Optional[List[int]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Set the given fields and bump the version; None if the row does not exist
+
+        With expected_versions the write only happens if the row is at one of
+        them; otherwise VersionConflictError is raised.
+        """
+        values = {key: _plain(data[key]) for key in WRITABLE_COLUMNS if key in data}
+        fields = tuple(sorted(values))
+
+        def build():
+            return (
+                update(self.table)
+                .where(self.table.c.id == bindparam("item_id"), self.table.c.status != DELETED)
+                .values({
+                    **{key: bindparam(f"v_{key}") for key in fields},
+                    "version": self.table.c.version + 1,
+                    "updated_at": bindparam("v_updated_at"),
+                    "updated_by": bindparam("v_updated_by")
+                })
+                .returning(*self.columns)
+            )
+
+        statement = self._cached(("update", fields), build)
+        params = {f"v_{key}": value for key, value in values.items()}
+        params.update(item_id=item_id, v_updated_at=datetime.utcnow(), v_updated_by=user)
+        # Only status and type changes move the counters
+        counted = "status" in values or "type" in values
+        await self._ensure_table()
+        async with get_engine().begin() as conn:
+            old = None
+            if counted or expected_versions is not None:
+                old = await self._locked_fields(conn, item_id)
+                if old is None:
+                    return None
+                self._check_version(item_id, old, expected_versions)
+            row = (await conn.execute(statement, params)).first()
+            if row is None:
+                return None
+            row = dict(row._mapping)
+            if counted:
+                await self.statistics.apply(conn, change_deltas(old, row))
+        self._index_rows("upsert", [row])
+        return row
+
+    async def _locked_fields(self, conn, item_id: int) -> Optional[Dict[str, Any]]:
+        """Status, type, creation time and version of a live row, locked until the transaction ends"""
+        c = self.table.c
+        statement = self._cached(("locked_fields",), lambda: select(c.status, c.type, c.created_at, c.version).where(
+            c.id == bindparam("item_id"), c.status != DELETED
+        ).with_for_update())
+        row = (await conn.execute(statement, {"item_id": item_id})).first()
+        return dict(row._mapping) if row else None
+
+    @staticmethod
+    def _check_version(item_id: int, row: Dict[str, Any], expected_versions: Optional[List[int]]):
+        if expected_versions is not None and row["version"] not in expected_versions:
+            raise VersionConflictError(item_id, row["version"])
+
+    async def delete(
+        self,
+        item_id: int,
+        hard: bool = False,
+        user: Optional[str] = None,
+        expected_versions: Optional[List[int]] = None
+    ) -> bool:
+        """Soft delete (status=deleted) or remove the row; False if it does not exist"""
+        c = self.table.c
+        await self._ensure_table()
+        async with get_engine().begin() as conn:
+            if hard and expected_versions is not None:
+                old = await self._locked_fields(conn, item_id)
+                if old is None:
+                    return False
+                self._check_version(item_id, old, expected_versions)
+            if hard:
+                statement = self._cached(("hard_delete",), lambda: delete(self.table).where(
+                    c.id == bindparam("item_id")
+                ).returning(c.status, c.type, c.created_at))
+                row = (await conn.execute(statement, {"item_id": item_id})).first()
+                if row is None:
+                    return False
+                await self.statistics.apply(conn, row_deltas(dict(row._mapping), -1))
+            else:
+                old = await self._locked_fields(conn, item_id)
+                if old is None:
+                    return False
+                self._check_version(item_id, old, expected_versions)
+                statement = self._cached(("soft_delete",), lambda: (
+                    update(self.table)
+                    .where(c.id == bindparam("item_id"))
+                    .values(
+                        status=DELETED,
+                        version=c.version + 1,
+                        updated_at=bindparam("v_updated_at"),
+                        updated_by=bindparam("v_updated_by")
+                    )
+                ))
+                await conn.execute(statement, {"item_id": item_id, "v_updated_at": datetime.utcnow(), "v_updated_by": user})
+                await self.statistics.apply(conn, change_deltas(old, {**old, "status": DELETED}))
+        self._index_rows("delete", [{"id": item_id}])
+        return True
+
+    async def stats(self) -> Dict[str, Any]:
+        """Counts by status and type and recent creation counts, from the materialized counters"""
+        await self._ensure_table()
+        return await self.statistics.read()
+
+
+_repositories: Dict[str, AsyncRepository] = {}
+
+
+def get_repository(name: str) -> AsyncRepository:
+    """Get the shared repository for a resource table"""
+    repository = _repositories.get(name)
+    if repository is None:
+        index = get_search_index(name, load=False) if settings.SEARCH_INDEX_ENABLED else None
+        repository = _repositories[name] = AsyncRepository(resource_table(name), index, RELATIONS.get(name))
+    return repository
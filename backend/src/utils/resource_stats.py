@@ -0,0 +1,269 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import Column, Integer, String, Table, bindparam, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from config import settings
+from database import get_engine, metadata
+
+logger = logging.getLogger(__name__)
+
+# Status of soft-deleted rows; hidden unless a status filter asks for them
+DELETED = "deleted"
+
+STATUSES = ("active", "inactive", "pending", "archived", DELETED)
+
+# Counter kinds: rows per status, live rows per type, rows created per UTC day
+STATUS, TYPE, DAY = "status", "type", "day"
+# Marks a counter table that has been filled from its resource table
+RECONCILED = ("meta", "reconciled")  # count: number of reconciliations
+
+# Day buckets cover this month and this week; older ones are pruned on reconcile
+DAY_RETENTION = 40
+
+
+def stats_table(name: str) -> Table:
+    """Counter table kept next to a resource table"""
+    stats_name = f"{name}_stats"
+    if stats_name in metadata.tables:
+        return metadata.tables[stats_name]
+    return Table(
+        stats_name, metadata,
+        Column("kind", String(8), primary_key=True),
+        Column("key", String(64), primary_key=True),
+        Column("count", Integer, nullable=False, default=0),
+    )
+
+
+def row_deltas(row: Dict[str, Any], sign: int = 1) -> Counter:
+    """Counter changes for adding (sign=1) or removing (sign=-1) one row"""
+    deltas = Counter({
+        (STATUS, row["status"]): sign,
+        (DAY, row["created_at"].date().isoformat()): sign
+    })
+    if row["status"] != DELETED:
+        deltas[(TYPE, row["type"])] += sign
+    return deltas
+
+
+def change_deltas(old: Dict[str, Any], new: Dict[str, Any]) -> Counter:
+    """Counter changes for a row whose status or type changed"""
+    deltas = row_deltas(new)
+    deltas.update(row_deltas({**old, "created_at": new["created_at"]}, -1))
+    return deltas
+
+
+class ResourceStats:
+    """
+    Materialized statistics of one resource table
+
+    Writes pass their counter deltas to apply() inside their own
+    transaction, so the counters commit or roll back with the rows. Reads
+    fetch a few dozen counter rows instead of scanning the table. The
+    reconciler recomputes the counters from the table now and then and
+    corrects any drift, e.g. from rows changed outside the repository.
+    """
+
+    def __init__(self, table: Table):
+        self.table = table
+        self.counters = stats_table(table.name)
+        # Set once the counters are known to be filled from the table
+        self.ready = False
+        self.reconciled_at: Optional[datetime] = None
+        self.last_drift = 0
+
+    def _upsert(self, dialect: str):
+        c = self.counters.c
+        if dialect == "postgresql":
+            statement = postgresql.insert(self.counters)
+        elif dialect == "sqlite":
+            statement = sqlite.insert(self.counters)
+        else:
+            return None
+        return statement.values(
+            kind=bindparam("kind"), key=bindparam("key"), count=bindparam("delta")
+        ).on_conflict_do_update(
+            index_elements=[c.kind, c.key],
+            set_={"count": c.count + statement.excluded.count}
+        )
+
+    async def apply(self, conn: AsyncConnection, deltas: Counter):
+        """Add the deltas to the counters within the caller's transaction"""
+        # Sorted, so concurrent writers and the reconciler lock counter rows in the same order
+        params = sorted((
+            {"kind": kind, "key": str(key)[:64], "delta": delta}
+            for (kind, key), delta in deltas.items() if delta
+        ), key=lambda entry: (entry["kind"], entry["key"]))
+        if not params:
+            return
+        statement = self._upsert(conn.dialect.name)
+        if statement is not None:
+            await conn.execute(statement, params)
+            return
+        # Backends without an upsert: bump existing counters, insert the rest
+        c = self.counters.c
+        bump = update(self.counters).where(
+            c.kind == bindparam("b_kind"), c.key == bindparam("b_key")
+        ).values(count=c.count + bindparam("delta"))
+        for entry in params:
+            result = await conn.execute(bump, {"b_kind": entry["kind"], "b_key": entry["key"], "delta": entry["delta"]})
+            if not result.rowcount:
+                await conn.execute(
+                    self.counters.insert(), {"kind": entry["kind"], "key": entry["key"], "count": entry["delta"]}
+                )
+
+    async def ensure(self, conn: AsyncConnection):
+        """Fill the counters from the table the first time they are used"""
+        c = self.counters.c
+        marker = (await conn.execute(
+            select(c.count).where(c.kind == RECONCILED[0], c.key == RECONCILED[1])
+        )).first()
+        if marker is None:
+            await self._reconcile(conn)
+        self.ready = True
+
+    async def read(self) -> Dict[str, Any]:
+        """Counts by status and type and recent creation counts"""
+        c = self.counters.c
+        now = datetime.utcnow()
+        today = now.date()
+        week = today - timedelta(days=today.weekday())
+        month = today.replace(day=1)
+        since = min(week, month).isoformat()
+        async with get_engine().connect() as conn:
+            rows = (await conn.execute(
+                select(c.kind, c.key, c.count).where(
+                    (c.kind != DAY) | (c.key >= bindparam("since"))
+                ),
+                {"since": since}
+            )).all()
+
+        by_status = {key: count for kind, key, count in rows if kind == STATUS}
+        days = {key: count for kind, key, count in rows if kind == DAY}
+        return {
+            # Matches the list total, which leaves soft-deleted rows out
+            "total_count": sum(count for status, count in by_status.items() if status != DELETED),
+            **{f"{status}_count": by_status.get(status, 0) for status in STATUSES},
+            "by_type": {key: count for kind, key, count in rows if kind == TYPE and count},
+            "created_today": days.get(today.isoformat(), 0),
+            "created_this_week": sum(count for day, count in days.items() if day >= week.isoformat()),
+            "created_this_month": sum(count for day, count in days.items() if day >= month.isoformat())
+        }
+
+    async def _actual(self, conn: AsyncConnection) -> Counter:
+        t = self.table.c
+        actual = Counter()
+        for status, count in await conn.execute(select(t.status, func.count()).group_by(t.status)):
+            actual[(STATUS, status)] = count
+        for type_, count in await conn.execute(
+            select(t.type, func.count()).where(t.status != DELETED).group_by(t.type)
+        ):
+            actual[(TYPE, type_)] = count
+        since = datetime.combine(datetime.utcnow().date() - timedelta(days=DAY_RETENTION), datetime.min.time())
+        day = func.date(t.created_at)
+        for created, count in await conn.execute(
+            select(day, func.count()).where(t.created_at >= bindparam("since")).group_by(day),
+            {"since": since}
+        ):
+            actual[(DAY, str(created))] = count
+        return actual
+
+    async def _reconcile(self, conn: AsyncConnection) -> int:
+        c = self.counters.c
+        # Take the write lock before scanning so no write lands between scan and fix
+        await self.apply(conn, Counter({RECONCILED: 1}))
+        stored = {
+            (kind, key): count
+            for kind, key, count in await conn.execute(
+                select(c.kind, c.key, c.count).order_by(c.kind, c.key).with_for_update()
+            )
+        }
+        actual = await self._actual(conn)
+        cutoff = (datetime.utcnow().date() - timedelta(days=DAY_RETENTION)).isoformat()
+
+        deltas = Counter()
+        stale = []
+        for key, count in stored.items():
+            if key == RECONCILED:
+                continue
+            if key[0] == DAY and key[1] < cutoff:
+                stale.append(key)
+            elif actual.get(key, 0) != count:
+                deltas[key] = actual.get(key, 0) - count
+        for key, count in actual.items():
+            if key not in stored and count:
+                deltas[key] = count
+        await self.apply(conn, deltas)
+        if stale:
+            await conn.execute(
+                self.counters.delete().where(c.kind == DAY, c.key.in_(bindparam("keys", expanding=True))),
+                {"keys": [key for _, key in stale]}
+            )
+
+        self.reconciled_at = datetime.utcnow()
+        self.last_drift = sum(abs(delta) for delta in deltas.values())
+        return self.last_drift
+
+    async def reconcile(self) -> int:
+        """Recompute the counters from the table; returns the total drift corrected"""
+        async with get_engine().begin() as conn:
+            drift = await self._reconcile(conn)
+        if drift:
+            logger.warning(f"Corrected statistics drift of {drift} on {self.table.name}")
+        return drift
+
+
+_resource_stats: Dict[str, ResourceStats] = {}
+_reconcile_task: Optional[asyncio.Task] = None
+
+
+def get_resource_stats(table: Table) -> ResourceStats:
+    """Get the shared statistics of a resource table"""
+    stats = _resource_stats.get(table.name)
+    if stats is None:
+        stats = _resource_stats[table.name] = ResourceStats(table)
+    return stats
+
+
+async def reconcile_all(names: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """Reconcile the statistics of every resource in use; drift per table"""
+    results = {}
+    for name in list(names or _resource_stats):
+        stats = _resource_stats.get(name)
+        # Tables not touched yet are reconciled on first use anyway
+        if stats is None or not stats.ready:
+            continue
+        try:
+            results[name] = await stats.reconcile()
+        except Exception as e:
+            logger.error(f"Error reconciling statistics of {name}: {str(e)}")
+    return results
+
+
+async def _reconcile_periodically(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        await reconcile_all()
+
+
+def start_stats_reconciler(interval: float = settings.STATS_RECONCILE_INTERVAL):
+    """Start the periodic statistics reconciliation"""
+    global _reconcile_task
+    if _reconcile_task is None and interval > 0:
+        _reconcile_task = asyncio.get_running_loop().create_task(_reconcile_periodically(interval))
+
+
+async def stop_stats_reconciler():
+    global _reconcile_task
+    if _reconcile_task is not None:
+        _reconcile_task.cancel()
+        try:
+            await _reconcile_task
+        except asyncio.CancelledError:
+            pass
+        _reconcile_task = None
@@ -0,0 +1,196 @@
+import asyncio
+import importlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import FastAPI
+from starlette.responses import JSONResponse
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LazyRouter:
+    """An endpoint module registered by prefix, imported on first use"""
+    prefix: str
+    module: str
+    attr: str = "router"
+    loaded: bool = False
+    import_seconds: Optional[float] = None
+    error: Optional[str] = None
+    failures: int = 0
+    # time.monotonic() before which a failed import is not tried again
+    retry_at: float = 0.0
+
+    def retry_after(self) -> float:
+        """Seconds until the next import attempt; 0 if one may run now"""
+        return max(0.0, self.retry_at - time.monotonic())
+
+
+class RouterRegistry:
+    """
+    Registers endpoint routers by URL prefix without importing them
+
+    The endpoint modules pull in openai, sklearn, textblob and numpy through
+    their services. Importing all of them eagerly puts that cost on every
+    cold start. The registry keeps a prefix table instead: the first request
+    under a prefix imports the module (in a worker thread, so the event loop
+    keeps serving) and includes its router, and a background warmup loads
+    the rest once the server is up.
+
+    A module that fails to import is not retried on every request: its
+    failure is cached for ROUTER_RETRY_BACKOFF seconds, doubling with each
+    further failure up to ROUTER_RETRY_MAX_BACKOFF, and requests under its
+    prefix get a 503 meanwhile.
+    """
+
+    def __init__(
+        self,
+        app: FastAPI,
+        retry_backoff: float = settings.ROUTER_RETRY_BACKOFF,
+        max_retry_backoff: float = settings.ROUTER_RETRY_MAX_BACKOFF
+    ):
+        self.app = app
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self._routers: Dict[str, LazyRouter] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._warmup_task: Optional[asyncio.Task] = None
+
+    def register(self, prefix: str, module: str, attr: str = "router"):
+        """Register a module's router under its URL prefix"""
+        self._routers[prefix.rstrip("/")] = LazyRouter(prefix.rstrip("/"), module, attr)
+
+    def match(self, path: str) -> Optional[LazyRouter]:
+        """The registered router whose prefix covers the path, if any"""
+        for prefix, entry in self._routers.items():
+            if path == prefix or path.startswith(prefix + "/"):
+                return entry
+        return None
+
+    @property
+    def pending(self) -> List[LazyRouter]:
+        return [entry for entry in self._routers.values() if not entry.loaded]
+
+    def _include(self, entry: LazyRouter, module):
+        self.app.include_router(getattr(module, entry.attr))
+        entry.loaded = True
+        # New routes invalidate the cached OpenAPI document
+        self.app.openapi_schema = None
+
+    def _import(self, entry: LazyRouter) -> Tuple[object, float]:
+        started = time.perf_counter()
+        module = importlib.import_module(entry.module)
+        return module, time.perf_counter() - started
+
+    def _failed(self, entry: LazyRouter, error: Exception):
+        entry.error = str(error)
+        entry.failures += 1
+        backoff = min(self.retry_backoff * 2 ** (entry.failures - 1), self.max_retry_backoff)
+        entry.retry_at = time.monotonic() + backoff
+        logger.error(f"Error importing router {entry.module}: {str(error)}; next attempt in {backoff:.0f} s")
+
+    async def ensure_loaded(self, entry: LazyRouter) -> bool:
+        """Import and include a router once; concurrent callers wait for the same import"""
+        if entry.loaded:
+            return True
+        if entry.retry_after():
+            return False
+        lock = self._locks.setdefault(entry.prefix, asyncio.Lock())
+        async with lock:
+            if entry.loaded:
+                return True
+            if entry.retry_after():
+                return False
+            try:
+                module, seconds = await asyncio.to_thread(self._import, entry)
+            except Exception as e:
+                self._failed(entry, e)
+                return False
+            entry.import_seconds = seconds
+            entry.error = None
+            entry.failures = 0
+            self._include(entry, module)
+            logger.info(f"Loaded router {entry.module} for {entry.prefix} in {seconds * 1000:.0f} ms")
+            return True
+
+    async def load_all(self):
+        """Load every pending router, one at a time"""
+        for entry in self.pending:
+            await self.ensure_loaded(entry)
+
+    def load_all_sync(self):
+        """Import every router on the calling thread (eager mode, scripts and tests)"""
+        for entry in self.pending:
+            try:
+                module, entry.import_seconds = self._import(entry)
+            except Exception as e:
+                self._failed(entry, e)
+                continue
+            self._include(entry, module)
+
+    def start_warmup(self, delay: float = 0.0):
+        """Load the remaining routers in the background after startup"""
+        if self._warmup_task is None:
+            self._warmup_task = asyncio.get_running_loop().create_task(self._warmup(delay))
+
+    async def stop_warmup(self):
+        if self._warmup_task is not None:
+            self._warmup_task.cancel()
+            try:
+                await self._warmup_task
+            except asyncio.CancelledError:
+                pass
+            self._warmup_task = None
+
+    async def _warmup(self, delay: float):
+        await asyncio.sleep(delay)
+        started = time.perf_counter()
+        await self.load_all()
+        logger.info(f"Router warmup finished in {time.perf_counter() - started:.2f} s")
+
+    def status(self) -> List[Dict]:
+        """Load state of every registered router"""
+        return [
+            {
+                "prefix": entry.prefix,
+                "module": entry.module,
+                "loaded": entry.loaded,
+                "import_ms": round(entry.import_seconds * 1000, 1) if entry.import_seconds is not None else None,
+                "error": entry.error,
+                "retry_in_s": round(entry.retry_after(), 1) if entry.error else None
+            }
+            for entry in self._routers.values()
+        ]
+
+
+class LazyRouterMiddleware:
+    """ASGI middleware that loads a lazily registered router before dispatching to it"""
+
+    def __init__(self, app, registry: RouterRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket"):
+            path = scope["path"]
+            if path == self.registry.app.openapi_url:
+                # The schema has to describe every route
+                await self.registry.load_all()
+            else:
+                entry = self.registry.match(path)
+                if entry is not None and not entry.loaded and not await self.registry.ensure_loaded(entry):
+                    if scope["type"] == "http":
+                        # Fails fast until the next attempt instead of paying for a failed import per request
+                        response = JSONResponse(
+                            {"detail": "Service temporarily unavailable"},
+                            status_code=503,
+                            headers={"Retry-After": str(max(1, round(entry.retry_after())))}
+                        )
+                        await response(scope, receive, send)
+                        return
+        await self.app(scope, receive, send)
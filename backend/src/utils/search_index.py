@@ -0,0 +1,674 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r"\w+")
+
+# Name matches count double; descriptions and tags count once
+NAME_WEIGHT = 2
+
+# Result orders search() supports; other sorts need the database
+ORDERS = ("relevance", "created_at", "id")
+
+# Query tokens this long match every word they begin; shorter ones only whole words
+MIN_PARTIAL_TOKEN = 3
+LAST_CHARACTER = chr(0x10FFFF)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercased word tokens of a text"""
+    return TOKEN.findall(text.lower()) if text else []
+
+
+def search_text(text: Optional[str]) -> Optional[str]:
+    """Tokens of a text between single spaces, with one at each end; the repository's LIKE scan matches over this"""
+    return None if text is None else f" {' '.join(tokenize(text))} "
+
+
+def _timestamp(value: Any) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    return 0.0
+
+
+def _as_bytes(value: Any) -> np.ndarray:
+    return np.frombuffer(json.dumps(value).encode(), dtype=np.uint8)
+
+
+def _from_bytes(value: np.ndarray) -> Any:
+    return json.loads(value.tobytes().decode())
+
+
+class _Postings:
+    """Internal doc numbers containing a term, with the term frequency in each"""
+    __slots__ = ("ids", "tfs")
+
+    def __init__(self):
+        self.ids = array("i")
+        self.tfs = array("H")
+
+
+class SearchIndex:
+    """
+    Inverted full-text index with BM25 ranking for one resource
+
+    Documents are the name, description and tags of a row. Each document
+    gets a dense internal number; per-document status, type, tags and
+    creation time are kept in flat arrays so filters are applied as numpy
+    masks before scoring. Updates tombstone the old document and append a
+    new one; compaction drops tombstones once they pile up.
+
+    A document matches when every query token begins one of its words, or
+    is one of its words when shorter than MIN_PARTIAL_TOKEN. Prefixes are
+    looked up by bisecting the sorted vocabulary. The repository's LIKE
+    filter applies the same rule, so indexed and scanned searches return
+    the same rows.
+
+    The table stays the source of truth. Each worker process holds its own
+    copy of the index and catches up on other workers' writes by applying
+    the rows created or updated since its watermark (see AsyncRepository);
+    row versions make rows that are applied twice no-ops. The index
+    persists as a snapshot (snapshot.npz) under `directory`, stamped with
+    that watermark. Workers share the file: each writes a complete snapshot
+    under a temporary name of its own and swaps it in atomically.
+
+    The lock guards the in-memory index, which the event loop reads and
+    writes. Snapshots, loads and rebuilds do their slow work on a private
+    copy in a worker thread; the lock is held only to take that copy and
+    to swap the result in.
+    """
+
+    K1 = 1.2
+    B = 0.75
+    # Most frequent vocabulary terms scored per query token; the rest still match
+    MAX_SCORED_TERMS = 64
+    # New terms kept apart from the joined vocabulary before it is rebuilt
+    MAX_RECENT_TERMS = 1024
+    # Everything a snapshot, load or rebuild replaces at once
+    _STATE = (
+        "_postings", "_tags", "_doc_ids", "_lengths", "_alive", "_status", "_type", "_created", "_versions",
+        "_by_id", "_codes", "_alive_count", "_alive_length", "_sorted_terms", "_recent_terms"
+    )
+
+    def __init__(self, name: str, directory: Optional[str] = None):
+        self.name = name
+        self.directory = directory or os.path.join(settings.SEARCH_INDEX_DIR, name)
+        self._lock = threading.RLock()
+        # One snapshot at a time
+        self._save_lock = threading.Lock()
+        # Bumped whenever the state is replaced, so a snapshot taken before a rebuild is not swapped in after it
+        self._generation = 0
+        # Changes applied since the last snapshot
+        self._changes = 0
+        self._maintenance_task: Optional[asyncio.Task] = None
+        # Changes made while a rebuild reads the table or a snapshot is written, replayed onto the result
+        self._rebuild_buffer: Optional[List[Tuple[str, List[Dict[str, Any]]]]] = None
+        self._snapshot_buffer: Optional[List[Tuple[str, List[Dict[str, Any]]]]] = None
+        self._reset()
+        # True until the index was loaded from disk or rebuilt from the table
+        self.is_new = True
+        # Table changes up to this time (naive UTC) are in the index
+        self.watermark: Optional[datetime] = None
+
+    def _reset(self):
+        self._postings: Dict[str, _Postings] = {}
+        self._tags: Dict[str, array] = {}
+        self._doc_ids = array("q")
+        self._lengths = array("i")
+        self._alive = array("b")
+        self._status = array("h")
+        self._type = array("h")
+        self._created = array("d")
+        self._versions = array("q")
+        self._by_id: Dict[int, int] = {}
+        self._codes: Dict[str, Dict[str, int]] = {"status": {}, "type": {}}
+        self._alive_count = 0
+        self._alive_length = 0
+        # Sorted vocabulary for prefix lookups, plus the terms added since it was sorted, also kept sorted
+        self._sorted_terms: Optional[List[str]] = None
+        self._recent_terms: List[str] = []
+
+    @property
+    def _snapshot_path(self) -> str:
+        return os.path.join(self.directory, "snapshot.npz")
+
+    @property
+    def size(self) -> int:
+        return self._alive_count
+
+    # Document changes
+
+    def _code(self, field: str, value: Any) -> int:
+        codes = self._codes[field]
+        value = str(value)
+        if value not in codes:
+            codes[value] = len(codes)
+        return codes[value]
+
+    def _add(self, row: Dict[str, Any]):
+        counts: Counter = Counter()
+        for token in tokenize(row.get("name")):
+            counts[token] += NAME_WEIGHT
+        counts.update(tokenize(row.get("description")))
+        tags = row.get("tags") or []
+        for tag in tags:
+            counts.update(tokenize(tag))
+
+        doc = len(self._doc_ids)
+        for term, tf in counts.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = _Postings()
+                if self._sorted_terms is not None:
+                    insort(self._recent_terms, term)
+            postings.ids.append(doc)
+            postings.tfs.append(min(tf, 65535))
+        for tag in {str(tag).lower() for tag in tags}:
+            self._tags.setdefault(tag, array("i")).append(doc)
+
+        length = sum(counts.values())
+        self._doc_ids.append(int(row["id"]))
+        self._lengths.append(length)
+        self._alive.append(1)
+        self._status.append(self._code("status", row.get("status", "active")))
+        self._type.append(self._code("type", row.get("type", "standard")))
+        self._created.append(_timestamp(row.get("created_at")))
+        self._versions.append(int(row.get("version") or 0))
+        self._by_id[int(row["id"])] = doc
+        self._alive_count += 1
+        self._alive_length += length
+
+    def _remove(self, item_id: int):
+        doc = self._by_id.pop(int(item_id), None)
+        if doc is not None and self._alive[doc]:
+            self._alive[doc] = 0
+            self._alive_count -= 1
+            self._alive_length -= self._lengths[doc]
+
+    def _apply_locked(self, op: str, rows: List[Dict[str, Any]]) -> int:
+        applied = 0
+        for row in rows:
+            doc = self._by_id.get(int(row["id"]))
+            if doc is None and (op == "delete" or row.get("status") == "deleted"):
+                continue
+            version = row.get("version")
+            if (
+                op == "upsert" and doc is not None and version is not None and self._versions[doc] >= version
+                and self._created[doc] == _timestamp(row.get("created_at"))
+            ):
+                # Already indexed at this version, e.g. a worker's own write read again on catch-up;
+                # a different created_at is a new row that reused a hard-deleted id
+                continue
+            self._remove(row["id"])
+            if op == "upsert" and row.get("status") != "deleted":
+                self._add(row)
+            applied += 1
+        self._changes += applied
+        return applied
+
+    def _buffer_locked(self, op: str, rows: List[Dict[str, Any]]):
+        for buffer in (self._rebuild_buffer, self._snapshot_buffer):
+            if buffer is not None:
+                buffer.append((op, rows))
+
+    def _adopt_locked(self, other: "SearchIndex") -> List[Any]:
+        """Take over the state of other; returns the old state, best dropped once the lock is released"""
+        retired = [getattr(self, attribute) for attribute in self._STATE]
+        for attribute in self._STATE:
+            setattr(self, attribute, getattr(other, attribute))
+        self._generation += 1
+        return retired
+
+    def apply(self, op: str, rows: List[Dict[str, Any]]):
+        """Index upserted rows or drop deleted ones"""
+        with self._lock:
+            self._apply_locked(op, rows)
+            self._buffer_locked(op, rows)
+        self._schedule_maintenance()
+
+    def catch_up(self, rows: List[Dict[str, Any]], watermark: datetime) -> int:
+        """Apply rows read from the table and move the watermark; the number that changed the index"""
+        with self._lock:
+            applied = self._apply_locked("upsert", rows)
+            self._buffer_locked("upsert", rows)
+            if self.watermark is None or watermark > self.watermark:
+                self.watermark = watermark
+        self._schedule_maintenance()
+        return applied
+
+    def rebuild(self, rows: Iterable[Dict[str, Any]]):
+        """Replace the whole index with the given rows"""
+        fresh = SearchIndex(self.name, self.directory)
+        for row in rows:
+            fresh._apply_locked("upsert", [row])
+        with self._lock:
+            retired = self._adopt_locked(fresh)
+            self._changes = fresh._changes
+            self.is_new = False
+        # The old index is freed here, outside the lock
+        del retired
+
+    def begin_rebuild(self):
+        """Start buffering live changes while rows for a rebuild are read"""
+        with self._lock:
+            self._rebuild_buffer = []
+
+    def finish_rebuild(self, rows: Iterable[Dict[str, Any]], watermark: Optional[datetime] = None):
+        """Rebuild from rows read since watermark, replay the changes made while they were read, and save"""
+        fresh = SearchIndex(self.name, self.directory)
+        for row in rows:
+            fresh._apply_locked("upsert", [row])
+        with self._lock:
+            buffered, self._rebuild_buffer = self._rebuild_buffer or [], None
+            for op, changed in buffered:
+                fresh._apply_locked(op, changed)
+            retired = self._adopt_locked(fresh)
+            self._changes = fresh._changes
+            self.watermark = watermark
+            self.is_new = False
+        del retired
+        self.save()
+
+    # Queries
+
+    def _matching_terms(self, token: str) -> List[str]:
+        """Vocabulary terms a query token matches; the exact term, if any, comes first"""
+        terms = [token] if token in self._postings else []
+        if len(token) < MIN_PARTIAL_TOKEN:
+            return terms
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+            self._recent_terms = []
+        elif len(self._recent_terms) > self.MAX_RECENT_TERMS:
+            # Both lists are sorted runs, which sorted() merges in linear time
+            self._sorted_terms = sorted(self._sorted_terms + self._recent_terms)
+            self._recent_terms = []
+        for vocabulary in (self._sorted_terms, self._recent_terms):
+            # Every term beginning with token sorts between token and token followed by the highest code point
+            begin = bisect_left(vocabulary, token)
+            end = bisect_left(vocabulary, token + LAST_CHARACTER, begin)
+            terms.extend(term for term in vocabulary[begin:end] if term != token)
+        return terms
+
+    def _filter_mask(
+        self,
+        status: Optional[str],
+        type: Optional[str],
+        tags: Optional[List[str]],
+        created_after: Optional[datetime],
+        created_before: Optional[datetime]
+    ) -> Optional[np.ndarray]:
+        mask = np.frombuffer(self._alive, dtype=np.int8).astype(bool)
+        for field, value, values in (("status", status, self._status), ("type", type, self._type)):
+            if value is None:
+                continue
+            code = self._codes[field].get(str(value))
+            if code is None:
+                return None
+            mask &= np.frombuffer(values, dtype=np.int16) == code
+        if tags:
+            tagged = np.zeros(mask.size, dtype=bool)
+            for tag in tags:
+                docs = self._tags.get(str(tag).lower())
+                if docs:
+                    tagged[np.frombuffer(docs, dtype=np.int32)] = True
+            mask &= tagged
+        if created_after is not None or created_before is not None:
+            created = np.frombuffer(self._created, dtype=np.float64)
+            if created_after is not None:
+                mask &= created >= _timestamp(created_after)
+            if created_before is not None:
+                mask &= created <= _timestamp(created_before)
+        return mask
+
+    def search(
+        self,
+        query: str,
+        status: Optional[str] = None,
+        type: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        offset: int = 0,
+        limit: int = 20,
+        order: str = "relevance",
+        descending: bool = True
+    ) -> Tuple[List[Tuple[int, float]], int]:
+        """
+        Row ids and BM25 scores of one page of matches, and the match count
+
+        Matches are ranked best first, or ordered by creation time or row id
+        when `order` is "created_at" or "id".
+        """
+        if order not in ORDERS:
+            raise ValueError(f"Cannot order search results by {order}")
+        with self._lock:
+            if not self._alive_count:
+                return [], 0
+            tokens = list(dict.fromkeys(tokenize(query)))
+            if not tokens:
+                return [], 0
+            mask = self._filter_mask(status, type, tags, created_after, created_before)
+            if mask is None:
+                return [], 0
+
+            scored = []
+            for token in tokens:
+                terms = self._matching_terms(token)
+                if not terms:
+                    return [], 0
+                docs, frequencies = array("i"), array("q")
+                for term in terms:
+                    ids = self._postings[term].ids
+                    docs.extend(ids)
+                    frequencies.append(len(ids))
+                found = np.zeros(mask.size, dtype=bool)
+                found[np.frombuffer(docs, dtype=np.int32)] = True
+                mask &= found
+                if len(terms) > self.MAX_SCORED_TERMS:
+                    # Short prefixes begin much of the vocabulary; rank by the exact and most common terms
+                    common = np.argpartition(-np.frombuffer(frequencies, dtype=np.int64)[1:], self.MAX_SCORED_TERMS - 2)
+                    terms = terms[:1] + [terms[1 + int(i)] for i in common[:self.MAX_SCORED_TERMS - 1]]
+                scored.extend(terms)
+
+            lengths = np.frombuffer(self._lengths, dtype=np.int32)
+            scores = np.zeros(mask.size, dtype=np.float64)
+            total_docs = self._alive_count
+            avgdl = self._alive_length / total_docs or 1.0
+            for term in dict.fromkeys(scored):
+                postings = self._postings[term]
+                ids = np.frombuffer(postings.ids, dtype=np.int32)
+                keep = mask[ids]
+                ids = ids[keep]
+                if not ids.size:
+                    continue
+                tfs = np.frombuffer(postings.tfs, dtype=np.uint16)[keep].astype(np.float64)
+                # Tombstones still count toward df until the next compaction
+                df = min(len(postings.ids), total_docs)
+                idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+                norm = self.K1 * (1 - self.B + self.B * lengths[ids] / avgdl)
+                scores[ids] += idf * tfs * (self.K1 + 1) / (tfs + norm)
+
+            matched = np.flatnonzero(mask)
+            total = int(matched.size)
+            wanted = offset + limit
+            if order == "relevance":
+                if total > wanted:
+                    top = np.argpartition(-scores[matched], wanted - 1)[:wanted]
+                    matched = matched[top]
+                # Best score first; earlier documents win ties
+                ranked = matched[np.lexsort((matched, -scores[matched]))][offset:wanted]
+            else:
+                item_ids = np.frombuffer(self._doc_ids, dtype=np.int64)[matched]
+                keys = (item_ids,) if order == "id" else (item_ids, np.frombuffer(self._created, dtype=np.float64)[matched])
+                ranked = matched[np.lexsort(keys)]
+                if descending:
+                    ranked = ranked[::-1]
+                ranked = ranked[offset:wanted]
+            return [(int(self._doc_ids[doc]), float(scores[doc])) for doc in ranked], total
+
+    # Persistence
+
+    def _copy_locked(self) -> "SearchIndex":
+        """
+        A copy of the index to snapshot, cheap enough to take under the lock
+
+        Per-document arrays are copied; postings and tag lists are shared
+        with the live index and cut back to the copied documents by
+        _detach() outside the lock. Lists only ever grow by appends of
+        higher document numbers, so everything below the copied count
+        stays as it was.
+        """
+        copy = SearchIndex(self.name, self.directory)
+        for attribute in ("_doc_ids", "_lengths", "_alive", "_status", "_type", "_created", "_versions"):
+            setattr(copy, attribute, getattr(self, attribute)[:])
+        copy._postings = dict(self._postings)
+        copy._tags = dict(self._tags)
+        copy._codes = {field: dict(codes) for field, codes in self._codes.items()}
+        copy._alive_count = self._alive_count
+        copy._alive_length = self._alive_length
+        copy.watermark = self.watermark
+        return copy
+
+    def _detach(self):
+        """Give a copy from _copy_locked() postings, tag lists and an id map of its own"""
+        size = len(self._doc_ids)
+
+        def own(values: array, dtype) -> np.ndarray:
+            values = np.frombuffer(values[:], dtype=dtype)
+            return values[:np.searchsorted(values, size)] if values.size and values[-1] >= size else values
+
+        postings = {}
+        for term, entry in self._postings.items():
+            ids = own(entry.ids, np.int32)
+            if ids.size:
+                # tfs are appended after ids; every copied document's entry is already in both
+                postings[term] = _Postings()
+                postings[term].ids.frombytes(ids.tobytes())
+                postings[term].tfs.frombytes(np.frombuffer(entry.tfs[:ids.size], dtype=np.uint16).tobytes())
+        self._postings = postings
+        self._tags = {tag: array("i", own(docs, np.int32).tobytes()) for tag, docs in self._tags.items()}
+        self._by_id = {item_id: doc for doc, item_id in enumerate(self._doc_ids) if self._alive[doc]}
+
+    def _compact(self) -> bool:
+        """Drop tombstoned documents; False if there were none"""
+        alive = np.frombuffer(self._alive, dtype=np.int8).astype(bool)
+        if alive.all():
+            return False
+        remap = np.cumsum(alive, dtype=np.int64) - 1
+        postings = {}
+        for term, entry in self._postings.items():
+            ids = np.frombuffer(entry.ids, dtype=np.int32)
+            keep = alive[ids]
+            if not keep.any():
+                continue
+            compacted = _Postings()
+            compacted.ids.frombytes(remap[ids[keep]].astype(np.int32).tobytes())
+            compacted.tfs.frombytes(np.frombuffer(entry.tfs, dtype=np.uint16)[keep].tobytes())
+            postings[term] = compacted
+        tags = {}
+        for tag, docs in self._tags.items():
+            ids = np.frombuffer(docs, dtype=np.int32)
+            keep = alive[ids]
+            if keep.any():
+                tags[tag] = array("i", remap[ids[keep]].astype(np.int32).tobytes())
+
+        def squeeze(values: array, dtype) -> array:
+            kept = array(values.typecode)
+            kept.frombytes(np.frombuffer(values, dtype=dtype)[alive].tobytes())
+            return kept
+
+        self._doc_ids = squeeze(self._doc_ids, np.int64)
+        self._lengths = squeeze(self._lengths, np.int32)
+        self._status = squeeze(self._status, np.int16)
+        self._type = squeeze(self._type, np.int16)
+        self._created = squeeze(self._created, np.float64)
+        self._versions = squeeze(self._versions, np.int64)
+        self._alive = array("b", bytes([1]) * len(self._doc_ids))
+        self._postings = postings
+        self._tags = tags
+        self._by_id = {item_id: doc for doc, item_id in enumerate(self._doc_ids)}
+        self._sorted_terms = None
+        self._recent_terms = []
+        return True
+
+    def _write_snapshot(self):
+        os.makedirs(self.directory, exist_ok=True)
+        terms = list(self._postings)
+        sizes = np.fromiter((len(self._postings[term].ids) for term in terms), dtype=np.int64, count=len(terms))
+        tag_names = list(self._tags)
+        tag_sizes = np.fromiter((len(self._tags[tag]) for tag in tag_names), dtype=np.int64, count=len(tag_names))
+
+        def joined(parts, dtype) -> np.ndarray:
+            return np.frombuffer(b"".join(part.tobytes() for part in parts), dtype=dtype)
+
+        arrays = {
+            "terms": np.frombuffer("\n".join(terms).encode(), dtype=np.uint8),
+            "term_sizes": sizes,
+            "posting_ids": joined((self._postings[term].ids for term in terms), np.int32),
+            "posting_tfs": joined((self._postings[term].tfs for term in terms), np.uint16),
+            "tag_names": _as_bytes(tag_names),
+            "tag_sizes": tag_sizes,
+            "tag_ids": joined((self._tags[tag] for tag in tag_names), np.int32),
+            "doc_ids": np.frombuffer(self._doc_ids, dtype=np.int64),
+            "lengths": np.frombuffer(self._lengths, dtype=np.int32),
+            "status": np.frombuffer(self._status, dtype=np.int16),
+            "type": np.frombuffer(self._type, dtype=np.int16),
+            "created": np.frombuffer(self._created, dtype=np.float64),
+            "versions": np.frombuffer(self._versions, dtype=np.int64),
+            "codes": _as_bytes(self._codes),
+            "watermark": _as_bytes(self.watermark.isoformat() if self.watermark else None),
+        }
+        # Other workers may be writing the same snapshot; each uses its own temporary file
+        temporary = f"{self._snapshot_path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as fh:
+            np.savez(fh, **arrays)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(temporary, self._snapshot_path)
+
+    def save(self):
+        """Compact and write a snapshot; searches and writes go on meanwhile"""
+        retired = None
+        with self._save_lock:
+            with self._lock:
+                copy = self._copy_locked()
+                generation, changes = self._generation, self._changes
+                self._snapshot_buffer = []
+            try:
+                copy._detach()
+                compacted = copy._compact()
+                copy._write_snapshot()
+            except BaseException:
+                with self._lock:
+                    self._snapshot_buffer = None
+                raise
+            with self._lock:
+                buffered, self._snapshot_buffer = self._snapshot_buffer, None
+                if generation != self._generation:
+                    # A load or rebuild replaced the index meanwhile; it saves its own snapshot
+                    return
+                if compacted:
+                    for op, rows in buffered:
+                        copy._apply_locked(op, rows)
+                    retired = self._adopt_locked(copy)
+                self._changes = max(self._changes - changes, 0)
+                self.is_new = False
+        del retired
+
+    def _read_snapshot(self) -> bool:
+        if not os.path.exists(self._snapshot_path):
+            return False
+        with np.load(self._snapshot_path) as data:
+            if "watermark" not in data or _from_bytes(data["watermark"]) is None:
+                # Written before snapshots carried a watermark; rebuilt from the table
+                logger.info(f"Ignoring search index snapshot {self._snapshot_path} without a watermark")
+                return False
+            self.watermark = datetime.fromisoformat(_from_bytes(data["watermark"]))
+            terms = data["terms"].tobytes().decode().split("\n") if data["terms"].size else []
+            bounds = np.concatenate(([0], np.cumsum(data["term_sizes"])))
+            posting_ids, posting_tfs = data["posting_ids"], data["posting_tfs"]
+            for i, term in enumerate(terms):
+                entry = self._postings[term] = _Postings()
+                entry.ids.frombytes(posting_ids[bounds[i]:bounds[i + 1]].tobytes())
+                entry.tfs.frombytes(posting_tfs[bounds[i]:bounds[i + 1]].tobytes())
+            tag_bounds = np.concatenate(([0], np.cumsum(data["tag_sizes"])))
+            tag_ids = data["tag_ids"]
+            for i, tag in enumerate(_from_bytes(data["tag_names"])):
+                self._tags[tag] = array("i", tag_ids[tag_bounds[i]:tag_bounds[i + 1]].tobytes())
+            for attribute, key in (
+                ("_doc_ids", "doc_ids"), ("_lengths", "lengths"), ("_status", "status"),
+                ("_type", "type"), ("_created", "created"), ("_versions", "versions")
+            ):
+                getattr(self, attribute).frombytes(data[key].tobytes())
+            self._codes = _from_bytes(data["codes"])
+        self._alive = array("b", bytes([1]) * len(self._doc_ids))
+        self._by_id = {item_id: doc for doc, item_id in enumerate(self._doc_ids)}
+        self._alive_count = len(self._doc_ids)
+        self._alive_length = int(np.frombuffer(self._lengths, dtype=np.int32).sum()) if self._alive_count else 0
+        return True
+
+    def load(self) -> bool:
+        """Load the snapshot; False if there is none the index can start from"""
+        fresh = SearchIndex(self.name, self.directory)
+        found = fresh._read_snapshot()
+        with self._lock:
+            retired = self._adopt_locked(fresh)
+            self.watermark = fresh.watermark
+            self._changes = 0
+            self.is_new = not found
+        del retired
+        if found:
+            logger.info(f"Search index {self.name} loaded: {self._alive_count} documents")
+        return found
+
+    def _maintenance_due(self) -> bool:
+        dead = len(self._doc_ids) - self._alive_count
+        return (
+            self._changes >= settings.SEARCH_INDEX_SNAPSHOT_OPS
+            or (dead >= 1000 and dead > settings.SEARCH_INDEX_COMPACT_RATIO * len(self._doc_ids))
+        )
+
+    def _schedule_maintenance(self):
+        if self._maintenance_task is not None or not self._maintenance_due():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+            return
+        self._maintenance_task = loop.create_task(self._maintain())
+
+    async def _maintain(self):
+        try:
+            await asyncio.to_thread(self.save)
+        except Exception as e:
+            logger.error(f"Error writing search index snapshot for {self.name}: {str(e)}")
+        finally:
+            self._maintenance_task = None
+
+    def close(self):
+        """Write a final snapshot if anything changed since the last one"""
+        if (self._changes or not os.path.exists(self._snapshot_path)) and not self.is_new:
+            self.save()
+
+
+_search_indexes: Dict[str, SearchIndex] = {}
+
+
+def get_search_index(name: str, load: bool = True) -> SearchIndex:
+    """Get the search index of a resource, loading it from disk on first use unless load is False"""
+    index = _search_indexes.get(name)
+    if index is None:
+        index = _search_indexes[name] = SearchIndex(name)
+        if load:
+            index.load()
+    return index
+
+
+def close_search_indexes():
+    """Snapshot every open index; call at shutdown"""
+    for index in _search_indexes.values():
+        try:
+            index.close()
+        except Exception as e:
+            logger.error(f"Error closing search index {index.name}: {str(e)}")
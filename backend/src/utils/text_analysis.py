@@ -0,0 +1,142 @@
+import difflib
+import logging
+from typing import Any, Dict, List
+
+import numpy as np
+from textblob import TextBlob
+
+logger = logging.getLogger(__name__)
+
+# Pure, picklable text analysis helpers used by the anti-cheat detectors.
+# They hold no service state so they can run inside the detector process pool.
+
+
+def analyze_text_complexity(text: str) -> Dict[str, Any]:
+    """Analyze text complexity metrics"""
+    try:
+        blob = TextBlob(text)
+        sentences = blob.sentences
+        words = blob.words
+
+        # Basic metrics
+        word_count = len(words)
+        sentence_count = len(sentences)
+        avg_sentence_length = word_count / max(sentence_count, 1)
+
+        # Vocabulary complexity
+        unique_words = len(set(word.lower() for word in words))
+        vocabulary_richness = unique_words / max(word_count, 1)
+
+        # Advanced vocabulary detection
+        complex_words = sum(1 for word in words if len(word) > 6)
+        complex_word_ratio = complex_words / max(word_count, 1)
+
+        # Calculate overall complexity score
+        complexity_score = (
+            min(avg_sentence_length / 15, 1.0) * 0.3 +
+            vocabulary_richness * 0.4 +
+            complex_word_ratio * 0.3
+        )
+
+        return {
+            "word_count": word_count,
+            "sentence_count": sentence_count,
+            "avg_sentence_length": avg_sentence_length,
+            "vocabulary_richness": vocabulary_richness,
+            "complex_word_ratio": complex_word_ratio,
+            "complexity_score": complexity_score,
+            "vocabulary_level": estimate_vocabulary_level(words)
+        }
+
+    except Exception as e:
+        logger.error(f"Error analyzing text complexity: {str(e)}")
+        return {
+            "complexity_score": 0.5,
+            "vocabulary_level": 5,
+            "avg_sentence_length": len(text.split()) / max(text.count('.'), 1)
+        }
+
+
+def estimate_vocabulary_level(words: List[str]) -> int:
+    """Estimate vocabulary level (1-10 scale)"""
+    try:
+        # Simple heuristic based on word length and complexity
+        avg_word_length = np.mean([len(word) for word in words])
+        long_words = sum(1 for word in words if len(word) > 7)
+        long_word_ratio = long_words / max(len(words), 1)
+
+        # Estimate level
+        level = min(10, max(1, int(
+            avg_word_length * 1.2 + long_word_ratio * 8
+        )))
+
+        return level
+    except Exception:
+        return 5
+
+
+def detect_ai_patterns(text: str) -> Dict[str, Any]:
+    """Detect patterns typical of AI-generated text"""
+    ai_indicators = {
+        "formal_structure": 0,
+        "perfect_grammar": 0,
+        "academic_language": 0,
+        "consistent_tone": 0,
+        "lack_of_personality": 0
+    }
+
+    text_lower = text.lower()
+
+    # Check for overly formal structure
+    formal_phrases = ["furthermore", "moreover", "nevertheless", "consequently", "thus", "therefore"]
+    ai_indicators["formal_structure"] = sum(1 for phrase in formal_phrases if phrase in text_lower) / 10
+
+    # Check for academic language patterns
+    academic_words = ["utilize", "facilitate", "demonstrate", "implement", "comprehensive", "fundamental"]
+    ai_indicators["academic_language"] = sum(1 for word in academic_words if word in text_lower) / 10
+
+    # Simple pattern detection
+    sentences = text.split('.')
+    if len(sentences) > 1:
+        # Check for consistent sentence length (AI tends to be consistent)
+        lengths = [len(s.split()) for s in sentences if s.strip()]
+        if lengths:
+            length_variance = np.var(lengths)
+            ai_indicators["consistent_tone"] = 1.0 if length_variance < 5 else 0.0
+
+    # Calculate overall AI pattern score
+    ai_score = sum(ai_indicators.values()) / len(ai_indicators)
+
+    return {
+        "score": min(1.0, ai_score),
+        "indicators": ai_indicators
+    }
+
+
+def calculate_text_similarity(text1: str, text2: str) -> float:
+    """Calculate similarity between two texts"""
+    try:
+        # Use difflib for basic similarity
+        return difflib.SequenceMatcher(None, text1.lower(), text2.lower()).ratio()
+    except Exception:
+        return 0.0
+
+
+def max_text_similarity(text: str, candidates: List[str]) -> float:
+    """Highest similarity between a text and any of the candidate texts"""
+    scores = [calculate_text_similarity(text, candidate) for candidate in candidates if candidate]
+    return max(scores) if scores else 0.0
+
+
+def vocabulary_profile(message: str, history: List[str]) -> Dict[str, Any]:
+    """Compare a message's complexity against the user's message history"""
+    current_analysis = analyze_text_complexity(message)
+    historical_analyses = [analyze_text_complexity(msg) for msg in history]
+
+    return {
+        "current": current_analysis,
+        "avg_complexity": float(np.mean([a['complexity_score'] for a in historical_analyses])),
+        "avg_vocabulary_level": float(np.mean([a['vocabulary_level'] for a in historical_analyses])),
+        "avg_sentence_length": float(np.mean([a['avg_sentence_length'] for a in historical_analyses])),
+        "ai_patterns": detect_ai_patterns(message)
+    }
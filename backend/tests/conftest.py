@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend modules import each other from backend/src (e.g. `from config import settings`)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+from pydantic import BaseModel
+
+from config import settings
+from utils.bulk_ingest import LineTooLongError, ingest_ndjson, ndjson_lines
+
+
+class Item(BaseModel):
+    name: str
+
+
+class FakeRepository:
+    """Stands in for AsyncRepository.bulk_create, assigning sequential ids"""
+
+    def __init__(self):
+        self.rows = []
+
+    async def bulk_create(self, items, user):
+        rows = [{"id": len(self.rows) + i + 1, **item} for i, item in enumerate(items)]
+        self.rows.extend(rows)
+        return rows
+
+
+async def _stream(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def _lines(chunks, max_line_bytes):
+    async def collect():
+        return [pair async for pair in ndjson_lines(_stream(chunks), max_line_bytes)]
+    return asyncio.run(collect())
+
+
+def _ingest(chunks):
+    repository = FakeRepository()
+
+    async def collect():
+        return [json.loads(out) async for out in ingest_ndjson(_stream(chunks), Item, repository)]
+    return asyncio.run(collect()), repository
+
+
+OVERLONG = [b'{"name":"a"}\n' + b"y" * 30, b'\n{"name":"c"}\n']
+
+
+def test_overlong_line_does_not_drop_neighbours():
+    pairs = _lines(OVERLONG, max_line_bytes=20)
+    assert [number for number, _ in pairs] == [1, 2, 3]
+    assert pairs[0][1] == b'{"name":"a"}'
+    assert isinstance(pairs[1][1], LineTooLongError)
+    assert pairs[2][1] == b'{"name":"c"}'
+
+
+def test_overlong_line_within_one_chunk_and_at_end_of_body():
+    pairs = _lines([b"z" * 30 + b'\n{"name":"b"}\n' + b"w" * 30], max_line_bytes=20)
+    assert [number for number, _ in pairs] == [1, 2, 3]
+    assert isinstance(pairs[0][1], LineTooLongError)
+    assert isinstance(pairs[2][1], LineTooLongError)
+
+
+def test_line_numbers_count_blank_lines():
+    pairs = _lines([b'{"name":"a"}\n\n', b'{"bad":1}\n  \n{"name":"c"}'], max_line_bytes=100)
+    assert [number for number, _ in pairs] == [1, 3, 5]
+
+
+def test_ingest_reports_overlong_line_and_keeps_going(monkeypatch):
+    monkeypatch.setattr(settings, "BULK_INGEST_MAX_LINE_BYTES", 20)
+    results, repository = _ingest(OVERLONG)
+    assert [r["name"] for r in repository.rows] == ["a", "c"]
+    assert results[:-1] == [
+        {"line": 2, "status": "invalid", "error": "Line longer than 20 bytes"},
+        {"line": 1, "status": "created", "id": 1},
+        {"line": 3, "status": "created", "id": 2},
+    ]
+    assert results[-1] == {"summary": {"lines": 3, "created": 2, "invalid": 1, "error": 0}}
+
+
+def test_ingest_reports_physical_line_numbers():
+    results, _ = _ingest([b'{"name":"a"}\n\n{"bad":1}'])
+    invalid = [r for r in results if r.get("status") == "invalid"]
+    assert [r["line"] for r in invalid] == [3]